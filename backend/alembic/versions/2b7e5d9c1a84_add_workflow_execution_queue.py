@@ -0,0 +1,36 @@
+"""Add workflow execution queue
+
+Revision ID: 2b7e5d9c1a84
+Revises: 9d2c4b6e8f13
+Create Date: 2026-10-18 15:20:08.114562
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2b7e5d9c1a84'
+down_revision: Union[str, None] = '9d2c4b6e8f13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('workflow_executions', sa.Column('planned_actions', sa.JSON(), nullable=True))
+    op.add_column('workflow_executions', sa.Column('next_action_index', sa.Integer(), nullable=True))
+    op.add_column('workflow_executions', sa.Column('scheduled_at', sa.DateTime(), nullable=True))
+    op.add_column('workflow_executions', sa.Column('locked_by', sa.String(length=100), nullable=True))
+    op.add_column('workflow_executions', sa.Column('locked_until', sa.DateTime(), nullable=True))
+    op.create_index('ix_workflow_executions_queue', 'workflow_executions', ['status', 'scheduled_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_workflow_executions_queue', table_name='workflow_executions')
+    op.drop_column('workflow_executions', 'locked_until')
+    op.drop_column('workflow_executions', 'locked_by')
+    op.drop_column('workflow_executions', 'scheduled_at')
+    op.drop_column('workflow_executions', 'next_action_index')
+    op.drop_column('workflow_executions', 'planned_actions')
@@ -0,0 +1,68 @@
+"""Add background report jobs
+
+Revision ID: 4c8e1a7d3f26
+Revises: 7f3a9c2e5b10
+Create Date: 2026-10-18 18:11:04.396182
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c8e1a7d3f26'
+down_revision: Union[str, None] = '7f3a9c2e5b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+job_status = sa.Enum('QUEUED', 'RUNNING', 'COMPLETED', 'FAILED', name='reportjobstatus')
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TYPE reportformat ADD VALUE IF NOT EXISTS 'JSONL'")
+            op.execute("ALTER TYPE reportformat ADD VALUE IF NOT EXISTS 'PARQUET'")
+    job_status.create(op.get_bind(), checkfirst=True)
+
+    # Reports and exports created before this revision were generated synchronously
+    op.add_column('reports', sa.Column('status', job_status, nullable=False, server_default='COMPLETED'))
+    op.add_column('reports', sa.Column('progress', sa.Integer(), nullable=False, server_default='100'))
+    op.add_column('reports', sa.Column('error_message', sa.Text(), nullable=True))
+    op.add_column('reports', sa.Column('started_at', sa.DateTime(), nullable=True))
+    op.add_column('reports', sa.Column('completed_at', sa.DateTime(), nullable=True))
+    op.add_column('reports', sa.Column('locked_by', sa.String(length=100), nullable=True))
+    op.add_column('reports', sa.Column('locked_until', sa.DateTime(), nullable=True))
+    op.create_index('ix_reports_status', 'reports', ['status'])
+
+    op.add_column('report_exports', sa.Column('status', job_status, nullable=False, server_default='COMPLETED'))
+    op.add_column('report_exports', sa.Column('progress', sa.Integer(), nullable=False, server_default='100'))
+    op.add_column('report_exports', sa.Column('row_count', sa.Integer(), nullable=True))
+    op.add_column('report_exports', sa.Column('error_message', sa.Text(), nullable=True))
+    op.add_column('report_exports', sa.Column('completed_at', sa.DateTime(), nullable=True))
+    op.add_column('report_exports', sa.Column('locked_by', sa.String(length=100), nullable=True))
+    op.add_column('report_exports', sa.Column('locked_until', sa.DateTime(), nullable=True))
+    op.create_index('ix_report_exports_status', 'report_exports', ['status'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_report_exports_status', table_name='report_exports')
+    op.drop_column('report_exports', 'locked_until')
+    op.drop_column('report_exports', 'locked_by')
+    op.drop_column('report_exports', 'completed_at')
+    op.drop_column('report_exports', 'error_message')
+    op.drop_column('report_exports', 'row_count')
+    op.drop_column('report_exports', 'progress')
+    op.drop_column('report_exports', 'status')
+
+    op.drop_index('ix_reports_status', table_name='reports')
+    op.drop_column('reports', 'locked_until')
+    op.drop_column('reports', 'locked_by')
+    op.drop_column('reports', 'completed_at')
+    op.drop_column('reports', 'started_at')
+    op.drop_column('reports', 'error_message')
+    op.drop_column('reports', 'progress')
+    op.drop_column('reports', 'status')
+    job_status.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,50 @@
+"""Add webhook delivery batching
+
+Revision ID: 5e9b0f3c7a21
+Revises: c41d7e2a9f10
+Create Date: 2026-10-18 11:37:05.218840
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e9b0f3c7a21'
+down_revision: Union[str, None] = 'c41d7e2a9f10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('webhook_endpoints', sa.Column('batch_enabled', sa.Boolean(), nullable=True))
+    op.add_column('webhook_endpoints', sa.Column('batch_max_size', sa.Integer(), nullable=True))
+    op.add_column('webhook_endpoints', sa.Column('batch_max_linger_ms', sa.Integer(), nullable=True))
+    op.add_column('webhook_endpoints', sa.Column('batch_max_bytes', sa.Integer(), nullable=True))
+    op.add_column('webhook_deliveries', sa.Column('event_count', sa.Integer(), nullable=True))
+    op.add_column('webhook_deliveries', sa.Column('payload_size', sa.Integer(), nullable=True))
+    op.create_table('webhook_delivery_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('delivery_id', sa.Integer(), nullable=False),
+    sa.Column('event_id', sa.String(length=255), nullable=False),
+    sa.Column('event_type', sa.String(length=100), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['delivery_id'], ['webhook_deliveries.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_webhook_delivery_events_id'), 'webhook_delivery_events', ['id'], unique=False)
+    op.create_index(op.f('ix_webhook_delivery_events_event_id'), 'webhook_delivery_events', ['event_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_webhook_delivery_events_event_id'), table_name='webhook_delivery_events')
+    op.drop_index(op.f('ix_webhook_delivery_events_id'), table_name='webhook_delivery_events')
+    op.drop_table('webhook_delivery_events')
+    op.drop_column('webhook_deliveries', 'payload_size')
+    op.drop_column('webhook_deliveries', 'event_count')
+    op.drop_column('webhook_endpoints', 'batch_max_bytes')
+    op.drop_column('webhook_endpoints', 'batch_max_linger_ms')
+    op.drop_column('webhook_endpoints', 'batch_max_size')
+    op.drop_column('webhook_endpoints', 'batch_enabled')
@@ -0,0 +1,58 @@
+"""Add analytics rollups
+
+Analytics read only these counters. The table starts empty, so existing
+deployments must backfill it from tasks and time logs after upgrading:
+
+    python -m scripts.rebuild_rollups
+
+Revision ID: 7f3a9c2e5b10
+Revises: 2b7e5d9c1a84
+Create Date: 2026-10-18 16:42:31.508217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7f3a9c2e5b10'
+down_revision: Union[str, None] = '2b7e5d9c1a84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('analytics_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('organization_id', sa.Integer(), nullable=False),
+    sa.Column('scope_type', sa.String(length=20), nullable=False),
+    sa.Column('scope_id', sa.Integer(), nullable=False),
+    sa.Column('granularity', sa.String(length=10), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('tasks_created', sa.Integer(), nullable=False),
+    sa.Column('tasks_completed', sa.Integer(), nullable=False),
+    sa.Column('completed_on_time', sa.Integer(), nullable=False),
+    sa.Column('completed_late', sa.Integer(), nullable=False),
+    sa.Column('tasks_todo', sa.Integer(), nullable=False),
+    sa.Column('tasks_in_progress', sa.Integer(), nullable=False),
+    sa.Column('tasks_in_review', sa.Integer(), nullable=False),
+    sa.Column('tasks_done', sa.Integer(), nullable=False),
+    sa.Column('tasks_cancelled', sa.Integer(), nullable=False),
+    sa.Column('minutes_logged', sa.Integer(), nullable=False),
+    sa.Column('billable_minutes', sa.Integer(), nullable=False),
+    sa.Column('time_entries', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('organization_id', 'scope_type', 'scope_id', 'granularity', 'bucket_start', name='uq_analytics_rollup_bucket')
+    )
+    op.create_index(op.f('ix_analytics_rollups_id'), 'analytics_rollups', ['id'], unique=False)
+    op.create_index('ix_analytics_rollups_scope_bucket', 'analytics_rollups', ['scope_type', 'scope_id', 'granularity', 'bucket_start'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_analytics_rollups_scope_bucket', table_name='analytics_rollups')
+    op.drop_index(op.f('ix_analytics_rollups_id'), table_name='analytics_rollups')
+    op.drop_table('analytics_rollups')
@@ -0,0 +1,36 @@
+"""Add report scheduler
+
+Revision ID: 8a1d5f3b9c47
+Revises: 4c8e1a7d3f26
+Create Date: 2026-10-18 19:37:52.118406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a1d5f3b9c47'
+down_revision: Union[str, None] = '4c8e1a7d3f26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('scheduler_leases',
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('holder', sa.String(length=100), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('acquired_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.add_column('report_alerts', sa.Column('last_value', sa.Float(), nullable=True))
+    op.add_column('report_alerts', sa.Column('consecutive_breaches', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    op.drop_column('report_alerts', 'consecutive_breaches')
+    op.drop_column('report_alerts', 'last_value')
+    op.drop_table('scheduler_leases')
@@ -0,0 +1,29 @@
+"""Fix workflow status default
+
+Revision ID: 9d2c4b6e8f13
+Revises: 5e9b0f3c7a21
+Create Date: 2026-10-18 14:02:27.730914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d2c4b6e8f13'
+down_revision: Union[str, None] = '5e9b0f3c7a21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The old default stored the enum value instead of its name; only
+    # databases without a native enum type could have accepted it
+    if op.get_bind().dialect.name != 'postgresql':
+        op.execute("UPDATE workflow_definitions SET status = 'ACTIVE' WHERE status = 'active'")
+
+
+def downgrade() -> None:
+    pass
@@ -0,0 +1,84 @@
+"""Add activity log and retention cohorts
+
+Revision ID: b3f6d2a8c514
+Revises: 8a1d5f3b9c47
+Create Date: 2026-10-18 21:14:06.392750
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f6d2a8c514'
+down_revision: Union[str, None] = '8a1d5f3b9c47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('activity_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('organization_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('event_type', sa.String(length=50), nullable=False),
+    sa.Column('entity_type', sa.String(length=50), nullable=True),
+    sa.Column('entity_id', sa.Integer(), nullable=True),
+    sa.Column('occurred_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_activity_events_id'), 'activity_events', ['id'], unique=False)
+    op.create_index('ix_activity_events_org_occurred', 'activity_events', ['organization_id', 'occurred_at'], unique=False)
+    op.create_table('activity_sketches',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('organization_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('register', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('organization_id', 'day', 'register', name='uq_activity_sketch_register')
+    )
+    op.create_index(op.f('ix_activity_sketches_id'), 'activity_sketches', ['id'], unique=False)
+    op.create_index('ix_activity_sketches_day', 'activity_sketches', ['day'], unique=False)
+    op.create_table('activity_members',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('organization_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('first_active_on', sa.Date(), nullable=False),
+    sa.Column('last_active_on', sa.Date(), nullable=False),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('organization_id', 'user_id', name='uq_activity_member')
+    )
+    op.create_index(op.f('ix_activity_members_id'), 'activity_members', ['id'], unique=False)
+    op.create_table('retention_cohorts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('organization_id', sa.Integer(), nullable=False),
+    sa.Column('granularity', sa.String(length=10), nullable=False),
+    sa.Column('cohort_start', sa.Date(), nullable=False),
+    sa.Column('period', sa.Integer(), nullable=False),
+    sa.Column('users', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('organization_id', 'granularity', 'cohort_start', 'period', name='uq_retention_cohort_cell')
+    )
+    op.create_index(op.f('ix_retention_cohorts_id'), 'retention_cohorts', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_retention_cohorts_id'), table_name='retention_cohorts')
+    op.drop_table('retention_cohorts')
+    op.drop_index(op.f('ix_activity_members_id'), table_name='activity_members')
+    op.drop_table('activity_members')
+    op.drop_index('ix_activity_sketches_day', table_name='activity_sketches')
+    op.drop_index(op.f('ix_activity_sketches_id'), table_name='activity_sketches')
+    op.drop_table('activity_sketches')
+    op.drop_index('ix_activity_events_org_occurred', table_name='activity_events')
+    op.drop_index(op.f('ix_activity_events_id'), table_name='activity_events')
+    op.drop_table('activity_events')
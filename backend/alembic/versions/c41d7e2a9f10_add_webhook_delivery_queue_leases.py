@@ -0,0 +1,30 @@
+"""Add webhook delivery queue leases
+
+Revision ID: c41d7e2a9f10
+Revises: a8504512dd54
+Create Date: 2026-10-18 09:12:41.503218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d7e2a9f10'
+down_revision: Union[str, None] = 'a8504512dd54'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('webhook_deliveries', sa.Column('locked_by', sa.String(length=100), nullable=True))
+    op.add_column('webhook_deliveries', sa.Column('locked_until', sa.DateTime(), nullable=True))
+    op.create_index('ix_webhook_deliveries_queue', 'webhook_deliveries', ['status', 'next_retry_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_webhook_deliveries_queue', table_name='webhook_deliveries')
+    op.drop_column('webhook_deliveries', 'locked_until')
+    op.drop_column('webhook_deliveries', 'locked_by')
@@ -0,0 +1,49 @@
+"""Add time log rollups
+
+Timesheets and time summaries read only these rows. The table starts
+empty, so existing deployments must backfill it from time logs after
+upgrading:
+
+    python -m scripts.rebuild_rollups
+
+Revision ID: d7e2c9a4f613
+Revises: b3f6d2a8c514
+Create Date: 2026-10-18 22:03:41.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7e2c9a4f613'
+down_revision: Union[str, None] = 'b3f6d2a8c514'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('time_log_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('task_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('minutes', sa.Integer(), nullable=False),
+    sa.Column('billable_minutes', sa.Integer(), nullable=False),
+    sa.Column('entries', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['task_id'], ['tasks.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'day', 'task_id', name='uq_time_log_rollup')
+    )
+    op.create_index(op.f('ix_time_log_rollups_id'), 'time_log_rollups', ['id'], unique=False)
+    op.create_index('ix_time_log_rollups_task_day', 'time_log_rollups', ['task_id', 'day'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_time_log_rollups_task_day', table_name='time_log_rollups')
+    op.drop_index(op.f('ix_time_log_rollups_id'), table_name='time_log_rollups')
+    op.drop_table('time_log_rollups')
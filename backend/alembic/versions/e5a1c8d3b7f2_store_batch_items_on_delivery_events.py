@@ -0,0 +1,26 @@
+"""Store batch items on delivery events
+
+Revision ID: e5a1c8d3b7f2
+Revises: d7e2c9a4f613
+Create Date: 2026-10-19 09:12:27.604318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a1c8d3b7f2'
+down_revision: Union[str, None] = 'd7e2c9a4f613'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('webhook_delivery_events', sa.Column('payload', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('webhook_delivery_events', 'payload')
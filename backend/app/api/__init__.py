@@ -2,7 +2,7 @@
 
 from fastapi import APIRouter
 
-from app.api.routes import auth, organizations, projects, tasks, users, advanced_features, websocket, files, search, workflow, webhooks, security, performance, performance_optimization, admin, config
+from app.api.routes import auth, organizations, projects, tasks, users, advanced_features, websocket, files, search, workflow, webhooks, security, performance, performance_optimization, admin, config, reports, dashboards
 
 # Create main API router
 api_router = APIRouter()
@@ -30,3 +30,5 @@ api_router.include_router(performance.router, tags=["performance-optimization"])
 api_router.include_router(performance_optimization.router, prefix="/optimization", tags=["advanced-optimization"])
 api_router.include_router(admin.router, prefix="/admin", tags=["admin-dashboard"])
 api_router.include_router(config.router, prefix="/config", tags=["system-configuration"])
+api_router.include_router(reports.router, tags=["reports"])
+api_router.include_router(dashboards.router, tags=["dashboards"])
@@ -3,7 +3,8 @@ Administrative dashboard and analytics API endpoints
 """
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, desc, and_, or_
 
@@ -13,9 +14,14 @@ from app.models.user import User
 from app.models.organization import Organization
 from app.models.project import Project
 from app.models.task import Task
+from app.models.analytics import ReportFrequency, ReportSchedule, ReportTemplate
 from app.schemas.analytics import *
+from app.services.admin_dashboard import admin_dashboard
 from app.services.analytics_service import analytics_service
 from app.services.performance_service import performance_monitor, metrics_collector
+from app.services.report_exports import csv_lines, flatten
+from app.services.report_scheduler import CronExpression, next_run_time, report_scheduler
+from app.services.retention import retention_engine
 from app.core.cache import cache
 
 
@@ -24,41 +30,15 @@ router = APIRouter()
 
 @router.get("/admin/dashboard")
 async def get_admin_dashboard(
-    db: AsyncSession = Depends(get_db),
+    refresh: bool = Query(False, description="Rebuild instead of serving the cached dashboard"),
     current_user: User = Depends(get_current_admin_user)
 ) -> Dict[str, Any]:
     """Get comprehensive admin dashboard data"""
     try:
-        # Get system overview statistics
-        system_stats = await get_system_statistics(db)
-        
-        # Get user activity metrics
-        user_metrics = await analytics_service.get_user_activity_summary(days=30)
-        
-        # Get performance summary
-        performance_summary = await performance_monitor.get_performance_summary()
-        
-        # Get organization metrics
-        org_metrics = await get_organization_metrics(db)
-        
-        # Get recent activities
-        recent_activities = await get_recent_system_activities(db, limit=10)
-        
-        # Get system health
-        system_health = await get_system_health_overview()
-        
-        # Get growth metrics
-        growth_metrics = await get_growth_metrics(db)
-        
+        dashboard = await (admin_dashboard.refresh() if refresh else admin_dashboard.get())
+
         return {
-            "dashboard_timestamp": datetime.utcnow(),
-            "system_statistics": system_stats,
-            "user_metrics": user_metrics,
-            "performance_summary": performance_summary,
-            "organization_metrics": org_metrics,
-            "recent_activities": recent_activities,
-            "system_health": system_health,
-            "growth_metrics": growth_metrics,
+            **dashboard,
             "quick_actions": [
                 {"title": "User Management", "url": "/admin/users", "icon": "users"},
                 {"title": "System Performance", "url": "/admin/performance", "icon": "activity"},
@@ -328,6 +308,32 @@ async def get_system_health_detailed(
         raise HTTPException(status_code=500, detail=f"Error getting system health: {str(e)}")
 
 
+@router.post("/admin/system/retention")
+async def run_retention_cleanup(
+    archive: bool = Query(False, description="Archive purged rows to gzipped JSONL"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+) -> Dict[str, Any]:
+    """Purge log records past their retention period"""
+    try:
+        results = await retention_engine.run(db, archive=archive)
+        
+        return {
+            "timestamp": datetime.utcnow(),
+            "policies": {
+                name: {
+                    "deleted": result.deleted,
+                    "batches": result.batches,
+                    "archive_path": result.archive_path
+                }
+                for name, result in results.items()
+            }
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error running retention cleanup: {str(e)}")
+
+
 @router.get("/admin/reports/usage")
 async def generate_usage_report(
     start_date: datetime = Query(..., description="Start date for report"),
@@ -385,8 +391,12 @@ async def generate_usage_report(
         }
         
         if format == "csv":
-            # Convert to CSV format (implementation would be added)
-            return {"message": "CSV format not yet implemented", "data": report_data}
+            filename = f"usage-report-{start_date:%Y%m%d}-{end_date:%Y%m%d}.csv"
+            return StreamingResponse(
+                csv_lines([("metric", "value"), *flatten(report_data)]),
+                media_type="text/csv",
+                headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+            )
         elif format == "pdf":
             # Convert to PDF format (implementation would be added)
             return {"message": "PDF format not yet implemented", "data": report_data}
@@ -400,166 +410,75 @@ async def generate_usage_report(
 @router.post("/admin/reports/schedule")
 async def schedule_report(
     report_config: Dict[str, Any],
-    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_admin_user)
-) -> Dict[str, str]:
-    """Schedule automated report generation"""
+) -> Dict[str, Any]:
+    """Schedule automated report generation.
+    
+    ``schedule`` is a frequency (daily, weekly, monthly, quarterly, yearly)
+    or a five-field cron expression; ``time``, ``day`` and ``timezone``
+    place frequency-based runs.
+    """
     try:
         # Validate report configuration
-        required_fields = ["report_type", "schedule", "recipients"]
+        required_fields = ["template_id", "schedule", "recipients"]
         for field in required_fields:
             if field not in report_config:
                 raise HTTPException(status_code=400, detail=f"Missing required field: {field}")
         
-        # Schedule the report generation
-        background_tasks.add_task(
-            schedule_automated_report,
-            report_config,
-            current_user.id
+        template = await db.get(ReportTemplate, report_config["template_id"])
+        if not template or not template.is_active:
+            raise HTTPException(status_code=404, detail="Report template not found")
+        
+        parameters = dict(report_config.get("parameters", {}))
+        frequency_values = {frequency.value for frequency in ReportFrequency}
+        if report_config["schedule"] in frequency_values:
+            frequency = ReportFrequency(report_config["schedule"])
+        else:
+            try:
+                CronExpression(report_config["schedule"])
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"Invalid schedule: {str(e)}")
+            frequency = ReportFrequency.DAILY
+            parameters["cron"] = report_config["schedule"]
+        
+        schedule = ReportSchedule(
+            name=report_config.get("name") or f"{template.name} ({report_config['schedule']})",
+            description=report_config.get("description"),
+            template_id=template.id,
+            frequency=frequency,
+            scheduled_time=report_config.get("time"),
+            scheduled_day=report_config.get("day"),
+            timezone=report_config.get("timezone", "UTC"),
+            parameters=parameters,
+            auto_export_formats=report_config.get("export_formats", []),
+            email_recipients=report_config["recipients"],
+            organization_id=template.organization_id,
+            created_by=current_user.id
         )
+        schedule.next_run_at = next_run_time(schedule, datetime.utcnow())
+        db.add(schedule)
+        await db.commit()
+        await db.refresh(schedule)
+        
+        report_scheduler.notify()
         
         return {
             "status": "success",
-            "message": f"Report scheduled successfully: {report_config['report_type']}",
+            "message": f"Report scheduled successfully: {template.report_type.value}",
             "schedule": report_config["schedule"],
-            "report_id": f"report_{int(datetime.utcnow().timestamp())}"
+            "schedule_id": schedule.id,
+            "next_run_at": schedule.next_run_at
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error scheduling report: {str(e)}")
 
 
 # Helper functions for analytics calculations
 
-async def get_system_statistics(db: AsyncSession) -> Dict[str, Any]:
-    """Get basic system statistics"""
-    # Total counts
-    total_users = await db.scalar(select(func.count(User.id)).where(User.is_active == True))
-    total_orgs = await db.scalar(select(func.count(Organization.id)).where(Organization.is_active == True))
-    total_projects = await db.scalar(select(func.count(Project.id)).where(Project.is_active == True))
-    total_tasks = await db.scalar(select(func.count(Task.id)).where(Task.is_active == True))
-    
-    return {
-        "total_users": total_users or 0,
-        "total_organizations": total_orgs or 0,
-        "total_projects": total_projects or 0,
-        "total_tasks": total_tasks or 0,
-        "last_updated": datetime.utcnow()
-    }
-
-
-async def get_organization_metrics(db: AsyncSession) -> Dict[str, Any]:
-    """Get organization-level metrics"""
-    # Most active organizations by task count
-    result = await db.execute(
-        select(Organization.name, func.count(Task.id).label('task_count'))
-        .join(Project, Organization.id == Project.organization_id)
-        .join(Task, Project.id == Task.project_id)
-        .where(and_(Organization.is_active == True, Task.is_active == True))
-        .group_by(Organization.id, Organization.name)
-        .order_by(desc('task_count'))
-        .limit(10)
-    )
-    
-    top_orgs = [{"name": row[0], "task_count": row[1]} for row in result]
-    
-    return {
-        "top_organizations_by_activity": top_orgs,
-        "average_projects_per_org": await get_average_projects_per_org(db),
-        "average_users_per_org": await get_average_users_per_org(db)
-    }
-
-
-async def get_recent_system_activities(db: AsyncSession, limit: int = 10) -> List[Dict[str, Any]]:
-    """Get recent system activities"""
-    # This would typically come from an audit log table
-    # For now, return recent task creations as proxy for activity
-    result = await db.execute(
-        select(Task.title, Task.created_at, User.username, Project.name.label('project_name'))
-        .join(User, Task.assignee_id == User.id)
-        .join(Project, Task.project_id == Project.id)
-        .where(Task.is_active == True)
-        .order_by(desc(Task.created_at))
-        .limit(limit)
-    )
-    
-    activities = []
-    for row in result:
-        activities.append({
-            "type": "task_created",
-            "description": f"Task '{row[0]}' created in project '{row[3]}'",
-            "user": row[2],
-            "timestamp": row[1],
-            "icon": "plus-circle"
-        })
-    
-    return activities
-
-
-async def get_system_health_overview() -> Dict[str, Any]:
-    """Get basic system health overview"""
-    # This would integrate with various health check systems
-    return {
-        "overall_status": "healthy",
-        "api_status": "operational",
-        "database_status": "healthy",
-        "cache_status": "operational",
-        "storage_status": "healthy",
-        "last_check": datetime.utcnow()
-    }
-
-
-async def get_growth_metrics(db: AsyncSession) -> Dict[str, Any]:
-    """Get growth metrics for the past 30 days"""
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    
-    # User growth
-    users_30_days = await db.scalar(
-        select(func.count(User.id))
-        .where(and_(User.created_at >= thirty_days_ago, User.is_active == True))
-    )
-    
-    # Organization growth
-    orgs_30_days = await db.scalar(
-        select(func.count(Organization.id))
-        .where(and_(Organization.created_at >= thirty_days_ago, Organization.is_active == True))
-    )
-    
-    # Project growth
-    projects_30_days = await db.scalar(
-        select(func.count(Project.id))
-        .where(and_(Project.created_at >= thirty_days_ago, Project.is_active == True))
-    )
-    
-    return {
-        "new_users_30_days": users_30_days or 0,
-        "new_organizations_30_days": orgs_30_days or 0,
-        "new_projects_30_days": projects_30_days or 0,
-        "growth_period": "30 days"
-    }
-
-
-# Additional helper functions would be implemented here...
-async def get_average_projects_per_org(db: AsyncSession) -> float:
-    """Calculate average projects per organization"""
-    result = await db.execute(
-        select(func.avg(func.count(Project.id)))
-        .select_from(Organization)
-        .join(Project, Organization.id == Project.organization_id, isouter=True)
-        .where(Organization.is_active == True)
-        .group_by(Organization.id)
-    )
-    avg_projects = result.scalar()
-    return round(avg_projects or 0, 2)
-
-
-async def get_average_users_per_org(db: AsyncSession) -> float:
-    """Calculate average users per organization"""
-    # This would require a user-organization membership table
-    # For now, return a placeholder
-    return 5.2
-
-
 def get_health_status_from_score(score: float) -> str:
     """Convert health score to status string"""
     if score >= 90:
@@ -574,13 +493,6 @@ def get_health_status_from_score(score: float) -> str:
         return "critical"
 
 
-async def schedule_automated_report(report_config: Dict[str, Any], user_id: str):
-    """Background task to schedule automated reports"""
-    # This would integrate with a job scheduler like Celery
-    print(f"Scheduling automated report: {report_config['report_type']} for user {user_id}")
-    # Implementation would be added here
-
-
 # Placeholder functions for various analytics calculations
 async def get_project_analytics(db: AsyncSession, days: int) -> Dict[str, Any]:
     """Get project analytics (placeholder)"""
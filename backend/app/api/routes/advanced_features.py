@@ -1,7 +1,7 @@
 """
 Advanced task features API routes: Time tracking, templates, analytics, and workflow management.
 """
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import List, Optional, Dict, Any
 import json
 
@@ -31,13 +31,13 @@ from app.models.task import Task, TaskStatus, TaskPriority
 from app.models.time_tracking import (
     TaskTimeLog, TaskTemplate, TaskActivity, TaskMention, TaskAssignmentHistory
 )
-from app.models.organization import Organization
-from app.models.project import Project
+from app.models.organization import Organization, OrganizationMember, OrganizationMemberRole
+from app.models.project import Project, ProjectMember
 from app.schemas.advanced_features import (
     # Time tracking schemas
     TaskTimeLogCreate, TaskTimeLogUpdate, TaskTimeLogResponse,
     TimeTrackingStartRequest, TimeTrackingStopRequest,
-    TimeReportFilter, TimeReportSummary,
+    TimeReportFilter, TimeReportSummary, TimesheetResponse,
     
     # Template schemas
     TaskTemplateCreate, TaskTemplateUpdate, TaskTemplateResponse,
@@ -58,11 +58,18 @@ from app.schemas.advanced_features import (
 )
 from app.schemas.task import TaskRead
 
+from app.services.activity_log import activity_log
+from app.services.advanced_features import TimeTrackingService
+from app.services.analytics_rollups import TaskState, analytics_rollups
+from app.services.time_rollups import TimeLogState, time_rollups
+
 # Import real-time notification service
 from app.services.realtime_notifications import trigger_time_tracking_notification
 
 router = APIRouter(prefix="/advanced", tags=["advanced-features"])
 
+MAX_TIMESHEET_DAYS = 92
+
 
 # ============================================================================
 # Time Tracking Endpoints
@@ -171,7 +178,7 @@ async def stop_time_tracking(
     
     # Find the running timer
     query = select(TaskTimeLog).options(
-        selectinload(TaskTimeLog.task)
+        selectinload(TaskTimeLog.task).selectinload(Task.project)
     ).where(
         and_(
             TaskTimeLog.user_id == current_user.id,
@@ -202,6 +209,13 @@ async def stop_time_tracking(
         task.actual_hours = 0
     task.actual_hours += round(duration_minutes / 60, 2)
     
+    organization_id = task.project.organization_id
+    await analytics_rollups.record_time_log(db, time_log, task.project_id, organization_id)
+    await time_rollups.record(db, None, TimeLogState.from_time_log(time_log))
+    await activity_log.record(
+        db, current_user.id, [organization_id], "time_logged", "task", task.id, time_log.end_time
+    )
+    
     # Create activity log
     activity = TaskActivity(
         task_id=task.id,
@@ -338,6 +352,174 @@ async def get_time_logs(
     ]
 
 
+@router.patch("/time-tracking/logs/{log_id}", response_model=TaskTimeLogResponse)
+async def update_time_log(
+    log_id: int,
+    request: TaskTimeLogUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user_model)
+):
+    """Edit one of your finished time logs."""
+    
+    query = select(TaskTimeLog).options(
+        selectinload(TaskTimeLog.task).selectinload(Task.project)
+    ).where(
+        and_(
+            TaskTimeLog.id == log_id,
+            TaskTimeLog.user_id == current_user.id,
+            TaskTimeLog.is_active == True
+        )
+    )
+    result = await db.execute(query)
+    time_log = result.scalar_one_or_none()
+    
+    if not time_log:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Time log not found"
+        )
+    if time_log.is_running and request.end_time is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Stop the running timer instead of setting its end time"
+        )
+    if request.end_time is not None and request.end_time <= time_log.start_time:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="End time must be after the start time"
+        )
+    
+    task = time_log.task
+    organization_id = task.project.organization_id
+    before = TimeLogState.from_time_log(time_log)
+    if before is not None:
+        # Take the log out of the analytics rollups as it was, then add it back as it is
+        await analytics_rollups.record_time_log(db, time_log, task.project_id, organization_id, sign=-1)
+    
+    if request.description is not None:
+        time_log.description = request.description
+    if request.is_billable is not None:
+        time_log.is_billable = request.is_billable
+    if request.end_time is not None:
+        time_log.stop_timer(request.end_time)
+    after = TimeLogState.from_time_log(time_log)
+    
+    if before is not None:
+        await analytics_rollups.record_time_log(db, time_log, task.project_id, organization_id)
+        task.actual_hours = round(
+            (task.actual_hours or 0) + (after.duration_minutes - before.duration_minutes) / 60, 2
+        )
+    await time_rollups.record(db, before, after)
+    
+    await db.commit()
+    await db.refresh(time_log)
+    
+    return TaskTimeLogResponse(
+        id=time_log.id,
+        task_id=time_log.task_id,
+        user_id=time_log.user_id,
+        start_time=time_log.start_time,
+        end_time=time_log.end_time,
+        duration_minutes=time_log.duration_minutes,
+        description=time_log.description,
+        is_billable=time_log.is_billable,
+        is_running=time_log.is_running,
+        created_at=time_log.created_at,
+        updated_at=time_log.updated_at,
+        user_name=current_user.full_name,
+        task_title=task.title
+    )
+
+
+@router.get("/time-tracking/timesheet", response_model=TimesheetResponse)
+async def get_timesheet(
+    start_date: date = Query(..., description="First day of the timesheet"),
+    end_date: date = Query(..., description="Last day of the timesheet"),
+    user_ids: Optional[List[int]] = Query(None, description="Users to include"),
+    project_id: Optional[int] = Query(None, description="Include every member of this project"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user_model)
+):
+    """Get a user by day timesheet for a team in one call."""
+    
+    if end_date < start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="End date must not be before the start date"
+        )
+    if (end_date - start_date).days >= MAX_TIMESHEET_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Timesheets cover at most {MAX_TIMESHEET_DAYS} days"
+        )
+    
+    team = list(dict.fromkeys(user_ids or []))
+    if team:
+        # Only users who share an organization with the current user
+        my_organizations = select(OrganizationMember.organization_id).where(
+            OrganizationMember.user_id == current_user.id
+        )
+        result = await db.execute(
+            select(OrganizationMember.user_id).where(
+                and_(
+                    OrganizationMember.organization_id.in_(my_organizations),
+                    OrganizationMember.user_id.in_(team)
+                )
+            )
+        )
+        visible = set(result.scalars()) | {current_user.id}
+        if any(user_id not in visible for user_id in team):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not allowed to view timesheets of users outside your organizations"
+            )
+    
+    if project_id is not None:
+        project = await db.get(Project, project_id)
+        if not project:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Project not found"
+            )
+        
+        # Project members and organization owners and admins may see the team
+        member = await db.execute(
+            select(ProjectMember.id).where(
+                and_(
+                    ProjectMember.project_id == project_id,
+                    ProjectMember.user_id == current_user.id
+                )
+            )
+        )
+        admin = await db.execute(
+            select(OrganizationMember.id).where(
+                and_(
+                    OrganizationMember.organization_id == project.organization_id,
+                    OrganizationMember.user_id == current_user.id,
+                    OrganizationMember.role.in_([
+                        OrganizationMemberRole.OWNER, OrganizationMemberRole.ADMIN
+                    ])
+                )
+            )
+        )
+        if member.first() is None and admin.first() is None:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not a member of this project"
+            )
+        
+        result = await db.execute(
+            select(ProjectMember.user_id)
+            .where(ProjectMember.project_id == project_id)
+            .order_by(ProjectMember.user_id)
+        )
+        team.extend(user_id for user_id in result.scalars() if user_id not in team)
+    if not team:
+        team = [current_user.id]
+    
+    return TimesheetResponse(**await TimeTrackingService.get_timesheet(db, team, start_date, end_date))
+
+
 @router.get("/time-tracking/report", response_model=TimeReportSummary)
 async def get_time_report(
     user_id: Optional[int] = Query(None, description="Filter by user ID"),
@@ -543,6 +725,7 @@ async def create_task_from_template(
     
     task = Task(**task_data)
     db.add(task)
+    await analytics_rollups.record_task(db, None, TaskState.from_task(task))
     
     # Increment template usage count
     template.increment_usage()
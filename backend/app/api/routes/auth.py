@@ -1,5 +1,6 @@
 """Authentication API routes."""
 
+import logging
 from datetime import timedelta
 from typing import Any
 
@@ -15,10 +16,36 @@ from app.core.security import (create_access_token, get_password_hash,
 from app.models.user import User, UserStatus
 from app.schemas.user import (Token, UserLogin, UserRead,
                               UserRegister)
+from app.services.activity_log import activity_log
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
+async def _record_login(db: AsyncSession, user: User) -> None:
+    """Stamp the login time and log the login as activity without failing the login."""
+    user_id = user.id
+
+    # Update last login (handle concurrent access gracefully)
+    try:
+        await user.update(db, last_login_at=user.updated_at)
+    except Exception:
+        # Ignore login time update failures to prevent concurrent access issues
+        pass
+
+    try:
+        await activity_log.record_login(db, user_id)
+        await db.commit()
+    except Exception as e:
+        logger.error(f"Failed to record login activity for user {user_id}: {e}")
+        try:
+            await db.rollback()
+        except Exception:
+            # The session may be mid-commit under concurrent access
+            pass
+
+
 @router.post("/register", response_model=UserRead, status_code=status.HTTP_201_CREATED)
 async def register(user_data: UserRegister, db: AsyncSession = Depends(get_db)) -> Any:
     """Register a new user account."""
@@ -71,12 +98,7 @@ async def login(
         subject=user.email, expires_delta=access_token_expires
     )
 
-    # Update last login (handle concurrent access gracefully)
-    try:
-        await user.update(db, last_login_at=user.updated_at)
-    except Exception:
-        # Ignore login time update failures to prevent concurrent access issues
-        pass
+    await _record_login(db, user)
 
     return Token(access_token=access_token, token_type="bearer")
 
@@ -105,12 +127,7 @@ async def login_json(user_data: UserLogin, db: AsyncSession = Depends(get_db)) -
         subject=user.email, expires_delta=access_token_expires
     )
 
-    # Update last login (handle concurrent access gracefully)
-    try:
-        await user.update(db, last_login_at=user.updated_at)
-    except Exception:
-        # Ignore login time update failures to prevent concurrent access issues
-        pass
+    await _record_login(db, user)
 
     return Token(access_token=access_token, token_type="bearer")
 
@@ -0,0 +1,68 @@
+"""
+Dashboard data API routes.
+Serves widget data for analytics dashboards through the widget query
+engine, which batches and caches widget queries.
+"""
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_db
+from app.core.dependencies import get_current_user
+from app.models.analytics import Dashboard, DashboardWidget
+from app.models.organization import OrganizationMember
+from app.models.user import User
+from app.services.analytics import DashboardService
+
+router = APIRouter(prefix="/dashboards", tags=["dashboards"])
+
+dashboard_service = DashboardService()
+
+
+async def _get_dashboard(db: AsyncSession, dashboard_id: int, user: User) -> Dashboard:
+    dashboard = await db.get(Dashboard, dashboard_id)
+    if not dashboard:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Dashboard not found")
+
+    result = await db.execute(
+        select(OrganizationMember.id).where(and_(
+            OrganizationMember.organization_id == dashboard.organization_id,
+            OrganizationMember.user_id == user.id
+        ))
+    )
+    shared = dashboard.is_public or dashboard.created_by == user.id or user.id in (dashboard.shared_with_users or [])
+    if result.scalar() is None or not shared:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No access to this dashboard")
+
+    return dashboard
+
+
+@router.get("/{dashboard_id}/data", response_model=Dict[int, Dict[str, Any]])
+async def get_dashboard_data(
+    dashboard_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get the data of every visible widget on a dashboard, keyed by widget id."""
+
+    dashboard = await _get_dashboard(db, dashboard_id, current_user)
+    return await dashboard_service.get_dashboard_data(dashboard, db)
+
+
+@router.get("/{dashboard_id}/widgets/{widget_id}/data", response_model=Dict[str, Any])
+async def get_widget_data(
+    dashboard_id: int,
+    widget_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get the data of one dashboard widget."""
+
+    await _get_dashboard(db, dashboard_id, current_user)
+    widget = await db.get(DashboardWidget, widget_id)
+    if not widget or widget.dashboard_id != dashboard_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Widget not found")
+
+    return await dashboard_service.get_widget_data(widget, current_user, db)
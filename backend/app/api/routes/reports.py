@@ -0,0 +1,264 @@
+"""
+Report generation and export API routes.
+Reports and exports are produced by background workers; these endpoints
+queue jobs, report their progress and serve finished export files.
+"""
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+import aiofiles
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_db
+from app.core.dependencies import get_current_user
+from app.models.analytics import Report, ReportExport, ReportJobStatus, ReportTemplate
+from app.models.organization import OrganizationMember
+from app.models.user import User
+from app.schemas.analytics import (
+    ReportExportRequest, ReportExportResponse, ReportGenerationRequest, ReportStatusResponse
+)
+from app.services.analytics import report_generation_service
+
+router = APIRouter(prefix="/reports", tags=["reports"])
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single ``bytes=start-end`` range into inclusive offsets.
+
+    Returns None when there is no usable range, so the whole file is sent;
+    raises ValueError when the range cannot be satisfied.
+    """
+    if not header:
+        return None
+    match = _RANGE_PATTERN.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+
+    first, last = match.groups()
+    if size == 0:
+        # No byte range of an empty file can be satisfied
+        raise ValueError("Range not satisfiable")
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+async def _file_chunks(path: str, start: int, length: int):
+    async with aiofiles.open(path, "rb") as file:
+        await file.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = await file.read(min(DOWNLOAD_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def ranged_file_response(
+    path: str,
+    filename: str,
+    content_type: str,
+    range_header: Optional[str] = None
+) -> StreamingResponse:
+    """Stream a file, honouring a single byte range so large downloads can resume."""
+    size = os.path.getsize(path)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'attachment; filename="{filename}"',
+    }
+
+    try:
+        byte_range = parse_range(range_header, size)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(
+            _file_chunks(path, 0, size), media_type=content_type, headers=headers
+        )
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        _file_chunks(path, start, end - start + 1),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=content_type,
+        headers=headers
+    )
+
+
+async def _check_member(db: AsyncSession, organization_id: int, user_id: int) -> None:
+    result = await db.execute(
+        select(OrganizationMember.id).where(and_(
+            OrganizationMember.organization_id == organization_id,
+            OrganizationMember.user_id == user_id
+        ))
+    )
+    if result.scalar() is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not a member of this organization"
+        )
+
+
+async def _get_report(db: AsyncSession, report_id: int, user: User) -> Report:
+    report = await db.get(Report, report_id)
+    if not report or report.is_archived:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Report not found")
+    await _check_member(db, report.organization_id, user.id)
+    return report
+
+
+async def _get_export(db: AsyncSession, export_id: int, user: User) -> ReportExport:
+    export = await db.get(ReportExport, export_id)
+    if not export or export.is_deleted:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Export not found")
+    await _check_member(db, export.organization_id, user.id)
+    return export
+
+
+# ============================================================================
+# Reports
+# ============================================================================
+
+@router.post("", response_model=ReportStatusResponse, status_code=status.HTTP_202_ACCEPTED)
+async def generate_report(
+    request: ReportGenerationRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Queue a report for generation; poll its status until it completes."""
+
+    template = await db.get(ReportTemplate, request.template_id)
+    if not template or not template.is_active:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Report template not found")
+    await _check_member(db, template.organization_id, current_user.id)
+
+    return await report_generation_service.generate_report(template, request, current_user, db)
+
+
+@router.get("/{report_id}", response_model=ReportStatusResponse)
+async def get_report_status(
+    report_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get the generation status and progress of a report."""
+
+    return await _get_report(db, report_id, current_user)
+
+
+@router.get("/{report_id}/data", response_model=Dict[str, Any])
+async def get_report_data(
+    report_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get the data of a generated report."""
+
+    report = await _get_report(db, report_id, current_user)
+    if report.status != ReportJobStatus.COMPLETED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Report is {ReportJobStatus(report.status).value}"
+        )
+
+    return report.data
+
+
+# ============================================================================
+# Exports
+# ============================================================================
+
+@router.post(
+    "/{report_id}/exports",
+    response_model=ReportExportResponse,
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def export_report(
+    report_id: int,
+    export_request: ReportExportRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Queue an export of a report's rows as CSV, JSONL or Parquet."""
+
+    report = await _get_report(db, report_id, current_user)
+
+    try:
+        return await report_generation_service.request_export(
+            db, report, current_user.id, export_request
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/exports/{export_id}", response_model=ReportExportResponse)
+async def get_export_status(
+    export_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get the status and progress of an export."""
+
+    return await _get_export(db, export_id, current_user)
+
+
+@router.get("/exports/{export_id}/download")
+async def download_export(
+    export_id: int,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Download a finished export; supports byte ranges for resuming."""
+
+    export = await _get_export(db, export_id, current_user)
+    if export.status != ReportJobStatus.COMPLETED or not export.file_path:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Export is not ready")
+    if export.expires_at and export.expires_at < datetime.utcnow():
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Export has expired")
+    if not os.path.exists(export.file_path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Export file not found")
+
+    path, filename, content_type = export.file_path, export.filename, export.content_type
+
+    # Count whole downloads, not every resumed range
+    if not range_header:
+        await db.execute(
+            update(ReportExport)
+            .where(ReportExport.id == export_id)
+            .values(
+                download_count=ReportExport.download_count + 1,
+                last_downloaded_at=datetime.utcnow()
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+    return ranged_file_response(path, filename, content_type, range_header)
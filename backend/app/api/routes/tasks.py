@@ -32,6 +32,8 @@ from app.schemas.task import (
     TaskUpdate,
 )
 from app.schemas.user import UserRead
+from app.services.activity_log import activity_log
+from app.services.analytics_rollups import TaskState, analytics_rollups
 
 # Import real-time notification service
 from app.services.realtime_notifications import (
@@ -140,7 +142,7 @@ async def create_task(
     """Create new task."""
     
     # Verify project access
-    await check_project_access(db, task_data.project_id, current_user.id)
+    project = await check_project_access(db, task_data.project_id, current_user.id)
     
     # Get assignee if specified
     assignee_id = None
@@ -180,6 +182,11 @@ async def create_task(
     )
     
     db.add(task)
+    await db.flush()
+    await analytics_rollups.record_task(db, None, TaskState.from_task(task), project.organization_id)
+    await activity_log.record(
+        db, current_user.id, [project.organization_id], "task_created", "task", task.id
+    )
     await db.commit()
     await db.refresh(task)
     
@@ -311,6 +318,7 @@ async def update_task(
     """Update task."""
     
     task = await get_task_or_404(db, task_id, current_user.id)
+    before = TaskState.from_task(task)
     
     # Handle assignee update
     if task_update.assignee_email is not None:
@@ -348,6 +356,12 @@ async def update_task(
     for field, value in update_data.items():
         setattr(task, field, value)
     
+    await analytics_rollups.record_task(
+        db, before, TaskState.from_task(task), task.project.organization_id
+    )
+    await activity_log.record(
+        db, current_user.id, [task.project.organization_id], "task_updated", "task", task.id
+    )
     await db.commit()
     await db.refresh(task)
     
@@ -376,8 +390,15 @@ async def update_task_status(
     """Update task status only."""
     
     task = await get_task_or_404(db, task_id, current_user.id)
+    before = TaskState.from_task(task)
     task.status = status_update.status
     
+    await analytics_rollups.record_task(
+        db, before, TaskState.from_task(task), task.project.organization_id
+    )
+    await activity_log.record(
+        db, current_user.id, [task.project.organization_id], "task_updated", "task", task.id
+    )
     await db.commit()
     await db.refresh(task)
     
@@ -407,7 +428,14 @@ async def delete_task(
     task = await get_task_or_404(db, task_id, current_user.id)
     
     # Soft delete - just mark as inactive
+    before = TaskState.from_task(task)
     task.is_active = False
+    await analytics_rollups.record_task(
+        db, before, TaskState.from_task(task), task.project.organization_id
+    )
+    await activity_log.record(
+        db, current_user.id, [task.project.organization_id], "task_deleted", "task", task.id
+    )
     await db.commit()
 
 
@@ -5,14 +5,15 @@ Provides endpoints for webhook management, OAuth2 flow, and external integration
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
 
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.responses import RedirectResponse
 from sqlalchemy import select, and_, or_, desc, func
 from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
-from app.core.dependencies import get_current_user
+from app.core.dependencies import get_current_admin_user, get_current_user
+from app.models.organization import OrganizationMember
 from app.models.user import User
 from app.models.webhooks import (
     WebhookEndpoint, WebhookDelivery, WebhookEvent, ExternalIntegration,
@@ -20,13 +21,15 @@ from app.models.webhooks import (
 )
 from app.schemas.webhooks import (
     WebhookEndpointCreate, WebhookEndpointUpdate, WebhookEndpointResponse,
-    WebhookDeliveryResponse, WebhookEventCreate, WebhookEventResponse,
+    WebhookDeliveryResponse, WebhookEventDeliveryStatus, WebhookEventCreate, WebhookEventResponse,
     ExternalIntegrationCreate, ExternalIntegrationUpdate, ExternalIntegrationResponse,
     OAuth2AuthorizeRequest, OAuth2CallbackRequest, WebhookTestRequest, WebhookTestResponse,
     WebhookAnalyticsFilter, WebhookAnalyticsResponse, RateLimitStatus,
     IntegrationProviderList, IntegrationProvider
 )
-from app.services.webhook_service import webhook_service, oauth2_service
+from app.services.retention import retention_engine
+from app.services.webhook_analytics import webhook_analytics_service
+from app.services.webhook_service import webhook_service, webhook_delivery_queue, oauth2_service
 
 router = APIRouter(prefix="/webhooks", tags=["webhooks-integrations"])
 
@@ -162,7 +165,6 @@ async def delete_webhook_endpoint(
 async def test_webhook_endpoint(
     endpoint_id: int,
     test_request: WebhookTestRequest,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -210,8 +212,8 @@ async def test_webhook_endpoint(
             detail="Failed to create test delivery"
         )
     
-    # Execute delivery in background
-    background_tasks.add_task(webhook_service._deliver_webhook, db, delivery.id)
+    # Hand the delivery to the queue workers
+    webhook_delivery_queue.notify()
     
     return WebhookTestResponse(
         success=True,
@@ -291,7 +293,6 @@ async def get_webhook_delivery(
 @router.post("/deliveries/{delivery_id}/retry")
 async def retry_webhook_delivery(
     delivery_id: int,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -324,8 +325,7 @@ async def retry_webhook_delivery(
     
     await db.commit()
     
-    # Execute retry in background
-    background_tasks.add_task(webhook_service._deliver_webhook, db, delivery_id)
+    webhook_delivery_queue.notify()
     
     return {"message": "Webhook delivery retry scheduled"}
 
@@ -385,6 +385,36 @@ async def list_webhook_events(
     return result.scalars().all()
 
 
+@router.get("/events/{event_id}/deliveries", response_model=List[WebhookEventDeliveryStatus])
+async def get_webhook_event_deliveries(
+    event_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get the delivery status of an event at each endpoint, including batched deliveries."""
+    
+    # The event's organization, if the user is a member of it
+    result = await db.execute(
+        select(WebhookEvent.organization_id)
+        .join(
+            OrganizationMember,
+            and_(
+                OrganizationMember.organization_id == WebhookEvent.organization_id,
+                OrganizationMember.user_id == current_user.id
+            )
+        )
+        .where(WebhookEvent.event_uuid == event_id)
+    )
+    organization_id = result.scalar_one_or_none()
+    if organization_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Webhook event not found"
+        )
+    
+    return await webhook_service.get_event_delivery_status(db, event_id, organization_id)
+
+
 # ============================================================================
 # External Integrations
 # ============================================================================
@@ -701,64 +731,9 @@ async def get_webhook_analytics(
     
     organization_id = 1  # TODO: Get from user context
     
-    # Build base query
-    query = select(WebhookDelivery).options(
-        selectinload(WebhookDelivery.endpoint)
-    ).where(WebhookDelivery.organization_id == organization_id)
-    
-    conditions = []
+    analytics = await webhook_analytics_service.get_analytics(db, organization_id, filters)
     
-    # Apply filters
-    if filters.start_date:
-        conditions.append(WebhookDelivery.scheduled_at >= filters.start_date)
-    if filters.end_date:
-        conditions.append(WebhookDelivery.scheduled_at <= filters.end_date)
-    if filters.endpoint_ids:
-        conditions.append(WebhookDelivery.endpoint_id.in_(filters.endpoint_ids))
-    if filters.event_types:
-        conditions.append(WebhookDelivery.event_type.in_(filters.event_types))
-    if filters.status_filter:
-        conditions.append(WebhookDelivery.status.in_(filters.status_filter))
-    
-    if conditions:
-        query = query.where(and_(*conditions))
-    
-    # Execute query
-    result = await db.execute(query)
-    deliveries = result.scalars().all()
-    
-    # Calculate analytics
-    total_deliveries = len(deliveries)
-    successful_deliveries = len([d for d in deliveries if d.is_successful])
-    failed_deliveries = total_deliveries - successful_deliveries
-    success_rate = (successful_deliveries / total_deliveries * 100) if total_deliveries > 0 else 0
-    
-    # Calculate response times
-    response_times = [d.response_time_ms for d in deliveries if d.response_time_ms is not None]
-    avg_response_time = sum(response_times) / len(response_times) if response_times else 0
-    max_response_time = max(response_times) if response_times else 0
-    
-    # Calculate median
-    sorted_times = sorted(response_times)
-    median_response_time = sorted_times[len(sorted_times) // 2] if sorted_times else 0
-    
-    # TODO: Implement additional analytics (daily trends, event type breakdown, etc.)
-    
-    return WebhookAnalyticsResponse(
-        overall_stats={
-            "total_deliveries": total_deliveries,
-            "successful_deliveries": successful_deliveries,
-            "failed_deliveries": failed_deliveries,
-            "success_rate": round(success_rate, 2),
-            "average_response_time_ms": round(avg_response_time, 2),
-            "median_response_time_ms": median_response_time,
-            "max_response_time_ms": max_response_time
-        },
-        deliveries_by_day=[],  # TODO: Implement
-        deliveries_by_event_type=[],  # TODO: Implement
-        top_failing_endpoints=[],  # TODO: Implement
-        response_time_trends=[]  # TODO: Implement
-    )
+    return WebhookAnalyticsResponse(**analytics)
 
 
 # ============================================================================
@@ -767,7 +742,6 @@ async def get_webhook_analytics(
 
 @router.post("/system/retry-failed")
 async def retry_failed_webhooks(
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -775,14 +749,27 @@ async def retry_failed_webhooks(
     
     # TODO: Check admin permissions
     
-    background_tasks.add_task(webhook_service.retry_failed_deliveries, db)
+    due_count = await webhook_service.retry_failed_deliveries(db)
+    
+    return {
+        "message": "Failed webhook retry process started",
+        "due_count": due_count
+    }
+
+
+@router.get("/system/pool-stats")
+async def get_webhook_pool_stats(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Get webhook connection pool usage per host and endpoint."""
     
-    return {"message": "Failed webhook retry process started"}
+    return webhook_service.transport.get_pool_stats()
 
 
 @router.post("/system/cleanup")
 async def cleanup_old_deliveries(
     days: int = Query(30, ge=1, le=365, description="Days to keep delivery records"),
+    archive: bool = Query(False, description="Archive deleted records to gzipped JSONL"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -790,25 +777,16 @@ async def cleanup_old_deliveries(
     
     # TODO: Check admin permissions
     
-    cutoff_date = datetime.utcnow() - timedelta(days=days)
-    
-    # Delete old completed deliveries
-    delete_query = select(WebhookDelivery).where(
-        and_(
-            WebhookDelivery.completed_at < cutoff_date,
-            WebhookDelivery.status.in_([DeliveryStatus.DELIVERED, DeliveryStatus.FAILED])
+    try:
+        result = await retention_engine.purge(db, "webhook_deliveries", days=days, archive=archive)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
-    )
-    
-    result = await db.execute(delete_query)
-    old_deliveries = result.scalars().all()
-    
-    for delivery in old_deliveries:
-        await db.delete(delivery)
-    
-    await db.commit()
     
     return {
-        "message": f"Cleaned up {len(old_deliveries)} old delivery records",
-        "deleted_count": len(old_deliveries)
-    }
\ No newline at end of file
+        "message": f"Cleaned up {result.deleted} old delivery records",
+        "deleted_count": result.deleted,
+        "archive_path": result.archive_path
+    }
@@ -2,7 +2,6 @@
 WebSocket endpoints for real-time collaboration.
 Handles live updates, notifications, and team presence.
 """
-import json
 import uuid
 import logging
 from typing import Dict, Any, Optional
@@ -11,7 +10,9 @@ from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
+from app.core.event_coalescer import event_coalescer
 from app.core.websocket import connection_manager, MessageType
+from app.core.websocket_protocol import negotiate_protocol
 from app.models.user import User
 from app.models.project import Project
 from app.models.task import Task
@@ -24,16 +25,30 @@ logger = logging.getLogger(__name__)
 async def websocket_endpoint(
     websocket: WebSocket,
     token: str = Query(..., description="JWT authentication token"),
+    protocol: str = Query("json", description="Wire protocol: json or msgpack"),
     db: AsyncSession = Depends(get_db)
 ):
-    """Main WebSocket endpoint for real-time collaboration."""
+    """Main WebSocket endpoint for real-time collaboration.
+    
+    Clients choose the wire protocol with ``?protocol=msgpack`` or by offering
+    the ``teamflow.msgpack.v1`` subprotocol; JSON text frames are the default.
+    """
     
     connection_id = str(uuid.uuid4())
     user = None
     
+    offered = [
+        value.strip()
+        for value in websocket.headers.get("sec-websocket-protocol", "").split(",")
+        if value.strip()
+    ]
+    wire_protocol, subprotocol = negotiate_protocol(protocol, offered)
+    
     try:
         # Accept connection
-        await connection_manager.connect(websocket, connection_id)
+        await connection_manager.connect(
+            websocket, connection_id, wire_protocol, subprotocol
+        )
         
         # Authenticate user
         user = await connection_manager.authenticate_connection(
@@ -58,9 +73,9 @@ async def websocket_endpoint(
         # Main message handling loop
         while True:
             try:
-                # Receive message from client
-                data = await websocket.receive_text()
-                message = json.loads(data)
+                # Receive message from client; any message counts as liveness
+                message = await wire_protocol.receive(websocket)
+                await connection_manager.record_heartbeat(connection_id)
                 
                 message_type = message.get("type")
                 message_data = message.get("data", {})
@@ -72,11 +87,11 @@ async def websocket_endpoint(
                 
             except WebSocketDisconnect:
                 break
-            except json.JSONDecodeError:
+            except ValueError:
                 await connection_manager.send_message(
                     websocket,
                     MessageType.ERROR,
-                    {"error": "Invalid JSON message format"}
+                    {"error": f"Invalid {wire_protocol.name.upper()} message format"}
                 )
             except Exception as e:
                 logger.error(f"Error handling WebSocket message: {e}")
@@ -241,11 +256,7 @@ async def handle_unsubscribe_project(
         return
     
     # Remove from project subscriptions
-    if project_id in connection_manager.project_subscriptions:
-        if user.id in connection_manager.project_subscriptions[project_id]:
-            connection_manager.project_subscriptions[project_id][user.id].discard(connection_id)
-            if not connection_manager.project_subscriptions[project_id][user.id]:
-                del connection_manager.project_subscriptions[project_id][user.id]
+    await connection_manager.unsubscribe_from_project(user.id, project_id, connection_id)
     
     await connection_manager.send_to_user(
         user.id,
@@ -269,11 +280,7 @@ async def handle_unsubscribe_task(
         return
     
     # Remove from task subscriptions
-    if task_id in connection_manager.task_subscriptions:
-        if user.id in connection_manager.task_subscriptions[task_id]:
-            connection_manager.task_subscriptions[task_id][user.id].discard(connection_id)
-            if not connection_manager.task_subscriptions[task_id][user.id]:
-                del connection_manager.task_subscriptions[task_id][user.id]
+    await connection_manager.unsubscribe_from_task(user.id, task_id, connection_id)
     
     await connection_manager.send_to_user(
         user.id,
@@ -338,11 +345,17 @@ async def handle_get_presence(
 async def handle_heartbeat(user: User, connection_id: str) -> None:
     """Handle heartbeat to keep connection alive."""
     
-    await connection_manager.send_to_user(
-        user.id,
+    # Presence was already refreshed when the message was received; reply
+    # only to the connection that sent the heartbeat
+    websocket = connection_manager.active_connections.get(user.id, {}).get(connection_id)
+    if websocket is None:
+        return
+    
+    await connection_manager.send_message(
+        websocket,
         MessageType.HEARTBEAT,
         {
-            "timestamp": connection_manager._get_current_timestamp(),
+            "timestamp": connection_manager._get_timestamp(),
             "connection_id": connection_id
         }
     )
@@ -373,8 +386,8 @@ async def notify_task_created(task: Task, created_by_user_id: int) -> None:
 async def notify_task_updated(task: Task, updated_by_user_id: int, changes: Dict[str, Any]) -> None:
     """Notify users about task updates."""
     
-    # Broadcast to project subscribers
-    await connection_manager.broadcast_to_project(
+    # Broadcast to project subscribers (coalesced per task)
+    await event_coalescer.publish_to_project(
         task.project_id,
         MessageType.TASK_UPDATED,
         {
@@ -385,11 +398,12 @@ async def notify_task_updated(task: Task, updated_by_user_id: int, changes: Dict
             "changes": changes,
             "timestamp": task.updated_at.isoformat() if task.updated_at else None
         },
+        entity_key=("task", task.id),
         exclude_user=updated_by_user_id
     )
     
-    # Broadcast to task subscribers
-    await connection_manager.broadcast_to_task(
+    # Broadcast to task subscribers (coalesced per task)
+    await event_coalescer.publish_to_task(
         task.id,
         MessageType.TASK_UPDATED,
         {
@@ -398,6 +412,7 @@ async def notify_task_updated(task: Task, updated_by_user_id: int, changes: Dict
             "updated_by": updated_by_user_id,
             "timestamp": task.updated_at.isoformat() if task.updated_at else None
         },
+        entity_key=("task", task.id),
         exclude_user=updated_by_user_id
     )
 
@@ -410,7 +425,7 @@ async def notify_task_status_changed(
 ) -> None:
     """Notify users about task status changes."""
     
-    await connection_manager.broadcast_to_project(
+    await event_coalescer.publish_to_project(
         task.project_id,
         MessageType.TASK_STATUS_CHANGED,
         {
@@ -422,6 +437,7 @@ async def notify_task_status_changed(
             "updated_by": updated_by_user_id,
             "timestamp": task.updated_at.isoformat() if task.updated_at else None
         },
+        entity_key=("task", task.id),
         exclude_user=updated_by_user_id
     )
 
@@ -464,8 +480,8 @@ async def notify_task_assigned(
             }
         )
     
-    # Broadcast to project
-    await connection_manager.broadcast_to_project(
+    # Broadcast to project (coalesced per task)
+    await event_coalescer.publish_to_project(
         task.project_id,
         MessageType.TASK_ASSIGNED,
         {
@@ -476,6 +492,7 @@ async def notify_task_assigned(
             "updated_by": updated_by_user_id,
             "timestamp": task.updated_at.isoformat() if task.updated_at else None
         },
+        entity_key=("task", task.id),
         exclude_user=updated_by_user_id
     )
 
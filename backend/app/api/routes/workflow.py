@@ -61,6 +61,7 @@ async def create_workflow_definition(
     db.add(workflow_def)
     await db.commit()
     await db.refresh(workflow_def)
+    workflow_engine.invalidate_workflows(workflow_def.organization_id)
     
     return workflow_def
 
@@ -144,6 +145,7 @@ async def update_workflow_definition(
     
     await db.commit()
     await db.refresh(workflow)
+    workflow_engine.invalidate_workflows(workflow.organization_id)
     
     return workflow
 
@@ -170,6 +172,7 @@ async def delete_workflow_definition(
     
     await db.delete(workflow)
     await db.commit()
+    workflow_engine.invalidate_workflows(workflow.organization_id)
     
     return {"message": "Workflow definition deleted successfully"}
 
@@ -190,12 +193,12 @@ async def trigger_workflow(
     if not trigger_event.user_id:
         trigger_event.user_id = current_user.id
     
-    # Process the trigger event
+    # Queue matching workflows; their actions run in the background
     results = await workflow_engine.process_trigger_event(db, trigger_event)
     
     return {
         "message": "Workflow trigger processed",
-        "workflows_executed": len(results),
+        "workflows_queued": len(results),
         "results": results
     }
 
@@ -473,6 +476,7 @@ async def apply_workflow_template(
     db.add(workflow)
     await db.commit()
     await db.refresh(workflow)
+    workflow_engine.invalidate_workflows(workflow.organization_id)
     
     # Update template usage count
     template.usage_count += 1
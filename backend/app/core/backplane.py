@@ -0,0 +1,219 @@
+"""
+Pub/sub backplane for multi-node WebSocket fan-out.
+Relays realtime broadcasts and shared presence state between workers.
+"""
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import redis.asyncio as redis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Envelope handler: receives every message published on the backplane
+EnvelopeHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class Backplane(ABC):
+    """Interface for relaying realtime messages between application nodes.
+
+    Envelopes are plain JSON-safe dicts of the form::
+
+        {"origin": node_id, "target": "project" | "task" | "user",
+         "target_id": int, "type": str, "data": {...}, "exclude_user": int | None}
+
+    Presence is stored per node so that each node only ever overwrites the
+    state of its own connections; readers merge the entries of all nodes.
+    Typing indicators stay sharded on the node that owns the connection and
+    only their start/stop events travel over the backplane.
+    """
+
+    @abstractmethod
+    async def start(self, handler: EnvelopeHandler) -> None:
+        """Start delivering published envelopes to ``handler``."""
+
+    @abstractmethod
+    async def stop(self) -> None:
+        """Stop receiving envelopes and release resources."""
+
+    @abstractmethod
+    async def publish(self, envelope: Dict[str, Any]) -> None:
+        """Publish an envelope to every node."""
+
+    @abstractmethod
+    async def set_presence(
+        self, project_id: int, user_id: int, node_id: str, presence: Dict[str, Any]
+    ) -> None:
+        """Store a node's presence entry for a user in a project."""
+
+    @abstractmethod
+    async def remove_presence(self, project_id: int, user_id: int, node_id: str) -> None:
+        """Remove a node's presence entry for a user in a project."""
+
+    @abstractmethod
+    async def get_presence(self, project_id: int) -> Dict[int, Dict[str, Any]]:
+        """Return merged presence for a project: {user_id: presence}."""
+
+    @staticmethod
+    def _merge_presence(entries: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+        """Merge per-node presence entries, preferring online and most recent."""
+        merged: Dict[int, Dict[str, Any]] = {}
+        for entry in entries:
+            user_id = entry["user_id"]
+            current = merged.get(user_id)
+            if current is None:
+                merged[user_id] = entry
+                continue
+
+            entry_online = entry["status"] == "online"
+            current_online = current["status"] == "online"
+            if (entry_online, entry["last_seen"]) > (current_online, current["last_seen"]):
+                merged[user_id] = entry
+        return merged
+
+
+class InProcessBackplane(Backplane):
+    """Backplane that relays envelopes between managers in one process.
+
+    Several ConnectionManager instances may share one InProcessBackplane to
+    simulate a multi-node deployment in tests.
+    """
+
+    def __init__(self):
+        self._handlers: List[EnvelopeHandler] = []
+        # Presence: {project_id: {(node_id, user_id): presence}}
+        self._presence: Dict[int, Dict[tuple, Dict[str, Any]]] = {}
+
+    async def start(self, handler: EnvelopeHandler) -> None:
+        self._handlers.append(handler)
+
+    async def stop(self) -> None:
+        self._handlers.clear()
+
+    async def publish(self, envelope: Dict[str, Any]) -> None:
+        for handler in list(self._handlers):
+            try:
+                await handler(envelope)
+            except Exception as e:
+                logger.error(f"Backplane handler error: {e}")
+
+    async def set_presence(
+        self, project_id: int, user_id: int, node_id: str, presence: Dict[str, Any]
+    ) -> None:
+        self._presence.setdefault(project_id, {})[(node_id, user_id)] = {
+            **presence,
+            "user_id": user_id,
+        }
+
+    async def remove_presence(self, project_id: int, user_id: int, node_id: str) -> None:
+        entries = self._presence.get(project_id)
+        if entries is None:
+            return
+        entries.pop((node_id, user_id), None)
+        if not entries:
+            del self._presence[project_id]
+
+    async def get_presence(self, project_id: int) -> Dict[int, Dict[str, Any]]:
+        return self._merge_presence(list(self._presence.get(project_id, {}).values()))
+
+
+class RedisBackplane(Backplane):
+    """Backplane backed by Redis pub/sub with presence in Redis hashes.
+
+    Pub/sub gives at-most-once, low-latency fan-out, which matches the
+    semantics of live WebSocket updates. Presence hashes are keyed per
+    project with one ``{node_id}:{user_id}`` field per node, and entries older
+    than ``presence_ttl`` seconds are ignored so a crashed node's users expire.
+    """
+
+    def __init__(
+        self,
+        redis_url: str,
+        channel: str = "teamflow:realtime",
+        presence_ttl: int = 120,
+    ):
+        self.redis_url = redis_url
+        self.channel = channel
+        self.presence_ttl = presence_ttl
+        self.redis_client: Optional[redis.Redis] = None
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self, handler: EnvelopeHandler) -> None:
+        self.redis_client = redis.Redis.from_url(self.redis_url, decode_responses=True)
+        self._pubsub = self.redis_client.pubsub()
+        await self._pubsub.subscribe(self.channel)
+        self._listener = asyncio.create_task(self._listen(handler))
+        logger.info(f"Redis backplane subscribed to {self.channel}")
+
+    async def stop(self) -> None:
+        if self._listener:
+            self._listener.cancel()
+            self._listener = None
+        if self._pubsub:
+            await self._pubsub.unsubscribe(self.channel)
+            await self._pubsub.close()
+            self._pubsub = None
+        if self.redis_client:
+            await self.redis_client.close()
+            self.redis_client = None
+
+    async def _listen(self, handler: EnvelopeHandler) -> None:
+        """Forward pub/sub messages to the handler until cancelled."""
+        async for message in self._pubsub.listen():
+            if message.get("type") != "message":
+                continue
+            try:
+                await handler(json.loads(message["data"]))
+            except Exception as e:
+                logger.error(f"Backplane handler error: {e}")
+
+    async def publish(self, envelope: Dict[str, Any]) -> None:
+        await self.redis_client.publish(self.channel, json.dumps(envelope, default=str))
+
+    def _presence_key(self, project_id: int) -> str:
+        return f"{self.channel}:presence:{project_id}"
+
+    async def set_presence(
+        self, project_id: int, user_id: int, node_id: str, presence: Dict[str, Any]
+    ) -> None:
+        key = self._presence_key(project_id)
+        pipe = self.redis_client.pipeline()
+        pipe.hset(key, f"{node_id}:{user_id}", json.dumps(presence, default=str))
+        pipe.expire(key, self.presence_ttl)
+        await pipe.execute()
+
+    async def remove_presence(self, project_id: int, user_id: int, node_id: str) -> None:
+        await self.redis_client.hdel(self._presence_key(project_id), f"{node_id}:{user_id}")
+
+    async def get_presence(self, project_id: int) -> Dict[int, Dict[str, Any]]:
+        raw = await self.redis_client.hgetall(self._presence_key(project_id))
+        cutoff = (datetime.utcnow() - timedelta(seconds=self.presence_ttl)).isoformat()
+
+        entries = []
+        for field, value in raw.items():
+            presence = json.loads(value)
+            if str(presence.get("last_seen", "")) < cutoff:
+                continue
+            presence["user_id"] = int(field.rsplit(":", 1)[1])
+            entries.append(presence)
+        return self._merge_presence(entries)
+
+
+def create_backplane() -> Optional[Backplane]:
+    """Create the backplane configured by REALTIME_BACKPLANE, if any."""
+    backend = settings.REALTIME_BACKPLANE.lower()
+    if backend == "redis":
+        return RedisBackplane(
+            settings.REDIS_URL,
+            channel=settings.REALTIME_BACKPLANE_CHANNEL,
+            presence_ttl=settings.REALTIME_PRESENCE_TTL,
+        )
+    if backend == "memory":
+        return InProcessBackplane()
+    return None
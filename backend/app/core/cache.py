@@ -137,6 +137,53 @@ class CacheManager:
         
         return True
     
+    def get_many(self, keys: List[str], namespace: str = "teamflow") -> Dict[str, Any]:
+        """Get several values in one Redis round trip; missing keys are left out"""
+        found = {}
+        remote_keys = []
+
+        self._clean_local_cache()
+        for key in keys:
+            cache_key = self._generate_key(key, namespace)
+            if cache_key in self.local_cache and datetime.now() < self.local_cache_ttl.get(cache_key, datetime.min):
+                found[key] = self.local_cache[cache_key]
+            else:
+                remote_keys.append(key)
+
+        if self.redis_client and remote_keys:
+            try:
+                values = self.redis_client.mget([self._generate_key(key, namespace) for key in remote_keys])
+                for key, data in zip(remote_keys, values):
+                    if data:
+                        value = self._deserialize_data(data)
+                        cache_key = self._generate_key(key, namespace)
+                        self.local_cache[cache_key] = value
+                        self.local_cache_ttl[cache_key] = datetime.now() + timedelta(minutes=5)
+                        found[key] = value
+            except Exception as e:
+                print(f"Redis mget error: {e}")
+
+        return found
+
+    def set_many(self, items: Dict[str, Any], ttl: int = 3600, namespace: str = "teamflow") -> bool:
+        """Set several values in one Redis round trip"""
+        for key, value in items.items():
+            cache_key = self._generate_key(key, namespace)
+            self.local_cache[cache_key] = value
+            self.local_cache_ttl[cache_key] = datetime.now() + timedelta(seconds=min(ttl, 300))
+
+        if self.redis_client and items:
+            try:
+                pipe = self.redis_client.pipeline()
+                for key, value in items.items():
+                    pipe.setex(self._generate_key(key, namespace), ttl, self._serialize_data(value))
+                pipe.execute()
+            except Exception as e:
+                print(f"Redis pipeline set error: {e}")
+                return False
+
+        return True
+
     def delete(self, key: str, namespace: str = "teamflow") -> bool:
         """Delete value from cache"""
         cache_key = self._generate_key(key, namespace)
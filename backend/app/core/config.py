@@ -61,6 +61,95 @@ class Settings(BaseSettings):
     ENABLE_BACKGROUND_TASKS: bool = Field(default=True, description="Enable background task processing")
     MAX_BACKGROUND_TASKS: int = Field(default=100, description="Maximum concurrent background tasks")
 
+    # Realtime
+    REALTIME_BACKPLANE: str = Field(
+        default="none", description="WebSocket fan-out backplane (none, memory, redis)"
+    )
+    REALTIME_BACKPLANE_CHANNEL: str = Field(
+        default="teamflow:realtime", description="Redis channel for realtime fan-out"
+    )
+    REALTIME_PRESENCE_TTL: int = Field(
+        default=120, description="Seconds before shared presence entries expire"
+    )
+    REALTIME_COALESCE_WINDOW_MS: int = Field(
+        default=50, ge=0, le=100,
+        description="Window for coalescing realtime events per topic (0 disables)"
+    )
+    REALTIME_MAX_BATCH_SIZE: int = Field(
+        default=100, description="Maximum events per batched realtime frame"
+    )
+    REALTIME_MAX_FRAMES_PER_SECOND: int = Field(
+        default=50, description="Per-connection WebSocket frame rate cap (0 disables)"
+    )
+    REALTIME_HEARTBEAT_TIMEOUT: float = Field(
+        default=120, description="Seconds without client messages before a connection is dropped"
+    )
+    REALTIME_TYPING_TTL: float = Field(
+        default=6, description="Seconds before an unrenewed typing indicator expires"
+    )
+    REALTIME_PRESENCE_FLUSH_MS: int = Field(
+        default=250, description="Interval for batching presence diffs to subscribers"
+    )
+    WEBSOCKET_PER_MESSAGE_DEFLATE: bool = Field(
+        default=True, description="Negotiate permessage-deflate on WebSocket connections"
+    )
+
+    # Webhooks
+    WEBHOOK_WORKERS: int = Field(
+        default=4, description="Webhook delivery workers per process (0 disables the queue)"
+    )
+    WEBHOOK_ENDPOINT_CONCURRENCY: int = Field(
+        default=2, description="Maximum in-flight deliveries per webhook endpoint per process"
+    )
+    WEBHOOK_LEASE_SECONDS: int = Field(
+        default=600, description="Seconds a claimed delivery stays locked to its worker"
+    )
+    WEBHOOK_POLL_INTERVAL: float = Field(
+        default=15, description="Seconds between idle polls of the webhook delivery queue"
+    )
+    WEBHOOK_POOL_MAX_CONNECTIONS: int = Field(
+        default=20, description="Maximum connections per webhook destination host"
+    )
+    WEBHOOK_POOL_MAX_KEEPALIVE: int = Field(
+        default=10, description="Idle keep-alive connections kept per webhook destination host"
+    )
+    WEBHOOK_POOL_KEEPALIVE_EXPIRY: float = Field(
+        default=60, description="Seconds an idle webhook connection is kept open"
+    )
+    WEBHOOK_POOL_MAX_HOSTS: int = Field(
+        default=256, description="Destination hosts with an open webhook connection pool"
+    )
+    WEBHOOK_HTTP2: bool = Field(default=True, description="Use HTTP/2 for webhook delivery when offered")
+    WEBHOOK_DNS_CACHE_TTL: int = Field(
+        default=300, description="Seconds webhook destination DNS lookups are cached"
+    )
+    WEBHOOK_SUBSCRIPTION_CACHE_TTL: float = Field(
+        default=60, description="Seconds compiled webhook subscriptions are cached per organization"
+    )
+
+    # Workflows
+    WORKFLOW_INDEX_CACHE_TTL: float = Field(
+        default=300, description="Seconds compiled workflow definitions are cached per organization"
+    )
+    WORKFLOW_WORKERS: int = Field(
+        default=4, description="Workflow execution workers per process (0 disables the queue)"
+    )
+    WORKFLOW_LEASE_SECONDS: int = Field(
+        default=300, description="Seconds a claimed workflow execution stays locked to its worker"
+    )
+    WORKFLOW_POLL_INTERVAL: float = Field(
+        default=15, description="Seconds between idle polls of the workflow execution queue"
+    )
+    WORKFLOW_QUOTA_BACKEND: str = Field(
+        default="memory", description="Daily workflow execution quota counters (memory, redis)"
+    )
+    WORKFLOW_QUOTA_RECONCILE_INTERVAL: float = Field(
+        default=60, description="Seconds before in-memory quota counters are re-read from the database"
+    )
+    WORKFLOW_STATS_FLUSH_INTERVAL: float = Field(
+        default=5, description="Seconds between writes of buffered workflow statistics"
+    )
+
     # Security
     SECRET_KEY: str = Field(
         default="your-super-secret-jwt-key-change-in-production",
@@ -124,6 +213,46 @@ class Settings(BaseSettings):
     RATE_LIMIT_PER_MINUTE: int = Field(
         default=60, description="Rate limit per minute per IP"
     )
+    RATE_LIMIT_BACKEND: str = Field(
+        default="memory", description="Outbound rate limiter backend (memory, redis)"
+    )
+    RATE_LIMIT_FLUSH_INTERVAL: float = Field(
+        default=30, description="Seconds between writes of rate limit usage to the database"
+    )
+
+    # Data Retention
+    RETENTION_BATCH_SIZE: int = Field(default=1000, description="Rows deleted per retention cleanup chunk")
+    RETENTION_BATCH_PAUSE_MS: int = Field(
+        default=100, description="Pause between retention cleanup chunks in milliseconds"
+    )
+    RETENTION_ARCHIVE_DIR: Optional[str] = Field(
+        default=None, description="Directory for gzipped JSONL archives of purged rows"
+    )
+    RETENTION_WEBHOOK_DELIVERY_DAYS: int = Field(default=30, description="Days to keep finished webhook deliveries")
+    RETENTION_WEBHOOK_EVENT_DAYS: int = Field(default=30, description="Days to keep processed webhook events")
+    RETENTION_WORKFLOW_EXECUTION_DAYS: int = Field(default=90, description="Days to keep workflow executions")
+    RETENTION_AUDIT_LOG_DAYS: int = Field(default=365, description="Days to keep audit logs")
+    RETENTION_SEARCH_HISTORY_DAYS: int = Field(default=90, description="Days to keep search history")
+    RETENTION_LOGIN_ATTEMPT_DAYS: int = Field(default=90, description="Days to keep login attempts")
+    RETENTION_FILE_DOWNLOAD_DAYS: int = Field(default=180, description="Days to keep file download logs")
+
+    # Reports
+    REPORT_WORKERS: int = Field(default=2, description="Background report generation and export workers")
+    REPORT_LEASE_SECONDS: int = Field(default=600, description="Seconds a worker holds a report job")
+    REPORT_POLL_INTERVAL: float = Field(default=5.0, description="Seconds between idle polls for report jobs")
+    REPORT_EXPORT_DIR: str = Field(default="./uploads/reports", description="Directory for report export files")
+    REPORT_EXPORT_CHUNK_SIZE: int = Field(default=5000, description="Rows read and written per export chunk")
+    REPORT_SCHEDULER_WORKERS: int = Field(default=4, description="Workers running due report schedules and alert checks")
+    REPORT_SCHEDULER_LEADER_TTL: int = Field(default=30, description="Seconds a node holds report scheduler leadership")
+    REPORT_SCHEDULER_POLL_INTERVAL: float = Field(default=15.0, description="Seconds between scans for due schedules")
+    REPORT_SCHEDULER_BATCH_SIZE: int = Field(default=100, description="Due schedules dispatched per scan")
+    REPORT_ALERT_INTERVAL: int = Field(default=300, description="Seconds between evaluations of each report alert")
+
+    # Admin dashboard
+    ADMIN_DASHBOARD_CACHE_TTL: int = Field(default=300, description="Seconds an assembled admin dashboard is kept")
+    ADMIN_DASHBOARD_REFRESH_AFTER: int = Field(
+        default=30, description="Age in seconds after which the admin dashboard is rebuilt in the background"
+    )
 
     # Pagination
     DEFAULT_PAGE_SIZE: int = Field(default=20, description="Default page size")
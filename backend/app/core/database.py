@@ -6,6 +6,7 @@ import os
 from contextlib import asynccontextmanager
 
 from sqlalchemy import text, create_engine
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.pool import StaticPool
@@ -118,6 +119,16 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
+def dialect_insert(db: AsyncSession, model):
+    """INSERT for the session's dialect, supporting ``on_conflict_do_*`` upserts."""
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    raise NotImplementedError(f"Upserts are not supported on {dialect}")
+
+
 def create_tables_sync():
     """Create tables using synchronous engine (for setup/testing)."""
     try:
@@ -0,0 +1,185 @@
+"""
+Per-topic coalescing buffer for realtime notifications.
+Merges bursts of updates to the same entity into delta frames and batches
+the rest, so bulk edits don't turn into thousands of WebSocket frames.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.websocket import ConnectionManager, MessageType, connection_manager
+
+logger = logging.getLogger(__name__)
+
+# Buffer key: (target kind, target id, excluded user)
+BufferKey = Tuple[str, int, Optional[int]]
+
+
+class EventCoalescer:
+    """Buffers realtime events per topic and flushes them once per window.
+
+    Events carrying the same ``entity_key`` within one window are merged
+    into a single delta: ``changes`` dicts keep the earliest ``old`` and the
+    latest ``new`` value per field, ``old_*`` fields keep their first value
+    and everything else takes the latest value. When events of different
+    types are merged the frame keeps the first type and lists all of them
+    in ``coalesced_types``.
+    """
+
+    def __init__(
+        self,
+        manager: ConnectionManager,
+        window_ms: Optional[int] = None,
+        max_batch_size: Optional[int] = None,
+    ):
+        self.manager = manager
+        self.window_ms = settings.REALTIME_COALESCE_WINDOW_MS if window_ms is None else window_ms
+        self.max_batch_size = max_batch_size or settings.REALTIME_MAX_BATCH_SIZE
+
+        # Pending events: {buffer_key: {entity_key: event}} (insertion ordered)
+        self._buffers: Dict[BufferKey, Dict[Hashable, Dict[str, Any]]] = {}
+        self._flush_handles: Dict[BufferKey, asyncio.TimerHandle] = {}
+        self._flush_tasks: Set[asyncio.Task] = set()
+        self._sequence = 0
+
+    async def publish_to_project(
+        self,
+        project_id: int,
+        message_type: MessageType,
+        data: Dict[str, Any],
+        entity_key: Optional[Hashable] = None,
+        exclude_user: Optional[int] = None,
+    ) -> None:
+        """Queue an event for the subscribers of a project."""
+        await self.enqueue("project", project_id, message_type, data, entity_key, exclude_user)
+
+    async def publish_to_task(
+        self,
+        task_id: int,
+        message_type: MessageType,
+        data: Dict[str, Any],
+        entity_key: Optional[Hashable] = None,
+        exclude_user: Optional[int] = None,
+    ) -> None:
+        """Queue an event for the subscribers of a task."""
+        await self.enqueue("task", task_id, message_type, data, entity_key, exclude_user)
+
+    async def enqueue(
+        self,
+        target: str,
+        target_id: int,
+        message_type: MessageType,
+        data: Dict[str, Any],
+        entity_key: Optional[Hashable] = None,
+        exclude_user: Optional[int] = None,
+    ) -> None:
+        """Queue an event, merging it with a pending event for the same entity."""
+        if not self.window_ms:
+            await self._send(target, target_id, message_type, data, exclude_user)
+            return
+
+        buffer_key = (target, target_id, exclude_user)
+        buffer = self._buffers.setdefault(buffer_key, {})
+
+        if entity_key is None:
+            # Unkeyed events are batched but never merged
+            self._sequence += 1
+            entity_key = ("_seq", self._sequence)
+
+        event = {"type": MessageType(message_type).value, "data": data}
+        if entity_key in buffer:
+            buffer[entity_key] = self._merge_events(buffer[entity_key], event)
+        else:
+            buffer[entity_key] = event
+
+        if buffer_key not in self._flush_handles:
+            self._flush_handles[buffer_key] = asyncio.get_running_loop().call_later(
+                self.window_ms / 1000, self._schedule_flush, buffer_key
+            )
+
+    async def flush(self, buffer_key: BufferKey) -> None:
+        """Send the pending events of one topic as delta and batch frames."""
+        handle = self._flush_handles.pop(buffer_key, None)
+        if handle:
+            handle.cancel()
+
+        buffer = self._buffers.pop(buffer_key, None)
+        if not buffer:
+            return
+
+        target, target_id, exclude_user = buffer_key
+        events = list(buffer.values())
+        for start in range(0, len(events), self.max_batch_size):
+            chunk = events[start:start + self.max_batch_size]
+            if len(chunk) == 1:
+                await self._send(
+                    target, target_id, MessageType(chunk[0]["type"]), chunk[0]["data"], exclude_user
+                )
+            else:
+                await self._send(
+                    target, target_id, MessageType.BATCH, {"events": chunk}, exclude_user
+                )
+
+    async def flush_all(self) -> None:
+        """Flush every pending topic immediately."""
+        for buffer_key in list(self._buffers):
+            await self.flush(buffer_key)
+
+    def _schedule_flush(self, buffer_key: BufferKey) -> None:
+        """Timer callback: run the flush as a task on the event loop."""
+        self._flush_handles.pop(buffer_key, None)
+        task = asyncio.ensure_future(self.flush(buffer_key))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _send(
+        self,
+        target: str,
+        target_id: int,
+        message_type: MessageType,
+        data: Dict[str, Any],
+        exclude_user: Optional[int],
+    ) -> None:
+        """Hand a frame to the connection manager."""
+        try:
+            if target == "project":
+                await self.manager.broadcast_to_project(target_id, message_type, data, exclude_user)
+            else:
+                await self.manager.broadcast_to_task(target_id, message_type, data, exclude_user)
+        except Exception as e:
+            logger.error(f"Error flushing realtime events for {target} {target_id}: {e}")
+
+    @staticmethod
+    def _merge_events(existing: Dict[str, Any], incoming: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge two events for the same entity into one delta event."""
+        old_data = existing["data"]
+        data = dict(old_data)
+        for field, value in incoming["data"].items():
+            if field.startswith("old_") and field in old_data:
+                continue
+            data[field] = value
+
+        old_changes = old_data.get("changes")
+        new_changes = incoming["data"].get("changes")
+        if isinstance(old_changes, dict) and isinstance(new_changes, dict):
+            changes = dict(old_changes)
+            for field, change in new_changes.items():
+                previous = changes.get(field)
+                if isinstance(previous, dict) and isinstance(change, dict) and "old" in previous:
+                    changes[field] = {**change, "old": previous["old"]}
+                else:
+                    changes[field] = change
+            data["changes"] = changes
+
+        types: List[str] = list(old_data.get("coalesced_types", [existing["type"]]))
+        if incoming["type"] not in types:
+            types.append(incoming["type"])
+        if len(types) > 1:
+            data["coalesced_types"] = types
+
+        return {"type": existing["type"], "data": data}
+
+
+# Global coalescer instance
+event_coalescer = EventCoalescer(connection_manager)
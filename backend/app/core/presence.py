@@ -0,0 +1,318 @@
+"""
+Presence and typing-indicator service for real-time collaboration.
+Tracks who is online per project and who is typing per task, expires stale
+state with a timing wheel and batches presence changes for subscribers.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.timing_wheel import HierarchicalTimingWheel
+
+logger = logging.getLogger(__name__)
+
+# Callbacks into the connection manager
+DiffHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+TypingExpiredHandler = Callable[[int, int], Awaitable[None]]
+ConnectionTimeoutHandler = Callable[[str, int], Awaitable[None]]
+
+
+class PresenceService:
+    """Per-node presence and typing state with timer-wheel expiry.
+
+    * A user is online in a project while at least one of their connections
+      is subscribed to it. Heartbeats re-arm a per-connection timeout; when it
+      fires, ``on_connection_timeout`` is called so the manager can drop the
+      connection, which removes its presence.
+    * Typing indicators expire after ``typing_ttl`` seconds unless renewed.
+    * Joins and leaves are collected per project and flushed every
+      ``flush_interval`` seconds as one diff, cancelling join/leave pairs that
+      happened within the same interval.
+    * Each project keeps a ready-made snapshot for ``get_project_presence``.
+      Membership changes mark it stale and it is rebuilt on the next read;
+      heartbeats update the shared entry dicts in place, so they never
+      invalidate it.
+    """
+
+    def __init__(
+        self,
+        heartbeat_timeout: Optional[float] = None,
+        typing_ttl: Optional[float] = None,
+        flush_interval: Optional[float] = None,
+        tick_seconds: float = 0.1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.heartbeat_timeout = heartbeat_timeout or settings.REALTIME_HEARTBEAT_TIMEOUT
+        self.typing_ttl = typing_ttl or settings.REALTIME_TYPING_TTL
+        self.flush_interval = (
+            flush_interval if flush_interval is not None
+            else settings.REALTIME_PRESENCE_FLUSH_MS / 1000
+        )
+        self.clock = clock
+        self.wheel = HierarchicalTimingWheel(tick_seconds=tick_seconds, start_time=clock())
+
+        self.on_diff: Optional[DiffHandler] = None
+        self.on_typing_expired: Optional[TypingExpiredHandler] = None
+        self.on_connection_timeout: Optional[ConnectionTimeoutHandler] = None
+
+        # Connections per user per project: {project_id: {user_id: {connection_id}}}
+        self._project_connections: Dict[int, Dict[int, Set[str]]] = {}
+        # Online entries: {project_id: {user_id: {user_id, last_seen, current_task}}}
+        self._online: Dict[int, Dict[int, Dict[str, Any]]] = {}
+        # Cached snapshots and projects whose snapshot is stale
+        self._snapshots: Dict[int, Dict[str, Any]] = {}
+        self._stale_snapshots: Set[int] = set()
+
+        # Reverse indexes: {connection_id: user_id}, {connection_id: {project_id}}
+        self._connection_users: Dict[str, int] = {}
+        self._connection_projects: Dict[str, Set[int]] = {}
+
+        # Typing: {task_id: {user_id: connection_id}}, {connection_id: {task_id}}
+        self.typing_indicators: Dict[int, Dict[int, str]] = {}
+        self._connection_typing: Dict[str, Set[int]] = {}
+
+        # Pending diff: {project_id: {user_id: "joined" | "left"}}
+        self._pending: Dict[int, Dict[int, str]] = {}
+        # Users seen via heartbeat since the last flush: {project_id: {user_id}}
+        self._refreshed: Dict[int, Set[int]] = {}
+
+        self._ticker: Optional[asyncio.Task] = None
+
+    # Lifecycle
+
+    def start(self) -> None:
+        """Start the background ticker if it is not already running."""
+        if self._ticker is None or self._ticker.done():
+            self._ticker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the ticker and flush pending diffs."""
+        if self._ticker:
+            self._ticker.cancel()
+            self._ticker = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        next_flush = self.clock() + self.flush_interval
+        while True:
+            await asyncio.sleep(self.wheel.tick_seconds)
+            try:
+                await self.process_expired()
+                if self.clock() >= next_flush:
+                    await self.flush()
+                    next_flush = self.clock() + self.flush_interval
+            except Exception as e:
+                logger.error(f"Presence ticker error: {e}")
+
+    # Connections and heartbeats
+
+    def register_connection(self, connection_id: str, user_id: int) -> None:
+        """Start tracking a connection and arm its heartbeat timeout."""
+        self._connection_users[connection_id] = user_id
+        self.heartbeat(connection_id)
+
+    def heartbeat(self, connection_id: str) -> None:
+        """Re-arm a connection's timeout and refresh its users' last_seen."""
+        user_id = self._connection_users.get(connection_id)
+        if user_id is None:
+            return
+
+        self.wheel.schedule(
+            ("heartbeat", connection_id), self.heartbeat_timeout, self.clock(), user_id
+        )
+        last_seen = datetime.utcnow().isoformat()
+        for project_id in self._connection_projects.get(connection_id, ()):
+            self._online[project_id][user_id]["last_seen"] = last_seen
+            self._refreshed.setdefault(project_id, set()).add(user_id)
+
+    def remove_connection(self, connection_id: str) -> List[Tuple[int, int]]:
+        """Forget a connection; returns the (task_id, user_id) typing it cleared."""
+        user_id = self._connection_users.pop(connection_id, None)
+        self.wheel.cancel(("heartbeat", connection_id))
+        if user_id is not None:
+            for project_id in list(self._connection_projects.get(connection_id, ())):
+                self.leave_project(project_id, user_id, connection_id)
+
+        cleared = []
+        for task_id in list(self._connection_typing.get(connection_id, ())):
+            owners = [
+                typing_user_id
+                for typing_user_id, owner in self.typing_indicators.get(task_id, {}).items()
+                if owner == connection_id
+            ]
+            for typing_user_id in owners:
+                if self.stop_typing(task_id, typing_user_id, connection_id):
+                    cleared.append((task_id, typing_user_id))
+        return cleared
+
+    # Project presence
+
+    def join_project(self, project_id: int, user_id: int, connection_id: str) -> None:
+        """Mark a connection's user online in a project."""
+        users = self._project_connections.setdefault(project_id, {})
+        connections = users.setdefault(user_id, set())
+        connections.add(connection_id)
+        self._connection_projects.setdefault(connection_id, set()).add(project_id)
+
+        online = self._online.setdefault(project_id, {})
+        if user_id in online:
+            online[user_id]["last_seen"] = datetime.utcnow().isoformat()
+            return
+
+        online[user_id] = {
+            "user_id": user_id,
+            "last_seen": datetime.utcnow().isoformat(),
+            "current_task": None
+        }
+        self._stale_snapshots.add(project_id)
+        self._record_change(project_id, user_id, "joined")
+
+    def leave_project(self, project_id: int, user_id: int, connection_id: str) -> None:
+        """Remove a connection from a project, going offline with the last one."""
+        projects = self._connection_projects.get(connection_id)
+        if projects is not None:
+            projects.discard(project_id)
+            if not projects:
+                del self._connection_projects[connection_id]
+
+        users = self._project_connections.get(project_id)
+        if not users or user_id not in users:
+            return
+
+        users[user_id].discard(connection_id)
+        if users[user_id]:
+            return
+
+        del users[user_id]
+        if not users:
+            del self._project_connections[project_id]
+
+        online = self._online.get(project_id, {})
+        online.pop(user_id, None)
+        if not online:
+            self._online.pop(project_id, None)
+        self._stale_snapshots.add(project_id)
+        self._record_change(project_id, user_id, "left")
+
+    def get_project_presence(self, project_id: int) -> Dict[str, Any]:
+        """Return the maintained presence snapshot for a project."""
+        if project_id in self._stale_snapshots:
+            self._stale_snapshots.discard(project_id)
+            online = self._online.get(project_id)
+            if online:
+                self._snapshots[project_id] = {
+                    "online_users": list(online.values()),
+                    "total_online": len(online)
+                }
+            else:
+                self._snapshots.pop(project_id, None)
+
+        return self._snapshots.get(project_id) or {"online_users": [], "total_online": 0}
+
+    def _record_change(self, project_id: int, user_id: int, change: str) -> None:
+        pending = self._pending.setdefault(project_id, {})
+        previous = pending.get(user_id)
+        if previous is not None and previous != change:
+            # Joined and left within one interval: nothing to report
+            del pending[user_id]
+            if not pending:
+                del self._pending[project_id]
+        else:
+            pending[user_id] = change
+
+    async def flush(self) -> None:
+        """Send the batched presence diff of every changed project."""
+        pending, self._pending = self._pending, {}
+        refreshed, self._refreshed = self._refreshed, {}
+        if not self.on_diff:
+            return
+
+        for project_id in set(pending) | set(refreshed):
+            changes = pending.get(project_id, {})
+            online = self._online.get(project_id, {})
+            joined = [
+                online[user_id] for user_id, change in changes.items()
+                if change == "joined" and user_id in online
+            ]
+            left = [user_id for user_id, change in changes.items() if change == "left"]
+            seen = [
+                online[user_id] for user_id in refreshed.get(project_id, ())
+                if user_id in online and changes.get(user_id) != "joined"
+            ]
+            try:
+                await self.on_diff({
+                    "project_id": project_id,
+                    "joined": joined,
+                    "left": left,
+                    "refreshed": seen
+                })
+            except Exception as e:
+                logger.error(f"Error publishing presence diff for project {project_id}: {e}")
+
+    # Typing indicators
+
+    def start_typing(self, task_id: int, user_id: int, connection_id: str) -> bool:
+        """Record a typing indicator; returns True if the user was not typing yet."""
+        typing_users = self.typing_indicators.setdefault(task_id, {})
+        is_new = user_id not in typing_users
+
+        previous_connection = typing_users.get(user_id)
+        if previous_connection is not None and previous_connection != connection_id:
+            self._discard_connection_typing(previous_connection, task_id)
+
+        typing_users[user_id] = connection_id
+        self._connection_typing.setdefault(connection_id, set()).add(task_id)
+        self.wheel.schedule(("typing", task_id, user_id), self.typing_ttl, self.clock())
+        return is_new
+
+    def stop_typing(
+        self, task_id: int, user_id: int, connection_id: Optional[str] = None
+    ) -> bool:
+        """Clear a typing indicator; returns True if one was cleared.
+
+        When ``connection_id`` is given, only an indicator owned by that
+        connection is cleared.
+        """
+        typing_users = self.typing_indicators.get(task_id)
+        if not typing_users or user_id not in typing_users:
+            return False
+        if connection_id is not None and typing_users[user_id] != connection_id:
+            return False
+
+        owner = typing_users.pop(user_id)
+        if not typing_users:
+            del self.typing_indicators[task_id]
+        self._discard_connection_typing(owner, task_id)
+        self.wheel.cancel(("typing", task_id, user_id))
+        return True
+
+    def _discard_connection_typing(self, connection_id: str, task_id: int) -> None:
+        tasks = self._connection_typing.get(connection_id)
+        if tasks is None:
+            return
+        tasks.discard(task_id)
+        if not tasks:
+            del self._connection_typing[connection_id]
+
+    # Expiry
+
+    async def process_expired(self) -> None:
+        """Advance the wheel and act on expired heartbeats and typing TTLs."""
+        for key, payload in self.wheel.advance(self.clock()):
+            try:
+                if key[0] == "typing":
+                    _, task_id, user_id = key
+                    if self.stop_typing(task_id, user_id) and self.on_typing_expired:
+                        await self.on_typing_expired(task_id, user_id)
+                elif key[0] == "heartbeat":
+                    connection_id = key[1]
+                    logger.info(f"Heartbeat timeout for connection {connection_id}")
+                    if self.on_connection_timeout:
+                        await self.on_connection_timeout(connection_id, payload)
+                    else:
+                        self.remove_connection(connection_id)
+            except Exception as e:
+                logger.error(f"Error handling expired presence timer {key}: {e}")
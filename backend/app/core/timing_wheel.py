@@ -0,0 +1,121 @@
+"""
+Hierarchical timing wheel for large numbers of cheap, cancellable timers.
+Schedule, reschedule and cancel are O(1); advancing costs O(expired + cascaded).
+"""
+from typing import Any, Dict, Hashable, List, Tuple
+
+
+class HierarchicalTimingWheel:
+    """Multi-level hashed timing wheel driven by an external clock.
+
+    Level 0 has ``wheel_size`` slots of one tick each; every higher level has
+    ``wheel_size`` slots each spanning a full rotation of the level below.
+    Timers far in the future sit in coarse slots and cascade down as the
+    wheel turns, so each timer is touched at most ``levels`` times. Timers
+    beyond the top level's range stay in the top level and are re-placed on
+    each of its rotations.
+
+    The wheel never reads the clock itself: callers pass monotonic seconds to
+    ``schedule`` and ``advance``, which keeps it deterministic in tests.
+    """
+
+    def __init__(
+        self,
+        tick_seconds: float = 0.1,
+        wheel_size: int = 64,
+        levels: int = 4,
+        start_time: float = 0.0,
+    ):
+        self.tick_seconds = tick_seconds
+        self.wheel_size = wheel_size
+        self.levels = levels
+        self._start_time = start_time
+        self._current_tick = 0
+
+        # Slots: [level][slot] -> {key: (deadline_tick, payload)}
+        self._slots: List[List[Dict[Hashable, Tuple[int, Any]]]] = [
+            [{} for _ in range(wheel_size)] for _ in range(levels)
+        ]
+        # Timer locations for O(1) cancel: {key: (level, slot)}
+        self._locations: Dict[Hashable, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._locations
+
+    def schedule(self, key: Hashable, delay_seconds: float, now: float, payload: Any = None) -> None:
+        """Schedule (or reschedule) ``key`` to expire ``delay_seconds`` after ``now``."""
+        self.cancel(key)
+        deadline = self._to_tick(now + delay_seconds)
+        # Never fire in the tick that is already being processed
+        self._place(key, max(deadline, self._current_tick + 1), payload)
+
+    def cancel(self, key: Hashable) -> bool:
+        """Cancel a timer; returns False if it was not scheduled."""
+        location = self._locations.pop(key, None)
+        if location is None:
+            return False
+        level, slot = location
+        del self._slots[level][slot][key]
+        return True
+
+    def advance(self, now: float) -> List[Tuple[Hashable, Any]]:
+        """Move the wheel up to ``now`` and return the expired (key, payload) pairs."""
+        target_tick = self._to_tick(now)
+        expired: List[Tuple[Hashable, Any]] = []
+
+        if not self._locations:
+            self._current_tick = max(self._current_tick, target_tick)
+            return expired
+
+        while self._current_tick < target_tick:
+            self._current_tick += 1
+            self._cascade()
+
+            slot = self._slots[0][self._current_tick % self.wheel_size]
+            if slot:
+                for key, (_, payload) in slot.items():
+                    del self._locations[key]
+                    expired.append((key, payload))
+                slot.clear()
+
+            if not self._locations:
+                self._current_tick = target_tick
+                break
+
+        return expired
+
+    def _to_tick(self, when: float) -> int:
+        return int((when - self._start_time) / self.tick_seconds)
+
+    def _place(self, key: Hashable, deadline: int, payload: Any) -> None:
+        delta = deadline - self._current_tick
+        level = 0
+        span = self.wheel_size
+        while delta >= span and level < self.levels - 1:
+            level += 1
+            span *= self.wheel_size
+
+        slot = (deadline // self.wheel_size ** level) % self.wheel_size
+        self._slots[level][slot][key] = (deadline, payload)
+        self._locations[key] = (level, slot)
+
+    def _cascade(self) -> None:
+        """Move timers from coarse slots that start at this tick to finer levels."""
+        for level in range(self.levels - 1, 0, -1):
+            granularity = self.wheel_size ** level
+            if self._current_tick % granularity:
+                continue
+
+            slot_index = (self._current_tick // granularity) % self.wheel_size
+            slot = self._slots[level][slot_index]
+            if not slot:
+                continue
+
+            entries = list(slot.items())
+            slot.clear()
+            for key, (deadline, payload) in entries:
+                self._place(key, max(deadline, self._current_tick), payload)
+
@@ -2,16 +2,24 @@
 WebSocket manager for real-time collaboration features.
 Handles live updates, notifications, and team presence.
 """
-import json
+import asyncio
 import logging
-from typing import Dict, List, Set, Optional, Any
+import time
+import uuid
+from typing import Dict, List, Set, Optional, Any, Tuple
 from datetime import datetime
 from enum import Enum
 
 from fastapi import WebSocket, WebSocketDisconnect
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.backplane import Backplane
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.presence import PresenceService
+from app.core.websocket_protocol import (
+    WebSocketProtocol, get_connection_protocol, json_protocol
+)
 from app.models.user import User
 from app.models.project import Project
 from app.models.task import Task
@@ -60,12 +68,25 @@ class MessageType(str, Enum):
     NOTIFICATION = "notification"
     ERROR = "error"
     HEARTBEAT = "heartbeat"
+    
+    # Several events delivered in one frame: {"events": [{"type", "data"}]}
+    BATCH = "batch"
 
 
 class ConnectionManager:
     """Manages WebSocket connections for real-time collaboration."""
     
-    def __init__(self):
+    def __init__(
+        self,
+        backplane: Optional[Backplane] = None,
+        max_frames_per_second: Optional[int] = None
+    ):
+        # Identifies this node on the backplane
+        self.node_id = uuid.uuid4().hex
+        
+        # Optional pub/sub backplane for fan-out across workers/pods
+        self.backplane = backplane
+        
         # Active connections: {user_id: {connection_id: websocket}}
         self.active_connections: Dict[int, Dict[str, WebSocket]] = {}
         
@@ -75,16 +96,59 @@ class ConnectionManager:
         # Task subscriptions: {task_id: {user_id: connection_ids}}
         self.task_subscriptions: Dict[int, Dict[int, Set[str]]] = {}
         
-        # User presence: {project_id: {user_id: {last_seen, status, current_task}}}
-        self.user_presence: Dict[int, Dict[int, Dict[str, Any]]] = {}
+        # Reverse index: {connection_id: {(topic_kind, topic_id)}} so that
+        # unsubscribe/disconnect only touch the connection's own topics
+        self.connection_subscriptions: Dict[str, Set[Tuple[str, int]]] = {}
         
-        # Typing indicators: {task_id: {user_id: {started_at, connection_id}}}
-        self.typing_indicators: Dict[int, Dict[int, Dict[str, Any]]] = {}
+        # Presence and typing indicators, expired by the service's timing wheel
+        self.presence = PresenceService()
+        self.presence.on_diff = self._publish_presence_diff
+        self.presence.on_typing_expired = self._broadcast_stopped_typing
+        self.presence.on_connection_timeout = self._handle_connection_timeout
+        
+        # Per-connection frame rate cap (token bucket); 0 disables the cap
+        self.max_frames_per_second = (
+            settings.REALTIME_MAX_FRAMES_PER_SECOND
+            if max_frames_per_second is None else max_frames_per_second
+        )
+        # Token buckets: {connection_id: (tokens, last_refill_monotonic)}
+        self._frame_buckets: Dict[str, Tuple[float, float]] = {}
+        # Frames held back by the cap: {connection_id: [{type, data}]}
+        self._deferred_frames: Dict[str, List[Dict[str, Any]]] = {}
+        # Running deferred-frame flushes, kept so they are not garbage collected
+        self._flush_tasks: Set[asyncio.Task] = set()
     
-    async def connect(self, websocket: WebSocket, connection_id: str) -> None:
-        """Accept a new WebSocket connection."""
-        await websocket.accept()
-        logger.info(f"WebSocket connection accepted: {connection_id}")
+    async def attach_backplane(self, backplane: Backplane) -> None:
+        """Start relaying broadcasts through a pub/sub backplane."""
+        try:
+            await backplane.start(self._handle_backplane_envelope)
+        except Exception:
+            # Release whatever the backplane set up before failing
+            try:
+                await backplane.stop()
+            except Exception as e:
+                logger.error(f"Error stopping failed backplane: {e}")
+            raise
+        self.backplane = backplane
+        logger.info(f"Connection manager {self.node_id} attached to backplane")
+    
+    async def detach_backplane(self) -> None:
+        """Stop relaying broadcasts through the backplane."""
+        if self.backplane:
+            await self.backplane.stop()
+            self.backplane = None
+    
+    async def connect(
+        self,
+        websocket: WebSocket,
+        connection_id: str,
+        protocol: WebSocketProtocol = json_protocol,
+        subprotocol: Optional[str] = None
+    ) -> None:
+        """Accept a new WebSocket connection using the negotiated protocol."""
+        websocket.state.protocol = protocol
+        await websocket.accept(subprotocol=subprotocol)
+        logger.info(f"WebSocket connection accepted: {connection_id} ({protocol.name})")
     
     async def disconnect(self, connection_id: str, user_id: Optional[int] = None) -> None:
         """Handle WebSocket disconnection."""
@@ -95,25 +159,19 @@ class ConnectionManager:
                 if not self.active_connections[user_id]:
                     del self.active_connections[user_id]
             
-            # Remove from project subscriptions
-            for project_id, users in self.project_subscriptions.items():
-                if user_id in users:
-                    users[user_id].discard(connection_id)
-                    if not users[user_id]:
-                        del users[user_id]
-            
-            # Remove from task subscriptions
-            for task_id, users in self.task_subscriptions.items():
-                if user_id in users:
-                    users[user_id].discard(connection_id)
-                    if not users[user_id]:
-                        del users[user_id]
+            # Drop rate-limiter state for this connection
+            self._frame_buckets.pop(connection_id, None)
+            self._deferred_frames.pop(connection_id, None)
             
-            # Update presence
-            await self._update_user_presence(user_id, "offline")
+            # Remove from the topics this connection subscribed to
+            for kind, topic_id in self.connection_subscriptions.pop(connection_id, set()):
+                self._remove_subscription(
+                    self._get_topic_registry(kind), topic_id, user_id, connection_id
+                )
             
-            # Clear typing indicators
-            await self._clear_typing_indicators(user_id, connection_id)
+            # Drop presence and clear typing indicators
+            for task_id, typing_user_id in self.presence.remove_connection(connection_id):
+                await self._broadcast_stopped_typing(task_id, typing_user_id)
         
         logger.info(f"WebSocket disconnected: {connection_id}")
     
@@ -151,8 +209,9 @@ class ConnectionManager:
                 self.active_connections[user.id] = {}
             self.active_connections[user.id][connection_id] = websocket
             
-            # Update user presence
-            await self._update_user_presence(user.id, "online")
+            # Track presence and arm the heartbeat timeout
+            self.presence.register_connection(connection_id, user.id)
+            self.presence.start()
             
             # Send authentication success
             await self.send_message(
@@ -161,7 +220,8 @@ class ConnectionManager:
                 {
                     "user_id": user.id,
                     "user_name": user.full_name,
-                    "connection_id": connection_id
+                    "connection_id": connection_id,
+                    "protocol": get_connection_protocol(websocket).name
                 }
             )
             
@@ -184,36 +244,13 @@ class ConnectionManager:
         connection_id: str
     ) -> None:
         """Subscribe user to project updates."""
-        if project_id not in self.project_subscriptions:
-            self.project_subscriptions[project_id] = {}
-        
-        if user_id not in self.project_subscriptions[project_id]:
-            self.project_subscriptions[project_id][user_id] = set()
-        
-        self.project_subscriptions[project_id][user_id].add(connection_id)
-        
-        # Update presence for this project
-        if project_id not in self.user_presence:
-            self.user_presence[project_id] = {}
-        
-        self.user_presence[project_id][user_id] = {
-            "last_seen": datetime.utcnow(),
-            "status": "online",
-            "current_task": None
-        }
-        
-        # Notify other users
-        await self.broadcast_to_project(
-            project_id,
-            MessageType.USER_JOINED,
-            {
-                "user_id": user_id,
-                "project_id": project_id,
-                "timestamp": datetime.utcnow().isoformat()
-            },
-            exclude_user=user_id
+        self._add_subscription(
+            self.project_subscriptions, "project", project_id, user_id, connection_id
         )
         
+        # Update presence; other users are notified with the next presence diff
+        self.presence.join_project(project_id, user_id, connection_id)
+        
         logger.info(f"User {user_id} subscribed to project {project_id}")
     
     async def subscribe_to_task(
@@ -223,29 +260,52 @@ class ConnectionManager:
         connection_id: str
     ) -> None:
         """Subscribe user to task updates."""
-        if task_id not in self.task_subscriptions:
-            self.task_subscriptions[task_id] = {}
-        
-        if user_id not in self.task_subscriptions[task_id]:
-            self.task_subscriptions[task_id][user_id] = set()
-        
-        self.task_subscriptions[task_id][user_id].add(connection_id)
+        self._add_subscription(
+            self.task_subscriptions, "task", task_id, user_id, connection_id
+        )
         logger.info(f"User {user_id} subscribed to task {task_id}")
     
+    async def unsubscribe_from_project(
+        self, 
+        user_id: int, 
+        project_id: int, 
+        connection_id: str
+    ) -> None:
+        """Unsubscribe a connection from project updates."""
+        self._discard_connection_topic(connection_id, ("project", project_id))
+        self._remove_subscription(
+            self.project_subscriptions, project_id, user_id, connection_id
+        )
+        self.presence.leave_project(project_id, user_id, connection_id)
+        logger.info(f"User {user_id} unsubscribed from project {project_id}")
+    
+    async def unsubscribe_from_task(
+        self, 
+        user_id: int, 
+        task_id: int, 
+        connection_id: str
+    ) -> None:
+        """Unsubscribe a connection from task updates."""
+        self._discard_connection_topic(connection_id, ("task", task_id))
+        self._remove_subscription(
+            self.task_subscriptions, task_id, user_id, connection_id
+        )
+        logger.info(f"User {user_id} unsubscribed from task {task_id}")
+    
     async def send_message(
         self, 
         websocket: WebSocket, 
         message_type: MessageType, 
         data: Dict[str, Any]
     ) -> None:
-        """Send a message to a specific WebSocket connection."""
+        """Send a message using the connection's negotiated wire protocol."""
         try:
-            message = {
-                "type": message_type,
-                "data": data,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-            await websocket.send_text(json.dumps(message))
+            protocol = get_connection_protocol(websocket)
+            frame = protocol.encode(MessageType(message_type).value, data)
+            if isinstance(frame, bytes):
+                await websocket.send_bytes(frame)
+            else:
+                await websocket.send_text(frame)
         except Exception as e:
             logger.error(f"Error sending message: {e}")
     
@@ -255,15 +315,9 @@ class ConnectionManager:
         message_type: MessageType, 
         data: Dict[str, Any]
     ) -> None:
-        """Send a message to all connections of a specific user."""
-        if user_id in self.active_connections:
-            for connection_id, websocket in self.active_connections[user_id].items():
-                try:
-                    await self.send_message(websocket, message_type, data)
-                except Exception as e:
-                    logger.error(f"Error sending to user {user_id}, connection {connection_id}: {e}")
-                    # Remove failed connection
-                    await self.disconnect(connection_id, user_id)
+        """Send a message to all connections of a specific user, on every node."""
+        await self._send_to_local_user(user_id, message_type, data)
+        await self._publish("user", user_id, message_type, data)
     
     async def broadcast_to_project(
         self, 
@@ -272,22 +326,11 @@ class ConnectionManager:
         data: Dict[str, Any],
         exclude_user: Optional[int] = None
     ) -> None:
-        """Broadcast a message to all users subscribed to a project."""
-        if project_id not in self.project_subscriptions:
-            return
-        
-        for user_id, connection_ids in self.project_subscriptions[project_id].items():
-            if exclude_user and user_id == exclude_user:
-                continue
-            
-            if user_id in self.active_connections:
-                for connection_id in connection_ids:
-                    if connection_id in self.active_connections[user_id]:
-                        websocket = self.active_connections[user_id][connection_id]
-                        try:
-                            await self.send_message(websocket, message_type, data)
-                        except Exception as e:
-                            logger.error(f"Error broadcasting to project {project_id}, user {user_id}: {e}")
+        """Broadcast a message to all users subscribed to a project, on every node."""
+        await self._broadcast_local(
+            self.project_subscriptions, project_id, message_type, data, exclude_user
+        )
+        await self._publish("project", project_id, message_type, data, exclude_user)
     
     async def broadcast_to_task(
         self, 
@@ -296,22 +339,172 @@ class ConnectionManager:
         data: Dict[str, Any],
         exclude_user: Optional[int] = None
     ) -> None:
-        """Broadcast a message to all users subscribed to a task."""
-        if task_id not in self.task_subscriptions:
+        """Broadcast a message to all users subscribed to a task, on every node."""
+        await self._broadcast_local(
+            self.task_subscriptions, task_id, message_type, data, exclude_user
+        )
+        await self._publish("task", task_id, message_type, data, exclude_user)
+    
+    async def _send_to_local_user(
+        self, 
+        user_id: int, 
+        message_type: MessageType, 
+        data: Dict[str, Any]
+    ) -> None:
+        """Send a message to the connections of a user held by this node."""
+        if user_id in self.active_connections:
+            for connection_id, websocket in list(self.active_connections[user_id].items()):
+                try:
+                    await self._deliver(user_id, connection_id, websocket, message_type, data)
+                except Exception as e:
+                    logger.error(f"Error sending to user {user_id}, connection {connection_id}: {e}")
+                    # Remove failed connection
+                    await self.disconnect(connection_id, user_id)
+    
+    async def _broadcast_local(
+        self,
+        registry: Dict[int, Dict[int, Set[str]]],
+        topic_id: int,
+        message_type: MessageType,
+        data: Dict[str, Any],
+        exclude_user: Optional[int] = None
+    ) -> None:
+        """Deliver a message to the subscribers of a topic held by this node."""
+        if topic_id not in registry:
             return
         
-        for user_id, connection_ids in self.task_subscriptions[task_id].items():
+        for user_id, connection_ids in list(registry[topic_id].items()):
             if exclude_user and user_id == exclude_user:
                 continue
             
             if user_id in self.active_connections:
-                for connection_id in connection_ids:
+                for connection_id in list(connection_ids):
                     if connection_id in self.active_connections[user_id]:
                         websocket = self.active_connections[user_id][connection_id]
                         try:
-                            await self.send_message(websocket, message_type, data)
+                            await self._deliver(
+                                user_id, connection_id, websocket, message_type, data
+                            )
                         except Exception as e:
-                            logger.error(f"Error broadcasting to task {task_id}, user {user_id}: {e}")
+                            logger.error(f"Error broadcasting to topic {topic_id}, user {user_id}: {e}")
+    
+    async def _deliver(
+        self,
+        user_id: int,
+        connection_id: str,
+        websocket: WebSocket,
+        message_type: MessageType,
+        data: Dict[str, Any]
+    ) -> None:
+        """Send a frame to one connection, deferring it if over the rate cap."""
+        if connection_id in self._deferred_frames or not self._take_frame_token(connection_id):
+            self._defer_frame(user_id, connection_id, message_type, data)
+            return
+        
+        await self.send_message(websocket, message_type, data)
+    
+    def _take_frame_token(self, connection_id: str) -> bool:
+        """Consume one frame token for a connection, refilling at the cap rate."""
+        rate = self.max_frames_per_second
+        if not rate:
+            return True
+        
+        now = time.monotonic()
+        tokens, last_refill = self._frame_buckets.get(connection_id, (float(rate), now))
+        tokens = min(float(rate), tokens + (now - last_refill) * rate)
+        if tokens < 1:
+            self._frame_buckets[connection_id] = (tokens, now)
+            return False
+        
+        self._frame_buckets[connection_id] = (tokens - 1, now)
+        return True
+    
+    def _defer_frame(
+        self,
+        user_id: int,
+        connection_id: str,
+        message_type: MessageType,
+        data: Dict[str, Any]
+    ) -> None:
+        """Hold a frame back and schedule one batched flush for the connection."""
+        deferred = self._deferred_frames.get(connection_id)
+        if deferred is None:
+            deferred = self._deferred_frames[connection_id] = []
+            delay = 1.0 / self.max_frames_per_second
+            asyncio.get_running_loop().call_later(
+                delay, self._schedule_deferred_flush, user_id, connection_id
+            )
+        
+        deferred.append({"type": MessageType(message_type).value, "data": data})
+    
+    def _schedule_deferred_flush(self, user_id: int, connection_id: str) -> None:
+        """Timer callback: run the deferred flush as a task on the event loop."""
+        task = asyncio.ensure_future(self._flush_deferred_frames(user_id, connection_id))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._deferred_flush_done)
+    
+    def _deferred_flush_done(self, task: asyncio.Task) -> None:
+        self._flush_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Error flushing deferred frames: {task.exception()}")
+    
+    async def _flush_deferred_frames(self, user_id: int, connection_id: str) -> None:
+        """Send all frames held back for a connection as one batch frame."""
+        frames = self._deferred_frames.pop(connection_id, None)
+        websocket = self.active_connections.get(user_id, {}).get(connection_id)
+        if not frames or websocket is None:
+            return
+        
+        self._take_frame_token(connection_id)
+        if len(frames) == 1:
+            await self.send_message(websocket, MessageType(frames[0]["type"]), frames[0]["data"])
+        else:
+            await self.send_message(websocket, MessageType.BATCH, {"events": frames})
+    
+    async def _publish(
+        self,
+        target: str,
+        target_id: int,
+        message_type: MessageType,
+        data: Dict[str, Any],
+        exclude_user: Optional[int] = None
+    ) -> None:
+        """Relay a message to the other nodes through the backplane."""
+        if not self.backplane:
+            return
+        
+        try:
+            await self.backplane.publish({
+                "origin": self.node_id,
+                "target": target,
+                "target_id": target_id,
+                "type": MessageType(message_type).value,
+                "data": data,
+                "exclude_user": exclude_user
+            })
+        except Exception as e:
+            logger.error(f"Error publishing to backplane: {e}")
+    
+    async def _handle_backplane_envelope(self, envelope: Dict[str, Any]) -> None:
+        """Deliver a message published by another node to local connections."""
+        if envelope.get("origin") == self.node_id:
+            return
+        
+        target = envelope["target"]
+        target_id = envelope["target_id"]
+        message_type = MessageType(envelope["type"])
+        data = envelope.get("data", {})
+        
+        if target == "user":
+            await self._send_to_local_user(target_id, message_type, data)
+        else:
+            await self._broadcast_local(
+                self._get_topic_registry(target),
+                target_id,
+                message_type,
+                data,
+                envelope.get("exclude_user")
+            )
     
     async def handle_typing_indicator(
         self, 
@@ -320,35 +513,16 @@ class ConnectionManager:
         connection_id: str,
         is_typing: bool
     ) -> None:
-        """Handle typing indicators for real-time collaboration."""
+        """Handle typing indicators for real-time collaboration.
+        
+        Repeated typing_start messages only renew the indicator's TTL; other
+        users are notified when typing starts, stops or expires.
+        """
         if is_typing:
-            # Start typing
-            if task_id not in self.typing_indicators:
-                self.typing_indicators[task_id] = {}
-            
-            self.typing_indicators[task_id][user_id] = {
-                "started_at": datetime.utcnow(),
-                "connection_id": connection_id
-            }
-            
-            await self.broadcast_to_task(
-                task_id,
-                MessageType.USER_TYPING,
-                {
-                    "user_id": user_id,
-                    "task_id": task_id,
-                    "timestamp": datetime.utcnow().isoformat()
-                },
-                exclude_user=user_id
-            )
-        else:
-            # Stop typing
-            if task_id in self.typing_indicators and user_id in self.typing_indicators[task_id]:
-                del self.typing_indicators[task_id][user_id]
-                
+            if self.presence.start_typing(task_id, user_id, connection_id):
                 await self.broadcast_to_task(
                     task_id,
-                    MessageType.USER_STOPPED_TYPING,
+                    MessageType.USER_TYPING,
                     {
                         "user_id": user_id,
                         "task_id": task_id,
@@ -356,62 +530,142 @@ class ConnectionManager:
                     },
                     exclude_user=user_id
                 )
+        elif self.presence.stop_typing(task_id, user_id):
+            await self._broadcast_stopped_typing(task_id, user_id)
+    
+    async def record_heartbeat(self, connection_id: str) -> None:
+        """Keep a connection's presence alive."""
+        self.presence.heartbeat(connection_id)
     
     async def get_project_presence(self, project_id: int) -> Dict[str, Any]:
         """Get current user presence for a project."""
-        if project_id not in self.user_presence:
-            return {"online_users": [], "total_online": 0}
-        
-        online_users = []
-        for user_id, presence in self.user_presence[project_id].items():
-            if presence["status"] == "online":
-                online_users.append({
-                    "user_id": user_id,
-                    "last_seen": presence["last_seen"].isoformat(),
-                    "current_task": presence["current_task"]
-                })
+        if not self.backplane:
+            return self.presence.get_project_presence(project_id)
         
+        online_users = [
+            {
+                "user_id": user_id,
+                "last_seen": presence["last_seen"],
+                "current_task": presence["current_task"]
+            }
+            for user_id, presence in (await self.backplane.get_presence(project_id)).items()
+            if presence["status"] == "online"
+        ]
         return {
             "online_users": online_users,
             "total_online": len(online_users)
         }
     
-    async def _update_user_presence(
-        self, 
-        user_id: int, 
-        status: str,
-        current_task: Optional[int] = None
-    ) -> None:
-        """Update user presence across all subscribed projects."""
-        for project_id in self.user_presence:
-            if user_id in self.user_presence[project_id]:
-                self.user_presence[project_id][user_id].update({
-                    "last_seen": datetime.utcnow(),
-                    "status": status,
-                    "current_task": current_task
-                })
-    
-    async def _clear_typing_indicators(self, user_id: int, connection_id: str) -> None:
-        """Clear typing indicators for a disconnected user."""
-        tasks_to_clear = []
-        for task_id, typing_users in self.typing_indicators.items():
-            if user_id in typing_users and typing_users[user_id]["connection_id"] == connection_id:
-                tasks_to_clear.append(task_id)
+    async def _publish_presence_diff(self, diff: Dict[str, Any]) -> None:
+        """Notify project subscribers of batched joins/leaves and mirror them."""
+        project_id = diff["project_id"]
+        timestamp = datetime.utcnow().isoformat()
         
-        for task_id in tasks_to_clear:
-            if user_id in self.typing_indicators[task_id]:
-                del self.typing_indicators[task_id][user_id]
-                
-                await self.broadcast_to_task(
-                    task_id,
-                    MessageType.USER_STOPPED_TYPING,
-                    {
-                        "user_id": user_id,
-                        "task_id": task_id,
-                        "timestamp": datetime.utcnow().isoformat()
-                    },
-                    exclude_user=user_id
+        events = [
+            {
+                "type": MessageType.USER_JOINED.value,
+                "data": {"user_id": entry["user_id"], "project_id": project_id, "timestamp": timestamp}
+            }
+            for entry in diff["joined"]
+        ] + [
+            {
+                "type": MessageType.USER_LEFT.value,
+                "data": {"user_id": user_id, "project_id": project_id, "timestamp": timestamp}
+            }
+            for user_id in diff["left"]
+        ]
+        
+        if len(events) == 1:
+            await self.broadcast_to_project(
+                project_id,
+                MessageType(events[0]["type"]),
+                events[0]["data"],
+                exclude_user=events[0]["data"]["user_id"]
+            )
+        elif events:
+            await self.broadcast_to_project(project_id, MessageType.BATCH, {"events": events})
+        
+        if not self.backplane:
+            return
+        
+        try:
+            for entry in diff["joined"] + diff["refreshed"]:
+                await self.backplane.set_presence(
+                    project_id, entry["user_id"], self.node_id, {**entry, "status": "online"}
                 )
+            for user_id in diff["left"]:
+                await self.backplane.remove_presence(project_id, user_id, self.node_id)
+        except Exception as e:
+            logger.error(f"Error sharing presence for project {project_id}: {e}")
+    
+    async def _broadcast_stopped_typing(self, task_id: int, user_id: int) -> None:
+        """Tell task subscribers that a user stopped typing."""
+        await self.broadcast_to_task(
+            task_id,
+            MessageType.USER_STOPPED_TYPING,
+            {
+                "user_id": user_id,
+                "task_id": task_id,
+                "timestamp": datetime.utcnow().isoformat()
+            },
+            exclude_user=user_id
+        )
+    
+    async def _handle_connection_timeout(self, connection_id: str, user_id: int) -> None:
+        """Close and drop a connection that stopped sending heartbeats."""
+        websocket = self.active_connections.get(user_id, {}).get(connection_id)
+        await self.disconnect(connection_id, user_id)
+        if websocket is not None:
+            try:
+                await websocket.close(code=4008, reason="Heartbeat timeout")
+            except Exception as e:
+                logger.error(f"Error closing timed out connection {connection_id}: {e}")
+    
+    def _get_topic_registry(self, kind: str) -> Dict[int, Dict[int, Set[str]]]:
+        """Return the subscription registry for a topic kind."""
+        if kind == "project":
+            return self.project_subscriptions
+        return self.task_subscriptions
+    
+    def _add_subscription(
+        self,
+        registry: Dict[int, Dict[int, Set[str]]],
+        kind: str,
+        topic_id: int,
+        user_id: int,
+        connection_id: str
+    ) -> None:
+        """Add a connection to a topic and record it in the reverse index."""
+        registry.setdefault(topic_id, {}).setdefault(user_id, set()).add(connection_id)
+        self.connection_subscriptions.setdefault(connection_id, set()).add((kind, topic_id))
+    
+    def _remove_subscription(
+        self,
+        registry: Dict[int, Dict[int, Set[str]]],
+        topic_id: int,
+        user_id: int,
+        connection_id: str
+    ) -> None:
+        """Remove a connection from a topic, dropping entries left empty."""
+        users = registry.get(topic_id)
+        if not users or user_id not in users:
+            return
+        
+        users[user_id].discard(connection_id)
+        if not users[user_id]:
+            del users[user_id]
+        if not users:
+            del registry[topic_id]
+    
+    def _discard_connection_topic(self, connection_id: str, topic: Tuple[str, int]) -> None:
+        """Remove a topic from a connection's reverse index entry."""
+        topics = self.connection_subscriptions.get(connection_id)
+        if topics is None:
+            return
+        
+        topics.discard(topic)
+        if not topics:
+            del self.connection_subscriptions[connection_id]
     
     def _get_timestamp(self) -> str:
         """Get current timestamp in ISO format."""
@@ -419,16 +673,9 @@ class ConnectionManager:
 
 
 # Global connection manager instance
-_connection_manager: Optional[ConnectionManager] = None
+connection_manager = ConnectionManager()
 
 
 def get_connection_manager() -> ConnectionManager:
     """Get the global connection manager instance."""
-    global _connection_manager
-    if _connection_manager is None:
-        _connection_manager = ConnectionManager()
-    return _connection_manager
-
-
-# Global connection manager instance
-connection_manager = ConnectionManager()
\ No newline at end of file
+    return connection_manager
@@ -0,0 +1,185 @@
+"""
+Wire protocols for WebSocket frames.
+
+Two protocols are supported and negotiated per connection:
+
+* ``json`` (default): text frames ``{"type", "data", "timestamp"}`` with the
+  enum value as ``type`` and an ISO-8601 timestamp.
+* ``msgpack``: binary frames holding a msgpack array. Message types are sent
+  as small integer codes (see ``MESSAGE_TYPE_CODES``) and timestamps as epoch
+  milliseconds::
+
+      [code, ts_ms, data]                  # full frame
+      [code, ts_ms, changed, removed_keys] # delta frame
+
+  Task snapshots (frames whose data carries a ``task_id``) are delta encoded
+  per connection: after the first full frame for a (type, task) pair, later
+  frames only carry the fields that changed and the keys that disappeared.
+  Clients apply them on top of the last snapshot they received for that pair.
+"""
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import msgpack
+from fastapi import WebSocket
+
+JSON_PROTOCOL = "json"
+MSGPACK_PROTOCOL = "msgpack"
+
+# WebSocket subprotocol names clients may offer during the handshake
+SUBPROTOCOLS = {
+    "teamflow.json.v1": JSON_PROTOCOL,
+    "teamflow.msgpack.v1": MSGPACK_PROTOCOL,
+}
+
+# Stable wire codes keyed by MessageType value; append new types, never renumber
+MESSAGE_TYPE_CODES: Dict[str, int] = {
+    "auth": 1,
+    "auth_success": 2,
+    "auth_error": 3,
+    "task_created": 10,
+    "task_updated": 11,
+    "task_deleted": 12,
+    "task_status_changed": 13,
+    "task_assigned": 14,
+    "comment_added": 20,
+    "comment_updated": 21,
+    "comment_deleted": 22,
+    "mention_created": 23,
+    "time_tracking_started": 30,
+    "time_tracking_stopped": 31,
+    "user_joined": 40,
+    "user_left": 41,
+    "user_typing": 42,
+    "user_stopped_typing": 43,
+    "project_updated": 50,
+    "project_member_added": 51,
+    "project_member_removed": 52,
+    "notification": 60,
+    "error": 61,
+    "heartbeat": 62,
+    "batch": 63,
+}
+MESSAGE_TYPES_BY_CODE: Dict[int, str] = {
+    code: message_type for message_type, code in MESSAGE_TYPE_CODES.items()
+}
+
+
+class JSONProtocol:
+    """Text frame protocol kept for existing clients."""
+
+    name = JSON_PROTOCOL
+
+    def encode(self, message_type: str, data: Dict[str, Any]) -> str:
+        return json.dumps({
+            "type": message_type,
+            "data": data,
+            "timestamp": datetime.utcnow().isoformat()
+        })
+
+    async def receive(self, websocket: WebSocket) -> Dict[str, Any]:
+        """Receive one client message as a dict; raises ValueError if malformed."""
+        message = json.loads(await websocket.receive_text())
+        if not isinstance(message, dict):
+            raise ValueError("Message must be an object")
+        return message
+
+
+class MsgpackProtocol:
+    """Binary msgpack protocol with integer type codes and task delta frames."""
+
+    name = MSGPACK_PROTOCOL
+
+    def __init__(self, max_snapshots: int = 1000):
+        self.max_snapshots = max_snapshots
+        # Last snapshot sent per (type code, task_id), least recently used first
+        self._snapshots: "OrderedDict[Tuple[int, Any], Dict[str, Any]]" = OrderedDict()
+
+    def encode(self, message_type: str, data: Dict[str, Any]) -> bytes:
+        code = MESSAGE_TYPE_CODES[message_type]
+        timestamp_ms = int(time.time() * 1000)
+
+        task_id = data.get("task_id") if isinstance(data, dict) else None
+        if task_id is None or message_type == "batch":
+            return self._pack([code, timestamp_ms, data])
+
+        key = (code, task_id)
+        previous = self._snapshots.get(key)
+        self._remember(key, data)
+        if previous is None:
+            return self._pack([code, timestamp_ms, data])
+
+        changed, removed = self._diff(previous, data)
+        return self._pack([code, timestamp_ms, changed, removed])
+
+    async def receive(self, websocket: WebSocket) -> Dict[str, Any]:
+        """Receive one client message as a dict; raises ValueError if malformed."""
+        try:
+            message = msgpack.unpackb(await websocket.receive_bytes(), raw=False)
+        except (msgpack.exceptions.UnpackException, KeyError) as e:
+            raise ValueError(f"Invalid msgpack frame: {e}") from e
+        if not isinstance(message, dict):
+            raise ValueError("Message must be a map")
+
+        message_type = message.get("type")
+        if isinstance(message_type, int) and message_type in MESSAGE_TYPES_BY_CODE:
+            message["type"] = MESSAGE_TYPES_BY_CODE[message_type]
+        return message
+
+    def _remember(self, key: Tuple[int, Any], data: Dict[str, Any]) -> None:
+        self._snapshots[key] = dict(data)
+        self._snapshots.move_to_end(key)
+        while len(self._snapshots) > self.max_snapshots:
+            self._snapshots.popitem(last=False)
+
+    @staticmethod
+    def _diff(
+        previous: Dict[str, Any], current: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], List[str]]:
+        changed = {
+            field: value for field, value in current.items()
+            if field not in previous or previous[field] != value
+        }
+        # Always carry the key the client uses to find its snapshot
+        changed["task_id"] = current["task_id"]
+        removed = [field for field in previous if field not in current]
+        return changed, removed
+
+    @staticmethod
+    def _pack(frame: List[Any]) -> bytes:
+        return msgpack.packb(frame, default=str, use_bin_type=True)
+
+
+WebSocketProtocol = Union[JSONProtocol, MsgpackProtocol]
+
+# JSON is stateless, so all JSON connections share one instance
+json_protocol = JSONProtocol()
+
+
+def negotiate_protocol(
+    requested: Optional[str], offered_subprotocols: List[str]
+) -> Tuple[WebSocketProtocol, Optional[str]]:
+    """Pick a protocol from the query parameter or offered subprotocols.
+
+    Returns the protocol and the subprotocol to echo back on accept, if any.
+    """
+    for subprotocol in offered_subprotocols:
+        if subprotocol in SUBPROTOCOLS:
+            return create_protocol(SUBPROTOCOLS[subprotocol]), subprotocol
+    return create_protocol(requested), None
+
+
+def create_protocol(name: Optional[str]) -> WebSocketProtocol:
+    """Create the protocol handler for one connection."""
+    if name == MSGPACK_PROTOCOL:
+        return MsgpackProtocol()
+    return json_protocol
+
+
+def get_connection_protocol(websocket: WebSocket) -> WebSocketProtocol:
+    """Return the protocol negotiated for a connection (JSON by default)."""
+    state = getattr(websocket, "state", None)
+    return getattr(state, "protocol", None) or json_protocol
@@ -139,20 +139,82 @@ app = create_application()
 @app.on_event("startup")
 async def startup_event():
     """Application startup event - no hanging database operations."""
+    print("🚀 TeamFlow API v2.0 starting up...")
+    print(f"✅ Environment: {settings.ENVIRONMENT}")
+    print("📋 Database: Lazy-loaded (use /test-db to check or run setup_database.py)")
+    print("🎯 No hanging - server ready instantly!")
     try:
-        print("🚀 TeamFlow API v2.0 starting up...")
-        print(f"✅ Environment: {settings.ENVIRONMENT}")
-        print("📋 Database: Lazy-loaded (use /test-db to check or run setup_database.py)")
-        print("🎯 No hanging - server ready instantly!")
-        print(f"✅ TeamFlow API startup complete in {settings.ENVIRONMENT} mode")
+        from app.core.backplane import create_backplane
+        from app.core.websocket import connection_manager
+        backplane = create_backplane()
+        if backplane:
+            await connection_manager.attach_backplane(backplane)
+            print(f"📡 Realtime backplane: {settings.REALTIME_BACKPLANE}")
     except Exception as e:
-        print(f"TeamFlow API starting up in {settings.ENVIRONMENT} mode with startup warning: {e}")
+        print(f"⚠️ Error attaching realtime backplane: {e}")
+    try:
+        from app.services.webhook_service import webhook_delivery_queue
+        webhook_delivery_queue.start()
+        webhook_delivery_queue.service.rate_limit_usage.start()
+    except Exception as e:
+        print(f"⚠️ Error starting webhook delivery queue: {e}")
+    try:
+        from app.services.workflow_engine import workflow_execution_queue
+        workflow_execution_queue.start()
+        workflow_execution_queue.engine.stats.start()
+    except Exception as e:
+        print(f"⚠️ Error starting workflow execution queue: {e}")
+    try:
+        from app.services.analytics import report_job_queue
+        report_job_queue.start()
+    except Exception as e:
+        print(f"⚠️ Error starting report job queue: {e}")
+    try:
+        from app.services.report_scheduler import report_scheduler
+        report_scheduler.start()
+    except Exception as e:
+        print(f"⚠️ Error starting report scheduler: {e}")
+
+    print(f"✅ TeamFlow API startup complete in {settings.ENVIRONMENT} mode")
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Application shutdown event."""
     print("👋 TeamFlow API shutting down...")
+    try:
+        from app.core.event_coalescer import event_coalescer
+        from app.core.websocket import connection_manager
+        await event_coalescer.flush_all()
+        await connection_manager.presence.stop()
+        await connection_manager.detach_backplane()
+    except Exception as e:
+        print(f"⚠️ Error detaching realtime backplane: {e}")
+    try:
+        from app.services.webhook_service import webhook_delivery_queue
+        await webhook_delivery_queue.stop()
+        await webhook_delivery_queue.service.rate_limit_usage.stop()
+        await webhook_delivery_queue.service.rate_limiter.close()
+        await webhook_delivery_queue.service.transport.close()
+    except Exception as e:
+        print(f"⚠️ Error stopping webhook delivery queue: {e}")
+    try:
+        from app.services.workflow_engine import workflow_execution_queue
+        await workflow_execution_queue.stop()
+        await workflow_execution_queue.engine.stats.stop()
+        await workflow_execution_queue.engine.quotas.close()
+    except Exception as e:
+        print(f"⚠️ Error stopping workflow execution queue: {e}")
+    try:
+        from app.services.analytics import report_job_queue
+        await report_job_queue.stop()
+    except Exception as e:
+        print(f"⚠️ Error stopping report job queue: {e}")
+    try:
+        from app.services.report_scheduler import report_scheduler
+        await report_scheduler.stop()
+    except Exception as e:
+        print(f"⚠️ Error stopping report scheduler: {e}")
     try:
         await close_database()
         print("✅ Database connections closed cleanly")
@@ -10,7 +10,7 @@ from app.models.project import (Project, ProjectMember, ProjectMemberRole,
                                 ProjectPriority, ProjectStatus)
 from app.models.task import (Task, TaskComment, TaskDependency, TaskPriority, 
                             TaskStatus)
-from app.models.time_tracking import (TaskTimeLog, TaskTemplate, TaskActivity,
+from app.models.time_tracking import (TaskTimeLog, TimeLogRollup, TaskTemplate, TaskActivity,
                                       TaskMention, TaskAssignmentHistory)
 from app.models.user import User, UserRole, UserStatus
 from app.models.file_management import (
@@ -22,15 +22,16 @@ from app.models.search import (
 )
 from app.models.analytics import (
     ReportTemplate, Report, ReportExport, ReportSchedule,
-    Dashboard, DashboardWidget, AnalyticsMetric, ReportAlert
+    Dashboard, DashboardWidget, AnalyticsMetric, AnalyticsRollup, ReportAlert, SchedulerLease,
+    ActivityEvent, ActivitySketch, ActivityMember, RetentionCohort
 )
 from app.models.workflow import (
     WorkflowDefinition, BusinessRule, WorkflowExecution, AutomationRule,
     WorkflowTemplate
 )
 from app.models.webhooks import (
-    WebhookEndpoint, WebhookDelivery, WebhookEvent, ExternalIntegration,
-    APIRateLimit
+    WebhookEndpoint, WebhookDelivery, WebhookDeliveryEvent, WebhookEvent,
+    ExternalIntegration, APIRateLimit
 )
 from app.models.security import (
     AuditLog, SecurityAlert, APIKey, GDPRRequest, DataConsentRecord,
@@ -59,6 +60,7 @@ __all__ = [
     "TaskStatus",
     "TaskPriority",
     "TaskTimeLog",
+    "TimeLogRollup",
     "TaskTemplate",
     "TaskActivity",
     "TaskMention",
@@ -80,7 +82,13 @@ __all__ = [
     "Dashboard",
     "DashboardWidget",
     "AnalyticsMetric",
+    "AnalyticsRollup",
     "ReportAlert",
+    "SchedulerLease",
+    "ActivityEvent",
+    "ActivitySketch",
+    "ActivityMember",
+    "RetentionCohort",
     "WorkflowDefinition",
     "BusinessRule",
     "WorkflowExecution",
@@ -88,6 +96,7 @@ __all__ = [
     "WorkflowTemplate",
     "WebhookEndpoint",
     "WebhookDelivery",
+    "WebhookDeliveryEvent",
     "WebhookEvent",
     "ExternalIntegration",
     "APIRateLimit",
@@ -39,6 +39,16 @@ class ReportFormat(str, Enum):
     JSON = "json"
     PNG = "png"
     SVG = "svg"
+    JSONL = "jsonl"
+    PARQUET = "parquet"
+
+
+class ReportJobStatus(str, Enum):
+    """Status of background report generation and export jobs."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
 
 
 class ReportFrequency(str, Enum):
@@ -169,6 +179,15 @@ class Report(Base):
     is_archived = Column(Boolean, default=False, index=True)
     archived_at = Column(DateTime)
     
+    # Background generation
+    status = Column(SQLEnum(ReportJobStatus), default=ReportJobStatus.QUEUED, nullable=False)
+    progress = Column(Integer, default=0, nullable=False)  # Percent complete
+    error_message = Column(Text)
+    started_at = Column(DateTime)
+    completed_at = Column(DateTime)
+    locked_by = Column(String(100))  # Worker holding the lease
+    locked_until = Column(DateTime)
+    
     # Relationships
     template = relationship("ReportTemplate", back_populates="reports")
     organization = relationship("Organization", back_populates="reports")
@@ -180,6 +199,7 @@ class Report(Base):
         Index("ix_reports_org_generated", "organization_id", "generated_at"),
         Index("ix_reports_template_date", "template_id", "generated_at"),
         Index("ix_reports_date_range", "data_start_date", "data_end_date"),
+        Index("ix_reports_status", "status"),
     )
 
 
@@ -219,6 +239,15 @@ class ReportExport(Base):
     is_deleted = Column(Boolean, default=False, index=True)
     deleted_at = Column(DateTime)
     
+    # Background export
+    status = Column(SQLEnum(ReportJobStatus), default=ReportJobStatus.QUEUED, nullable=False)
+    progress = Column(Integer, default=0, nullable=False)  # Percent complete
+    row_count = Column(Integer)  # Rows written so far
+    error_message = Column(Text)
+    completed_at = Column(DateTime)
+    locked_by = Column(String(100))  # Worker holding the lease
+    locked_until = Column(DateTime)
+    
     # Relationships
     report = relationship("Report", back_populates="exports")
     organization = relationship("Organization")
@@ -227,6 +256,7 @@ class ReportExport(Base):
     __table_args__ = (
         Index("ix_report_exports_org_format", "organization_id", "format"),
         Index("ix_report_exports_expires", "expires_at", "is_deleted"),
+        Index("ix_report_exports_status", "status"),
     )
 
 
@@ -445,6 +475,52 @@ class AnalyticsMetric(Base):
     )
 
 
+class AnalyticsRollup(Base):
+    """
+    Pre-aggregated task and time tracking counters per scope and time bucket.
+    Updated incrementally on every task and time log write, so metrics over
+    any date range are sums over a few rollup rows instead of raw table scans.
+    """
+    __tablename__ = "analytics_rollups"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    
+    # Scope: the organization itself, one of its projects, or one of its users
+    organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
+    scope_type = Column(String(20), nullable=False)  # organization, project, user
+    scope_id = Column(Integer, nullable=False)
+    
+    # Bucket: start of the hour or day (UTC) the counters cover
+    granularity = Column(String(10), nullable=False)  # hour, day
+    bucket_start = Column(DateTime, nullable=False)
+    
+    # Task flow within the bucket
+    tasks_created = Column(Integer, default=0, nullable=False)
+    tasks_completed = Column(Integer, default=0, nullable=False)
+    completed_on_time = Column(Integer, default=0, nullable=False)
+    completed_late = Column(Integer, default=0, nullable=False)
+    
+    # Net change in active tasks per status; summed up to a date they give status counts
+    tasks_todo = Column(Integer, default=0, nullable=False)
+    tasks_in_progress = Column(Integer, default=0, nullable=False)
+    tasks_in_review = Column(Integer, default=0, nullable=False)
+    tasks_done = Column(Integer, default=0, nullable=False)
+    tasks_cancelled = Column(Integer, default=0, nullable=False)
+    
+    # Time tracking within the bucket
+    minutes_logged = Column(Integer, default=0, nullable=False)
+    billable_minutes = Column(Integer, default=0, nullable=False)
+    time_entries = Column(Integer, default=0, nullable=False)
+    
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint("organization_id", "scope_type", "scope_id", "granularity", "bucket_start",
+                        name="uq_analytics_rollup_bucket"),
+        Index("ix_analytics_rollups_scope_bucket", "scope_type", "scope_id", "granularity", "bucket_start"),
+    )
+
+
 class ReportAlert(Base):
     """
     Alert configurations for report monitoring.
@@ -486,6 +562,8 @@ class ReportAlert(Base):
     last_evaluated_at = Column(DateTime, index=True)
     last_triggered_at = Column(DateTime, index=True)
     trigger_count = Column(Integer, default=0)
+    last_value = Column(Float)  # Metric value at the last evaluation
+    consecutive_breaches = Column(Integer, default=0, nullable=False)  # Evaluations in a row over threshold
     
     # Snooze functionality
     is_snoozed = Column(Boolean, default=False, index=True)
@@ -501,4 +579,99 @@ class ReportAlert(Base):
         Index("ix_report_alerts_org_active", "organization_id", "is_active"),
         Index("ix_report_alerts_metric_active", "metric_name", "is_active"),
         Index("ix_report_alerts_next_eval", "is_active", "last_evaluated_at"),
-    )
\ No newline at end of file
+    )
+
+
+class SchedulerLease(Base):
+    """
+    Leadership leases for in-process schedulers.
+    The node whose lease is live runs the scheduler; others stand by and
+    take over once it stops renewing.
+    """
+    __tablename__ = "scheduler_leases"
+    
+    name = Column(String(100), primary_key=True)
+    holder = Column(String(100), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    acquired_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ActivityEvent(Base):
+    """
+    Append-only log of user activity within an organization.
+    Source of truth for the activity sketches and retention cohorts, which
+    can be rebuilt from it.
+    """
+    __tablename__ = "activity_events"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    event_type = Column(String(50), nullable=False)  # login, task_created, task_updated, time_logged, ...
+    entity_type = Column(String(50))
+    entity_id = Column(Integer)
+    occurred_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_activity_events_org_occurred", "organization_id", "occurred_at"),
+    )
+
+
+class ActivitySketch(Base):
+    """
+    Daily distinct active user sketches per organization.
+    One row per non-empty HyperLogLog register; the union over any days or
+    organizations is the per-register maximum.
+    """
+    __tablename__ = "activity_sketches"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
+    day = Column(Date, nullable=False)
+    register = Column(Integer, nullable=False)
+    rank = Column(Integer, nullable=False)
+    
+    __table_args__ = (
+        UniqueConstraint("organization_id", "day", "register", name="uq_activity_sketch_register"),
+        Index("ix_activity_sketches_day", "day"),
+    )
+
+
+class ActivityMember(Base):
+    """
+    First and last active day of each user in an organization.
+    Lets each event decide in O(1) whether it is the user's first in a day
+    or week, so retention cohorts are counted exactly and incrementally.
+    """
+    __tablename__ = "activity_members"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    first_active_on = Column(Date, nullable=False)
+    last_active_on = Column(Date, nullable=False)
+    
+    __table_args__ = (
+        UniqueConstraint("organization_id", "user_id", name="uq_activity_member"),
+    )
+
+
+class RetentionCohort(Base):
+    """
+    Retention matrix cells: users first active in a cohort day or week who
+    were active again ``period`` days or weeks later. Period 0 is the size
+    of the cohort.
+    """
+    __tablename__ = "retention_cohorts"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
+    granularity = Column(String(10), nullable=False)  # day, week
+    cohort_start = Column(Date, nullable=False)
+    period = Column(Integer, nullable=False)
+    users = Column(Integer, default=0, nullable=False)
+    
+    __table_args__ = (
+        UniqueConstraint("organization_id", "granularity", "cohort_start", "period",
+                        name="uq_retention_cohort_cell"),
+    )
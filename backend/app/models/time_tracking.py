@@ -1,7 +1,7 @@
 """
 Time tracking models for detailed task time management.
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, Date, Boolean, ForeignKey, Text, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 import datetime
@@ -66,6 +66,31 @@ class TaskTimeLog(Base):
         return f"<TaskTimeLog(task_id={self.task_id}, user_id={self.user_id}, {status})>"
 
 
+class TimeLogRollup(Base):
+    """
+    Finished time logged per user, task and day the logs started on.
+    Maintained on every time log write, so timesheets and summaries over
+    any days read one row per user, task and day instead of every log.
+    """
+    __tablename__ = "time_log_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
+    day = Column(Date, nullable=False)
+
+    minutes = Column(Integer, default=0, nullable=False)
+    billable_minutes = Column(Integer, default=0, nullable=False)
+    entries = Column(Integer, default=0, nullable=False)
+
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "day", "task_id", name="uq_time_log_rollup"),
+        Index("ix_time_log_rollups_task_day", "task_id", "day"),
+    )
+
+
 class TaskTemplate(Base):
     """
     Reusable task templates for common work patterns.
@@ -2,6 +2,7 @@
 Webhook models for external integrations and event notifications.
 Provides webhook management, delivery tracking, and retry mechanisms.
 """
+import uuid
 from datetime import datetime, timedelta
 from enum import Enum
 from typing import Optional, Dict, Any, List
@@ -12,6 +13,9 @@ from sqlalchemy.ext.hybrid import hybrid_property
 
 from app.core.database import Base
 
+# Event type of deliveries that carry a batch of events
+BATCH_EVENT_TYPE = "batch"
+
 
 class WebhookEventType(str, Enum):
     """Types of webhook events."""
@@ -40,6 +44,7 @@ class WebhookStatus(str, Enum):
 
 class DeliveryStatus(str, Enum):
     """Webhook delivery status."""
+    BATCHING = "batching"  # Open batch still accepting events
     PENDING = "pending"
     DELIVERED = "delivered"
     FAILED = "failed"
@@ -81,6 +86,12 @@ class WebhookEndpoint(Base):
     rate_limit_per_minute = Column(Integer, default=60)
     rate_limit_per_hour = Column(Integer, default=1000)
     
+    # Batching: deliver several events per request
+    batch_enabled = Column(Boolean, default=False)
+    batch_max_size = Column(Integer, default=100)
+    batch_max_linger_ms = Column(Integer, default=1000)
+    batch_max_bytes = Column(Integer, default=256 * 1024)
+    
     # Organization and ownership
     organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
     created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -130,7 +141,7 @@ class WebhookDelivery(Base):
     __tablename__ = "webhook_deliveries"
 
     id = Column(Integer, primary_key=True, index=True)
-    delivery_uuid = Column(String(36), unique=True, index=True)
+    delivery_uuid = Column(String(36), unique=True, index=True, default=lambda: str(uuid.uuid4()))
     
     # Webhook and event information
     endpoint_id = Column(Integer, ForeignKey("webhook_endpoints.id"), nullable=False)
@@ -148,6 +159,10 @@ class WebhookDelivery(Base):
     url = Column(String(2048), nullable=False)
     signature = Column(String(255))  # HMAC signature
     
+    # Batches carry a list payload of event_count events, built when sealed
+    event_count = Column(Integer, default=1)
+    payload_size = Column(Integer)  # Serialized payload bytes
+    
     # Response data
     response_status_code = Column(Integer)
     response_headers = Column(JSON)
@@ -164,12 +179,23 @@ class WebhookDelivery(Base):
     completed_at = Column(DateTime)
     next_retry_at = Column(DateTime)
     
+    # Queue lease, held by the worker currently delivering
+    locked_by = Column(String(100))
+    locked_until = Column(DateTime)
+    
     # Organization for filtering
     organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
     
     # Relationships
     endpoint = relationship("WebhookEndpoint", back_populates="deliveries")
     organization = relationship("Organization")
+    batch_events = relationship(
+        "WebhookDeliveryEvent", back_populates="delivery", cascade="all, delete-orphan"
+    )
+    
+    __table_args__ = (
+        Index("ix_webhook_deliveries_queue", "status", "next_retry_at"),
+    )
     
     @hybrid_property
     def is_successful(self) -> bool:
@@ -190,6 +216,24 @@ class WebhookDelivery(Base):
         )
 
 
+class WebhookDeliveryEvent(Base):
+    """
+    Events carried by a batched webhook delivery.
+    Keeps per-event delivery status queryable through the batch.
+    """
+    __tablename__ = "webhook_delivery_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    delivery_id = Column(Integer, ForeignKey("webhook_deliveries.id", ondelete="CASCADE"), nullable=False)
+    event_id = Column(String(255), nullable=False, index=True)
+    event_type = Column(String(100), nullable=False)
+    position = Column(Integer, nullable=False)  # Index in the batch payload
+    payload = Column(JSON)  # The event's item in the batch payload
+    
+    # Relationships
+    delivery = relationship("WebhookDelivery", back_populates="batch_events")
+
+
 class WebhookEvent(Base):
     """
     Webhook events queue for processing.
@@ -198,7 +242,7 @@ class WebhookEvent(Base):
     __tablename__ = "webhook_events"
 
     id = Column(Integer, primary_key=True, index=True)
-    event_uuid = Column(String(36), unique=True, index=True)
+    event_uuid = Column(String(36), unique=True, index=True, default=lambda: str(uuid.uuid4()))
     
     # Event details
     event_type = Column(String(100), nullable=False)
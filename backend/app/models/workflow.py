@@ -109,7 +109,7 @@ class WorkflowDefinition(Base):
     
     # Execution settings
     is_enabled = Column(Boolean, default=True, index=True)
-    status = Column(SQLEnum(WorkflowStatus), default=WorkflowStatus.ACTIVE.value, index=True)
+    status = Column(SQLEnum(WorkflowStatus), default=WorkflowStatus.ACTIVE, index=True)
     
     # Scheduling and limits
     max_executions_per_day = Column(Integer, default=1000)
@@ -212,6 +212,13 @@ class WorkflowExecution(Base):
     triggered_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     context_data = Column(JSON, default={})  # Additional context information
     
+    # Queue state: pending executions resume at next_action_index once scheduled_at passes
+    planned_actions = Column(JSON, default=[])  # Actions snapshotted when the workflow was triggered
+    next_action_index = Column(Integer, default=0)
+    scheduled_at = Column(DateTime)
+    locked_by = Column(String(100))  # Worker holding the execution lease
+    locked_until = Column(DateTime)
+    
     # Relationships
     workflow = relationship("WorkflowDefinition", back_populates="executions")
     triggered_by_user = relationship("User", foreign_keys=[triggered_by_user_id])
@@ -219,6 +226,7 @@ class WorkflowExecution(Base):
     __table_args__ = (
         Index("ix_workflow_executions_workflow_status", "workflow_id", "status"),
         Index("ix_workflow_executions_started_at", "started_at"),
+        Index("ix_workflow_executions_queue", "status", "scheduled_at"),
     )
 
 
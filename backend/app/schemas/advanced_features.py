@@ -1,7 +1,7 @@
 """
 Advanced task feature schemas for time tracking, templates, and analytics.
 """
-from datetime import datetime
+from datetime import date, datetime
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field, ConfigDict
 
@@ -80,6 +80,32 @@ class TimeReportSummary(BaseModel):
     date_range: Dict[str, Optional[datetime]] = Field(..., description="Start and end dates of report")
 
 
+class TimesheetCell(BaseModel):
+    """Schema for one user's time on one day of a timesheet."""
+    day: date
+    total_minutes: int = Field(..., description="Minutes tracked")
+    billable_minutes: int = Field(..., description="Billable minutes tracked")
+    entries_count: int = Field(..., description="Number of time entries")
+    tasks_count: int = Field(..., description="Number of tasks with time entries")
+
+
+class TimesheetRow(BaseModel):
+    """Schema for one user's row of a timesheet."""
+    user_id: int
+    days: List[TimesheetCell]
+    total_minutes: int = Field(..., description="Minutes tracked over the timesheet")
+    billable_minutes: int = Field(..., description="Billable minutes tracked over the timesheet")
+
+
+class TimesheetResponse(BaseModel):
+    """Schema for a user by day timesheet."""
+    start_date: date
+    end_date: date
+    days: List[date]
+    users: List[TimesheetRow]
+    daily_totals: List[int] = Field(..., description="Minutes tracked per day over all users")
+
+
 # ============================================================================
 # Task Template Schemas
 # ============================================================================
@@ -150,6 +150,31 @@ class ReportResponse(BaseModel):
         from_attributes = True
 
 
+class ReportStatusResponse(BaseModel):
+    """Response model for the status of a queued report."""
+    
+    id: int
+    report_uuid: str
+    name: str
+    template_id: int
+    
+    # Background generation
+    status: str
+    progress: int
+    error_message: Optional[str] = None
+    generated_at: datetime
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    
+    # Result
+    generation_duration_ms: Optional[int] = None
+    data_points_count: Optional[int] = None
+    file_size_bytes: Optional[int] = None
+    
+    class Config:
+        from_attributes = True
+
+
 class ReportExportRequest(BaseModel):
     """Request model for exporting reports."""
     
@@ -171,7 +196,12 @@ class ReportExportResponse(BaseModel):
     file_size_bytes: Optional[int]
     
     # Status
+    status: str
+    progress: int
+    row_count: Optional[int] = None
+    error_message: Optional[str] = None
     exported_at: datetime
+    completed_at: Optional[datetime] = None
     expires_at: Optional[datetime]
     download_count: int
     
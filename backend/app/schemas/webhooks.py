@@ -41,6 +41,12 @@ class WebhookEndpointBase(BaseModel):
     # Rate limiting
     rate_limit_per_minute: int = Field(default=60, ge=1, le=1000)
     rate_limit_per_hour: int = Field(default=1000, ge=1, le=10000)
+    
+    # Batching
+    batch_enabled: bool = Field(default=False, description="Deliver several events per request")
+    batch_max_size: int = Field(default=100, ge=1, le=1000)
+    batch_max_linger_ms: int = Field(default=1000, ge=0, le=60000)
+    batch_max_bytes: int = Field(default=256 * 1024, ge=1024, le=10 * 1024 * 1024)
 
 
 class WebhookEndpointCreate(WebhookEndpointBase):
@@ -65,6 +71,10 @@ class WebhookEndpointUpdate(BaseModel):
     auth_config: Optional[Dict[str, Any]] = None
     rate_limit_per_minute: Optional[int] = Field(None, ge=1, le=1000)
     rate_limit_per_hour: Optional[int] = Field(None, ge=1, le=10000)
+    batch_enabled: Optional[bool] = None
+    batch_max_size: Optional[int] = Field(None, ge=1, le=1000)
+    batch_max_linger_ms: Optional[int] = Field(None, ge=0, le=60000)
+    batch_max_bytes: Optional[int] = Field(None, ge=1024, le=10 * 1024 * 1024)
 
 
 class WebhookEndpointResponse(WebhookEndpointBase):
@@ -111,6 +121,9 @@ class WebhookDeliveryResponse(WebhookDeliveryBase):
     id: int
     uuid: UUID
     endpoint_id: int
+    event_type: str  # An event type, or "batch"
+    payload: Union[Dict[str, Any], List[Dict[str, Any]]]
+    event_count: int = 1
     status: DeliveryStatus
     attempt_number: int = 1
     max_attempts: int = 3
@@ -133,6 +146,18 @@ class WebhookDeliveryResponse(WebhookDeliveryBase):
         from_attributes = True
 
 
+class WebhookEventDeliveryStatus(BaseModel):
+    """Delivery status of one event at one endpoint."""
+    delivery_id: int
+    endpoint_id: int
+    status: DeliveryStatus
+    batched: bool = False
+    batch_position: Optional[int] = None
+    attempt_number: int = 1
+    completed_at: Optional[datetime] = None
+    error_message: Optional[str] = None
+
+
 # ============================================================================
 # Webhook Event Schemas
 # ============================================================================
@@ -324,6 +349,8 @@ class WebhookDeliveryStats(BaseModel):
     success_rate: float
     average_response_time_ms: float
     median_response_time_ms: int
+    p95_response_time_ms: int = 0
+    p99_response_time_ms: int = 0
     max_response_time_ms: int
 
 
@@ -189,6 +189,7 @@ class WorkflowExecutionResponse(BaseModel):
     started_at: datetime
     completed_at: Optional[datetime]
     execution_time_ms: Optional[int]
+    scheduled_at: Optional[datetime] = None
     
     # Results
     actions_executed: List[Dict[str, Any]]
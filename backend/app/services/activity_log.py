@@ -0,0 +1,329 @@
+"""
+User activity log, distinct active user sketches and retention cohorts.
+Every activity event is appended to ``activity_events``. The first event of
+a user in an organization on a given day also adds the user to that day's
+HyperLogLog sketch and to the retention cohort cells, inside the writer's
+transaction. Active user counts over any range are then merges of a few
+compact daily sketches, and retention matrices are reads of stored cells,
+instead of scans of the users table.
+"""
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import dialect_insert
+from app.core.hyperloglog import HyperLogLog
+from app.models.analytics import ActivityEvent, ActivityMember, ActivitySketch, RetentionCohort
+from app.models.organization import OrganizationMember
+
+logger = logging.getLogger(__name__)
+
+# 2048 registers: about 2.3% standard error, at most 2048 rows per organization and day
+sketch = HyperLogLog(precision=11)
+
+GRANULARITIES = ("day", "week")
+
+# Days covered by the daily, weekly and monthly active user counts
+ACTIVE_WINDOWS = {"dau": 1, "wau": 7, "mau": 30}
+
+RETENTION_PERIOD_DAYS = 7
+
+
+def cohort_start(day: date, granularity: str) -> date:
+    """The first day of the day or ISO week a date falls in."""
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def period_of(first_active_on: date, day: date, granularity: str) -> int:
+    """Days or weeks from a user's first active day or week to ``day``'s."""
+    elapsed = (cohort_start(day, granularity) - cohort_start(first_active_on, granularity)).days
+    return elapsed // 7 if granularity == "week" else elapsed
+
+
+class ActivityLog:
+    """Records activity events and answers active user and retention queries.
+
+    Members track each user's first and last active day per organization.
+    An event on a later day than the last one moves ``last_active_on``
+    forward with a conditional update, so exactly one event per user and
+    day adds to the sketches and cohorts even with concurrent writers.
+    Cohorts assume events arrive in time order; events recorded late only
+    reach the log, until ``rebuild`` replays it.
+    """
+
+    async def record(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        organization_ids: Iterable[int],
+        event_type: str,
+        entity_type: Optional[str] = None,
+        entity_id: Optional[int] = None,
+        occurred_at: Optional[datetime] = None
+    ) -> None:
+        """Append an activity event for each organization it happened in."""
+        occurred_at = occurred_at or datetime.utcnow()
+        for organization_id in organization_ids:
+            db.add(ActivityEvent(
+                organization_id=organization_id,
+                user_id=user_id,
+                event_type=event_type,
+                entity_type=entity_type,
+                entity_id=entity_id,
+                occurred_at=occurred_at
+            ))
+            await self._mark_active(db, organization_id, user_id, occurred_at.date())
+
+    async def record_login(self, db: AsyncSession, user_id: int, occurred_at: Optional[datetime] = None) -> None:
+        """Record a login as activity in every organization of the user."""
+        result = await db.execute(
+            select(OrganizationMember.organization_id).where(OrganizationMember.user_id == user_id)
+        )
+        await self.record(db, user_id, result.scalars().all(), "login", occurred_at=occurred_at)
+
+    async def active_users(
+        self, db: AsyncSession, start: date, end: date, organization_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Distinct active users over ``[start, end]`` and per day within it."""
+        by_day = await self._sketches(db, start, end, organization_id)
+        daily = []
+        day = start
+        while day <= end:
+            daily.append({"date": day.isoformat(), "active_users": sketch.estimate(by_day.get(day, {}))})
+            day += timedelta(days=1)
+        return {
+            "active_users": sketch.estimate(sketch.merge(by_day.values())),
+            "daily_activity": daily
+        }
+
+    async def active_user_counts(
+        self, db: AsyncSession, day: date, organization_id: Optional[int] = None
+    ) -> Dict[str, int]:
+        """Daily, weekly and monthly active users up to and including ``day``."""
+        longest = max(ACTIVE_WINDOWS.values())
+        by_day = await self._sketches(db, day - timedelta(days=longest - 1), day, organization_id)
+        return {
+            name: sketch.estimate(sketch.merge(
+                registers for sketch_day, registers in by_day.items()
+                if sketch_day > day - timedelta(days=days)
+            ))
+            for name, days in ACTIVE_WINDOWS.items()
+        }
+
+    async def cohorts(
+        self,
+        db: AsyncSession,
+        start: date,
+        end: date,
+        granularity: str = "week",
+        organization_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Retention matrix rows for cohorts from ``start``'s day or week through ``end``.
+
+        Without an organization, cells are summed over organizations, so a
+        user active in two organizations counts in both.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown cohort granularity: {granularity}")
+
+        conditions = [
+            RetentionCohort.granularity == granularity,
+            RetentionCohort.cohort_start >= cohort_start(start, granularity),
+            RetentionCohort.cohort_start <= end
+        ]
+        if organization_id is not None:
+            conditions.append(RetentionCohort.organization_id == organization_id)
+        result = await db.execute(
+            select(RetentionCohort.cohort_start, RetentionCohort.period, func.sum(RetentionCohort.users))
+            .where(and_(*conditions))
+            .group_by(RetentionCohort.cohort_start, RetentionCohort.period)
+        )
+
+        cells: Dict[date, Dict[int, int]] = {}
+        for start_day, period, users in result:
+            cells.setdefault(start_day, {})[period] = int(users)
+
+        rows = []
+        for start_day in sorted(cells):
+            periods = cells[start_day]
+            size = periods.get(0, 0)
+            retained = [periods.get(period, 0) for period in range(max(periods) + 1)]
+            rows.append({
+                "cohort_start": start_day.isoformat(),
+                "users": size,
+                "retained": retained,
+                "retention_rates": [round(users / size * 100, 2) if size else 0 for users in retained]
+            })
+        return rows
+
+    async def retention_summary(
+        self, db: AsyncSession, start: date, end: date, organization_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Share of the weekly cohorts from ``start`` through ``end`` active again the next week."""
+        rows = await self.cohorts(db, start, end, "week", organization_id)
+        new_users = sum(row["users"] for row in rows)
+        retained_users = sum(row["retained"][1] for row in rows if len(row["retained"]) > 1)
+        return {
+            "new_users": new_users,
+            "retained_users": retained_users,
+            "retention_rate": round(retained_users / new_users * 100, 2) if new_users else 0,
+            "retention_period_days": RETENTION_PERIOD_DAYS
+        }
+
+    async def rebuild(self, db: AsyncSession, organization_id: int) -> int:
+        """Recompute an organization's members, sketches and cohorts from its event log.
+
+        Used after importing or back-dating events. Returns the events replayed.
+        """
+        members: Dict[int, Tuple[date, date]] = {}
+        registers: Dict[Tuple[date, int], int] = {}
+        cells: Dict[Tuple[str, date, int], int] = {}
+        replayed = 0
+
+        events = await db.stream(
+            select(ActivityEvent.user_id, ActivityEvent.occurred_at)
+            .where(ActivityEvent.organization_id == organization_id)
+            .order_by(ActivityEvent.occurred_at, ActivityEvent.id)
+            .execution_options(yield_per=1000)
+        )
+        async for user_id, occurred_at in events:
+            replayed += 1
+            day = occurred_at.date()
+            first, last = members.get(user_id, (day, None))
+            if last is not None and day <= last:
+                continue
+            members[user_id] = (first, day)
+            for granularity, period in self._new_periods(first, last, day):
+                key = (granularity, cohort_start(first, granularity), period)
+                cells[key] = cells.get(key, 0) + 1
+            index, rank = sketch.register(user_id)
+            if rank > registers.get((day, index), 0):
+                registers[(day, index)] = rank
+
+        for model in (ActivityMember, ActivitySketch, RetentionCohort):
+            await db.execute(delete(model).where(model.organization_id == organization_id))
+        rows = {
+            ActivityMember: [
+                {"organization_id": organization_id, "user_id": user_id,
+                 "first_active_on": first, "last_active_on": last}
+                for user_id, (first, last) in members.items()
+            ],
+            ActivitySketch: [
+                {"organization_id": organization_id, "day": day, "register": index, "rank": rank}
+                for (day, index), rank in registers.items()
+            ],
+            RetentionCohort: [
+                {"organization_id": organization_id, "granularity": granularity,
+                 "cohort_start": start_day, "period": period, "users": users}
+                for (granularity, start_day, period), users in cells.items()
+            ],
+        }
+        for model, model_rows in rows.items():
+            for offset in range(0, len(model_rows), 500):
+                await db.execute(dialect_insert(db, model).values(model_rows[offset:offset + 500]))
+        await db.commit()
+
+        logger.info(f"Replayed {replayed} activity events for organization {organization_id}")
+        return replayed
+
+    async def _mark_active(self, db: AsyncSession, organization_id: int, user_id: int, day: date) -> None:
+        advanced = await self._advance_member(db, organization_id, user_id, day)
+        if advanced is None:
+            return
+        first, last = advanced
+
+        cells = [
+            {"organization_id": organization_id, "granularity": granularity,
+             "cohort_start": cohort_start(first, granularity), "period": period, "users": 1}
+            for granularity, period in self._new_periods(first, last, day)
+        ]
+        statement = dialect_insert(db, RetentionCohort).values(cells)
+        await db.execute(statement.on_conflict_do_update(
+            index_elements=["organization_id", "granularity", "cohort_start", "period"],
+            set_={"users": RetentionCohort.users + statement.excluded.users}
+        ))
+
+        index, rank = sketch.register(user_id)
+        statement = dialect_insert(db, ActivitySketch).values(
+            organization_id=organization_id, day=day, register=index, rank=rank
+        )
+        await db.execute(statement.on_conflict_do_update(
+            index_elements=["organization_id", "day", "register"],
+            set_={"rank": statement.excluded.rank},
+            where=ActivitySketch.rank < statement.excluded.rank
+        ))
+
+    @staticmethod
+    async def _advance_member(
+        db: AsyncSession, organization_id: int, user_id: int, day: date
+    ) -> Optional[Tuple[date, Optional[date]]]:
+        """Move a member's last active day to ``day``.
+
+        Returns their first active day and previous last active day (None
+        for a new member), or None when ``day`` was already counted.
+        """
+        result = await db.execute(
+            dialect_insert(db, ActivityMember)
+            .values(organization_id=organization_id, user_id=user_id, first_active_on=day, last_active_on=day)
+            .on_conflict_do_nothing(index_elements=["organization_id", "user_id"])
+        )
+        if result.rowcount:
+            return day, None
+
+        while True:
+            result = await db.execute(
+                select(ActivityMember.first_active_on, ActivityMember.last_active_on)
+                .where(and_(ActivityMember.organization_id == organization_id, ActivityMember.user_id == user_id))
+            )
+            first, last = result.one()
+            if day <= last:
+                return None
+
+            result = await db.execute(
+                update(ActivityMember)
+                .where(and_(
+                    ActivityMember.organization_id == organization_id,
+                    ActivityMember.user_id == user_id,
+                    ActivityMember.last_active_on == last
+                ))
+                .values(last_active_on=day)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                return first, last
+
+    @staticmethod
+    def _new_periods(first: date, last: Optional[date], day: date) -> List[Tuple[str, int]]:
+        """Cohort periods ``day`` is the user's first activity in."""
+        return [
+            (granularity, period_of(first, day, granularity))
+            for granularity in GRANULARITIES
+            if last is None or period_of(first, last, granularity) < period_of(first, day, granularity)
+        ]
+
+    @staticmethod
+    async def _sketches(
+        db: AsyncSession, start: date, end: date, organization_id: Optional[int]
+    ) -> Dict[date, Dict[int, int]]:
+        """Daily sketches over ``[start, end]``, merged across organizations when none is given."""
+        conditions = [ActivitySketch.day >= start, ActivitySketch.day <= end]
+        if organization_id is not None:
+            conditions.append(ActivitySketch.organization_id == organization_id)
+        result = await db.execute(
+            select(ActivitySketch.day, ActivitySketch.register, func.max(ActivitySketch.rank))
+            .where(and_(*conditions))
+            .group_by(ActivitySketch.day, ActivitySketch.register)
+        )
+
+        by_day: Dict[date, Dict[int, int]] = {}
+        for day, index, rank in result:
+            by_day.setdefault(day, {})[index] = rank
+        return by_day
+
+
+activity_log = ActivityLog()
@@ -0,0 +1,273 @@
+"""
+Admin dashboard aggregation.
+Builds the admin dashboard from a handful of queries run concurrently on
+separate sessions, and serves it from the cache, rebuilding it in the
+background once it gets old.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import and_, desc, func, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.database import get_async_session_maker
+from app.models.organization import Organization, OrganizationMember
+from app.models.project import Project
+from app.models.task import Task
+from app.models.user import User, UserStatus
+from app.services.activity_log import activity_log
+from app.services.performance_service import performance_monitor
+
+logger = logging.getLogger(__name__)
+
+CACHE_NAMESPACE = "admin"
+CACHE_KEY = "dashboard"
+
+# Window of the growth and user activity figures
+PERIOD_DAYS = 30
+RETENTION_DAYS = 7
+RECENT_ACTIVITY_LIMIT = 10
+TOP_ORGANIZATION_LIMIT = 10
+
+
+def count_where(*conditions):
+    """``count(*) FILTER (WHERE ...)`` over the given conditions."""
+    return func.count().filter(and_(*conditions))
+
+
+async def get_counts(db: AsyncSession, now: datetime) -> Dict[str, int]:
+    """Every count on the dashboard, in one statement.
+
+    Each table is aggregated once with filtered counts, and the one-row
+    aggregates are cross joined (explicitly, ``JOIN ... ON true``) into a
+    single row.
+    """
+    since = now - timedelta(days=PERIOD_DAYS)
+    active_user = User.status == UserStatus.ACTIVE
+
+    users = select(
+        count_where(active_user).label("total_users"),
+        count_where(active_user, User.created_at >= since).label("new_users"),
+    ).subquery()
+    organizations = select(
+        count_where(Organization.is_active == True).label("total_organizations"),
+        count_where(Organization.is_active == True, Organization.created_at >= since).label("new_organizations"),
+    ).subquery()
+    projects = select(
+        count_where(Project.is_active == True).label("total_projects"),
+        count_where(Project.is_active == True, Project.created_at >= since).label("new_projects"),
+        count_where(Organization.is_active == True).label("organization_projects"),
+    ).select_from(Project).join(Organization, Project.organization_id == Organization.id).subquery()
+    tasks = select(count_where(Task.is_active == True).label("total_tasks")).subquery()
+    members = select(
+        count_where(Organization.is_active == True).label("organization_members")
+    ).select_from(OrganizationMember).join(
+        Organization, OrganizationMember.organization_id == Organization.id
+    ).subquery()
+
+    result = await db.execute(
+        select(users, organizations, projects, tasks, members)
+        .select_from(users)
+        .join(organizations, true())
+        .join(projects, true())
+        .join(tasks, true())
+        .join(members, true())
+    )
+    return {key: value or 0 for key, value in result.mappings().one().items()}
+
+
+async def get_user_activity(db: AsyncSession, now: datetime) -> Dict[str, Any]:
+    """Active users overall and per day, and retention, from the activity log."""
+    start = (now - timedelta(days=PERIOD_DAYS)).date()
+    activity = await activity_log.active_users(db, start, now.date())
+    activity["retention_metrics"] = await activity_log.retention_summary(
+        db, start, (now - timedelta(days=RETENTION_DAYS)).date()
+    )
+    return activity
+
+
+async def get_top_organizations(db: AsyncSession) -> List[Dict[str, Any]]:
+    """Organizations with the most active tasks."""
+    task_count = func.count(Task.id).label("task_count")
+    result = await db.execute(
+        select(Organization.name, task_count)
+        .join(Project, Organization.id == Project.organization_id)
+        .join(Task, Project.id == Task.project_id)
+        .where(and_(Organization.is_active == True, Task.is_active == True))
+        .group_by(Organization.id, Organization.name)
+        .order_by(desc(task_count))
+        .limit(TOP_ORGANIZATION_LIMIT)
+    )
+    return [{"name": row[0], "task_count": row[1]} for row in result]
+
+
+async def get_recent_activities(db: AsyncSession) -> List[Dict[str, Any]]:
+    """Recently created tasks, standing in for a system activity feed."""
+    result = await db.execute(
+        select(Task.title, Task.created_at, User.first_name, User.last_name, Project.name)
+        .join(User, Task.created_by == User.id)
+        .join(Project, Task.project_id == Project.id)
+        .where(Task.is_active == True)
+        .order_by(desc(Task.created_at), desc(Task.id))
+        .limit(RECENT_ACTIVITY_LIMIT)
+    )
+    return [
+        {
+            "type": "task_created",
+            "description": f"Task '{title}' created in project '{project}'",
+            "user": f"{first_name} {last_name}",
+            "timestamp": created_at,
+            "icon": "plus-circle"
+        }
+        for title, created_at, first_name, last_name, project in result
+    ]
+
+
+def get_system_health_overview(now: datetime) -> Dict[str, Any]:
+    """Basic system health overview."""
+    # This would integrate with various health check systems
+    return {
+        "overall_status": "healthy",
+        "api_status": "operational",
+        "database_status": "healthy",
+        "cache_status": "operational",
+        "storage_status": "healthy",
+        "last_check": now
+    }
+
+
+def assemble_dashboard(
+    now: datetime,
+    counts: Dict[str, int],
+    user_activity: Dict[str, Any],
+    top_organizations: List[Dict[str, Any]],
+    recent_activities: List[Dict[str, Any]],
+    performance_summary: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Shape the section results into the admin dashboard."""
+    organizations = counts["total_organizations"]
+    active_users = user_activity["active_users"]
+
+    return {
+        "dashboard_timestamp": now,
+        "system_statistics": {
+            "total_users": counts["total_users"],
+            "total_organizations": organizations,
+            "total_projects": counts["total_projects"],
+            "total_tasks": counts["total_tasks"],
+            "last_updated": now
+        },
+        "user_metrics": {
+            "period_days": PERIOD_DAYS,
+            "active_users": active_users,
+            "new_registrations": counts["new_users"],
+            "daily_activity": user_activity["daily_activity"],
+            "retention_metrics": user_activity["retention_metrics"],
+            "growth_rate": round(counts["new_users"] / active_users * 100, 2) if active_users else 0.0,
+            "last_updated": now.isoformat()
+        },
+        "performance_summary": performance_summary,
+        "organization_metrics": {
+            "top_organizations_by_activity": top_organizations,
+            "average_projects_per_org": (
+                round(counts["organization_projects"] / organizations, 2) if organizations else 0
+            ),
+            "average_users_per_org": (
+                round(counts["organization_members"] / organizations, 2) if organizations else 0
+            )
+        },
+        "recent_activities": recent_activities,
+        "system_health": get_system_health_overview(now),
+        "growth_metrics": {
+            "new_users_30_days": counts["new_users"],
+            "new_organizations_30_days": counts["new_organizations"],
+            "new_projects_30_days": counts["new_projects"],
+            "growth_period": f"{PERIOD_DAYS} days"
+        }
+    }
+
+
+class AdminDashboardAggregator:
+    """Builds and caches the admin dashboard.
+
+    The independent sections run concurrently, each on a session of its own.
+    The assembled dashboard is cached for ``ADMIN_DASHBOARD_CACHE_TTL``
+    seconds; reads of a dashboard older than ``ADMIN_DASHBOARD_REFRESH_AFTER``
+    seconds return it as is and start one background rebuild.
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[int] = None,
+        refresh_after: Optional[int] = None,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+        namespace: str = CACHE_NAMESPACE,
+    ):
+        self.ttl = ttl or settings.ADMIN_DASHBOARD_CACHE_TTL
+        self.refresh_after = refresh_after if refresh_after is not None else settings.ADMIN_DASHBOARD_REFRESH_AFTER
+        self.session_factory = session_factory
+        self.namespace = namespace
+        self._rebuild: Optional[asyncio.Future] = None
+
+    async def get(self) -> Dict[str, Any]:
+        """The cached dashboard, building it if there is none."""
+        entry = cache.get(CACHE_KEY, namespace=self.namespace)
+        if entry is None:
+            return await self.refresh()
+
+        if time.time() - entry["built_at"] >= self.refresh_after:
+            self._start_rebuild()
+        return entry["dashboard"]
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Rebuild the dashboard, joining a rebuild already running."""
+        return await asyncio.shield(self._start_rebuild())
+
+    def _start_rebuild(self) -> asyncio.Future:
+        if self._rebuild is None or self._rebuild.done():
+            self._rebuild = asyncio.ensure_future(self._build_and_store())
+            self._rebuild.add_done_callback(self._rebuild_done)
+        return self._rebuild
+
+    @staticmethod
+    def _rebuild_done(future: asyncio.Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"Admin dashboard rebuild failed: {future.exception()}")
+
+    async def _build_and_store(self) -> Dict[str, Any]:
+        dashboard = await self.build()
+        cache.set(
+            CACHE_KEY, {"built_at": time.time(), "dashboard": dashboard},
+            ttl=self.ttl, namespace=self.namespace
+        )
+        return dashboard
+
+    async def build(self) -> Dict[str, Any]:
+        """Run every section concurrently and assemble the dashboard."""
+        now = datetime.utcnow()
+        counts, user_activity, top_organizations, recent_activities, performance_summary = (
+            await asyncio.gather(
+                self._run(get_counts, now),
+                self._run(get_user_activity, now),
+                self._run(get_top_organizations),
+                self._run(get_recent_activities),
+                performance_monitor.get_performance_summary(),
+            )
+        )
+        return assemble_dashboard(
+            now, counts, user_activity, top_organizations, recent_activities, performance_summary
+        )
+
+    async def _run(self, section: Callable[..., Awaitable[Any]], *args) -> Any:
+        if self.session_factory is None:
+            self.session_factory = get_async_session_maker()
+        async with self.session_factory() as session:
+            return await section(session, *args)
+
+
+admin_dashboard = AdminDashboardAggregator()
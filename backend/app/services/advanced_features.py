@@ -2,7 +2,7 @@
 Business logic services for advanced task features.
 Handles complex operations, analytics calculations, and workflow automation.
 """
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import List, Optional, Dict, Any, Tuple
 import json
 from collections import defaultdict
@@ -22,6 +22,7 @@ from app.schemas.advanced_features import (
     ProductivityMetrics, TeamPerformanceMetrics, ProjectHealthMetrics,
     AnalyticsDashboardData, TaskAnalyticsFilter
 )
+from app.services.time_rollups import empty_cell, time_rollups
 
 
 class TimeTrackingService:
@@ -35,35 +36,54 @@ class TimeTrackingService:
     ) -> Dict[str, Any]:
         """Get daily time tracking summary for a user."""
         
-        start_of_day = date.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_of_day = start_of_day + timedelta(days=1)
+        day = date.date()
+        matrix = await time_rollups.user_day_matrix(db, [user_id], day, day)
+        cell = matrix.get(user_id, {}).get(day, empty_cell())
         
-        query = select(
-            func.sum(TaskTimeLog.duration_minutes).label('total_minutes'),
-            func.sum(func.case((TaskTimeLog.is_billable == True, TaskTimeLog.duration_minutes), else_=0)).label('billable_minutes'),
-            func.count(TaskTimeLog.id).label('entries_count'),
-            func.count(func.distinct(TaskTimeLog.task_id)).label('tasks_count')
-        ).where(
-            and_(
-                TaskTimeLog.user_id == user_id,
-                TaskTimeLog.start_time >= start_of_day,
-                TaskTimeLog.start_time < end_of_day,
-                TaskTimeLog.is_active == True,
-                TaskTimeLog.end_time.isnot(None)
-            )
-        )
-        
-        result = await db.execute(query)
-        row = result.first()
+        return {
+            "date": day,
+            "total_minutes": cell["total_minutes"],
+            "total_hours": round(cell["total_minutes"] / 60, 2),
+            "billable_minutes": cell["billable_minutes"],
+            "billable_hours": round(cell["billable_minutes"] / 60, 2),
+            "entries_count": cell["entries_count"],
+            "tasks_count": cell["tasks_count"]
+        }
+    
+    @staticmethod
+    async def get_timesheet(
+        db: AsyncSession,
+        user_ids: List[int],
+        start_date: date,
+        end_date: date
+    ) -> Dict[str, Any]:
+        """Get a user by day timesheet for a team, read in one query."""
+        
+        matrix = await time_rollups.user_day_matrix(db, user_ids, start_date, end_date)
+        days = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+        
+        rows = []
+        for user_id in user_ids:
+            cells = [
+                {"day": day, **matrix.get(user_id, {}).get(day, empty_cell())}
+                for day in days
+            ]
+            rows.append({
+                "user_id": user_id,
+                "days": cells,
+                "total_minutes": sum(cell["total_minutes"] for cell in cells),
+                "billable_minutes": sum(cell["billable_minutes"] for cell in cells)
+            })
         
         return {
-            "date": date.date(),
-            "total_minutes": row.total_minutes or 0,
-            "total_hours": round((row.total_minutes or 0) / 60, 2),
-            "billable_minutes": row.billable_minutes or 0,
-            "billable_hours": round((row.billable_minutes or 0) / 60, 2),
-            "entries_count": row.entries_count or 0,
-            "tasks_count": row.tasks_count or 0
+            "start_date": start_date,
+            "end_date": end_date,
+            "days": days,
+            "users": rows,
+            "daily_totals": [
+                sum(row["days"][index]["total_minutes"] for row in rows)
+                for index in range(len(days))
+            ]
         }
     
     @staticmethod
@@ -73,48 +93,20 @@ class TimeTrackingService:
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None
     ) -> List[Dict[str, Any]]:
-        """Get time breakdown by user for a project."""
+        """Get time breakdown by user for a project, over whole days."""
         
-        query = select(
-            TaskTimeLog.user_id,
-            User.full_name,
-            func.sum(TaskTimeLog.duration_minutes).label('total_minutes'),
-            func.sum(func.case((TaskTimeLog.is_billable == True, TaskTimeLog.duration_minutes), else_=0)).label('billable_minutes'),
-            func.count(TaskTimeLog.id).label('entries_count')
-        ).select_from(
-            TaskTimeLog
-        ).join(
-            Task, TaskTimeLog.task_id == Task.id
-        ).join(
-            User, TaskTimeLog.user_id == User.id
-        ).where(
-            and_(
-                Task.project_id == project_id,
-                TaskTimeLog.is_active == True,
-                TaskTimeLog.end_time.isnot(None)
-            )
+        rows = await time_rollups.project_breakdown(
+            db,
+            project_id,
+            start_date.date() if start_date else None,
+            end_date.date() if end_date else None
         )
         
-        if start_date:
-            query = query.where(TaskTimeLog.start_time >= start_date)
-        if end_date:
-            query = query.where(TaskTimeLog.start_time <= end_date)
-        
-        query = query.group_by(TaskTimeLog.user_id, User.full_name)
-        query = query.order_by(desc('total_minutes'))
-        
-        result = await db.execute(query)
-        rows = result.all()
-        
         return [
             {
-                "user_id": row.user_id,
-                "user_name": row.full_name,
-                "total_minutes": row.total_minutes,
-                "total_hours": round(row.total_minutes / 60, 2),
-                "billable_minutes": row.billable_minutes,
-                "billable_hours": round(row.billable_minutes / 60, 2),
-                "entries_count": row.entries_count
+                **row,
+                "total_hours": round(row["total_minutes"] / 60, 2),
+                "billable_hours": round(row["billable_minutes"] / 60, 2)
             }
             for row in rows
         ]
@@ -131,20 +123,8 @@ class TimeTrackingService:
         start_date = end_date - timedelta(days=days)
         
         # Get time tracking data
-        time_query = select(
-            func.sum(TaskTimeLog.duration_minutes).label('total_minutes'),
-            func.count(TaskTimeLog.id).label('entries_count')
-        ).where(
-            and_(
-                TaskTimeLog.user_id == user_id,
-                TaskTimeLog.start_time >= start_date,
-                TaskTimeLog.is_active == True,
-                TaskTimeLog.end_time.isnot(None)
-            )
-        )
-        
-        time_result = await db.execute(time_query)
-        time_row = time_result.first()
+        matrix = await time_rollups.user_day_matrix(db, [user_id], start_date.date(), end_date.date())
+        total_minutes = sum(cell["total_minutes"] for cell in matrix.get(user_id, {}).values())
         
         # Get task completion data
         task_query = select(
@@ -165,7 +145,7 @@ class TimeTrackingService:
         task_row = task_result.first()
         
         # Calculate productivity components
-        time_logged_hours = (time_row.total_minutes or 0) / 60
+        time_logged_hours = total_minutes / 60
         completion_rate = (
             (task_row.completed_tasks or 0) / (task_row.total_tasks or 1)
         ) * 100
@@ -3,29 +3,57 @@ Advanced analytics service for TeamFlow.
 Provides comprehensive business intelligence and reporting capabilities.
 """
 import json
+import uuid
 import asyncio
+import statistics
+from array import array
 from datetime import datetime, date, timedelta
 from typing import List, Dict, Any, Optional, Tuple, Union
-from sqlalchemy import and_, or_, text, func, desc, asc, between
+from sqlalchemy import and_, or_, text, func, desc, asc, between, select
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
 from app.models.analytics import (
     ReportTemplate, Report, ReportExport, ReportSchedule,
     Dashboard, DashboardWidget, AnalyticsMetric, ReportAlert,
-    ReportType, ReportFormat, ChartType, MetricType
+    ReportType, ReportFormat, ReportJobStatus, ChartType, MetricType
 )
 from app.models.task import Task, TaskStatus, TaskPriority
+from app.models.organization import OrganizationMember
 from app.models.project import Project, ProjectStatus
 from app.models.user import User, UserStatus
 from app.models.time_tracking import TaskTimeLog
 from app.schemas.analytics import (
     ReportGenerationRequest, ReportResponse, DashboardRequest,
     DashboardWidgetRequest, AnalyticsMetricRequest, MetricsQueryRequest,
-    DateRangeRequest
+    DateRangeRequest, ReportExportRequest
 )
 from app.schemas.user import UserRead
+from app.services.analytics_batch import MetricFrame, MetricRequest, evaluate_metrics
+from app.services.analytics_columns import (
+    Columns, chart, daily_series, group_count, group_sum, histogram_chart, mean, percentiles,
+    present, where
+)
+from app.services.analytics_rollups import STATUS_COUNTERS, analytics_rollups, period_bounds
+from app.services.dashboard_queries import widget_query_engine
+from app.services.report_exports import export_filename, report_exporter
+from app.services.report_queue import ReportJobQueue
+
+
+# Histogram bucket edges for report charts
+ENTRY_DURATION_EDGES = (15, 30, 60, 120, 240, 480)  # minutes
+COMPLETION_TIME_EDGES = (1, 4, 24, 72, 168, 336, 720)  # hours
+
+
+def _dispersion(values: List[float]) -> Tuple[float, float, float]:
+    """Mean, population standard deviation and coefficient of variation (%) of a sample."""
+    if not values:
+        return 0.0, 0.0, 0.0
+    mean = statistics.fmean(values)
+    std_dev = statistics.pstdev(values, mu=mean)
+    return mean, std_dev, (std_dev / mean * 100) if mean else 0.0
 
 
 class AnalyticsCalculatorService:
@@ -73,37 +101,52 @@ class AnalyticsCalculatorService:
                 "is_estimated": True
             }
     
+    async def calculate_metrics(
+        self,
+        requests: List[MetricRequest],
+        organization_id: int,
+        period_start: date,
+        period_end: date,
+        db: AsyncSession
+    ) -> MetricFrame:
+        """Calculate many (metric, entity) pairs with one grouped query per scope type."""
+        return await evaluate_metrics(db, organization_id, period_start, period_end, requests)
+    
+    @staticmethod
+    def _rollup_scope(
+        organization_id: int, entity_type: Optional[str], entity_id: Optional[int]
+    ) -> Tuple[str, int]:
+        """Map a metric's entity filter to a rollup scope."""
+        if entity_type in ("project", "user") and entity_id:
+            return entity_type, entity_id
+        return "organization", organization_id
+    
     async def _calculate_task_completion_rate(
         self, organization_id: int, period_start: date, period_end: date,
-        entity_type: Optional[str], entity_id: Optional[int], db: Session
+        entity_type: Optional[str], entity_id: Optional[int], db: AsyncSession
     ) -> Dict[str, Any]:
         """Calculate task completion rate for the period."""
         
-        # Base query for tasks in the period
-        query = db.query(Task).filter(
-            Task.organization_id == organization_id,
-            Task.created_at >= period_start,
-            Task.created_at <= period_end
+        # Tasks created and completed in the period, from the rollups
+        scope_type, scope_id = self._rollup_scope(organization_id, entity_type, entity_id)
+        start, end = period_bounds(period_start, period_end)
+        totals = await analytics_rollups.totals(
+            db, organization_id, start, end, scope_type, scope_id,
+            counters=("tasks_created", "tasks_completed")
         )
         
-        # Apply entity filter if specified
-        if entity_type == "project" and entity_id:
-            query = query.filter(Task.project_id == entity_id)
-        elif entity_type == "user" and entity_id:
-            query = query.filter(Task.assigned_to == entity_id)
-        
-        total_tasks = query.count()
+        total_tasks = totals["tasks_created"]
         if total_tasks == 0:
             return {"value": 0.0, "unit": "percentage", "confidence_score": 0.0}
         
-        completed_tasks = query.filter(Task.status == TaskStatus.COMPLETED).count()
+        completed_tasks = totals["tasks_completed"]
         completion_rate = (completed_tasks / total_tasks) * 100
         
         return {
             "value": completion_rate,
             "unit": "percentage",
             "confidence_score": 1.0,
-            "calculation_method": f"Completed tasks ({completed_tasks}) / Total tasks ({total_tasks}) * 100",
+            "calculation_method": f"Completed tasks ({completed_tasks}) / Created tasks ({total_tasks}) * 100",
             "source_data": {
                 "total_tasks": total_tasks,
                 "completed_tasks": completed_tasks
@@ -112,31 +155,27 @@ class AnalyticsCalculatorService:
     
     async def _calculate_project_progress(
         self, organization_id: int, period_start: date, period_end: date,
-        entity_type: Optional[str], entity_id: Optional[int], db: Session
+        entity_type: Optional[str], entity_id: Optional[int], db: AsyncSession
     ) -> Dict[str, Any]:
         """Calculate overall project progress."""
         
-        # Query projects in the organization
-        query = db.query(Project).filter(
-            Project.organization_id == organization_id
+        # Current active tasks per status for each project, from the rollups
+        scope_ids = [entity_id] if entity_type == "project" and entity_id else None
+        projects = await analytics_rollups.totals_by_scope(
+            db, organization_id, "project", None, None, scope_ids,
+            counters=list(STATUS_COUNTERS.values())
         )
-        
-        if entity_type == "project" and entity_id:
-            query = query.filter(Project.id == entity_id)
-        
-        projects = query.all()
         if not projects:
             return {"value": 0.0, "unit": "percentage", "confidence_score": 0.0}
         
         total_progress = 0.0
         valid_projects = 0
         
-        for project in projects:
+        for counts in projects.values():
             # Calculate progress based on completed tasks
-            total_tasks = len(project.tasks) if project.tasks else 0
+            total_tasks = sum(counts.values())
             if total_tasks > 0:
-                completed_tasks = sum(1 for task in project.tasks if task.status == TaskStatus.COMPLETED)
-                project_progress = (completed_tasks / total_tasks) * 100
+                project_progress = (counts["tasks_done"] / total_tasks) * 100
                 total_progress += project_progress
                 valid_projects += 1
         
@@ -159,30 +198,21 @@ class AnalyticsCalculatorService:
     
     async def _calculate_user_productivity(
         self, organization_id: int, period_start: date, period_end: date,
-        entity_type: Optional[str], entity_id: Optional[int], db: Session
+        entity_type: Optional[str], entity_id: Optional[int], db: AsyncSession
     ) -> Dict[str, Any]:
         """Calculate user productivity metrics."""
         
-        # Query time logs for the period
-        query = db.query(TaskTimeLog).filter(
-            TaskTimeLog.organization_id == organization_id,
-            TaskTimeLog.logged_date >= period_start,
-            TaskTimeLog.logged_date <= period_end
+        # Daily logged time for the period, from the rollups
+        scope_type, scope_id = self._rollup_scope(organization_id, entity_type, entity_id)
+        start, end = period_bounds(period_start, period_end)
+        days = await analytics_rollups.daily_series(
+            db, organization_id, start, end, scope_type, scope_id,
+            counters=("minutes_logged", "time_entries")
         )
         
-        if entity_type == "user" and entity_id:
-            query = query.filter(TaskTimeLog.user_id == entity_id)
-        elif entity_type == "project" and entity_id:
-            query = query.join(Task).filter(Task.project_id == entity_id)
-        
-        time_logs = query.all()
-        if not time_logs:
-            return {"value": 0.0, "unit": "hours_per_day", "confidence_score": 0.0}
-        
         # Calculate total hours and working days
-        total_hours = sum(float(log.hours_logged) for log in time_logs if log.hours_logged)
-        unique_dates = set(log.logged_date for log in time_logs)
-        working_days = len(unique_dates)
+        total_hours = sum(counts["minutes_logged"] for _, counts in days) / 60
+        working_days = sum(1 for _, counts in days if counts["minutes_logged"] > 0)
         
         if working_days == 0:
             return {"value": 0.0, "unit": "hours_per_day", "confidence_score": 0.0}
@@ -197,47 +227,51 @@ class AnalyticsCalculatorService:
             "source_data": {
                 "total_hours": total_hours,
                 "working_days": working_days,
-                "total_logs": len(time_logs)
+                "total_logs": sum(counts["time_entries"] for _, counts in days)
             }
         }
     
     async def _calculate_time_utilization(
         self, organization_id: int, period_start: date, period_end: date,
-        entity_type: Optional[str], entity_id: Optional[int], db: Session
+        entity_type: Optional[str], entity_id: Optional[int], db: AsyncSession
     ) -> Dict[str, Any]:
         """Calculate time utilization efficiency."""
         
-        # Get estimated vs actual time for completed tasks
-        query = db.query(Task).filter(
-            Task.organization_id == organization_id,
-            Task.status == TaskStatus.COMPLETED,
-            Task.completed_at >= period_start,
-            Task.completed_at <= period_end,
-            Task.estimated_hours.isnot(None)
+        # Estimated vs logged time for tasks completed in the period
+        start, end = period_bounds(period_start, period_end)
+        logged = (
+            select(TaskTimeLog.task_id, func.sum(TaskTimeLog.duration_minutes).label("minutes"))
+            .where(TaskTimeLog.is_active == True)
+            .group_by(TaskTimeLog.task_id)
+            .subquery()
         )
-        
+        task_filters = [
+            Project.organization_id == organization_id,
+            Task.is_active == True,
+            Task.status == TaskStatus.DONE,
+            Task.updated_at >= start,
+            Task.updated_at < end,
+            Task.estimated_hours > 0,
+            logged.c.minutes > 0
+        ]
         if entity_type == "project" and entity_id:
-            query = query.filter(Task.project_id == entity_id)
+            task_filters.append(Task.project_id == entity_id)
         elif entity_type == "user" and entity_id:
-            query = query.filter(Task.assigned_to == entity_id)
-        
-        tasks = query.all()
-        if not tasks:
-            return {"value": 0.0, "unit": "percentage", "confidence_score": 0.0}
+            task_filters.append(Task.assignee_id == entity_id)
         
-        total_estimated = 0.0
-        total_actual = 0.0
-        valid_tasks = 0
-        
-        for task in tasks:
-            if task.estimated_hours and task.time_logs:
-                estimated = float(task.estimated_hours)
-                actual = sum(float(log.hours_logged) for log in task.time_logs if log.hours_logged)
-                
-                if estimated > 0 and actual > 0:
-                    total_estimated += estimated
-                    total_actual += actual
-                    valid_tasks += 1
+        result = await db.execute(
+            select(
+                func.count(Task.id),
+                func.coalesce(func.sum(Task.estimated_hours), 0),
+                func.coalesce(func.sum(logged.c.minutes), 0)
+            )
+            .join(Project, Project.id == Task.project_id)
+            .join(logged, logged.c.task_id == Task.id)
+            .where(and_(*task_filters))
+        )
+        valid_tasks, total_estimated, logged_minutes = result.one()
+        total_estimated = float(total_estimated)
+        total_actual = logged_minutes / 60
         
         if total_estimated == 0 or valid_tasks == 0:
             return {"value": 0.0, "unit": "percentage", "confidence_score": 0.0}
@@ -260,81 +294,84 @@ class AnalyticsCalculatorService:
     
     async def _calculate_deadline_adherence(
         self, organization_id: int, period_start: date, period_end: date,
-        entity_type: Optional[str], entity_id: Optional[int], db: Session
+        entity_type: Optional[str], entity_id: Optional[int], db: AsyncSession
     ) -> Dict[str, Any]:
         """Calculate deadline adherence rate."""
         
-        query = db.query(Task).filter(
-            Task.organization_id == organization_id,
-            Task.status == TaskStatus.COMPLETED,
-            Task.completed_at >= period_start,
-            Task.completed_at <= period_end,
-            Task.due_date.isnot(None)
+        # Completions with a due date in the period, from the rollups
+        scope_type, scope_id = self._rollup_scope(organization_id, entity_type, entity_id)
+        start, end = period_bounds(period_start, period_end)
+        totals = await analytics_rollups.totals(
+            db, organization_id, start, end, scope_type, scope_id,
+            counters=("completed_on_time", "completed_late")
         )
         
-        if entity_type == "project" and entity_id:
-            query = query.filter(Task.project_id == entity_id)
-        elif entity_type == "user" and entity_id:
-            query = query.filter(Task.assigned_to == entity_id)
-        
-        tasks = query.all()
-        if not tasks:
+        on_time_tasks = totals["completed_on_time"]
+        total_tasks = on_time_tasks + totals["completed_late"]
+        if total_tasks == 0:
             return {"value": 0.0, "unit": "percentage", "confidence_score": 0.0}
         
-        on_time_tasks = sum(1 for task in tasks if task.completed_at.date() <= task.due_date)
-        adherence_rate = (on_time_tasks / len(tasks)) * 100
+        adherence_rate = (on_time_tasks / total_tasks) * 100
         
         return {
             "value": adherence_rate,
             "unit": "percentage",
             "confidence_score": 1.0,
-            "calculation_method": f"On-time tasks ({on_time_tasks}) / Total tasks ({len(tasks)}) * 100",
+            "calculation_method": f"On-time tasks ({on_time_tasks}) / Total tasks ({total_tasks}) * 100",
             "source_data": {
-                "total_tasks": len(tasks),
+                "total_tasks": total_tasks,
                 "on_time_tasks": on_time_tasks,
-                "late_tasks": len(tasks) - on_time_tasks
+                "late_tasks": total_tasks - on_time_tasks
             }
         }
     
     async def _calculate_workload_distribution(
         self, organization_id: int, period_start: date, period_end: date,
-        entity_type: Optional[str], entity_id: Optional[int], db: Session
+        entity_type: Optional[str], entity_id: Optional[int], db: AsyncSession
     ) -> Dict[str, Any]:
         """Calculate workload distribution balance."""
         
-        # Get active users in the organization
-        users = db.query(User).filter(
-            User.organization_id == organization_id,
-            User.status == UserStatus.ACTIVE
-        ).all()
+        # Tasks assigned per user, created in the period
+        start, end = period_bounds(period_start, period_end)
+        task_filters = [
+            Project.organization_id == organization_id,
+            Task.is_active == True,
+            Task.created_at >= start,
+            Task.created_at < end
+        ]
+        if entity_type == "project" and entity_id:
+            task_filters.append(Task.project_id == entity_id)
+        
+        task_counts = (
+            select(Task.assignee_id, func.count(Task.id).label("task_count"))
+            .join(Project, Project.id == Task.project_id)
+            .where(and_(*task_filters))
+            .group_by(Task.assignee_id)
+            .subquery()
+        )
+        
+        # One row per active member, including members without tasks
+        result = await db.execute(
+            select(OrganizationMember.user_id, func.coalesce(task_counts.c.task_count, 0))
+            .join(User, User.id == OrganizationMember.user_id)
+            .outerjoin(task_counts, task_counts.c.assignee_id == OrganizationMember.user_id)
+            .where(and_(
+                OrganizationMember.organization_id == organization_id,
+                User.status == UserStatus.ACTIVE
+            ))
+            .order_by(OrganizationMember.user_id)
+        )
+        user_task_counts = [count for _, count in result.all()]
         
-        if not users:
+        if not user_task_counts:
             return {"value": 0.0, "unit": "balance_score", "confidence_score": 0.0}
         
-        # Calculate task count per user
-        user_task_counts = []
-        for user in users:
-            task_count = db.query(Task).filter(
-                Task.assigned_to == user.id,
-                Task.created_at >= period_start,
-                Task.created_at <= period_end
-            ).count()
-            user_task_counts.append(task_count)
-        
-        if not user_task_counts or sum(user_task_counts) == 0:
+        if sum(user_task_counts) == 0:
             return {"value": 100.0, "unit": "balance_score", "confidence_score": 0.0}
         
-        # Calculate standard deviation to measure distribution
-        mean_tasks = sum(user_task_counts) / len(user_task_counts)
-        variance = sum((x - mean_tasks) ** 2 for x in user_task_counts) / len(user_task_counts)
-        std_dev = variance ** 0.5
-        
         # Convert to balance score (100 = perfect balance, lower = more imbalanced)
-        if mean_tasks == 0:
-            balance_score = 100.0
-        else:
-            coefficient_variation = (std_dev / mean_tasks) * 100
-            balance_score = max(0, 100 - coefficient_variation)
+        mean_tasks, std_dev, coefficient_variation = _dispersion(user_task_counts)
+        balance_score = max(0, 100 - coefficient_variation)
         
         return {
             "value": balance_score,
@@ -342,7 +379,7 @@ class AnalyticsCalculatorService:
             "confidence_score": 1.0,
             "calculation_method": f"100 - (std_dev / mean * 100), std_dev: {std_dev:.2f}, mean: {mean_tasks:.2f}",
             "source_data": {
-                "user_count": len(users),
+                "user_count": len(user_task_counts),
                 "task_counts": user_task_counts,
                 "mean_tasks": mean_tasks,
                 "std_deviation": std_dev
@@ -351,37 +388,51 @@ class AnalyticsCalculatorService:
     
     async def _calculate_team_velocity(
         self, organization_id: int, period_start: date, period_end: date,
-        entity_type: Optional[str], entity_id: Optional[int], db: Session
+        entity_type: Optional[str], entity_id: Optional[int], db: AsyncSession
     ) -> Dict[str, Any]:
         """Calculate team velocity (tasks completed per time period)."""
         
-        query = db.query(Task).filter(
-            Task.organization_id == organization_id,
-            Task.status == TaskStatus.COMPLETED,
-            Task.completed_at >= period_start,
-            Task.completed_at <= period_end
+        scope_type, scope_id = self._rollup_scope(organization_id, entity_type, entity_id)
+        start, end = period_bounds(period_start, period_end)
+        totals = await analytics_rollups.totals(
+            db, organization_id, start, end, scope_type, scope_id, counters=("tasks_completed",)
         )
         
-        if entity_type == "project" and entity_id:
-            query = query.filter(Task.project_id == entity_id)
-        
-        completed_tasks = query.count()
+        completed_tasks = totals["tasks_completed"]
         period_days = (period_end - period_start).days + 1
         
         if period_days == 0:
             return {"value": 0.0, "unit": "tasks_per_day", "confidence_score": 0.0}
         
         velocity = completed_tasks / period_days
+        source_data = {
+            "completed_tasks": completed_tasks,
+            "period_days": period_days
+        }
+        
+        # Organization-wide: how evenly completions spread across assignees
+        if scope_type == "organization":
+            by_user = await analytics_rollups.totals_by_scope(
+                db, organization_id, "user", start, end, counters=("tasks_completed",)
+            )
+            user_velocities = [
+                counts["tasks_completed"] / period_days
+                for counts in by_user.values() if counts["tasks_completed"]
+            ]
+            mean_velocity, std_dev, coefficient_variation = _dispersion(user_velocities)
+            source_data.update({
+                "contributors": len(user_velocities),
+                "mean_user_velocity": mean_velocity,
+                "user_velocity_std_deviation": std_dev,
+                "user_velocity_variation": coefficient_variation
+            })
         
         return {
             "value": velocity,
             "unit": "tasks_per_day",
             "confidence_score": 1.0,
             "calculation_method": f"Completed tasks ({completed_tasks}) / Period days ({period_days})",
-            "source_data": {
-                "completed_tasks": completed_tasks,
-                "period_days": period_days
-            }
+            "source_data": source_data
         }
     
     async def _calculate_bug_resolution_time(
@@ -433,36 +484,39 @@ class AnalyticsCalculatorService:
     
     async def _calculate_resource_allocation(
         self, organization_id: int, period_start: date, period_end: date,
-        entity_type: Optional[str], entity_id: Optional[int], db: Session
+        entity_type: Optional[str], entity_id: Optional[int], db: AsyncSession
     ) -> Dict[str, Any]:
         """Calculate resource allocation efficiency."""
         
-        # Get time logged vs available time
-        time_logs = db.query(TaskTimeLog).filter(
-            TaskTimeLog.organization_id == organization_id,
-            TaskTimeLog.logged_date >= period_start,
-            TaskTimeLog.logged_date <= period_end
-        ).all()
+        # Minutes logged per user in the period, from the rollups
+        start, end = period_bounds(period_start, period_end)
+        scope_ids = [entity_id] if entity_type == "user" and entity_id else None
+        by_user = await analytics_rollups.totals_by_scope(
+            db, organization_id, "user", start, end, scope_ids, counters=("minutes_logged",)
+        )
+        user_hours = [
+            counts["minutes_logged"] / 60 for counts in by_user.values() if counts["minutes_logged"]
+        ]
         
-        if not time_logs:
+        if not user_hours:
             return {"value": 0.0, "unit": "percentage", "confidence_score": 0.0}
         
         # Calculate total hours logged
-        total_logged_hours = sum(float(log.hours_logged) for log in time_logs if log.hours_logged)
+        total_logged_hours = sum(user_hours)
         
-        # Get unique users and calculate available time
-        unique_users = set(log.user_id for log in time_logs)
+        # Calculate available time for the users who logged time
         period_days = (period_end - period_start).days + 1
         working_days = period_days * 5 / 7  # Assume 5-day work week
         
         # Assume 8 hours per working day per user
-        total_available_hours = len(unique_users) * working_days * 8
+        total_available_hours = len(user_hours) * working_days * 8
         
         if total_available_hours == 0:
             return {"value": 0.0, "unit": "percentage", "confidence_score": 0.0}
         
         allocation_rate = (total_logged_hours / total_available_hours) * 100
         allocation_rate = min(allocation_rate, 100)  # Cap at 100%
+        mean_hours, std_dev, coefficient_variation = _dispersion(user_hours)
         
         return {
             "value": allocation_rate,
@@ -472,8 +526,11 @@ class AnalyticsCalculatorService:
             "source_data": {
                 "total_logged_hours": total_logged_hours,
                 "total_available_hours": total_available_hours,
-                "unique_users": len(unique_users),
-                "working_days": working_days
+                "unique_users": len(user_hours),
+                "working_days": working_days,
+                "mean_user_hours": mean_hours,
+                "user_hours_std_deviation": std_dev,
+                "user_hours_variation": coefficient_variation
             }
         }
     
@@ -540,99 +597,170 @@ class ReportGenerationService:
         template: ReportTemplate,
         request: ReportGenerationRequest,
         user: UserRead,
-        db: Session
+        db: AsyncSession
     ) -> Report:
-        """Generate a report based on the template and request."""
+        """Queue a report for background generation and return its record."""
+        
+        report = Report(
+            name=request.name or f"{template.name} - {datetime.utcnow().strftime('%Y-%m-%d %H:%M')}",
+            description=request.description,
+            data={},
+            generation_metadata={
+                "template_type": ReportType(template.report_type).value,
+                "filters_count": len(request.filters),
+                "includes_raw_data": request.include_raw_data,
+                "request": request.model_dump(mode="json")
+            },
+            filters_applied={
+                "date_range": {
+                    "start": request.date_range.start_date.isoformat(),
+                    "end": request.date_range.end_date.isoformat()
+                },
+                "additional_filters": [filter.model_dump(mode="json") for filter in request.filters]
+            },
+            template_id=template.id,
+            organization_id=template.organization_id,
+            generated_by=user.id,
+            data_start_date=request.date_range.start_date,
+            data_end_date=request.date_range.end_date,
+            status=ReportJobStatus.QUEUED,
+            progress=0
+        )
         
-        start_time = datetime.utcnow()
+        db.add(report)
+        await db.commit()
+        await db.refresh(report)
+        
+        report_job_queue.notify()
+        return report
+    
+    async def run_generation(self, db: AsyncSession, report_id: int) -> None:
+        """Generate the data of a queued report, recording progress on the report row."""
+        
+        report = await db.get(Report, report_id)
+        template = await db.get(ReportTemplate, report.template_id)
+        started_at = datetime.utcnow()
+        
+        report.status = ReportJobStatus.RUNNING
+        report.started_at = started_at
+        report.progress = 10
+        report.error_message = None
+        await db.commit()
         
         try:
-            # Get the appropriate report generator
-            generator = self.report_generators.get(template.report_type)
+            generator = self.report_generators.get(ReportType(template.report_type))
             if not generator:
                 raise ValueError(f"No generator available for report type: {template.report_type}")
             
-            # Generate report data
-            report_data = await generator(
-                template, request, user.organization_id, db
-            )
+            request = ReportGenerationRequest(**report.generation_metadata["request"])
+            report_data = await generator(template, request, report.organization_id, db)
             
-            # Calculate generation time
-            generation_time = (datetime.utcnow() - start_time).total_seconds() * 1000
+            # Size of the stored JSON, measured without building the whole string
+            encoder = json.JSONEncoder(default=str)
+            size = sum(len(chunk.encode("utf-8")) for chunk in encoder.iterencode(report_data))
             
-            # Create report record
-            report = Report(
-                name=request.name or f"{template.name} - {datetime.utcnow().strftime('%Y-%m-%d %H:%M')}",
-                description=request.description,
-                data=report_data,
-                metadata={
-                    "template_type": template.report_type,
-                    "generation_timestamp": start_time.isoformat(),
-                    "filters_count": len(request.filters),
-                    "includes_raw_data": request.include_raw_data
-                },
-                filters_applied={
-                    "date_range": {
-                        "start": request.date_range.start_date.isoformat(),
-                        "end": request.date_range.end_date.isoformat()
-                    },
-                    "additional_filters": [filter.dict() for filter in request.filters]
-                },
-                template_id=template.id,
-                organization_id=user.organization_id,
-                generated_by=user.id,
-                data_start_date=request.date_range.start_date,
-                data_end_date=request.date_range.end_date,
-                generation_duration_ms=int(generation_time),
-                data_points_count=report_data.get("summary", {}).get("total_data_points", 0),
-                file_size_bytes=len(json.dumps(report_data).encode('utf-8'))
-            )
-            
-            db.add(report)
-            db.commit()
-            db.refresh(report)
+            completed_at = datetime.utcnow()
+            report.data = report_data
+            report.data_points_count = report_data.get("summary", {}).get("total_data_points", 0)
+            report.file_size_bytes = size
+            report.generation_duration_ms = int((completed_at - started_at).total_seconds() * 1000)
+            report.status = ReportJobStatus.COMPLETED
+            report.progress = 100
+            report.completed_at = completed_at
+            report.locked_by = None
+            report.locked_until = None
             
             # Update template usage
-            template.usage_count += 1
-            template.last_used_at = datetime.utcnow()
-            db.commit()
-            
-            return report
+            template.usage_count = (template.usage_count or 0) + 1
+            template.last_used_at = completed_at
+            await db.commit()
             
         except Exception as e:
-            db.rollback()
-            raise Exception(f"Report generation failed: {str(e)}")
+            await db.rollback()
+            report = await db.get(Report, report_id)
+            report.status = ReportJobStatus.FAILED
+            report.error_message = f"Report generation failed: {str(e)}"
+            report.completed_at = datetime.utcnow()
+            report.locked_by = None
+            report.locked_until = None
+            await db.commit()
+    
+    async def request_export(
+        self,
+        db: AsyncSession,
+        report: Report,
+        user_id: int,
+        export_request: ReportExportRequest
+    ) -> ReportExport:
+        """Queue an export of a generated report."""
+        
+        export_format = ReportFormat(export_request.format)
+        template = await db.get(ReportTemplate, report.template_id)
+        if not report_exporter.supports(template.report_type, export_format):
+            raise ValueError(
+                f"{export_format.value} export is not available for {ReportType(template.report_type).value} reports"
+            )
+        
+        export = ReportExport(
+            export_uuid=str(uuid.uuid4()),
+            report_id=report.id,
+            format=export_format,
+            filename="",
+            export_settings=export_request.settings,
+            organization_id=report.organization_id,
+            exported_by=user_id,
+            expires_at=datetime.utcnow() + timedelta(hours=export_request.expires_in_hours or 24),
+            status=ReportJobStatus.QUEUED,
+            progress=0
+        )
+        export.filename = export_filename(report, export)
+        
+        db.add(export)
+        await db.commit()
+        await db.refresh(export)
+        
+        report_job_queue.notify()
+        return export
     
     async def _generate_project_overview(
         self, template: ReportTemplate, request: ReportGenerationRequest, 
-        organization_id: int, db: Session
+        organization_id: int, db: AsyncSession
     ) -> Dict[str, Any]:
         """Generate project overview report."""
         
         # Get projects in date range
-        projects = db.query(Project).filter(
-            Project.organization_id == organization_id,
-            Project.created_at >= request.date_range.start_date,
-            Project.created_at <= request.date_range.end_date
-        ).all()
+        start, end = period_bounds(request.date_range.start_date, request.date_range.end_date)
+        result = await db.execute(
+            select(Project).where(and_(
+                Project.organization_id == organization_id,
+                Project.created_at >= start,
+                Project.created_at < end
+            ))
+        )
+        projects = result.scalars().all()
+        
+        # Calculate metrics for all projects at once
+        metrics = await self.calculator_service.calculate_metrics(
+            [
+                MetricRequest(metric, "project", project.id)
+                for project in projects
+                for metric in ("project_progress", "task_count", "completed_tasks")
+            ],
+            organization_id, request.date_range.start_date, request.date_range.end_date, db
+        )
+        progress = metrics.column("project_progress", "project")
+        task_counts = metrics.column("task_count", "project")
+        completed_tasks = metrics.column("completed_tasks", "project")
         
-        # Calculate metrics for each project
         project_data = []
         for project in projects:
-            # Get project metrics
-            progress_metric = await self.calculator_service.calculate_metric(
-                "project_progress", organization_id, 
-                request.date_range.start_date, request.date_range.end_date,
-                "project", project.id, db
-            )
-            
             project_info = {
                 "id": project.id,
                 "name": project.name,
                 "status": project.status,
-                "progress": progress_metric.get("value", 0),
-                "task_count": len(project.tasks) if project.tasks else 0,
-                "completed_tasks": sum(1 for task in (project.tasks or []) if task.status == TaskStatus.COMPLETED),
+                "progress": progress.get(project.id, 0),
+                "task_count": int(task_counts.get(project.id, 0)),
+                "completed_tasks": int(completed_tasks.get(project.id, 0)),
                 "start_date": project.start_date.isoformat() if project.start_date else None,
                 "end_date": project.end_date.isoformat() if project.end_date else None,
                 "created_at": project.created_at.isoformat()
@@ -680,57 +808,81 @@ class ReportGenerationService:
     
     async def _generate_task_analytics(
         self, template: ReportTemplate, request: ReportGenerationRequest,
-        organization_id: int, db: Session
+        organization_id: int, db: AsyncSession
     ) -> Dict[str, Any]:
         """Generate task analytics report."""
         
-        # Get tasks in date range
-        tasks = db.query(Task).filter(
-            Task.organization_id == organization_id,
-            Task.created_at >= request.date_range.start_date,
-            Task.created_at <= request.date_range.end_date
-        ).all()
-        
-        # Calculate task metrics
-        completion_rate = await self.calculator_service.calculate_metric(
-            "task_completion_rate", organization_id,
-            request.date_range.start_date, request.date_range.end_date,
-            None, None, db
-        )
-        
-        deadline_adherence = await self.calculator_service.calculate_metric(
-            "deadline_adherence", organization_id,
-            request.date_range.start_date, request.date_range.end_date,
-            None, None, db
+        # Count tasks in date range by status and priority
+        start, end = period_bounds(request.date_range.start_date, request.date_range.end_date)
+        result = await db.execute(
+            select(Task.status, Task.priority, func.count(Task.id))
+            .join(Project, Project.id == Task.project_id)
+            .where(and_(
+                Project.organization_id == organization_id,
+                Task.is_active == True,
+                Task.created_at >= start,
+                Task.created_at < end
+            ))
+            .group_by(Task.status, Task.priority)
         )
         
         # Analyze task distribution
         status_distribution = {}
         priority_distribution = {}
         
-        for task in tasks:
-            # Status distribution
-            status = task.status
-            status_distribution[status] = status_distribution.get(status, 0) + 1
-            
-            # Priority distribution
-            priority = task.priority
-            priority_distribution[priority] = priority_distribution.get(priority, 0) + 1
+        for status, priority, count in result.all():
+            status_distribution[status.value] = status_distribution.get(status.value, 0) + count
+            priority_distribution[priority.value] = priority_distribution.get(priority.value, 0) + count
+        
+        total_tasks = sum(status_distribution.values())
+        
+        # Time from creation to the last update for tasks completed in the period
+        completed = await Columns.load(
+            db,
+            select(Task.created_at, Task.updated_at)
+            .join(Project, Project.id == Task.project_id)
+            .where(and_(
+                Project.organization_id == organization_id,
+                Task.is_active == True,
+                Task.status == TaskStatus.DONE,
+                Task.updated_at >= start,
+                Task.updated_at < end
+            )),
+            {"created_at": "datetime", "updated_at": "datetime"}
+        )
+        completion_hours = present(array("d", (
+            (updated - created) / 3600
+            for created, updated in zip(completed["created_at"], completed["updated_at"])
+        )))
+        completion_percentiles = percentiles(completion_hours)
+        
+        # Calculate task metrics
+        metrics = await self.calculator_service.calculate_metrics(
+            [
+                MetricRequest("task_completion_rate", "organization", organization_id),
+                MetricRequest("deadline_adherence", "organization", organization_id)
+            ],
+            organization_id, request.date_range.start_date, request.date_range.end_date, db
+        )
+        completion_rate = metrics.get("task_completion_rate", "organization", organization_id)
+        deadline_adherence = metrics.get("deadline_adherence", "organization", organization_id)
         
         summary = {
-            "total_tasks": len(tasks),
-            "completion_rate": completion_rate.get("value", 0),
-            "deadline_adherence": deadline_adherence.get("value", 0),
-            "avg_completion_time": 0,  # Would need more complex calculation
-            "total_data_points": len(tasks)
+            "total_tasks": total_tasks,
+            "completion_rate": completion_rate,
+            "deadline_adherence": deadline_adherence,
+            "avg_completion_time": mean(completion_hours),
+            "median_completion_time": completion_percentiles[0.5],
+            "p90_completion_time": completion_percentiles[0.9],
+            "total_data_points": total_tasks
         }
         
         return {
             "report_type": "task_analytics",
             "summary": summary,
             "metrics": {
-                "completion_rate": completion_rate,
-                "deadline_adherence": deadline_adherence
+                "completion_rate": {"value": completion_rate, "unit": "percentage"},
+                "deadline_adherence": {"value": deadline_adherence, "unit": "percentage"}
             },
             "distributions": {
                 "status": status_distribution,
@@ -750,52 +902,70 @@ class ReportGenerationService:
                         "labels": list(priority_distribution.keys()),
                         "values": list(priority_distribution.values())
                     }
-                }
+                },
+                "completion_time_distribution": histogram_chart(
+                    completion_hours, COMPLETION_TIME_EDGES, "h"
+                )
             }
         }
     
     async def _generate_time_tracking(
         self, template: ReportTemplate, request: ReportGenerationRequest,
-        organization_id: int, db: Session
+        organization_id: int, db: AsyncSession
     ) -> Dict[str, Any]:
         """Generate time tracking report."""
         
-        # Get time logs in date range
-        time_logs = db.query(TaskTimeLog).filter(
-            TaskTimeLog.organization_id == organization_id,
-            TaskTimeLog.logged_date >= request.date_range.start_date,
-            TaskTimeLog.logged_date <= request.date_range.end_date
-        ).all()
+        # Load time log columns in date range
+        period_start, period_end = request.date_range.start_date, request.date_range.end_date
+        start, end = period_bounds(period_start, period_end)
+        time_logs = await Columns.load(
+            db,
+            select(
+                TaskTimeLog.start_time, TaskTimeLog.user_id,
+                TaskTimeLog.duration_minutes, TaskTimeLog.is_billable
+            )
+            .join(Task, Task.id == TaskTimeLog.task_id)
+            .join(Project, Project.id == Task.project_id)
+            .where(and_(
+                Project.organization_id == organization_id,
+                TaskTimeLog.is_active == True,
+                TaskTimeLog.duration_minutes.isnot(None),
+                TaskTimeLog.start_time >= start,
+                TaskTimeLog.start_time < end
+            )),
+            {"start_time": "datetime", "user_id": "int", "minutes": "int", "is_billable": "bool"}
+        )
         
         # Calculate time metrics
         productivity = await self.calculator_service.calculate_metric(
-            "user_productivity", organization_id,
-            request.date_range.start_date, request.date_range.end_date,
-            None, None, db
+            "user_productivity", organization_id, period_start, period_end, None, None, db
         )
         
         utilization = await self.calculator_service.calculate_metric(
-            "time_utilization", organization_id,
-            request.date_range.start_date, request.date_range.end_date,
-            None, None, db
+            "time_utilization", organization_id, period_start, period_end, None, None, db
         )
         
         # Analyze time distribution
-        total_hours = sum(float(log.hours_logged) for log in time_logs if log.hours_logged)
-        billable_hours = sum(float(log.hours_logged) for log in time_logs if log.hours_logged and log.is_billable)
+        minutes = time_logs["minutes"]
+        billable_minutes = where(minutes, time_logs["is_billable"])
+        total_hours = sum(minutes) / 60
+        billable_hours = sum(billable_minutes) / 60
         
         # Group by user
-        user_hours = {}
-        for log in time_logs:
-            user_id = log.user_id
-            if user_id not in user_hours:
-                user_hours[user_id] = {"total": 0, "billable": 0, "entries": 0}
-            
-            if log.hours_logged:
-                user_hours[user_id]["total"] += float(log.hours_logged)
-                if log.is_billable:
-                    user_hours[user_id]["billable"] += float(log.hours_logged)
-                user_hours[user_id]["entries"] += 1
+        user_totals = group_sum(time_logs["user_id"], minutes)
+        user_billable = group_sum(where(time_logs["user_id"], time_logs["is_billable"]), billable_minutes)
+        user_entries = group_count(time_logs["user_id"])
+        user_hours = {
+            user_id: {
+                "total": total / 60,
+                "billable": user_billable.get(user_id, 0) / 60,
+                "entries": user_entries[user_id]
+            }
+            for user_id, total in user_totals.items()
+        }
+        
+        day_labels, day_minutes = daily_series(time_logs["start_time"], minutes, period_start, period_end)
+        entry_percentiles = percentiles(minutes)
         
         summary = {
             "total_hours": total_hours,
@@ -803,6 +973,9 @@ class ReportGenerationService:
             "billable_rate": (billable_hours / total_hours * 100) if total_hours > 0 else 0,
             "productivity_score": productivity.get("value", 0),
             "utilization_rate": utilization.get("value", 0),
+            "average_entry_minutes": mean(minutes),
+            "median_entry_minutes": entry_percentiles[0.5],
+            "p90_entry_minutes": entry_percentiles[0.9],
             "total_data_points": len(time_logs)
         }
         
@@ -815,21 +988,11 @@ class ReportGenerationService:
             },
             "user_breakdown": user_hours,
             "charts": {
-                "daily_hours": {
-                    "type": "line",
-                    "data": {
-                        # Would need to group by date for timeline
-                        "labels": [],
-                        "values": []
-                    }
-                },
-                "billable_vs_non_billable": {
-                    "type": "pie",
-                    "data": {
-                        "labels": ["Billable", "Non-Billable"],
-                        "values": [billable_hours, total_hours - billable_hours]
-                    }
-                }
+                "daily_hours": chart("line", day_labels, [total / 60 for total in day_minutes]),
+                "billable_vs_non_billable": chart(
+                    "pie", ["Billable", "Non-Billable"], [billable_hours, total_hours - billable_hours]
+                ),
+                "entry_duration_distribution": histogram_chart(minutes, ENTRY_DURATION_EDGES, "min")
             }
         }
     
@@ -941,57 +1104,27 @@ class DashboardService:
         return dashboard
     
     async def get_widget_data(
-        self, widget: DashboardWidget, user: UserRead, db: Session
+        self, widget: DashboardWidget, user: UserRead, db: AsyncSession
     ) -> Dict[str, Any]:
         """Get data for a specific widget."""
         
-        # Check cache first
-        if (widget.cached_data and widget.last_data_update and 
-            widget.cache_duration_seconds and
-            (datetime.utcnow() - widget.last_data_update).total_seconds() < widget.cache_duration_seconds):
-            return widget.cached_data
-        
-        # Generate fresh data based on widget configuration
-        widget_data = await self._generate_widget_data(widget, user, db)
-        
-        # Update cache
-        widget.cached_data = widget_data
-        widget.last_data_update = datetime.utcnow()
-        db.commit()
-        
-        return widget_data
+        data = await widget_query_engine.load(db, widget.organization_id, [widget])
+        return data[widget.id]
     
-    async def _generate_widget_data(
-        self, widget: DashboardWidget, user: UserRead, db: Session
-    ) -> Dict[str, Any]:
-        """Generate data for a widget based on its configuration."""
-        
-        query_config = widget.query_config
-        
-        # Basic implementation - would need to be expanded based on widget types
-        if widget.widget_type == ChartType.LINE:
-            return {
-                "type": "line",
-                "data": {
-                    "labels": ["Mon", "Tue", "Wed", "Thu", "Fri"],
-                    "datasets": [{
-                        "label": "Tasks Completed",
-                        "data": [12, 19, 3, 5, 2]
-                    }]
-                }
-            }
-        elif widget.widget_type == ChartType.PIE:
-            return {
-                "type": "pie",
-                "data": {
-                    "labels": ["Completed", "In Progress", "Todo"],
-                    "datasets": [{
-                        "data": [10, 5, 3]
-                    }]
-                }
-            }
-        
-        return {"message": "Widget data generated"}
+    async def get_dashboard_data(
+        self, dashboard: Dashboard, db: AsyncSession
+    ) -> Dict[int, Dict[str, Any]]:
+        """Get data for every visible widget of a dashboard in one batched load."""
+        
+        result = await db.execute(
+            select(DashboardWidget)
+            .where(and_(
+                DashboardWidget.dashboard_id == dashboard.id,
+                DashboardWidget.is_visible == True
+            ))
+            .order_by(DashboardWidget.display_order, DashboardWidget.id)
+        )
+        return await widget_query_engine.load(db, dashboard.organization_id, result.scalars().all())
 
 
 class AnalyticsService:
@@ -1045,4 +1178,8 @@ class AnalyticsService:
             "avg_report_generation_time": 0.0,
             "cache_hit_rate": 0.0,
             "alert_response_rate": 0.0
-        }
\ No newline at end of file
+        }
+
+
+report_generation_service = ReportGenerationService()
+report_job_queue = ReportJobQueue(report_generation_service)
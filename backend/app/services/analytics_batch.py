@@ -0,0 +1,179 @@
+"""
+Batched metric evaluation.
+Many (metric, entity) pairs are planned into one grouped rollup query per
+scope type and time range, so the number of queries depends on the metrics
+requested, not on how many projects or users they are requested for.
+"""
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.analytics_rollups import STATUS_COUNTERS, analytics_rollups, period_bounds
+
+logger = logging.getLogger(__name__)
+
+
+def _ratio(numerator: int, denominator: int) -> float:
+    return (numerator / denominator) * 100 if denominator else 0.0
+
+
+@dataclass(frozen=True)
+class BatchMetric:
+    """A metric computed from rollup counters of one scope.
+
+    ``period`` metrics sum the counters over the requested period; the others
+    sum them up to now (status counts). ``compute`` receives the summed
+    counters and the number of days in the period.
+    """
+    counters: Tuple[str, ...]
+    compute: Callable[[Dict[str, int], int], float]
+    unit: str
+    period: bool = True
+
+
+STATUS_TOTAL = tuple(STATUS_COUNTERS.values())
+
+BATCH_METRICS: Dict[str, BatchMetric] = {
+    "task_completion_rate": BatchMetric(
+        ("tasks_created", "tasks_completed"),
+        lambda c, days: _ratio(c["tasks_completed"], c["tasks_created"]),
+        "percentage"
+    ),
+    "deadline_adherence": BatchMetric(
+        ("completed_on_time", "completed_late"),
+        lambda c, days: _ratio(c["completed_on_time"], c["completed_on_time"] + c["completed_late"]),
+        "percentage"
+    ),
+    "team_velocity": BatchMetric(
+        ("tasks_completed",),
+        lambda c, days: c["tasks_completed"] / days if days else 0.0,
+        "tasks_per_day"
+    ),
+    "hours_logged": BatchMetric(
+        ("minutes_logged",), lambda c, days: c["minutes_logged"] / 60, "hours"
+    ),
+    "billable_hours": BatchMetric(
+        ("billable_minutes",), lambda c, days: c["billable_minutes"] / 60, "hours"
+    ),
+    "project_progress": BatchMetric(
+        STATUS_TOTAL,
+        lambda c, days: _ratio(c["tasks_done"], sum(c[counter] for counter in STATUS_TOTAL)),
+        "percentage",
+        period=False
+    ),
+    "task_count": BatchMetric(
+        STATUS_TOTAL, lambda c, days: sum(c[counter] for counter in STATUS_TOTAL), "tasks", period=False
+    ),
+    "completed_tasks": BatchMetric(
+        ("tasks_done",), lambda c, days: c["tasks_done"], "tasks", period=False
+    ),
+    **{
+        f"{status.value}_tasks": BatchMetric(
+            (counter,), lambda c, days, counter=counter: c[counter], "tasks", period=False
+        )
+        for status, counter in STATUS_COUNTERS.items() if status.value != "done"
+    },
+}
+
+
+@dataclass(frozen=True)
+class MetricRequest:
+    """One metric for one entity; ``entity_type`` is organization, project or user."""
+    metric: str
+    entity_type: str
+    entity_id: int
+
+
+class MetricFrame:
+    """Columnar batch result with one row per requested (metric, entity) pair."""
+
+    def __init__(self):
+        self.metric: List[str] = []
+        self.entity_type: List[str] = []
+        self.entity_id: List[int] = []
+        self.value: List[float] = []
+        self._index: Dict[MetricRequest, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.value)
+
+    def append(self, request: MetricRequest, value: float) -> None:
+        self._index[request] = len(self.value)
+        self.metric.append(request.metric)
+        self.entity_type.append(request.entity_type)
+        self.entity_id.append(request.entity_id)
+        self.value.append(value)
+
+    def get(self, metric: str, entity_type: str, entity_id: int, default: float = 0.0) -> float:
+        """Value of one pair."""
+        row = self._index.get(MetricRequest(metric, entity_type, entity_id))
+        return self.value[row] if row is not None else default
+
+    def column(self, metric: str, entity_type: str) -> Dict[int, float]:
+        """Values of one metric by entity id."""
+        return {
+            entity_id: value
+            for name, kind, entity_id, value in zip(self.metric, self.entity_type, self.entity_id, self.value)
+            if name == metric and kind == entity_type
+        }
+
+    def to_dict(self) -> Dict[str, list]:
+        return {
+            "metric": list(self.metric),
+            "entity_type": list(self.entity_type),
+            "entity_id": list(self.entity_id),
+            "value": list(self.value),
+        }
+
+
+async def evaluate_metrics(
+    db: AsyncSession,
+    organization_id: int,
+    period_start: date,
+    period_end: date,
+    requests: Iterable[MetricRequest]
+) -> MetricFrame:
+    """Evaluate many metrics in one grouped query per (scope type, time range).
+
+    Raises ValueError for metrics that cannot be batched.
+    """
+    requests = list(dict.fromkeys(requests))
+    for request in requests:
+        if request.metric not in BATCH_METRICS:
+            raise ValueError(f"Metric cannot be batched: {request.metric}")
+
+    # Plan: (scope_type, period) -> (entity ids, counters)
+    plan: Dict[Tuple[str, bool], Tuple[Set[int], Set[str]]] = defaultdict(lambda: (set(), set()))
+    for request in requests:
+        metric = BATCH_METRICS[request.metric]
+        entity_ids, counters = plan[(request.entity_type, metric.period)]
+        entity_ids.add(request.entity_id)
+        counters.update(metric.counters)
+
+    start, end = period_bounds(period_start, period_end)
+    totals: Dict[Tuple[str, bool], Dict[int, Dict[str, int]]] = {}
+    for (scope_type, period), (entity_ids, counters) in plan.items():
+        counters = sorted(counters)
+        grouped = await analytics_rollups.totals_by_scope(
+            db, organization_id, scope_type,
+            start if period else None, end if period else None,
+            sorted(entity_ids), counters
+        )
+        empty = dict.fromkeys(counters, 0)
+        totals[(scope_type, period)] = {
+            entity_id: grouped.get(entity_id, empty) for entity_id in entity_ids
+        }
+
+    period_days = (period_end - period_start).days + 1
+    frame = MetricFrame()
+    for request in requests:
+        metric = BATCH_METRICS[request.metric]
+        counters = totals[(request.entity_type, metric.period)][request.entity_id]
+        frame.append(request, metric.compute(counters, period_days))
+
+    logger.debug(f"Evaluated {len(frame)} metrics with {len(plan)} queries")
+    return frame
@@ -0,0 +1,149 @@
+"""
+Columnar helpers for report generation.
+Report queries select only the columns they need and stream them in
+batches into typed arrays, 8 bytes per value instead of one ORM object per
+row. Group-bys, histograms, percentiles and time buckets run over the
+arrays and return chart-ready structures.
+"""
+import math
+from array import array
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+from itertools import compress, repeat
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+# Column kind -> array typecode; datetimes are stored as epoch seconds
+COLUMN_TYPES = {"int": "q", "float": "d", "bool": "b", "datetime": "d"}
+
+DEFAULT_BATCH_SIZE = 10000
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch(value: Optional[datetime]) -> float:
+    return (value - EPOCH).total_seconds() if value is not None else math.nan
+
+
+def _convert(kind: str, values: Sequence[Any]) -> Iterable:
+    if kind == "datetime":
+        return map(to_epoch, values)
+    if kind == "float":
+        return (math.nan if value is None else float(value) for value in values)
+    if kind == "bool":
+        return (1 if value else 0 for value in values)
+    return (value or 0 for value in values)
+
+
+class Columns:
+    """Typed column arrays loaded from a query, one per selected column.
+
+    Missing numbers load as 0 for ints and NaN for floats and datetimes.
+    """
+
+    def __init__(self, types: Dict[str, str]):
+        self.types = types
+        self.data: Dict[str, array] = {
+            name: array(COLUMN_TYPES[kind]) for name, kind in types.items()
+        }
+
+    @classmethod
+    async def load(
+        cls,
+        db: AsyncSession,
+        statement: Select,
+        types: Dict[str, str],
+        batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> "Columns":
+        """Stream ``statement`` into arrays; ``types`` names its columns in order."""
+        columns = cls(types)
+        kinds = list(types.items())
+        result = await db.stream(statement.execution_options(yield_per=batch_size))
+        async for rows in result.partitions():
+            for (name, kind), values in zip(kinds, zip(*rows)):
+                columns.data[name].extend(_convert(kind, values))
+        return columns
+
+    def __len__(self) -> int:
+        return len(next(iter(self.data.values()), ()))
+
+    def __getitem__(self, name: str) -> array:
+        return self.data[name]
+
+
+def where(values: array, flags: Iterable) -> array:
+    """Values whose flag is set."""
+    return array(values.typecode, compress(values, flags))
+
+
+def present(values: array) -> array:
+    """Values that are not NaN."""
+    return where(values, (value == value for value in values))
+
+
+def group_sum(keys: Iterable[Hashable], values: Iterable[float]) -> Dict[Hashable, float]:
+    totals: Dict[Hashable, float] = {}
+    for key, value in zip(keys, values):
+        totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def group_count(keys: Iterable[Hashable]) -> Dict[Hashable, int]:
+    counts: Dict[Hashable, int] = {}
+    for key in keys:
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def histogram(values: Iterable[float], edges: Sequence[float]) -> List[int]:
+    """Counts per bucket: below edges[0], between consecutive edges, and from the last edge up."""
+    counts = [0] * (len(edges) + 1)
+    for value in values:
+        counts[bisect_right(edges, value)] += 1
+    return counts
+
+
+def percentiles(values: Iterable[float], qs: Sequence[float] = (0.5, 0.9, 0.99)) -> Dict[float, float]:
+    """Linearly interpolated percentiles, ignoring NaN."""
+    ordered = sorted(value for value in values if value == value)
+    if not ordered:
+        return dict.fromkeys(qs, 0.0)
+    results = {}
+    for q in qs:
+        rank = q * (len(ordered) - 1)
+        lower = math.floor(rank)
+        upper = min(lower + 1, len(ordered) - 1)
+        results[q] = ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+    return results
+
+
+def mean(values: Sequence[float]) -> float:
+    return math.fsum(values) / len(values) if len(values) else 0.0
+
+
+def daily_series(
+    timestamps: array, values: Optional[Iterable[float]], start: date, end: date
+) -> Tuple[List[str], List[float]]:
+    """Sum ``values`` (or count rows when None) per day from ``start`` to ``end`` inclusive."""
+    days = (end - start).days + 1
+    origin = to_epoch(datetime.combine(start, datetime.min.time()))
+    sums = [0.0] * days
+    for timestamp, value in zip(timestamps, values if values is not None else repeat(1)):
+        index = int((timestamp - origin) // 86400) if timestamp == timestamp else -1
+        if 0 <= index < days:
+            sums[index] += value
+    labels = [(start + timedelta(days=offset)).isoformat() for offset in range(days)]
+    return labels, sums
+
+
+def chart(chart_type: str, labels: Sequence[Any], values: Sequence[Any]) -> Dict[str, Any]:
+    return {"type": chart_type, "data": {"labels": list(labels), "values": list(values)}}
+
+
+def histogram_chart(values: Iterable[float], edges: Sequence[float], unit: str) -> Dict[str, Any]:
+    labels = [f"< {edges[0]:g} {unit}"]
+    labels += [f"{low:g}-{high:g} {unit}" for low, high in zip(edges, edges[1:])]
+    labels.append(f">= {edges[-1]:g} {unit}")
+    return chart("bar", labels, histogram(values, edges))
@@ -0,0 +1,397 @@
+"""
+Incremental analytics rollups.
+Task and time log writes add their deltas to hourly and daily counters per
+organization, project and user inside the writer's transaction. Totals over
+a time range read whole days from daily rows and the partial days at either
+edge from hourly rows, so any range touches only a few rows per scope.
+"""
+import logging
+from dataclasses import dataclass, replace
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, delete, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import dialect_insert
+from app.models.analytics import AnalyticsRollup
+from app.models.project import Project
+from app.models.task import Task, TaskStatus
+from app.models.time_tracking import TaskTimeLog
+
+logger = logging.getLogger(__name__)
+
+# Counter column per task status; values are net changes in active tasks
+STATUS_COUNTERS: Dict[TaskStatus, str] = {
+    TaskStatus.TODO: "tasks_todo",
+    TaskStatus.IN_PROGRESS: "tasks_in_progress",
+    TaskStatus.IN_REVIEW: "tasks_in_review",
+    TaskStatus.DONE: "tasks_done",
+    TaskStatus.CANCELLED: "tasks_cancelled",
+}
+
+COUNTERS: Tuple[str, ...] = (
+    "tasks_created", "tasks_completed", "completed_on_time", "completed_late",
+    *STATUS_COUNTERS.values(),
+    "minutes_logged", "billable_minutes", "time_entries",
+)
+
+GRANULARITIES = ("hour", "day")
+
+KEY_COLUMNS = ("organization_id", "scope_type", "scope_id", "granularity", "bucket_start")
+
+Scope = Tuple[str, int]
+Deltas = Dict[Scope, Dict[str, int]]
+
+
+def bucket_start(when: datetime, granularity: str) -> datetime:
+    """Truncate a timestamp to the start of its hour or day."""
+    if granularity == "hour":
+        return when.replace(minute=0, second=0, microsecond=0)
+    return datetime.combine(when.date(), time.min)
+
+
+def period_bounds(period_start: date, period_end: date) -> Tuple[datetime, datetime]:
+    """Turn an inclusive date period into a half-open datetime range."""
+    return (
+        datetime.combine(period_start, time.min),
+        datetime.combine(period_end, time.min) + timedelta(days=1)
+    )
+
+
+@dataclass(frozen=True)
+class TaskState:
+    """The task fields rollups depend on, captured before and after a write."""
+    project_id: int
+    assignee_id: Optional[int]
+    status: TaskStatus
+    is_active: bool
+    due_date: Optional[datetime]
+
+    @classmethod
+    def from_task(cls, task: Task) -> "TaskState":
+        return cls(
+            project_id=task.project_id,
+            assignee_id=task.assignee_id,
+            status=TaskStatus(task.status or TaskStatus.TODO),
+            is_active=task.is_active is not False,
+            due_date=task.due_date
+        )
+
+    def scopes(self, organization_id: int) -> List[Scope]:
+        scopes = [("organization", organization_id), ("project", self.project_id)]
+        if self.assignee_id:
+            scopes.append(("user", self.assignee_id))
+        return scopes
+
+
+def _add(deltas: Deltas, scopes: Iterable[Scope], counter: str, amount: int) -> None:
+    for scope in scopes:
+        counters = deltas.setdefault(scope, {})
+        counters[counter] = counters.get(counter, 0) + amount
+
+
+def task_deltas(
+    organization_id: int, before: Optional[TaskState], after: TaskState, when: datetime
+) -> Deltas:
+    """Counter changes caused by creating (``before`` is None) or updating a task."""
+    deltas: Deltas = {}
+    if before is None:
+        _add(deltas, after.scopes(organization_id), "tasks_created", 1)
+    elif before.is_active:
+        _add(deltas, before.scopes(organization_id), STATUS_COUNTERS[before.status], -1)
+    if after.is_active:
+        _add(deltas, after.scopes(organization_id), STATUS_COUNTERS[after.status], 1)
+
+    # Completions are events: reopening a task does not take one back
+    completed = after.status == TaskStatus.DONE and (before is None or before.status != TaskStatus.DONE)
+    if completed and after.is_active:
+        scopes = after.scopes(organization_id)
+        _add(deltas, scopes, "tasks_completed", 1)
+        if after.due_date is not None:
+            _add(deltas, scopes, "completed_on_time" if when <= after.due_date else "completed_late", 1)
+    return deltas
+
+
+def time_log_deltas(
+    organization_id: int, project_id: int, time_log: TaskTimeLog, sign: int = 1
+) -> Deltas:
+    """Counter changes caused by a finished time log, or by taking it back out with ``sign=-1``."""
+    deltas: Deltas = {}
+    scopes = [("organization", organization_id), ("project", project_id), ("user", time_log.user_id)]
+    minutes = sign * (time_log.duration_minutes or 0)
+    _add(deltas, scopes, "minutes_logged", minutes)
+    _add(deltas, scopes, "billable_minutes", minutes if time_log.is_billable else 0)
+    _add(deltas, scopes, "time_entries", sign)
+    return deltas
+
+
+class AnalyticsRollupStore:
+    """Reads and writes AnalyticsRollup counters.
+
+    Writes are single multi-row upserts (``INSERT ... ON CONFLICT DO UPDATE``
+    adding to the stored counters), executed on the caller's session so they
+    commit or roll back together with the task or time log change.
+    """
+
+    async def record_task(
+        self,
+        db: AsyncSession,
+        before: Optional[TaskState],
+        after: TaskState,
+        organization_id: Optional[int] = None,
+        when: Optional[datetime] = None
+    ) -> None:
+        """Apply a task creation or update to the rollups."""
+        if before == after:
+            return
+        if organization_id is None:
+            organization_id = await self._organization_for_project(db, after.project_id)
+        when = when or datetime.utcnow()
+        await self._apply(db, organization_id, {when: task_deltas(organization_id, before, after, when)})
+
+    async def record_time_log(
+        self,
+        db: AsyncSession,
+        time_log: TaskTimeLog,
+        project_id: int,
+        organization_id: Optional[int] = None,
+        sign: int = 1
+    ) -> None:
+        """Apply a stopped time log to the rollups, in the bucket it started in.
+
+        Edits remove the log as it was with ``sign=-1`` before adding it as it is.
+        """
+        if organization_id is None:
+            organization_id = await self._organization_for_project(db, project_id)
+        await self._apply(
+            db, organization_id,
+            {time_log.start_time: time_log_deltas(organization_id, project_id, time_log, sign)}
+        )
+
+    async def totals(
+        self,
+        db: AsyncSession,
+        organization_id: int,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        scope_type: str = "organization",
+        scope_id: Optional[int] = None,
+        counters: Sequence[str] = COUNTERS
+    ) -> Dict[str, int]:
+        """Sum counters of one scope over ``[start, end)``; open ends are unbounded."""
+        scope_id = scope_id if scope_id is not None else organization_id
+        grouped = await self.totals_by_scope(
+            db, organization_id, scope_type, start, end, [scope_id], counters
+        )
+        return grouped.get(scope_id, dict.fromkeys(counters, 0))
+
+    async def totals_by_scope(
+        self,
+        db: AsyncSession,
+        organization_id: int,
+        scope_type: str,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        scope_ids: Optional[Sequence[int]] = None,
+        counters: Sequence[str] = COUNTERS
+    ) -> Dict[int, Dict[str, int]]:
+        """Sum counters over ``[start, end)`` for every scope of a type, in one query."""
+        conditions = [
+            AnalyticsRollup.organization_id == organization_id,
+            AnalyticsRollup.scope_type == scope_type,
+            self._range_clause(start, end)
+        ]
+        if scope_ids is not None:
+            conditions.append(AnalyticsRollup.scope_id.in_(scope_ids))
+
+        result = await db.execute(
+            select(
+                AnalyticsRollup.scope_id,
+                *[func.coalesce(func.sum(getattr(AnalyticsRollup, counter)), 0).label(counter)
+                  for counter in counters]
+            )
+            .where(and_(*conditions))
+            .group_by(AnalyticsRollup.scope_id)
+        )
+        return {
+            row.scope_id: {counter: int(getattr(row, counter)) for counter in counters}
+            for row in result.all()
+        }
+
+    async def daily_series(
+        self,
+        db: AsyncSession,
+        organization_id: int,
+        start: datetime,
+        end: datetime,
+        scope_type: str = "organization",
+        scope_id: Optional[int] = None,
+        counters: Sequence[str] = COUNTERS
+    ) -> List[Tuple[date, Dict[str, int]]]:
+        """Per-day counters of one scope for the days overlapping ``[start, end)``."""
+        result = await db.execute(
+            select(AnalyticsRollup.bucket_start, *[getattr(AnalyticsRollup, counter) for counter in counters])
+            .where(and_(
+                AnalyticsRollup.organization_id == organization_id,
+                AnalyticsRollup.scope_type == scope_type,
+                AnalyticsRollup.scope_id == (scope_id if scope_id is not None else organization_id),
+                AnalyticsRollup.granularity == "day",
+                AnalyticsRollup.bucket_start >= bucket_start(start, "day"),
+                AnalyticsRollup.bucket_start < end
+            ))
+            .order_by(AnalyticsRollup.bucket_start)
+        )
+        return [
+            (row.bucket_start.date(), {counter: getattr(row, counter) for counter in counters})
+            for row in result.all()
+        ]
+
+    async def status_counts(
+        self,
+        db: AsyncSession,
+        organization_id: int,
+        scope_type: str = "organization",
+        scope_id: Optional[int] = None,
+        as_of: Optional[datetime] = None
+    ) -> Dict[str, int]:
+        """Active tasks per status at ``as_of`` (now by default)."""
+        totals = await self.totals(
+            db, organization_id, None, as_of, scope_type, scope_id,
+            counters=list(STATUS_COUNTERS.values())
+        )
+        return {status.value: totals[counter] for status, counter in STATUS_COUNTERS.items()}
+
+    async def rebuild(self, db: AsyncSession, organization_id: int) -> int:
+        """Recompute an organization's rollups from tasks and time logs.
+
+        Used to backfill data written before rollups existed. Tasks count in
+        their current status from their creation time, and completed tasks
+        as completed at their last update. Returns the rows written.
+        """
+        by_time: Dict[datetime, Deltas] = {}
+
+        tasks = await db.stream(
+            select(Task).join(Project, Project.id == Task.project_id)
+            .where(Project.organization_id == organization_id)
+            .execution_options(yield_per=1000)
+        )
+        async for task in tasks.scalars():
+            state = TaskState.from_task(task)
+            created = replace(state, status=TaskStatus.TODO)
+            _merge(by_time.setdefault(task.created_at, {}), task_deltas(organization_id, None, created, task.created_at))
+            if state.status != TaskStatus.TODO:
+                changed_at = task.updated_at or task.created_at
+                _merge(
+                    by_time.setdefault(changed_at, {}),
+                    task_deltas(organization_id, created, state, changed_at)
+                )
+
+        logs = await db.stream(
+            select(TaskTimeLog, Task.project_id)
+            .join(Task, Task.id == TaskTimeLog.task_id)
+            .join(Project, Project.id == Task.project_id)
+            .where(and_(
+                Project.organization_id == organization_id,
+                TaskTimeLog.is_active == True,
+                TaskTimeLog.duration_minutes.isnot(None)
+            ))
+            .execution_options(yield_per=1000)
+        )
+        async for time_log, project_id in logs:
+            _merge(
+                by_time.setdefault(time_log.start_time, {}),
+                time_log_deltas(organization_id, project_id, time_log)
+            )
+
+        await db.execute(delete(AnalyticsRollup).where(AnalyticsRollup.organization_id == organization_id))
+        rows = self._rows(organization_id, by_time)
+        for offset in range(0, len(rows), 500):
+            await db.execute(self._upsert(db, rows[offset:offset + 500]))
+        await db.commit()
+
+        logger.info(f"Rebuilt {len(rows)} analytics rollup rows for organization {organization_id}")
+        return len(rows)
+
+    async def _apply(self, db: AsyncSession, organization_id: int, by_time: Dict[datetime, Deltas]) -> None:
+        rows = self._rows(organization_id, by_time)
+        if rows:
+            await db.execute(self._upsert(db, rows))
+
+    @staticmethod
+    def _rows(organization_id: int, by_time: Dict[datetime, Deltas]) -> List[Dict[str, Any]]:
+        # Merge into one row per key: an upsert may not touch the same row twice
+        merged: Dict[Tuple[str, int, str, datetime], Dict[str, int]] = {}
+        for when, deltas in by_time.items():
+            for granularity in GRANULARITIES:
+                bucket = bucket_start(when, granularity)
+                for (scope_type, scope_id), counters in deltas.items():
+                    target = merged.setdefault((scope_type, scope_id, granularity, bucket), {})
+                    for counter, amount in counters.items():
+                        target[counter] = target.get(counter, 0) + amount
+
+        now = datetime.utcnow()
+        rows = []
+        for (scope_type, scope_id, granularity, bucket), counters in merged.items():
+            if not any(counters.values()):
+                continue
+            row = dict.fromkeys(COUNTERS, 0)
+            row.update(counters)
+            row.update(
+                organization_id=organization_id,
+                scope_type=scope_type,
+                scope_id=scope_id,
+                granularity=granularity,
+                bucket_start=bucket,
+                updated_at=now
+            )
+            rows.append(row)
+        return rows
+
+    @staticmethod
+    def _upsert(db: AsyncSession, rows: List[Dict[str, Any]]):
+        statement = dialect_insert(db, AnalyticsRollup).values(rows)
+        updates = {
+            counter: getattr(AnalyticsRollup, counter) + getattr(statement.excluded, counter)
+            for counter in COUNTERS
+        }
+        updates["updated_at"] = statement.excluded.updated_at
+        return statement.on_conflict_do_update(index_elements=list(KEY_COLUMNS), set_=updates)
+
+    @staticmethod
+    def _range_clause(start: Optional[datetime], end: Optional[datetime]):
+        """Daily rows for whole days in ``[start, end)``, hourly rows for the edges."""
+        bucket = AnalyticsRollup.bucket_start
+        hour = AnalyticsRollup.granularity == "hour"
+        first_day = bucket_start(start, "day") if start is not None else None
+        if first_day is not None and first_day < start:
+            first_day += timedelta(days=1)
+        last_day = bucket_start(end, "day") if end is not None else None
+
+        if first_day is not None and last_day is not None and first_day >= last_day:
+            return and_(hour, bucket >= bucket_start(start, "hour"), bucket < end)
+
+        whole_days = [AnalyticsRollup.granularity == "day"]
+        edges = []
+        if first_day is not None:
+            whole_days.append(bucket >= first_day)
+            edges.append(and_(hour, bucket >= bucket_start(start, "hour"), bucket < first_day))
+        if last_day is not None:
+            whole_days.append(bucket < last_day)
+            edges.append(and_(hour, bucket >= last_day, bucket < end))
+        return or_(and_(*whole_days), *edges)
+
+    @staticmethod
+    async def _organization_for_project(db: AsyncSession, project_id: int) -> int:
+        result = await db.execute(select(Project.organization_id).where(Project.id == project_id))
+        return result.scalar_one()
+
+
+def _merge(target: Deltas, deltas: Deltas) -> None:
+    for scope, counters in deltas.items():
+        merged = target.setdefault(scope, {})
+        for counter, amount in counters.items():
+            merged[counter] = merged.get(counter, 0) + amount
+
+
+analytics_rollups = AnalyticsRollupStore()
@@ -5,15 +5,15 @@ import asyncio
 from datetime import datetime, timedelta, date
 from typing import Dict, List, Any, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc, asc, and_, or_, text
+from sqlalchemy import select, func, desc, asc, and_, or_
 from collections import defaultdict, Counter
-import json
 
 from app.core.database import get_db
-from app.models.user import User
+from app.models.user import User, UserStatus
 from app.models.organization import Organization
 from app.models.project import Project
 from app.models.task import Task
+from app.services.activity_log import activity_log
 from app.services.performance_service import metrics_collector, performance_monitor
 from app.core.cache import cache
 
@@ -28,37 +28,31 @@ class AnalyticsService:
     async def get_user_activity_summary(self, days: int = 30) -> Dict[str, Any]:
         """Get comprehensive user activity summary"""
         cache_key = f"{self.cache_prefix}:user_activity:{days}"
-        cached_result = await cache.get(cache_key)
+        cached_result = cache.get(cache_key)
         
         if cached_result:
-            return json.loads(cached_result)
+            return cached_result
         
         async for db in get_db():
             end_date = datetime.utcnow()
             start_date = end_date - timedelta(days=days)
             
-            # Active users metrics
-            active_users_result = await db.execute(
-                select(func.count(func.distinct(User.id)))
-                .where(and_(
-                    User.is_active == True,
-                    User.last_login >= start_date
-                ))
-            )
-            active_users = active_users_result.scalar() or 0
+            # Distinct active users from the activity sketches
+            activity = await activity_log.active_users(db, start_date.date(), end_date.date())
+            active_users = activity["active_users"]
             
             # New registrations
             new_users_result = await db.execute(
                 select(func.count(User.id))
                 .where(and_(
-                    User.is_active == True,
+                    User.status == UserStatus.ACTIVE,
                     User.created_at >= start_date
                 ))
             )
             new_users = new_users_result.scalar() or 0
             
             # Daily activity breakdown
-            daily_activity = await self._get_daily_user_activity(db, start_date, end_date)
+            daily_activity = activity["daily_activity"]
             
             # User retention analysis
             retention_metrics = await self._calculate_user_retention(db, days)
@@ -73,16 +67,16 @@ class AnalyticsService:
                 "last_updated": datetime.utcnow().isoformat()
             }
             
-            await cache.set(cache_key, json.dumps(result, default=str), ttl=self.default_cache_ttl)
+            cache.set(cache_key, result, ttl=self.default_cache_ttl)
             return result
     
     async def get_user_analytics(self, days: int = 30) -> Dict[str, Any]:
         """Get detailed user analytics"""
         cache_key = f"{self.cache_prefix}:detailed_user_analytics:{days}"
-        cached_result = await cache.get(cache_key)
+        cached_result = cache.get(cache_key)
         
         if cached_result:
-            return json.loads(cached_result)
+            return cached_result
         
         async for db in get_db():
             end_date = datetime.utcnow()
@@ -113,16 +107,16 @@ class AnalyticsService:
                 "generated_at": datetime.utcnow().isoformat()
             }
             
-            await cache.set(cache_key, json.dumps(result, default=str), ttl=self.default_cache_ttl)
+            cache.set(cache_key, result, ttl=self.default_cache_ttl)
             return result
     
     async def get_usage_patterns(self, days: int = 30) -> Dict[str, Any]:
         """Analyze usage patterns and behavior"""
         cache_key = f"{self.cache_prefix}:usage_patterns:{days}"
-        cached_result = await cache.get(cache_key)
+        cached_result = cache.get(cache_key)
         
         if cached_result:
-            return json.loads(cached_result)
+            return cached_result
         
         # Get API usage patterns from performance metrics
         metrics_summary = metrics_collector.get_metrics_summary(timeframe_minutes=days * 24 * 60)
@@ -149,16 +143,16 @@ class AnalyticsService:
             "generated_at": datetime.utcnow().isoformat()
         }
         
-        await cache.set(cache_key, json.dumps(result, default=str), ttl=self.default_cache_ttl)
+        cache.set(cache_key, result, ttl=self.default_cache_ttl)
         return result
     
     async def get_user_activity_patterns(self, days: int = 30) -> Dict[str, Any]:
         """Get detailed user activity patterns"""
         cache_key = f"{self.cache_prefix}:activity_patterns:{days}"
-        cached_result = await cache.get(cache_key)
+        cached_result = cache.get(cache_key)
         
         if cached_result:
-            return json.loads(cached_result)
+            return cached_result
         
         async for db in get_db():
             end_date = datetime.utcnow()
@@ -185,16 +179,16 @@ class AnalyticsService:
                 "generated_at": datetime.utcnow().isoformat()
             }
             
-            await cache.set(cache_key, json.dumps(result, default=str), ttl=self.default_cache_ttl)
+            cache.set(cache_key, result, ttl=self.default_cache_ttl)
             return result
     
     async def generate_executive_summary(self, days: int = 30) -> Dict[str, Any]:
         """Generate executive summary for leadership"""
         cache_key = f"{self.cache_prefix}:executive_summary:{days}"
-        cached_result = await cache.get(cache_key)
+        cached_result = cache.get(cache_key)
         
         if cached_result:
-            return json.loads(cached_result)
+            return cached_result
         
         # Gather key metrics
         user_summary = await self.get_user_activity_summary(days)
@@ -232,76 +226,19 @@ class AnalyticsService:
                 "generated_at": datetime.utcnow().isoformat()
             }
             
-            await cache.set(cache_key, json.dumps(result, default=str), ttl=self.default_cache_ttl * 2)
+            cache.set(cache_key, result, ttl=self.default_cache_ttl * 2)
             return result
     
     # Private helper methods
     
-    async def _get_daily_user_activity(self, db: AsyncSession, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
-        """Get daily user activity breakdown"""
-        result = await db.execute(
-            select(
-                func.date(User.last_login).label('activity_date'),
-                func.count(func.distinct(User.id)).label('active_users')
-            )
-            .where(and_(
-                User.is_active == True,
-                User.last_login >= start_date,
-                User.last_login <= end_date
-            ))
-            .group_by(func.date(User.last_login))
-            .order_by(func.date(User.last_login))
-        )
-        
-        daily_activity = []
-        for row in result:
-            daily_activity.append({
-                "date": row[0].isoformat() if row[0] else None,
-                "active_users": row[1]
-            })
-        
-        return daily_activity
-    
     async def _calculate_user_retention(self, db: AsyncSession, days: int) -> Dict[str, Any]:
         """Calculate user retention metrics"""
-        # This is a simplified retention calculation
-        # In a real implementation, you'd track user sessions and define retention criteria
-        
+        # Weekly cohorts old enough to have had a following week
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=days)
         retention_period = end_date - timedelta(days=7)
         
-        # Users who registered in the period
-        new_users_result = await db.execute(
-            select(func.count(User.id))
-            .where(and_(
-                User.created_at >= start_date,
-                User.created_at <= retention_period,
-                User.is_active == True
-            ))
-        )
-        new_users = new_users_result.scalar() or 0
-        
-        # Users who remained active after 7 days
-        retained_users_result = await db.execute(
-            select(func.count(User.id))
-            .where(and_(
-                User.created_at >= start_date,
-                User.created_at <= retention_period,
-                User.last_login >= retention_period,
-                User.is_active == True
-            ))
-        )
-        retained_users = retained_users_result.scalar() or 0
-        
-        retention_rate = (retained_users / new_users * 100) if new_users > 0 else 0
-        
-        return {
-            "new_users": new_users,
-            "retained_users": retained_users,
-            "retention_rate": round(retention_rate, 2),
-            "retention_period_days": 7
-        }
+        return await activity_log.retention_summary(db, start_date.date(), retention_period.date())
     
     def _calculate_growth_rate(self, new_users: int, total_active: int) -> float:
         """Calculate user growth rate"""
@@ -340,28 +277,10 @@ class AnalyticsService:
     
     async def _get_user_engagement_patterns(self, db: AsyncSession, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
         """Analyze user engagement patterns"""
-        # This would typically involve more complex engagement tracking
-        # For now, we'll use login frequency as a proxy
-        
-        # Users by login frequency
-        frequent_users = await db.scalar(
-            select(func.count(User.id))
-            .where(and_(
-                User.last_login >= start_date,
-                User.is_active == True,
-                # Assuming frequent users login more than once per week
-                text("(EXTRACT(EPOCH FROM (NOW() - last_login)) / 86400) < 7")
-            ))
-        )
-        
-        occasional_users = await db.scalar(
-            select(func.count(User.id))
-            .where(and_(
-                User.last_login >= start_date,
-                User.is_active == True,
-                text("(EXTRACT(EPOCH FROM (NOW() - last_login)) / 86400) BETWEEN 7 AND 30")
-            ))
-        )
+        # Users active in the last week are frequent, the rest of the month occasional
+        counts = await activity_log.active_user_counts(db, end_date.date())
+        frequent_users = counts["wau"]
+        occasional_users = max(0, counts["mau"] - counts["wau"])
         
         return {
             "frequent_users": frequent_users or 0,
@@ -0,0 +1,349 @@
+"""
+Dashboard widget queries.
+Widget ``query_config`` is parsed into normalized queries over the
+analytics rollups. A dashboard's widgets are loaded together: identical
+queries are run once, results are shared through the cache across widgets
+and users, and the misses are executed as a few grouped rollup queries.
+
+Query configurations (``filter_config`` entries override them):
+
+* ``{"metrics": ["task_completion_rate", ...]}`` - batch metrics of one entity
+* ``{"status_counts": true}`` - active tasks per status
+* ``{"series": ["tasks_completed", ...]}`` - daily rollup counters
+* ``{"breakdown": "hours_logged", "group_by": "project"}`` - one metric per
+  project or user of the organization
+
+with ``entity_type``/``entity_id`` (the organization by default) and
+``days`` (30 by default) ending today.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import cache
+from app.models.analytics import ChartType, DashboardWidget
+from app.models.project import Project
+from app.models.task import TaskStatus
+from app.models.user import User
+from app.services.analytics_batch import BATCH_METRICS, MetricRequest, evaluate_metrics
+from app.services.analytics_rollups import COUNTERS, analytics_rollups, period_bounds
+
+logger = logging.getLogger(__name__)
+
+CACHE_NAMESPACE = "widgets"
+
+DEFAULT_DAYS = 30
+
+SCOPE_TYPES = ("organization", "project", "user")
+
+# Batch metric holding the active task count of each status
+STATUS_METRICS = {
+    status.value: "completed_tasks" if status == TaskStatus.DONE else f"{status.value}_tasks"
+    for status in TaskStatus
+}
+
+
+@dataclass(frozen=True)
+class WidgetQuery:
+    """A normalized widget query; equal queries share one result."""
+    kind: str  # metrics, series, breakdown
+    names: Tuple[str, ...]  # Metric names, or rollup counters for series
+    entity_type: str
+    entity_id: int
+    period_start: date
+    period_end: date
+    group_by: Optional[str] = None
+    labels: Optional[Tuple[str, ...]] = None
+
+    def cache_key(self, organization_id: int) -> str:
+        payload = json.dumps(asdict(self), default=str, sort_keys=True)
+        return f"{organization_id}:{hashlib.sha1(payload.encode('utf-8')).hexdigest()}"
+
+
+def parse_widget_query(
+    query_config: Dict[str, Any],
+    filter_config: Optional[Dict[str, Any]],
+    organization_id: int,
+    today: Optional[date] = None
+) -> WidgetQuery:
+    """Normalize a widget's configuration; raises ValueError when it is not usable."""
+    config = {**(query_config or {}), **(filter_config or {})}
+    today = today or datetime.utcnow().date()
+    days = int(config.get("days", DEFAULT_DAYS))
+    if days < 1:
+        raise ValueError("days must be at least 1")
+
+    entity_type = config.get("entity_type", "organization")
+    if entity_type not in SCOPE_TYPES:
+        raise ValueError(f"Unknown entity type: {entity_type}")
+    entity_id = organization_id if entity_type == "organization" else config.get("entity_id")
+    if entity_id is None:
+        raise ValueError(f"entity_id is required for {entity_type} widgets")
+
+    common = dict(
+        entity_type=entity_type,
+        entity_id=int(entity_id),
+        period_start=today - timedelta(days=days - 1),
+        period_end=today
+    )
+
+    if config.get("status_counts"):
+        return WidgetQuery(
+            "metrics", tuple(STATUS_METRICS.values()), labels=tuple(STATUS_METRICS), **common
+        )
+
+    if "metrics" in config or "metric" in config:
+        names = config.get("metrics") or [config["metric"]]
+        unknown = [name for name in names if name not in BATCH_METRICS]
+        if unknown:
+            raise ValueError(f"Unknown metrics: {', '.join(unknown)}")
+        return WidgetQuery("metrics", tuple(names), **common)
+
+    if "series" in config:
+        counters = config["series"] if isinstance(config["series"], list) else [config["series"]]
+        unknown = [counter for counter in counters if counter not in COUNTERS]
+        if unknown:
+            raise ValueError(f"Unknown series: {', '.join(unknown)}")
+        return WidgetQuery("series", tuple(counters), **common)
+
+    if "breakdown" in config:
+        metric, group_by = config["breakdown"], config.get("group_by", "project")
+        if metric not in BATCH_METRICS:
+            raise ValueError(f"Unknown metric: {metric}")
+        if group_by not in ("project", "user"):
+            raise ValueError(f"Cannot break down by {group_by}")
+        common.update(entity_type="organization", entity_id=organization_id)
+        return WidgetQuery("breakdown", (metric,), group_by=group_by, **common)
+
+    raise ValueError("query_config needs metrics, status_counts, series or breakdown")
+
+
+def render_widget(widget_type: Any, query: WidgetQuery, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a query result for a widget's chart type."""
+    return {
+        "type": ChartType(widget_type).value,
+        "data": {"labels": result["labels"], "datasets": result["datasets"]},
+        "unit": result.get("unit"),
+        "period": {"start": query.period_start.isoformat(), "end": query.period_end.isoformat()},
+    }
+
+
+# ============================================================================
+# Execution
+# ============================================================================
+
+async def _run_metrics(
+    db: AsyncSession, organization_id: int, queries: List[WidgetQuery]
+) -> Dict[WidgetQuery, Dict[str, Any]]:
+    # One batched evaluation per period covers every metric widget of that period
+    by_period: Dict[Tuple[date, date], List[WidgetQuery]] = defaultdict(list)
+    for query in queries:
+        by_period[(query.period_start, query.period_end)].append(query)
+
+    results = {}
+    for (start, end), group in by_period.items():
+        frame = await evaluate_metrics(db, organization_id, start, end, [
+            MetricRequest(name, query.entity_type, query.entity_id)
+            for query in group for name in query.names
+        ])
+        for query in group:
+            units = {BATCH_METRICS[name].unit for name in query.names}
+            values = [frame.get(name, query.entity_type, query.entity_id) for name in query.names]
+            results[query] = {
+                "labels": list(query.labels or query.names),
+                "datasets": [{"label": query.names[0] if len(query.names) == 1 else None, "data": values}],
+                "unit": units.pop() if len(units) == 1 else None,
+            }
+    return results
+
+
+async def _run_series(
+    db: AsyncSession, organization_id: int, queries: List[WidgetQuery]
+) -> Dict[WidgetQuery, Dict[str, Any]]:
+    # One daily series query per scope and period, with every counter asked for
+    by_scope: Dict[Tuple[str, int, date, date], List[WidgetQuery]] = defaultdict(list)
+    for query in queries:
+        by_scope[(query.entity_type, query.entity_id, query.period_start, query.period_end)].append(query)
+
+    results = {}
+    for (entity_type, entity_id, start_date, end_date), group in by_scope.items():
+        counters = sorted({counter for query in group for counter in query.names})
+        start, end = period_bounds(start_date, end_date)
+        rows = dict(await analytics_rollups.daily_series(
+            db, organization_id, start, end, entity_type, entity_id, counters
+        ))
+        days = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+        empty = dict.fromkeys(counters, 0)
+        for query in group:
+            results[query] = {
+                "labels": [day.isoformat() for day in days],
+                "datasets": [
+                    {"label": counter, "data": [rows.get(day, empty)[counter] for day in days]}
+                    for counter in query.names
+                ],
+                "unit": "count",
+            }
+    return results
+
+
+async def _entity_names(db: AsyncSession, group_by: str, ids: Iterable[int]) -> Dict[int, str]:
+    ids = list(ids)
+    if not ids:
+        return {}
+    if group_by == "project":
+        rows = await db.execute(select(Project.id, Project.name).where(Project.id.in_(ids)))
+        return {row.id: row.name for row in rows.all()}
+    rows = await db.execute(select(User.id, User.first_name, User.last_name).where(User.id.in_(ids)))
+    return {row.id: f"{row.first_name} {row.last_name}" for row in rows.all()}
+
+
+async def _run_breakdowns(
+    db: AsyncSession, organization_id: int, queries: List[WidgetQuery]
+) -> Dict[WidgetQuery, Dict[str, Any]]:
+    # One grouped rollup query per (scope type, period), then one name lookup per scope type
+    plans: Dict[Tuple[str, Optional[date], Optional[date]], List[WidgetQuery]] = defaultdict(list)
+    for query in queries:
+        metric = BATCH_METRICS[query.names[0]]
+        if metric.period:
+            plans[(query.group_by, query.period_start, query.period_end)].append(query)
+        else:
+            plans[(query.group_by, None, None)].append(query)
+
+    totals: Dict[WidgetQuery, Dict[int, Dict[str, int]]] = {}
+    entity_ids: Dict[str, set] = defaultdict(set)
+    for (group_by, start_date, end_date), group in plans.items():
+        counters = sorted({counter for query in group for counter in BATCH_METRICS[query.names[0]].counters})
+        start, end = period_bounds(start_date, end_date) if start_date else (None, None)
+        grouped = await analytics_rollups.totals_by_scope(
+            db, organization_id, group_by, start, end, counters=counters
+        )
+        entity_ids[group_by].update(grouped)
+        for query in group:
+            totals[query] = grouped
+
+    names = {
+        group_by: await _entity_names(db, group_by, ids) for group_by, ids in entity_ids.items()
+    }
+
+    results = {}
+    for query, grouped in totals.items():
+        metric = BATCH_METRICS[query.names[0]]
+        days = (query.period_end - query.period_start).days + 1
+        values = sorted(
+            ((metric.compute(counters, days), entity_id) for entity_id, counters in grouped.items()),
+            reverse=True
+        )
+        results[query] = {
+            "labels": [names[query.group_by].get(entity_id, str(entity_id)) for _, entity_id in values],
+            "datasets": [{"label": query.names[0], "data": [value for value, _ in values]}],
+            "entity_ids": [entity_id for _, entity_id in values],
+            "unit": metric.unit,
+        }
+    return results
+
+
+RUNNERS = {
+    "metrics": _run_metrics,
+    "series": _run_series,
+    "breakdown": _run_breakdowns,
+}
+
+
+class WidgetQueryEngine:
+    """Loads widget data through the shared cache, batching and de-duplicating queries.
+
+    Results are cached per organization and normalized query, so every
+    widget and user asking the same question shares one entry. Queries
+    already being computed by a concurrent load in this process are
+    awaited rather than run again.
+    """
+
+    def __init__(self, namespace: str = CACHE_NAMESPACE):
+        self.namespace = namespace
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def execute(
+        self, db: AsyncSession, organization_id: int, queries: Sequence[WidgetQuery]
+    ) -> Dict[WidgetQuery, Dict[str, Any]]:
+        """Run queries without the cache, grouped by kind."""
+        by_kind: Dict[str, List[WidgetQuery]] = defaultdict(list)
+        for query in dict.fromkeys(queries):
+            by_kind[query.kind].append(query)
+
+        results = {}
+        for kind, group in by_kind.items():
+            results.update(await RUNNERS[kind](db, organization_id, group))
+        return results
+
+    async def load(
+        self, db: AsyncSession, organization_id: int, widgets: Sequence[DashboardWidget]
+    ) -> Dict[int, Dict[str, Any]]:
+        """Data for each widget by id; widgets with unusable queries get an error entry."""
+        today = datetime.utcnow().date()
+        parsed: Dict[int, WidgetQuery] = {}
+        data: Dict[int, Dict[str, Any]] = {}
+        ttls: Dict[str, int] = {}
+        for widget in widgets:
+            try:
+                query = parse_widget_query(widget.query_config, widget.filter_config, organization_id, today)
+            except (ValueError, TypeError) as e:
+                data[widget.id] = {"error": str(e)}
+                continue
+            parsed[widget.id] = query
+            key = query.cache_key(organization_id)
+            ttl = widget.cache_duration_seconds or 300
+            ttls[key] = min(ttls.get(key, ttl), ttl)
+
+        queries = {query.cache_key(organization_id): query for query in parsed.values()}
+        results = cache.get_many(list(queries), namespace=self.namespace)
+
+        waiting = {key: self._inflight[key] for key in queries if key not in results and key in self._inflight}
+        misses = {key: query for key, query in queries.items() if key not in results and key not in waiting}
+
+        if misses:
+            futures = {key: asyncio.get_running_loop().create_future() for key in misses}
+            self._inflight.update(futures)
+            try:
+                computed = await self.execute(db, organization_id, list(misses.values()))
+                fresh = {key: computed[query] for key, query in misses.items()}
+                for ttl in set(ttls[key] for key in fresh):
+                    cache.set_many(
+                        {key: value for key, value in fresh.items() if ttls[key] == ttl},
+                        ttl=ttl, namespace=self.namespace
+                    )
+                results.update(fresh)
+                for key, future in futures.items():
+                    future.set_result(fresh[key])
+            except Exception as e:
+                for future in futures.values():
+                    future.set_exception(e)
+                    future.exception()  # Waiters re-raise it; nothing is left unretrieved
+                raise
+            finally:
+                for key in futures:
+                    self._inflight.pop(key, None)
+
+        for key, future in waiting.items():
+            results[key] = await future
+
+        logger.debug(
+            f"Loaded {len(widgets)} widgets: {len(queries)} distinct queries, {len(misses)} executed"
+        )
+        for widget in widgets:
+            if widget.id in parsed:
+                query = parsed[widget.id]
+                data[widget.id] = render_widget(
+                    widget.widget_type, query, results[query.cache_key(organization_id)]
+                )
+        return data
+
+
+widget_query_engine = WidgetQueryEngine()
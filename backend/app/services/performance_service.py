@@ -37,7 +37,7 @@ class MetricsCollector:
         self.active_requests = 0
         self.total_requests = 0
         self.error_count = 0
-        self._lock = threading.Lock()
+        self._lock = threading.RLock()
     
     def record_metric(self, metric_name: str, value: float, tags: Dict[str, str] = None, duration: float = None):
         """Record a performance metric"""
@@ -0,0 +1,278 @@
+"""
+Token-bucket rate limiting for outbound webhook traffic.
+Decisions are made in memory or atomically in Redis (GCRA); usage counters
+are written behind to APIRateLimit rows for reporting.
+"""
+import asyncio
+import logging
+import math
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import redis.asyncio as redis
+from sqlalchemy import and_, or_, select
+
+from app.core.config import settings
+from app.core.database import get_async_session
+from app.models.webhooks import APIRateLimit
+
+logger = logging.getLogger(__name__)
+
+# Window sizes of the limit types stored in APIRateLimit
+WINDOW_SECONDS = {"minute": 60, "hour": 3600, "day": 86400}
+
+
+@dataclass
+class RateLimit:
+    """``max_requests`` per ``limit_type`` window for one subject."""
+    limit_type: str
+    max_requests: int
+
+    @property
+    def period(self) -> float:
+        return float(WINDOW_SECONDS[self.limit_type])
+
+    @property
+    def interval(self) -> float:
+        return self.period / max(self.max_requests, 1)
+
+
+@dataclass
+class RateLimitDecision:
+    """Outcome of a rate limit check."""
+    allowed: bool
+    retry_after: float = 0.0
+    remaining: int = 0
+
+
+class RateLimiter(ABC):
+    """Generic cell rate algorithm (GCRA) limiter.
+
+    Each (subject, limit) pair stores a single theoretical arrival time. A
+    request is allowed when it would not push that time more than one
+    window ahead of now, which permits bursts of up to ``max_requests`` and
+    then spaces requests ``period / max_requests`` apart. A request must pass
+    every limit given to ``acquire`` and only consumes capacity if it does.
+    """
+
+    @abstractmethod
+    async def acquire(self, subject: str, limits: Sequence[RateLimit]) -> RateLimitDecision:
+        """Check and consume one request for ``subject`` against ``limits``."""
+
+    async def close(self) -> None:
+        """Release resources."""
+
+
+class MemoryRateLimiter(RateLimiter):
+    """Per-process limiter; limits apply to each worker process separately."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        # Theoretical arrival time per bucket: {(subject, limit_type): tat}
+        self._tats: Dict[Tuple[str, str], float] = {}
+
+    async def acquire(self, subject: str, limits: Sequence[RateLimit]) -> RateLimitDecision:
+        now = self.clock()
+        new_tats = []
+        retry_after = 0.0
+        remaining = None
+
+        for limit in limits:
+            tat = max(self._tats.get((subject, limit.limit_type), now), now)
+            new_tat = tat + limit.interval
+            allow_at = new_tat - limit.period
+            if allow_at > now:
+                retry_after = max(retry_after, allow_at - now)
+            new_tats.append(((subject, limit.limit_type), new_tat))
+
+            left = int((limit.period - (new_tat - now)) / limit.interval)
+            remaining = left if remaining is None else min(remaining, left)
+
+        if retry_after > 0:
+            return RateLimitDecision(allowed=False, retry_after=retry_after)
+
+        for key, new_tat in new_tats:
+            self._tats[key] = new_tat
+        return RateLimitDecision(allowed=True, remaining=max(remaining or 0, 0))
+
+
+class RedisRateLimiter(RateLimiter):
+    """Limiter shared by all processes through one atomic Lua script.
+
+    Falls back to an in-memory limiter while Redis is unreachable.
+    """
+
+    # KEYS: one bucket per limit; ARGV: now_ms, then interval_ms and period_ms per key
+    GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local new_tats = {}
+local retry_after = 0
+local remaining = -1
+for i, key in ipairs(KEYS) do
+    local interval = tonumber(ARGV[i * 2])
+    local period = tonumber(ARGV[i * 2 + 1])
+    local tat = tonumber(redis.call('GET', key) or now)
+    if tat < now then tat = now end
+    local new_tat = tat + interval
+    local allow_at = new_tat - period
+    if allow_at > now then
+        retry_after = math.max(retry_after, allow_at - now)
+    end
+    new_tats[i] = new_tat
+    local left = math.floor((period - (new_tat - now)) / interval)
+    if remaining < 0 or left < remaining then remaining = left end
+end
+if retry_after > 0 then
+    return {0, math.ceil(retry_after), 0}
+end
+for i, key in ipairs(KEYS) do
+    redis.call('SET', key, new_tats[i], 'PX', tonumber(ARGV[i * 2 + 1]))
+end
+return {1, 0, remaining}
+"""
+
+    def __init__(self, redis_url: str, prefix: str = "teamflow:ratelimit"):
+        self.redis_url = redis_url
+        self.prefix = prefix
+        self.fallback = MemoryRateLimiter()
+        self._redis: Optional[redis.Redis] = None
+        self._script = None
+
+    async def acquire(self, subject: str, limits: Sequence[RateLimit]) -> RateLimitDecision:
+        try:
+            if self._redis is None:
+                self._redis = redis.Redis.from_url(self.redis_url)
+                self._script = self._redis.register_script(self.GCRA_SCRIPT)
+
+            keys = [f"{self.prefix}:{subject}:{limit.limit_type}" for limit in limits]
+            args = [int(time.time() * 1000)]
+            for limit in limits:
+                args.extend([math.ceil(limit.interval * 1000), int(limit.period * 1000)])
+
+            allowed, retry_after_ms, remaining = await self._script(keys=keys, args=args)
+            return RateLimitDecision(
+                allowed=bool(allowed),
+                retry_after=int(retry_after_ms) / 1000,
+                remaining=int(remaining)
+            )
+        except Exception as e:
+            logger.error(f"Redis rate limiter unavailable, using local limits: {e}")
+            return await self.fallback.acquire(subject, limits)
+
+    async def close(self) -> None:
+        if self._redis:
+            await self._redis.close()
+            self._redis = None
+
+
+class RateLimitUsageWriter:
+    """Buffers allowed requests and writes them to APIRateLimit periodically.
+
+    Counts are approximate reporting data: a flush adds the buffered count to
+    the row's current window, or starts a new window if it has expired.
+    """
+
+    def __init__(self, flush_interval: Optional[float] = None, session_factory=None):
+        self.flush_interval = flush_interval or settings.RATE_LIMIT_FLUSH_INTERVAL
+        self.session_factory = session_factory or get_async_session
+        # {(subject_type, subject_id, limit_type): [count, max_requests, organization_id]}
+        self._pending: Dict[Tuple[str, str, str], List[int]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def record(
+        self, subject_type: str, subject_id: str, limits: Sequence[RateLimit], organization_id: int
+    ) -> None:
+        """Count one allowed request against each limit."""
+        for limit in limits:
+            key = (subject_type, subject_id, limit.limit_type)
+            entry = self._pending.get(key)
+            if entry is None:
+                self._pending[key] = [1, limit.max_requests, organization_id]
+            else:
+                entry[0] += 1
+                entry[1] = limit.max_requests
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Failed to write rate limit usage: {e}")
+
+    async def flush(self) -> int:
+        """Write buffered counters in one transaction; returns rows touched."""
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        now = datetime.utcnow()
+        try:
+            async with self.session_factory() as session:
+                query = select(APIRateLimit).where(or_(*[
+                    and_(
+                        APIRateLimit.subject_type == subject_type,
+                        APIRateLimit.subject_id == subject_id,
+                        APIRateLimit.limit_type == limit_type
+                    )
+                    for subject_type, subject_id, limit_type in pending
+                ]))
+                result = await session.execute(query)
+                rows = {
+                    (row.subject_type, row.subject_id, row.limit_type): row
+                    for row in result.scalars().all()
+                }
+
+                for key, (count, max_requests, organization_id) in pending.items():
+                    subject_type, subject_id, limit_type = key
+                    window_size = WINDOW_SECONDS[limit_type]
+                    row = rows.get(key)
+                    if row is None:
+                        row = APIRateLimit(
+                            subject_type=subject_type,
+                            subject_id=subject_id,
+                            limit_type=limit_type,
+                            max_requests=max_requests,
+                            window_size_seconds=window_size,
+                            current_count=0,
+                            window_start=now,
+                            organization_id=organization_id
+                        )
+                        session.add(row)
+                    elif now >= row.window_start + timedelta(seconds=window_size):
+                        row.current_count = 0
+                        row.window_start = now
+
+                    row.max_requests = max_requests
+                    row.current_count += count
+                    row.last_request_at = now
+
+                await session.commit()
+        except Exception:
+            # Keep the counts for the next flush
+            for key, (count, max_requests, organization_id) in pending.items():
+                entry = self._pending.setdefault(key, [0, max_requests, organization_id])
+                entry[0] += count
+            raise
+
+        return len(pending)
+
+
+def create_rate_limiter() -> RateLimiter:
+    """Create the limiter selected by RATE_LIMIT_BACKEND."""
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisRateLimiter(settings.REDIS_URL)
+    return MemoryRateLimiter()
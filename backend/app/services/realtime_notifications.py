@@ -59,8 +59,16 @@ class RealTimeNotificationService:
         new_values: Dict[str, Any],
         db: AsyncSession
     ) -> None:
-        """Trigger notifications when a task is updated."""
+        """Trigger notifications when a task is updated.
+        
+        The generic, status and assignment events for one edit share the
+        task's coalescing key, so project subscribers get a single delta frame.
+        """
         try:
+            from app.api.routes.websocket import (
+                notify_task_assigned, notify_task_status_changed, notify_task_updated
+            )
+            
             # Calculate what actually changed
             changes = {}
             for field, new_value in new_values.items():
@@ -104,6 +112,8 @@ class RealTimeNotificationService:
     ) -> None:
         """Trigger notifications when a comment is added."""
         try:
+            from app.api.routes.websocket import notify_comment_added
+            
             # Enhance comment data with user information
             enhanced_comment_data = {
                 **comment_data,
@@ -125,6 +135,8 @@ class RealTimeNotificationService:
     ) -> None:
         """Trigger notifications when a user is mentioned."""
         try:
+            from app.api.routes.websocket import notify_mention_created
+            
             # Enhance mention data with user information
             enhanced_mention_data = {
                 **mention_data,
@@ -174,6 +186,8 @@ class RealTimeNotificationService:
     ) -> None:
         """Trigger notifications when time tracking stops."""
         try:
+            from app.api.routes.websocket import notify_time_tracking_stopped
+            
             # Enhance time log data with user information
             enhanced_time_log_data = {
                 **time_log_data,
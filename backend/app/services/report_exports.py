@@ -0,0 +1,351 @@
+"""
+Chunked report exports.
+An export streams its report's underlying rows from the database in
+keyset-paginated chunks and appends each chunk to a CSV, JSONL or Parquet
+file, so neither the query result nor the file is ever held in memory.
+"""
+import asyncio
+import csv
+import enum
+import io
+import json
+import logging
+import os
+import re
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, and_, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+from app.core.config import settings
+from app.models.analytics import (
+    Report, ReportExport, ReportFormat, ReportJobStatus, ReportTemplate, ReportType
+)
+from app.models.project import Project
+from app.models.task import Task
+from app.models.time_tracking import TaskTimeLog
+from app.services.analytics_rollups import period_bounds
+
+logger = logging.getLogger(__name__)
+
+# Formats that can be streamed in chunks: file extension and content type
+EXPORT_FORMATS: Dict[ReportFormat, Tuple[str, str]] = {
+    ReportFormat.CSV: ("csv", "text/csv"),
+    ReportFormat.JSONL: ("jsonl", "application/x-ndjson"),
+    ReportFormat.PARQUET: ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+def parquet_available() -> bool:
+    """Parquet export needs the optional pyarrow package."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _cell(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+def flatten(data: Any, prefix: str = "") -> Iterator[Tuple[str, Any]]:
+    """Flatten nested report data into (dotted key, value) pairs."""
+    if isinstance(data, dict):
+        for key, value in data.items():
+            yield from flatten(value, f"{prefix}.{key}" if prefix else str(key))
+    elif isinstance(data, (list, tuple)):
+        for index, value in enumerate(data):
+            yield from flatten(value, f"{prefix}.{index}" if prefix else str(index))
+    else:
+        yield prefix, _cell(data)
+
+
+def csv_lines(rows: Iterable[Sequence[Any]]) -> Iterator[str]:
+    """Encode rows as CSV lines, one at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_cell(value) for value in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+# ============================================================================
+# Row sources
+# ============================================================================
+
+def _task_rows(report: Report) -> Select:
+    start, end = period_bounds(report.data_start_date, report.data_end_date)
+    return (
+        select(
+            Task.id, Task.project_id, Task.title, Task.status, Task.priority, Task.assignee_id,
+            Task.due_date, Task.estimated_hours, Task.actual_hours, Task.created_at, Task.updated_at
+        )
+        .join(Project, Project.id == Task.project_id)
+        .where(and_(
+            Project.organization_id == report.organization_id,
+            Task.is_active == True,
+            Task.created_at >= start,
+            Task.created_at < end
+        ))
+    )
+
+
+def _project_rows(report: Report) -> Select:
+    start, end = period_bounds(report.data_start_date, report.data_end_date)
+    return select(
+        Project.id, Project.name, Project.status, Project.priority,
+        Project.start_date, Project.end_date, Project.created_at
+    ).where(and_(
+        Project.organization_id == report.organization_id,
+        Project.created_at >= start,
+        Project.created_at < end
+    ))
+
+
+def _time_log_rows(report: Report) -> Select:
+    start, end = period_bounds(report.data_start_date, report.data_end_date)
+    return (
+        select(
+            TaskTimeLog.id, TaskTimeLog.task_id, Task.project_id, TaskTimeLog.user_id,
+            TaskTimeLog.start_time, TaskTimeLog.end_time, TaskTimeLog.duration_minutes,
+            TaskTimeLog.is_billable, TaskTimeLog.description
+        )
+        .join(Task, Task.id == TaskTimeLog.task_id)
+        .join(Project, Project.id == Task.project_id)
+        .where(and_(
+            Project.organization_id == report.organization_id,
+            TaskTimeLog.is_active == True,
+            TaskTimeLog.start_time >= start,
+            TaskTimeLog.start_time < end
+        ))
+    )
+
+
+# Rows exported for each report type; the first selected column is the row id
+EXPORT_SOURCES: Dict[ReportType, Callable[[Report], Select]] = {
+    ReportType.PROJECT_OVERVIEW: _project_rows,
+    ReportType.MILESTONE_TRACKING: _project_rows,
+    ReportType.TASK_ANALYTICS: _task_rows,
+    ReportType.TEAM_PERFORMANCE: _task_rows,
+    ReportType.TIME_TRACKING: _time_log_rows,
+    ReportType.USER_PRODUCTIVITY: _time_log_rows,
+    ReportType.RESOURCE_UTILIZATION: _time_log_rows,
+    ReportType.BUDGET_ANALYSIS: _time_log_rows,
+}
+
+
+# ============================================================================
+# Writers
+# ============================================================================
+
+class CsvExportWriter:
+    def __init__(self, path: str, columns: Sequence[Any]):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([column.key for column in columns])
+
+    def write(self, rows: List[Sequence[Any]]) -> None:
+        self.writer.writerows([[_cell(value) for value in row] for row in rows])
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class JsonlExportWriter:
+    def __init__(self, path: str, columns: Sequence[Any]):
+        self.file = open(path, "w", encoding="utf-8")
+        self.keys = [column.key for column in columns]
+
+    def write(self, rows: List[Sequence[Any]]) -> None:
+        self.file.writelines(
+            json.dumps({key: _cell(value) for key, value in zip(self.keys, row)}) + "\n"
+            for row in rows
+        )
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class ParquetExportWriter:
+    """Writes each chunk as a row group, with a schema taken from the column types."""
+
+    def __init__(self, path: str, columns: Sequence[Any]):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.schema = pa.schema([(column.key, self._arrow_type(column.type)) for column in columns])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def _arrow_type(self, column_type):
+        pa = self.pa
+        if isinstance(column_type, Boolean):
+            return pa.bool_()
+        if isinstance(column_type, Integer):
+            return pa.int64()
+        if isinstance(column_type, Float):
+            return pa.float64()
+        if isinstance(column_type, DateTime):
+            return pa.timestamp("us")
+        if isinstance(column_type, Date):
+            return pa.date32()
+        return pa.string()
+
+    def write(self, rows: List[Sequence[Any]]) -> None:
+        arrays = [
+            self.pa.array(
+                [value.value if isinstance(value, enum.Enum) else value for value in values],
+                type=field.type
+            )
+            for values, field in zip(zip(*rows), self.schema)
+        ]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+WRITERS = {
+    ReportFormat.CSV: CsvExportWriter,
+    ReportFormat.JSONL: JsonlExportWriter,
+    ReportFormat.PARQUET: ParquetExportWriter,
+}
+
+
+def export_filename(report: Report, export: ReportExport) -> str:
+    extension = EXPORT_FORMATS[ReportFormat(export.format)][0]
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", report.name).strip("-").lower() or "report"
+    return f"{slug}-{export.export_uuid[:8]}.{extension}"
+
+
+class ReportExporter:
+    """Writes report exports to local storage in chunks.
+
+    Rows are read ``chunk_size`` at a time by keyset pagination on the row id,
+    so no cursor stays open between chunks; after each chunk the export's
+    progress is committed and the worker's lease extended. Files are written
+    under a temporary name and renamed once complete.
+    """
+
+    def __init__(self, export_dir: Optional[str] = None, chunk_size: Optional[int] = None):
+        self.export_dir = export_dir or settings.REPORT_EXPORT_DIR
+        self.chunk_size = chunk_size or settings.REPORT_EXPORT_CHUNK_SIZE
+
+    def supports(self, report_type: ReportType, format: ReportFormat) -> bool:
+        if format == ReportFormat.PARQUET and not parquet_available():
+            return False
+        return ReportType(report_type) in EXPORT_SOURCES and ReportFormat(format) in EXPORT_FORMATS
+
+    async def run(self, db: AsyncSession, export_id: int, lease_seconds: int) -> None:
+        """Write an export file, recording progress on the export row."""
+        export = await db.get(ReportExport, export_id)
+        report = await db.get(Report, export.report_id)
+        template = await db.get(ReportTemplate, report.template_id)
+        started = time.monotonic()
+
+        report_id = report.id
+        export_format = ReportFormat(export.format)
+        extension, content_type = EXPORT_FORMATS[export_format]
+        path = os.path.join(self.export_dir, f"{export.export_uuid}.{extension}")
+        partial_path = f"{path}.part"
+        statement = EXPORT_SOURCES[ReportType(template.report_type)](report)
+        id_column = statement.selected_columns[0]
+
+        export.status = ReportJobStatus.RUNNING
+        export.progress = 0
+        export.row_count = 0
+        await db.commit()
+
+        try:
+            os.makedirs(self.export_dir, exist_ok=True)
+            total = (await db.execute(
+                select(func.count()).select_from(statement.subquery())
+            )).scalar() or 0
+
+            writer = await asyncio.to_thread(
+                WRITERS[export_format], partial_path, list(statement.selected_columns)
+            )
+            written = 0
+            last_id = None
+            try:
+                while True:
+                    chunk = statement
+                    if last_id is not None:
+                        chunk = chunk.where(id_column > last_id)
+                    rows = (await db.execute(chunk.order_by(id_column).limit(self.chunk_size))).all()
+                    if not rows:
+                        break
+
+                    await asyncio.to_thread(writer.write, rows)
+                    written += len(rows)
+                    last_id = rows[-1][0]
+                    await self._progress(db, export_id, written, total, lease_seconds)
+            finally:
+                await asyncio.to_thread(writer.close)
+
+            os.replace(partial_path, path)
+        except Exception as e:
+            logger.error(f"Report export {export_id} failed: {e}")
+            await db.rollback()
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            await db.execute(
+                update(ReportExport)
+                .where(ReportExport.id == export_id)
+                .values(
+                    status=ReportJobStatus.FAILED,
+                    error_message=str(e),
+                    locked_by=None,
+                    locked_until=None
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            return
+
+        await db.execute(
+            update(ReportExport)
+            .where(ReportExport.id == export_id)
+            .values(
+                status=ReportJobStatus.COMPLETED,
+                progress=100,
+                row_count=written,
+                file_path=path,
+                file_size_bytes=os.path.getsize(path),
+                content_type=content_type,
+                generation_duration_ms=int((time.monotonic() - started) * 1000),
+                completed_at=datetime.utcnow(),
+                locked_by=None,
+                locked_until=None
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        logger.info(f"Exported {written} rows of report {report_id} to {path}")
+
+    @staticmethod
+    async def _progress(db: AsyncSession, export_id: int, written: int, total: int, lease_seconds: int) -> None:
+        await db.execute(
+            update(ReportExport)
+            .where(ReportExport.id == export_id)
+            .values(
+                row_count=written,
+                progress=min(99, written * 100 // total) if total else 99,
+                locked_until=datetime.utcnow() + timedelta(seconds=lease_seconds)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+
+report_exporter = ReportExporter()
@@ -0,0 +1,164 @@
+"""
+Background report jobs.
+Report generation and exports are stored as queued rows and run by a pool
+of async workers, so request handlers only enqueue and return.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import get_async_session_maker
+from app.models.analytics import Report, ReportExport, ReportJobStatus
+from app.services.report_exports import ReportExporter, report_exporter
+
+if TYPE_CHECKING:
+    from app.services.analytics import ReportGenerationService
+
+logger = logging.getLogger(__name__)
+
+
+class ReportJobQueue:
+    """Worker pool running queued report generations and exports.
+
+    A job is ready when it is queued, or running under an expired lease
+    because its worker died. Claiming stamps ``locked_by``/``locked_until``;
+    exports extend their lease after every chunk. Generations are claimed
+    before exports, oldest first. An idle poll picks up jobs queued by
+    other processes or before a restart.
+    """
+
+    def __init__(
+        self,
+        service: "ReportGenerationService",
+        exporter: Optional[ReportExporter] = None,
+        worker_count: Optional[int] = None,
+        lease_seconds: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+    ):
+        self.service = service
+        self.exporter = exporter or report_exporter
+        self.worker_count = worker_count if worker_count is not None else settings.REPORT_WORKERS
+        self.lease_seconds = lease_seconds or settings.REPORT_LEASE_SECONDS
+        self.poll_interval = poll_interval or settings.REPORT_POLL_INTERVAL
+        self.session_factory = session_factory
+        self.node_id = uuid.uuid4().hex[:12]
+
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        """Start the workers."""
+        if self._tasks or self.worker_count <= 0:
+            return
+        if self.session_factory is None:
+            self.session_factory = get_async_session_maker()
+
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker(index)) for index in range(self.worker_count)
+        ]
+        logger.info(f"Started {self.worker_count} report workers")
+
+    async def stop(self) -> None:
+        """Stop the workers; jobs in flight are retried once their lease expires."""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def notify(self) -> None:
+        """Wake idle workers after jobs were queued."""
+        self._wakeup.set()
+
+    async def claim(self, session: AsyncSession, worker_id: str) -> Optional[Tuple[type, int]]:
+        """Lease the next ready job; returns (Report or ReportExport, id)."""
+        for model in (Report, ReportExport):
+            job_id = await self._claim(session, model, worker_id)
+            if job_id is not None:
+                return model, job_id
+        return None
+
+    async def run_job(self, session: AsyncSession, model: type, job_id: int) -> None:
+        if model is Report:
+            await self.service.run_generation(session, job_id)
+        else:
+            await self.exporter.run(session, job_id, self.lease_seconds)
+
+    async def _claim(self, session: AsyncSession, model: type, worker_id: str) -> Optional[int]:
+        now = datetime.utcnow()
+        ready = self._ready_clause(model, now)
+
+        candidates = select(model.id).where(ready).order_by(model.id).limit(1)
+        if session.bind.dialect.name != "sqlite":
+            candidates = candidates.with_for_update(skip_locked=True)
+
+        job_id = (await session.execute(candidates)).scalar()
+        if job_id is None:
+            await session.commit()
+            return None
+
+        # Re-check readiness: without row locks another process may have won
+        result = await session.execute(
+            update(model)
+            .where(and_(model.id == job_id, ready))
+            .values(
+                locked_by=worker_id,
+                locked_until=now + timedelta(seconds=self.lease_seconds)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        return job_id if result.rowcount == 1 else None
+
+    async def _worker(self, index: int) -> None:
+        worker_id = f"{self.node_id}:{index}"
+        async with self.session_factory() as session:
+            while True:
+                try:
+                    claimed = await self.claim(session, worker_id)
+                except Exception as e:
+                    logger.error(f"Report worker {worker_id} failed to claim a job: {e}")
+                    await session.rollback()
+                    claimed = None
+
+                if claimed is None:
+                    await self._wait_for_work()
+                    continue
+
+                model, job_id = claimed
+                try:
+                    await self.run_job(session, model, job_id)
+                except Exception as e:
+                    # The lease stays in place and the job is retried after it expires
+                    logger.error(f"Error running {model.__tablename__} job {job_id}: {e}")
+                    await session.rollback()
+                finally:
+                    session.expunge_all()
+
+    async def _wait_for_work(self) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    @staticmethod
+    def _ready_clause(model: type, now: datetime):
+        return or_(
+            and_(
+                model.status == ReportJobStatus.QUEUED,
+                or_(model.locked_until.is_(None), model.locked_until < now)
+            ),
+            and_(model.status == ReportJobStatus.RUNNING, model.locked_until < now)
+        )
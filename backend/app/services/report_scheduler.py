@@ -0,0 +1,588 @@
+"""
+Report schedule and alert scheduler.
+One node at a time, elected through a database lease, scans due report
+schedules and alerts and hands them to a bounded worker pool. Schedules
+queue background report generation; alerts are evaluated against the
+analytics rollups rather than raw task and time log rows.
+"""
+import asyncio
+import calendar
+import logging
+import operator
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import get_async_session_maker
+from app.core.timing_wheel import HierarchicalTimingWheel
+from app.core.websocket import MessageType, get_connection_manager
+from app.models.analytics import (
+    ReportAlert, ReportFormat, ReportFrequency, ReportSchedule, ReportTemplate, SchedulerLease
+)
+from app.models.user import User
+from app.schemas.analytics import DateRangeRequest, ReportExportRequest, ReportGenerationRequest
+from app.services.analytics import ReportGenerationService, report_generation_service
+from app.services.analytics_batch import BATCH_METRICS
+from app.services.analytics_rollups import analytics_rollups
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = "report-scheduler"
+
+# Months a schedule of each frequency can run in
+FREQUENCY_MONTHS = {
+    ReportFrequency.MONTHLY: tuple(range(1, 13)),
+    ReportFrequency.QUARTERLY: (1, 4, 7, 10),
+    ReportFrequency.YEARLY: (1,),
+}
+
+# Days of data covered by each scheduled run
+PERIOD_DAYS = {
+    ReportFrequency.DAILY: 1,
+    ReportFrequency.WEEKLY: 7,
+    ReportFrequency.MONTHLY: 30,
+    ReportFrequency.QUARTERLY: 91,
+    ReportFrequency.YEARLY: 365,
+}
+
+THRESHOLD_OPERATORS: Dict[str, Callable[[float, float], bool]] = {
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+# ============================================================================
+# Next run computation
+# ============================================================================
+
+class CronExpression:
+    """Five-field cron expression: minute, hour, day of month, month, day of week.
+
+    Fields accept ``*``, numbers, ranges, lists and ``/`` steps; day of week
+    runs 0-6 from Sunday, 7 also meaning Sunday. As in cron, when both day
+    fields are restricted a day matching either one matches.
+    """
+
+    RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self._parse(field, low, high) for field, (low, high) in zip(fields, self.RANGES)
+        )
+        self.weekdays = {day % 7 for day in weekdays}
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    @staticmethod
+    def _parse(field: str, low: int, high: int) -> Set[int]:
+        values: Set[int] = set()
+        for part in field.split(","):
+            spec, _, step = part.partition("/")
+            if spec == "*":
+                start, end = low, high
+            elif "-" in spec:
+                start, end = (int(value) for value in spec.split("-", 1))
+            else:
+                start = int(spec)
+                end = high if step else start
+            if start < low or end > high or start > end:
+                raise ValueError(f"Cron field out of range: {field!r}")
+            values.update(range(start, end + 1, int(step) if step else 1))
+        return values
+
+    def _day_matches(self, day: date) -> bool:
+        in_month = day.day in self.days
+        in_week = (day.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return in_month and in_week
+        return in_month or in_week
+
+    def next_after(self, after: datetime) -> datetime:
+        """First matching minute strictly after ``after`` (naive, same wall clock)."""
+        candidate = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year, month = divmod(candidate.month, 12)
+                candidate = datetime(candidate.year + year, month + 1, 1)
+            elif not self._day_matches(candidate.date()):
+                candidate = datetime.combine(candidate.date() + timedelta(days=1), datetime.min.time())
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression never matches: {self.expression!r}")
+
+
+def _zone(name: Optional[str]) -> ZoneInfo:
+    try:
+        return ZoneInfo(name or "UTC")
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning(f"Unknown schedule timezone {name!r}, using UTC")
+        return ZoneInfo("UTC")
+
+
+def _scheduled_time(value: Optional[str]) -> Tuple[int, int]:
+    if not value:
+        return 0, 0
+    hour, _, minute = value.partition(":")
+    return int(hour), int(minute or 0)
+
+
+def _next_by_frequency(schedule: ReportSchedule, after: datetime) -> Optional[datetime]:
+    frequency = ReportFrequency(schedule.frequency)
+    hour, minute = _scheduled_time(schedule.scheduled_time)
+
+    def at(day: date) -> datetime:
+        return datetime(day.year, day.month, day.day, hour, minute)
+
+    if frequency == ReportFrequency.DAILY:
+        candidate = at(after.date())
+        return candidate if candidate > after else candidate + timedelta(days=1)
+
+    if frequency == ReportFrequency.WEEKLY:
+        weekday = schedule.scheduled_day if schedule.scheduled_day is not None else 0
+        candidate = at(after.date() + timedelta(days=(weekday - after.weekday()) % 7))
+        return candidate if candidate > after else candidate + timedelta(days=7)
+
+    months = FREQUENCY_MONTHS.get(frequency)
+    if not months:
+        return None  # Manual schedules only run on demand
+
+    # Days past the end of a month run on its last day
+    day_of_month = schedule.scheduled_day or 1
+    year, month = after.year, after.month
+    for _ in range(13):
+        if month in months:
+            day = min(day_of_month, calendar.monthrange(year, month)[1])
+            candidate = at(date(year, month, day))
+            if candidate > after:
+                return candidate
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return None
+
+
+def next_run_time(schedule: ReportSchedule, after: datetime) -> Optional[datetime]:
+    """Next run of a schedule after ``after`` (naive UTC), in naive UTC.
+
+    A ``cron`` expression in the schedule parameters takes precedence over
+    its frequency. Both are evaluated in the schedule's timezone.
+    """
+    zone = _zone(schedule.timezone)
+    local_after = after.replace(tzinfo=timezone.utc).astimezone(zone).replace(tzinfo=None)
+
+    cron = (schedule.parameters or {}).get("cron")
+    if cron:
+        local_next = CronExpression(cron).next_after(local_after)
+    else:
+        local_next = _next_by_frequency(schedule, local_after)
+    if local_next is None:
+        return None
+
+    return local_next.replace(tzinfo=zone).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+# ============================================================================
+# Alert evaluation
+# ============================================================================
+
+async def evaluate_alerts(
+    db: AsyncSession,
+    organization_id: int,
+    alert_ids: List[int],
+    now: Optional[datetime] = None
+) -> List[ReportAlert]:
+    """Evaluate an organization's alerts from rollups; returns the alerts that fired.
+
+    Alerts sharing an evaluation window share one rollup query. ``absolute``
+    thresholds compare the metric itself, ``change`` its difference from
+    the previous window and ``percentage`` that difference relative to the
+    previous value. An alert fires when its threshold has been crossed on
+    ``consecutive_periods`` evaluations in a row, and again only after a
+    clear evaluation.
+    """
+    now = now or datetime.utcnow()
+    result = await db.execute(select(ReportAlert).where(ReportAlert.id.in_(alert_ids)))
+    alerts = result.scalars().all()
+
+    totals: Dict[Tuple[Optional[datetime], datetime], Dict[str, int]] = {}
+    planned: Dict[Tuple[Optional[datetime], datetime], Set[str]] = {}
+
+    def window(alert: ReportAlert, periods_back: int) -> Tuple[Optional[datetime], datetime]:
+        length = timedelta(hours=alert.evaluation_window or 24)
+        end = now - length * periods_back
+        return (end - length if BATCH_METRICS[alert.metric_name].period else None), end
+
+    evaluable = [alert for alert in alerts if alert.metric_name in BATCH_METRICS]
+    for alert in evaluable:
+        windows = [window(alert, 0)]
+        if alert.threshold_type in ("change", "percentage"):
+            windows.append(window(alert, 1))
+        for key in windows:
+            planned.setdefault(key, set()).update(BATCH_METRICS[alert.metric_name].counters)
+
+    for (start, end), counters in planned.items():
+        totals[(start, end)] = await analytics_rollups.totals(
+            db, organization_id, start, end, counters=sorted(counters)
+        )
+
+    fired = []
+    for alert in alerts:
+        alert.last_evaluated_at = now
+        metric = BATCH_METRICS.get(alert.metric_name)
+        compare = THRESHOLD_OPERATORS.get(alert.threshold_operator)
+        if metric is None or compare is None:
+            logger.warning(f"Report alert {alert.id} cannot be evaluated from rollups")
+            continue
+
+        days = (alert.evaluation_window or 24) / 24
+        value = metric.compute(totals[window(alert, 0)], days)
+        observed = value
+        if alert.threshold_type in ("change", "percentage"):
+            previous = metric.compute(totals[window(alert, 1)], days)
+            observed = value - previous
+            if alert.threshold_type == "percentage":
+                observed = (observed / previous) * 100 if previous else 0.0
+
+        alert.last_value = value
+        if compare(observed, alert.threshold_value):
+            alert.consecutive_breaches = (alert.consecutive_breaches or 0) + 1
+            if alert.consecutive_breaches == (alert.consecutive_periods or 1):
+                alert.last_triggered_at = now
+                alert.trigger_count = (alert.trigger_count or 0) + 1
+                fired.append(alert)
+        else:
+            alert.consecutive_breaches = 0
+
+    await db.commit()
+    return fired
+
+
+async def _notify_alert(alert: ReportAlert) -> None:
+    data = {
+        "alert_id": alert.id,
+        "name": alert.name,
+        "metric": alert.metric_name,
+        "value": alert.last_value,
+        "threshold": alert.threshold_value,
+        "operator": alert.threshold_operator,
+        "severity": alert.severity_level,
+        "message": alert.notification_template or f"{alert.name}: {alert.metric_name} is {alert.last_value:g}",
+    }
+    connection_manager = get_connection_manager()
+    for recipient in alert.notification_recipients or []:
+        if isinstance(recipient, int):
+            try:
+                await connection_manager.send_to_user(recipient, MessageType.NOTIFICATION, data)
+            except Exception as e:
+                logger.error(f"Error notifying user {recipient} of report alert {alert.id}: {e}")
+
+
+# ============================================================================
+# Scheduler
+# ============================================================================
+
+class ReportScheduler:
+    """Leader-elected scheduler for report schedules and alerts.
+
+    * Every node runs the loop, but only the holder of the ``scheduler_leases``
+      row scans; the lease is renewed on each pass and taken over by another
+      node once it expires.
+    * Due schedules are found through the ``(is_active, next_run_at)`` index.
+      Each is claimed by moving ``next_run_at`` forward with a conditional
+      update, so a run is dispatched once even across a leadership change,
+      then queued to the worker pool. Schedules due before the next scan are
+      armed on a timing wheel that wakes the loop on time.
+    * Alerts are due every ``REPORT_ALERT_INTERVAL`` seconds and evaluated
+      per organization from the rollups.
+    """
+
+    def __init__(
+        self,
+        service: ReportGenerationService,
+        worker_count: Optional[int] = None,
+        leader_ttl: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        alert_interval: Optional[int] = None,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.service = service
+        self.worker_count = (
+            worker_count if worker_count is not None else settings.REPORT_SCHEDULER_WORKERS
+        )
+        self.leader_ttl = leader_ttl or settings.REPORT_SCHEDULER_LEADER_TTL
+        self.poll_interval = poll_interval or settings.REPORT_SCHEDULER_POLL_INTERVAL
+        self.batch_size = batch_size or settings.REPORT_SCHEDULER_BATCH_SIZE
+        self.alert_interval = alert_interval or settings.REPORT_ALERT_INTERVAL
+        self.session_factory = session_factory
+        self.clock = clock
+        self.node_id = uuid.uuid4().hex[:12]
+        self.is_leader = False
+
+        self.wheel = HierarchicalTimingWheel(tick_seconds=1.0, start_time=clock())
+        self.jobs: asyncio.Queue = asyncio.Queue(maxsize=max(1, self.worker_count) * 4)
+
+        # Alert batches queued or running, by organization
+        self._alerts_in_flight: Set[int] = set()
+
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        """Start the scheduling loop, its timer and the workers."""
+        if self._tasks or self.worker_count <= 0:
+            return
+        if self.session_factory is None:
+            self.session_factory = get_async_session_maker()
+
+        self._wakeup = asyncio.Event()
+        self.jobs = asyncio.Queue(maxsize=self.worker_count * 4)
+        self._tasks = [
+            asyncio.create_task(self._worker(index)) for index in range(self.worker_count)
+        ]
+        self._tasks.append(asyncio.create_task(self._run_timers()))
+        self._tasks.append(asyncio.create_task(self._run()))
+        logger.info(f"Started report scheduler with {self.worker_count} workers")
+
+    async def stop(self) -> None:
+        """Stop the scheduler and give up leadership."""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        if self.is_leader and self.session_factory is not None:
+            async with self.session_factory() as session:
+                await session.execute(
+                    update(SchedulerLease)
+                    .where(and_(SchedulerLease.name == LEASE_NAME, SchedulerLease.holder == self.node_id))
+                    .values(expires_at=datetime.utcnow())
+                )
+                await session.commit()
+        self.is_leader = False
+
+    def notify(self) -> None:
+        """Wake the loop after schedules or alerts changed."""
+        self._wakeup.set()
+
+    async def elect(self, session: AsyncSession) -> bool:
+        """Acquire or renew the scheduler lease; returns whether this node leads."""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.leader_ttl)
+
+        result = await session.execute(
+            update(SchedulerLease)
+            .where(and_(
+                SchedulerLease.name == LEASE_NAME,
+                or_(SchedulerLease.holder == self.node_id, SchedulerLease.expires_at < now)
+            ))
+            .values(holder=self.node_id, expires_at=expires_at)
+            .execution_options(synchronize_session=False)
+        )
+        leader = result.rowcount == 1
+        if not leader:
+            held = (await session.execute(
+                select(SchedulerLease.name).where(SchedulerLease.name == LEASE_NAME)
+            )).scalar()
+            if held is None:
+                session.add(SchedulerLease(name=LEASE_NAME, holder=self.node_id, expires_at=expires_at))
+                leader = True
+        try:
+            await session.commit()
+        except IntegrityError:
+            # Another node created the lease first
+            await session.rollback()
+            leader = False
+
+        if leader != self.is_leader:
+            logger.info(f"Report scheduler node {self.node_id} {'acquired' if leader else 'lost'} leadership")
+        self.is_leader = leader
+        return leader
+
+    async def dispatch_due_schedules(self, session: AsyncSession) -> List[int]:
+        """Claim due schedules and queue their runs; returns the claimed ids."""
+        now = datetime.utcnow()
+        horizon = now + timedelta(seconds=self.poll_interval)
+        result = await session.execute(
+            select(ReportSchedule)
+            .where(and_(
+                ReportSchedule.is_active == True,
+                ReportSchedule.next_run_at <= horizon
+            ))
+            .order_by(ReportSchedule.next_run_at)
+            .limit(self.batch_size)
+        )
+
+        claimed = []
+        for schedule in result.scalars().all():
+            if schedule.next_run_at > now:
+                self.wheel.schedule(
+                    schedule.id, (schedule.next_run_at - now).total_seconds(), self.clock()
+                )
+                continue
+
+            try:
+                next_run_at = next_run_time(schedule, now)
+            except ValueError as e:
+                logger.error(f"Report schedule {schedule.id} has an invalid cron expression: {e}")
+                next_run_at = None
+
+            updated = await session.execute(
+                update(ReportSchedule)
+                .where(and_(
+                    ReportSchedule.id == schedule.id,
+                    ReportSchedule.next_run_at == schedule.next_run_at
+                ))
+                .values(next_run_at=next_run_at, last_run_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+            if updated.rowcount == 1:
+                claimed.append(schedule.id)
+
+        for schedule_id in claimed:
+            await self.jobs.put(("schedule", schedule_id))
+        return claimed
+
+    async def dispatch_due_alerts(self, session: AsyncSession) -> Dict[int, List[int]]:
+        """Queue one evaluation per organization with due alerts."""
+        now = datetime.utcnow()
+        result = await session.execute(
+            select(ReportAlert.id, ReportAlert.organization_id)
+            .where(and_(
+                ReportAlert.is_active == True,
+                or_(
+                    ReportAlert.last_evaluated_at.is_(None),
+                    ReportAlert.last_evaluated_at <= now - timedelta(seconds=self.alert_interval)
+                ),
+                or_(
+                    ReportAlert.is_snoozed == False,
+                    ReportAlert.snoozed_until < now
+                )
+            ))
+        )
+        await session.commit()
+
+        batches: Dict[int, List[int]] = {}
+        for alert_id, organization_id in result.all():
+            if organization_id not in self._alerts_in_flight:
+                batches.setdefault(organization_id, []).append(alert_id)
+
+        for organization_id, alert_ids in batches.items():
+            self._alerts_in_flight.add(organization_id)
+            await self.jobs.put(("alerts", (organization_id, alert_ids)))
+        return batches
+
+    async def run_schedule(self, session: AsyncSession, schedule_id: int) -> None:
+        """Queue the report of one schedule run, plus its automatic exports."""
+        schedule = await session.get(ReportSchedule, schedule_id)
+        try:
+            template = await session.get(ReportTemplate, schedule.template_id)
+            user = await session.get(User, schedule.created_by)
+            parameters = schedule.parameters or {}
+            frequency = ReportFrequency(schedule.frequency)
+
+            end = datetime.utcnow().date()
+            days = parameters.get("period_days") or PERIOD_DAYS.get(frequency, 1)
+            request = ReportGenerationRequest(
+                template_id=template.id,
+                name=f"{schedule.name} - {end.isoformat()}",
+                description=schedule.description,
+                date_range=DateRangeRequest(start_date=end - timedelta(days=days), end_date=end),
+                filters=parameters.get("filters", []),
+                include_raw_data=parameters.get("include_raw_data", False)
+            )
+            report = await self.service.generate_report(template, request, user, session)
+
+            for export_format in schedule.auto_export_formats or []:
+                await self.service.request_export(
+                    session, report, schedule.created_by,
+                    ReportExportRequest(format=ReportFormat(export_format))
+                )
+
+            schedule.run_count = (schedule.run_count or 0) + 1
+            await session.commit()
+        except Exception as e:
+            logger.error(f"Report schedule {schedule_id} failed: {e}")
+            await session.rollback()
+            schedule = await session.get(ReportSchedule, schedule_id)
+            schedule.failure_count = (schedule.failure_count or 0) + 1
+            schedule.last_failure_reason = str(e)
+            await session.commit()
+
+    async def run_alerts(self, session: AsyncSession, organization_id: int, alert_ids: List[int]) -> None:
+        try:
+            fired = await evaluate_alerts(session, organization_id, alert_ids)
+            for alert in fired:
+                await _notify_alert(alert)
+        finally:
+            self._alerts_in_flight.discard(organization_id)
+
+    async def _run(self) -> None:
+        async with self.session_factory() as session:
+            while True:
+                try:
+                    if await self.elect(session):
+                        await self.dispatch_due_schedules(session)
+                        await self.dispatch_due_alerts(session)
+                except Exception as e:
+                    logger.error(f"Report scheduler pass failed: {e}")
+                    await session.rollback()
+                finally:
+                    session.expunge_all()
+                await self._wait(min(self.poll_interval, self.leader_ttl / 3))
+
+    async def _worker(self, index: int) -> None:
+        async with self.session_factory() as session:
+            while True:
+                kind, payload = await self.jobs.get()
+                try:
+                    if kind == "schedule":
+                        await self.run_schedule(session, payload)
+                    else:
+                        await self.run_alerts(session, *payload)
+                except Exception as e:
+                    logger.error(f"Report scheduler worker {index} failed on {kind} {payload}: {e}")
+                    await session.rollback()
+                finally:
+                    session.expunge_all()
+                    self.jobs.task_done()
+
+    async def _wait(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _run_timers(self) -> None:
+        while True:
+            await asyncio.sleep(self.wheel.tick_seconds)
+            if self.wheel.advance(self.clock()):
+                self.notify()
+
+
+report_scheduler = ReportScheduler(report_generation_service)
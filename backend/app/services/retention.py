@@ -0,0 +1,216 @@
+"""
+Retention cleanup for high-volume log tables.
+Old rows are deleted in small set-based chunks, each in its own short
+transaction, with a pause between chunks so cleanup never holds long locks
+or loads a whole table into memory. Rows can be archived to gzipped JSONL
+before they are deleted.
+"""
+import asyncio
+import enum
+import gzip
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.file_management import FileDownload
+from app.models.search import SearchHistory
+from app.models.security import AuditLog, LoginAttempt
+from app.models.webhooks import DeliveryStatus, WebhookDelivery, WebhookDeliveryEvent, WebhookEvent
+from app.models.workflow import ExecutionStatus, WorkflowExecution
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RetentionPolicy:
+    """Rows of ``model`` older than ``days`` (by ``timestamp``) are purged."""
+    name: str
+    model: Any
+    timestamp: str
+    days: int
+    # Extra conditions a row must meet to be purged, e.g. a final status
+    conditions: Callable[[], List[Any]] = field(default=lambda: [])
+    # Child rows deleted with their parents: (model, foreign key column name).
+    # Chunk deletes are Core statements, so ORM cascades never run, and
+    # SQLite only honours ON DELETE CASCADE with foreign keys enabled.
+    children: List[Tuple[Any, str]] = field(default_factory=list)
+
+    def clause(self, cutoff: datetime):
+        column = getattr(self.model, self.timestamp)
+        return and_(column < cutoff, *self.conditions())
+
+
+@dataclass
+class RetentionResult:
+    """Outcome of purging one policy."""
+    policy: str
+    deleted: int = 0
+    batches: int = 0
+    archive_path: Optional[str] = None
+
+
+def default_policies() -> List[RetentionPolicy]:
+    return [
+        RetentionPolicy(
+            "webhook_deliveries", WebhookDelivery, "completed_at",
+            settings.RETENTION_WEBHOOK_DELIVERY_DAYS,
+            lambda: [WebhookDelivery.status.in_([
+                DeliveryStatus.DELIVERED.value, DeliveryStatus.FAILED.value
+            ])],
+            children=[(WebhookDeliveryEvent, "delivery_id")]
+        ),
+        RetentionPolicy(
+            "webhook_events", WebhookEvent, "created_at",
+            settings.RETENTION_WEBHOOK_EVENT_DAYS,
+            lambda: [WebhookEvent.is_processed.is_(True)]
+        ),
+        RetentionPolicy(
+            "workflow_executions", WorkflowExecution, "started_at",
+            settings.RETENTION_WORKFLOW_EXECUTION_DAYS,
+            lambda: [WorkflowExecution.status != ExecutionStatus.PENDING]
+        ),
+        RetentionPolicy("audit_logs", AuditLog, "created_at", settings.RETENTION_AUDIT_LOG_DAYS),
+        RetentionPolicy(
+            "search_history", SearchHistory, "searched_at", settings.RETENTION_SEARCH_HISTORY_DAYS
+        ),
+        RetentionPolicy(
+            "login_attempts", LoginAttempt, "created_at", settings.RETENTION_LOGIN_ATTEMPT_DAYS
+        ),
+        RetentionPolicy(
+            "file_downloads", FileDownload, "downloaded_at", settings.RETENTION_FILE_DOWNLOAD_DAYS
+        ),
+    ]
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return str(value)
+
+
+class RetentionEngine:
+    """Chunked, throttled deletion of rows past their retention period.
+
+    Each chunk selects up to ``n`` expired ids, deletes their child rows
+    and then the rows themselves, and is committed on its own. When
+    archiving, the chunk's rows are read and appended to the policy's
+    archive file first, and exactly those ids are deleted. Archive files
+    are concatenated gzip members, readable with ``gzip.open``.
+    """
+
+    def __init__(
+        self,
+        policies: Optional[List[RetentionPolicy]] = None,
+        batch_size: Optional[int] = None,
+        pause_seconds: Optional[float] = None,
+        archive_dir: Optional[str] = None,
+    ):
+        self.policies = {policy.name: policy for policy in (policies or default_policies())}
+        self.batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+        self.pause_seconds = (
+            pause_seconds if pause_seconds is not None else settings.RETENTION_BATCH_PAUSE_MS / 1000
+        )
+        self.archive_dir = archive_dir if archive_dir is not None else settings.RETENTION_ARCHIVE_DIR
+
+    async def run(self, db: AsyncSession, archive: bool = False) -> Dict[str, RetentionResult]:
+        """Purge every policy."""
+        if archive and not self.archive_dir:
+            raise ValueError("RETENTION_ARCHIVE_DIR is not configured")
+
+        results = {}
+        for name in self.policies:
+            try:
+                results[name] = await self.purge(db, name, archive=archive)
+            except Exception as e:
+                logger.error(f"Retention cleanup of {name} failed: {e}")
+                await db.rollback()
+        return results
+
+    async def purge(
+        self,
+        db: AsyncSession,
+        name: str,
+        days: Optional[int] = None,
+        archive: bool = False,
+    ) -> RetentionResult:
+        """Delete one policy's expired rows chunk by chunk."""
+        policy = self.policies[name]
+        cutoff = datetime.utcnow() - timedelta(days=days if days is not None else policy.days)
+        where = policy.clause(cutoff)
+        model = policy.model
+        result = RetentionResult(policy=name)
+
+        if archive:
+            if not self.archive_dir:
+                raise ValueError("RETENTION_ARCHIVE_DIR is not configured")
+            os.makedirs(self.archive_dir, exist_ok=True)
+            result.archive_path = os.path.join(
+                self.archive_dir,
+                f"{model.__tablename__}-{datetime.utcnow():%Y%m%dT%H%M%S}.jsonl.gz"
+            )
+
+        while True:
+            if archive:
+                ids = await self._archive_chunk(db, model, where, result.archive_path)
+            else:
+                chunk = select(model.id).where(where).order_by(model.id).limit(self.batch_size)
+                ids = list((await db.execute(chunk)).scalars())
+            deleted = await self._delete_ids(db, policy, ids)
+            await db.commit()
+
+            result.deleted += deleted
+            result.batches += 1
+            if deleted < self.batch_size:
+                break
+            await asyncio.sleep(self.pause_seconds)
+
+        if not result.deleted:
+            result.archive_path = None
+        else:
+            logger.info(f"Retention removed {result.deleted} {name} rows in {result.batches} batches")
+        return result
+
+    async def _archive_chunk(self, db: AsyncSession, model, where, path: str) -> List[int]:
+        query = select(model.__table__).where(where).order_by(model.id).limit(self.batch_size)
+        rows = (await db.execute(query)).mappings().all()
+        if not rows:
+            return []
+
+        lines = [json.dumps(dict(row), default=_json_value) for row in rows]
+        await asyncio.to_thread(self._append_archive, path, lines)
+        return [row["id"] for row in rows]
+
+    @staticmethod
+    async def _delete_ids(db: AsyncSession, policy: RetentionPolicy, ids: List[int]) -> int:
+        if not ids:
+            return 0
+        for child, foreign_key in policy.children:
+            await db.execute(
+                delete(child)
+                .where(getattr(child, foreign_key).in_(ids))
+                .execution_options(synchronize_session=False)
+            )
+        outcome = await db.execute(
+            delete(policy.model)
+            .where(policy.model.id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+        return outcome.rowcount
+
+    @staticmethod
+    def _append_archive(path: str, lines: List[str]) -> None:
+        with gzip.open(path, "at", encoding="utf-8") as archive:
+            for line in lines:
+                archive.write(line + "\n")
+
+
+retention_engine = RetentionEngine()
@@ -0,0 +1,223 @@
+"""
+Time tracking rollups.
+Time log writes add their minutes, billable minutes and entry counts to a
+per user, task and day row inside the writer's transaction. Timesheets,
+daily summaries and project breakdowns then read those rows, a whole team
+and date range in one grouped query, instead of aggregating raw logs.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, desc, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import dialect_insert
+from app.models.task import Task
+from app.models.time_tracking import TaskTimeLog, TimeLogRollup
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+COUNTERS: Tuple[str, ...] = ("minutes", "billable_minutes", "entries")
+
+# (user_id, task_id, day)
+RollupKey = Tuple[int, int, date]
+
+
+@dataclass(frozen=True)
+class TimeLogState:
+    """The time log fields rollups depend on, captured before and after a write."""
+    user_id: int
+    task_id: int
+    start_time: datetime
+    duration_minutes: int
+    is_billable: bool
+
+    @classmethod
+    def from_time_log(cls, time_log: TaskTimeLog) -> Optional["TimeLogState"]:
+        """The log's state, or None while it is running or once it is deleted."""
+        if time_log.end_time is None or time_log.is_active is False:
+            return None
+        return cls(
+            user_id=time_log.user_id,
+            task_id=time_log.task_id,
+            start_time=time_log.start_time,
+            duration_minutes=time_log.duration_minutes or 0,
+            is_billable=bool(time_log.is_billable)
+        )
+
+    @property
+    def key(self) -> RollupKey:
+        return self.user_id, self.task_id, self.start_time.date()
+
+    def counters(self, sign: int = 1) -> Dict[str, int]:
+        return {
+            "minutes": sign * self.duration_minutes,
+            "billable_minutes": sign * self.duration_minutes if self.is_billable else 0,
+            "entries": sign,
+        }
+
+
+def empty_cell() -> Dict[str, int]:
+    return {"total_minutes": 0, "billable_minutes": 0, "entries_count": 0, "tasks_count": 0}
+
+
+class TimeRollupStore:
+    """Reads and writes TimeLogRollup rows.
+
+    Writes are upserts adding to the stored counters on the caller's
+    session, so they commit or roll back with the time log change.
+    """
+
+    async def record(
+        self, db: AsyncSession, before: Optional[TimeLogState], after: Optional[TimeLogState]
+    ) -> None:
+        """Apply a time log creation, stop, edit or deletion to the rollups."""
+        if before == after:
+            return
+        deltas: Dict[RollupKey, Dict[str, int]] = {}
+        for state, sign in ((before, -1), (after, 1)):
+            if state is None:
+                continue
+            target = deltas.setdefault(state.key, dict.fromkeys(COUNTERS, 0))
+            for counter, amount in state.counters(sign).items():
+                target[counter] += amount
+        await self._apply(db, deltas)
+
+    async def user_day_matrix(
+        self, db: AsyncSession, user_ids: Iterable[int], start: date, end: date
+    ) -> Dict[int, Dict[date, Dict[str, int]]]:
+        """Totals per user and day within ``[start, end]``, for many users in one query.
+
+        Only users and days with rows are present.
+        """
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        result = await db.execute(
+            select(
+                TimeLogRollup.user_id,
+                TimeLogRollup.day,
+                func.sum(TimeLogRollup.minutes),
+                func.sum(TimeLogRollup.billable_minutes),
+                func.sum(TimeLogRollup.entries),
+                func.count().filter(TimeLogRollup.entries > 0)
+            )
+            .where(and_(
+                TimeLogRollup.user_id.in_(user_ids),
+                TimeLogRollup.day >= start,
+                TimeLogRollup.day <= end
+            ))
+            .group_by(TimeLogRollup.user_id, TimeLogRollup.day)
+        )
+
+        matrix: Dict[int, Dict[date, Dict[str, int]]] = {}
+        for user_id, day, minutes, billable, entries, tasks in result:
+            if not entries:
+                continue
+            matrix.setdefault(user_id, {})[day] = {
+                "total_minutes": int(minutes),
+                "billable_minutes": int(billable),
+                "entries_count": int(entries),
+                "tasks_count": int(tasks)
+            }
+        return matrix
+
+    async def project_breakdown(
+        self, db: AsyncSession, project_id: int, start: Optional[date] = None, end: Optional[date] = None
+    ) -> List[Dict[str, Any]]:
+        """Totals per user on a project's tasks, most time first."""
+        total = func.sum(TimeLogRollup.minutes).label("total_minutes")
+        conditions = [Task.project_id == project_id]
+        if start is not None:
+            conditions.append(TimeLogRollup.day >= start)
+        if end is not None:
+            conditions.append(TimeLogRollup.day <= end)
+
+        result = await db.execute(
+            select(
+                TimeLogRollup.user_id,
+                User.first_name,
+                User.last_name,
+                total,
+                func.sum(TimeLogRollup.billable_minutes),
+                func.sum(TimeLogRollup.entries)
+            )
+            .join(Task, Task.id == TimeLogRollup.task_id)
+            .join(User, User.id == TimeLogRollup.user_id)
+            .where(and_(*conditions))
+            .group_by(TimeLogRollup.user_id, User.first_name, User.last_name)
+            .having(func.sum(TimeLogRollup.entries) > 0)
+            .order_by(desc(total))
+        )
+        return [
+            {
+                "user_id": user_id,
+                "user_name": f"{first_name} {last_name}",
+                "total_minutes": int(minutes),
+                "billable_minutes": int(billable),
+                "entries_count": int(entries)
+            }
+            for user_id, first_name, last_name, minutes, billable, entries in result
+        ]
+
+    async def rebuild(self, db: AsyncSession, user_ids: Optional[Iterable[int]] = None) -> int:
+        """Recompute rollups from finished time logs, for some users or everyone.
+
+        Used to backfill logs written before rollups existed. Returns the rows written.
+        """
+        user_ids = list(user_ids) if user_ids is not None else None
+        conditions = [TaskTimeLog.is_active == True, TaskTimeLog.end_time.isnot(None)]
+        if user_ids is not None:
+            conditions.append(TaskTimeLog.user_id.in_(user_ids))
+
+        deltas: Dict[RollupKey, Dict[str, int]] = {}
+        logs = await db.stream(
+            select(TaskTimeLog).where(and_(*conditions)).execution_options(yield_per=1000)
+        )
+        async for time_log in logs.scalars():
+            state = TimeLogState.from_time_log(time_log)
+            target = deltas.setdefault(state.key, dict.fromkeys(COUNTERS, 0))
+            for counter, amount in state.counters().items():
+                target[counter] += amount
+
+        statement = delete(TimeLogRollup)
+        if user_ids is not None:
+            statement = statement.where(TimeLogRollup.user_id.in_(user_ids))
+        await db.execute(statement)
+        rows = self._rows(deltas)
+        for offset in range(0, len(rows), 500):
+            await db.execute(self._upsert(db, rows[offset:offset + 500]))
+        await db.commit()
+
+        logger.info(f"Rebuilt {len(rows)} time log rollup rows")
+        return len(rows)
+
+    async def _apply(self, db: AsyncSession, deltas: Dict[RollupKey, Dict[str, int]]) -> None:
+        rows = self._rows(deltas)
+        if rows:
+            await db.execute(self._upsert(db, rows))
+
+    @staticmethod
+    def _rows(deltas: Dict[RollupKey, Dict[str, int]]) -> List[Dict[str, Any]]:
+        now = datetime.utcnow()
+        return [
+            {"user_id": user_id, "task_id": task_id, "day": day, "updated_at": now, **counters}
+            for (user_id, task_id, day), counters in deltas.items()
+            if any(counters.values())
+        ]
+
+    @staticmethod
+    def _upsert(db: AsyncSession, rows: List[Dict[str, Any]]):
+        statement = dialect_insert(db, TimeLogRollup).values(rows)
+        updates = {
+            counter: getattr(TimeLogRollup, counter) + getattr(statement.excluded, counter)
+            for counter in COUNTERS
+        }
+        updates["updated_at"] = statement.excluded.updated_at
+        return statement.on_conflict_do_update(index_elements=["user_id", "day", "task_id"], set_=updates)
+
+
+time_rollups = TimeRollupStore()
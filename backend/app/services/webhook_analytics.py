@@ -0,0 +1,231 @@
+"""
+Webhook delivery analytics computed in the database.
+Every figure is a grouped aggregate, so memory use does not grow with the
+number of deliveries. Percentiles use percentile_cont on PostgreSQL and a
+response time histogram elsewhere.
+"""
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.webhooks import DeliveryStatus, WebhookDelivery, WebhookEndpoint
+from app.schemas.webhooks import WebhookAnalyticsFilter
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (0.5, 0.95, 0.99)
+
+# Histogram bucket upper bounds in ms, ~25% apart, up to one hour
+RESPONSE_TIME_BUCKETS: List[int] = sorted({int(5 * 1.25 ** i) for i in range(60)})
+
+
+def _bucket_percentiles(
+    buckets: Sequence[Any], minimum: float, maximum: float
+) -> Dict[float, float]:
+    """Interpolate percentiles from (bucket, count) rows in bucket order.
+
+    The total comes from the histogram itself, so ranks always fall inside it
+    even if deliveries changed since the count was taken.
+    """
+    total = sum(count for _, count in buckets)
+    if not total:
+        return {q: 0 for q in PERCENTILES}
+
+    results = {}
+    seen = 0
+    rows = iter(buckets)
+    bucket, count = None, 0
+    for q in PERCENTILES:
+        rank = q * (total - 1)
+        while seen + count <= rank:
+            seen += count
+            bucket, count = next(rows)
+        lower = RESPONSE_TIME_BUCKETS[bucket - 1] if bucket > 0 else 0
+        upper = RESPONSE_TIME_BUCKETS[bucket] if bucket < len(RESPONSE_TIME_BUCKETS) else maximum
+        lower, upper = max(lower, minimum), min(upper, maximum)
+        fraction = (rank - seen + 0.5) / count
+        results[q] = lower + (upper - lower) * min(fraction, 1.0)
+    return results
+
+
+class WebhookAnalyticsService:
+    """Delivery statistics for the webhook analytics endpoint."""
+
+    def __init__(self, top_failing_limit: int = 10):
+        self.top_failing_limit = top_failing_limit
+
+    async def get_analytics(
+        self, db: AsyncSession, organization_id: int, filters: WebhookAnalyticsFilter
+    ) -> Dict[str, Any]:
+        """Get overall stats and breakdowns for the filtered deliveries."""
+        where = self._filter_clause(organization_id, filters)
+        day = func.date(WebhookDelivery.scheduled_at).label("date")
+
+        return {
+            "overall_stats": await self._overall_stats(db, where),
+            "deliveries_by_day": await self._grouped_counts(db, where, day),
+            "deliveries_by_event_type": await self._grouped_counts(
+                db, where, WebhookDelivery.event_type.label("event_type")
+            ),
+            "top_failing_endpoints": await self._top_failing_endpoints(db, where),
+            "response_time_trends": await self._response_time_trends(db, where, day)
+        }
+
+    @staticmethod
+    def _filter_clause(organization_id: int, filters: WebhookAnalyticsFilter):
+        conditions = [WebhookDelivery.organization_id == organization_id]
+        if filters.start_date:
+            conditions.append(WebhookDelivery.scheduled_at >= filters.start_date)
+        if filters.end_date:
+            conditions.append(WebhookDelivery.scheduled_at <= filters.end_date)
+        if filters.endpoint_ids:
+            conditions.append(WebhookDelivery.endpoint_id.in_(filters.endpoint_ids))
+        if filters.event_types:
+            conditions.append(
+                WebhookDelivery.event_type.in_([event_type.value for event_type in filters.event_types])
+            )
+        if filters.status_filter:
+            conditions.append(
+                WebhookDelivery.status.in_([status.value for status in filters.status_filter])
+            )
+        return and_(*conditions)
+
+    @staticmethod
+    def _outcome_columns():
+        successful = func.sum(case(
+            (and_(
+                WebhookDelivery.status == DeliveryStatus.DELIVERED.value,
+                WebhookDelivery.response_status_code >= 200,
+                WebhookDelivery.response_status_code < 300
+            ), 1),
+            else_=0
+        ))
+        return func.count(WebhookDelivery.id).label("total"), successful.label("successful")
+
+    async def _overall_stats(self, db: AsyncSession, where) -> Dict[str, Any]:
+        total, successful = self._outcome_columns()
+        response_time = WebhookDelivery.response_time_ms
+        result = await db.execute(
+            select(
+                total,
+                successful,
+                func.count(response_time).label("timed"),
+                func.avg(response_time).label("average"),
+                func.min(response_time).label("minimum"),
+                func.max(response_time).label("maximum")
+            ).where(where)
+        )
+        row = result.one()
+
+        total_deliveries = row.total or 0
+        successful_deliveries = int(row.successful or 0)
+        percentiles = await self._percentiles(db, where, row.timed or 0, row.minimum, row.maximum)
+
+        return {
+            "total_deliveries": total_deliveries,
+            "successful_deliveries": successful_deliveries,
+            "failed_deliveries": total_deliveries - successful_deliveries,
+            "success_rate": round(successful_deliveries / total_deliveries * 100, 2) if total_deliveries else 0,
+            "average_response_time_ms": round(float(row.average or 0), 2),
+            "median_response_time_ms": round(percentiles[0.5]),
+            "p95_response_time_ms": round(percentiles[0.95]),
+            "p99_response_time_ms": round(percentiles[0.99]),
+            "max_response_time_ms": row.maximum or 0
+        }
+
+    async def _percentiles(
+        self,
+        db: AsyncSession,
+        where,
+        timed: int,
+        minimum: Optional[int],
+        maximum: Optional[int]
+    ) -> Dict[float, float]:
+        if not timed:
+            return {q: 0 for q in PERCENTILES}
+
+        response_time = WebhookDelivery.response_time_ms
+        if db.bind.dialect.name == "postgresql":
+            result = await db.execute(
+                select(*[
+                    func.percentile_cont(q).within_group(response_time)
+                    for q in PERCENTILES
+                ]).where(where)
+            )
+            return dict(zip(PERCENTILES, (float(value) for value in result.one())))
+
+        bucket = case(
+            *[(response_time <= bound, index) for index, bound in enumerate(RESPONSE_TIME_BUCKETS)],
+            else_=len(RESPONSE_TIME_BUCKETS)
+        ).label("bucket")
+        result = await db.execute(
+            select(bucket, func.count())
+            .where(and_(where, response_time.isnot(None)))
+            .group_by(bucket)
+            .order_by(bucket)
+        )
+        return _bucket_percentiles(result.all(), float(minimum), float(maximum))
+
+    async def _grouped_counts(self, db: AsyncSession, where, key) -> List[Dict[str, Any]]:
+        total, successful = self._outcome_columns()
+        result = await db.execute(
+            select(key, total, successful).where(where).group_by(key).order_by(key)
+        )
+        return [
+            {
+                key.name: str(row[0]),
+                "total_deliveries": row.total,
+                "successful_deliveries": int(row.successful or 0),
+                "failed_deliveries": row.total - int(row.successful or 0)
+            }
+            for row in result.all()
+        ]
+
+    async def _top_failing_endpoints(self, db: AsyncSession, where) -> List[Dict[str, Any]]:
+        total, successful = self._outcome_columns()
+        failed = (total - successful).label("failed")
+        result = await db.execute(
+            select(WebhookDelivery.endpoint_id, WebhookEndpoint.name, total, failed)
+            .join(WebhookEndpoint, WebhookEndpoint.id == WebhookDelivery.endpoint_id)
+            .where(where)
+            .group_by(WebhookDelivery.endpoint_id, WebhookEndpoint.name)
+            .having(failed > 0)
+            .order_by(failed.desc())
+            .limit(self.top_failing_limit)
+        )
+        return [
+            {
+                "endpoint_id": row.endpoint_id,
+                "name": row.name,
+                "total_deliveries": row.total,
+                "failed_deliveries": int(row.failed),
+                "failure_rate": round(row.failed / row.total * 100, 2)
+            }
+            for row in result.all()
+        ]
+
+    async def _response_time_trends(self, db: AsyncSession, where, day) -> List[Dict[str, Any]]:
+        response_time = WebhookDelivery.response_time_ms
+        result = await db.execute(
+            select(
+                day,
+                func.avg(response_time).label("average"),
+                func.max(response_time).label("maximum")
+            )
+            .where(and_(where, response_time.isnot(None)))
+            .group_by(day)
+            .order_by(day)
+        )
+        return [
+            {
+                "date": str(row.date),
+                "average_response_time_ms": round(float(row.average), 2),
+                "max_response_time_ms": row.maximum
+            }
+            for row in result.all()
+        ]
+
+
+webhook_analytics_service = WebhookAnalyticsService()
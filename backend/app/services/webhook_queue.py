@@ -0,0 +1,219 @@
+"""
+Durable webhook delivery queue.
+Deliveries live in the webhook_deliveries table and are drained by a pool of
+async workers that claim rows with short leases.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import get_async_session_maker
+from app.core.timing_wheel import HierarchicalTimingWheel
+from app.models.webhooks import DeliveryStatus, WebhookDelivery
+
+if TYPE_CHECKING:
+    from app.services.webhook_service import WebhookService
+
+logger = logging.getLogger(__name__)
+
+# Statuses a worker may pick up; open batches become ready once their linger expires
+QUEUED_STATUSES = [
+    DeliveryStatus.BATCHING.value, DeliveryStatus.PENDING.value, DeliveryStatus.RETRYING.value
+]
+
+
+class WebhookDeliveryQueue:
+    """Worker pool draining queued webhook deliveries.
+
+    * A delivery is ready when it is pending or retrying, its ``next_retry_at``
+      has passed and it holds no live lease. A worker picks one candidate
+      (``FOR UPDATE SKIP LOCKED`` where the database supports it; SQLite
+      serialises writers instead) and stamps ``locked_by``/``locked_until`` in
+      the same transaction, so the HTTP call runs without holding row locks.
+      If a worker dies, its lease expires and the delivery is claimed again.
+    * Every worker owns one session; request sessions are never shared.
+    * At most ``endpoint_concurrency`` deliveries per endpoint are in flight
+      in this process.
+    * Retry times are persisted in ``next_retry_at`` and armed on a timing
+      wheel that wakes the workers when they come due. An idle poll picks up
+      work queued by other processes or before a restart.
+    """
+
+    def __init__(
+        self,
+        service: "WebhookService",
+        worker_count: Optional[int] = None,
+        endpoint_concurrency: Optional[int] = None,
+        lease_seconds: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.service = service
+        self.worker_count = (
+            worker_count if worker_count is not None else settings.WEBHOOK_WORKERS
+        )
+        self.endpoint_concurrency = endpoint_concurrency or settings.WEBHOOK_ENDPOINT_CONCURRENCY
+        self.lease_seconds = lease_seconds or settings.WEBHOOK_LEASE_SECONDS
+        self.poll_interval = poll_interval or settings.WEBHOOK_POLL_INTERVAL
+        self.session_factory = session_factory
+        self.clock = clock
+        self.node_id = uuid.uuid4().hex[:12]
+
+        self.wheel = HierarchicalTimingWheel(tick_seconds=1.0, start_time=clock())
+
+        # Claimed but unfinished deliveries and delivery slots per endpoint
+        self._reserved: Dict[int, int] = {}
+        self._endpoint_slots: Dict[int, asyncio.Semaphore] = {}
+
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        """Start the workers and the retry timer."""
+        if self._tasks or self.worker_count <= 0:
+            return
+        if self.session_factory is None:
+            self.session_factory = get_async_session_maker()
+
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker(index)) for index in range(self.worker_count)
+        ]
+        self._tasks.append(asyncio.create_task(self._run_timers()))
+        logger.info(f"Started {self.worker_count} webhook delivery workers")
+
+    async def stop(self) -> None:
+        """Stop the workers; deliveries in flight are retried once their lease expires."""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def notify(self) -> None:
+        """Wake idle workers after deliveries were queued."""
+        self._wakeup.set()
+
+    def schedule_retry(self, delivery_id: int, retry_at: datetime) -> None:
+        """Wake the workers when a delivery's retry comes due."""
+        delay = max(0.0, (retry_at - datetime.utcnow()).total_seconds())
+        self.wheel.schedule(delivery_id, delay, self.clock())
+
+    async def claim(self, session: AsyncSession, worker_id: str) -> Optional[Tuple[int, int]]:
+        """Lease the next ready delivery; returns (delivery_id, endpoint_id)."""
+        now = datetime.utcnow()
+        ready = self._ready_clause(now)
+
+        candidates = select(WebhookDelivery.id, WebhookDelivery.endpoint_id).where(ready)
+        saturated = [
+            endpoint_id for endpoint_id, count in self._reserved.items()
+            if count >= self.endpoint_concurrency
+        ]
+        if saturated:
+            candidates = candidates.where(WebhookDelivery.endpoint_id.notin_(saturated))
+        candidates = candidates.order_by(WebhookDelivery.scheduled_at, WebhookDelivery.id).limit(1)
+        if session.bind.dialect.name != "sqlite":
+            candidates = candidates.with_for_update(skip_locked=True)
+
+        row = (await session.execute(candidates)).first()
+        if row is None:
+            await session.commit()
+            return None
+
+        # Re-check readiness: without row locks another process may have won
+        result = await session.execute(
+            update(WebhookDelivery)
+            .where(and_(WebhookDelivery.id == row.id, ready))
+            .values(
+                locked_by=worker_id,
+                locked_until=now + timedelta(seconds=self.lease_seconds)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+
+        if result.rowcount != 1:
+            return None
+        return row.id, row.endpoint_id
+
+    async def _worker(self, index: int) -> None:
+        worker_id = f"{self.node_id}:{index}"
+        async with self.session_factory() as session:
+            while True:
+                try:
+                    claimed = await self.claim(session, worker_id)
+                except Exception as e:
+                    logger.error(f"Webhook worker {worker_id} failed to claim a delivery: {e}")
+                    await session.rollback()
+                    claimed = None
+
+                if claimed is None:
+                    await self._wait_for_work()
+                    continue
+
+                delivery_id, endpoint_id = claimed
+                self._reserved[endpoint_id] = self._reserved.get(endpoint_id, 0) + 1
+                try:
+                    await self._run_delivery(session, delivery_id, endpoint_id)
+                finally:
+                    self._release_reservation(endpoint_id)
+                    session.expunge_all()
+
+    async def _run_delivery(self, session: AsyncSession, delivery_id: int, endpoint_id: int) -> None:
+        slot = self._endpoint_slots.setdefault(
+            endpoint_id, asyncio.Semaphore(self.endpoint_concurrency)
+        )
+        async with slot:
+            try:
+                await self.service._deliver_webhook(session, delivery_id)
+            except Exception as e:
+                # The lease stays in place and the delivery is retried after it expires
+                logger.error(f"Error delivering webhook {delivery_id}: {e}")
+                await session.rollback()
+                return
+
+        delivery = await session.get(WebhookDelivery, delivery_id)
+        if delivery and delivery.status in QUEUED_STATUSES and delivery.next_retry_at:
+            self.schedule_retry(delivery_id, delivery.next_retry_at)
+
+    def _release_reservation(self, endpoint_id: int) -> None:
+        remaining = self._reserved.get(endpoint_id, 0) - 1
+        if remaining > 0:
+            self._reserved[endpoint_id] = remaining
+            return
+        self._reserved.pop(endpoint_id, None)
+        slot = self._endpoint_slots.get(endpoint_id)
+        if slot is not None and not slot.locked():
+            del self._endpoint_slots[endpoint_id]
+
+    async def _wait_for_work(self) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _run_timers(self) -> None:
+        while True:
+            await asyncio.sleep(self.wheel.tick_seconds)
+            if self.wheel.advance(self.clock()):
+                self.notify()
+
+    @staticmethod
+    def _ready_clause(now: datetime):
+        return and_(
+            WebhookDelivery.status.in_(QUEUED_STATUSES),
+            or_(WebhookDelivery.next_retry_at.is_(None), WebhookDelivery.next_retry_at <= now),
+            or_(WebhookDelivery.locked_until.is_(None), WebhookDelivery.locked_until < now)
+        )
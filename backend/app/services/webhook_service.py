@@ -5,7 +5,6 @@ Provides webhook management, OAuth2 flow, and reliable delivery with retries.
 import hmac
 import hashlib
 import json
-import asyncio
 import logging
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional, Tuple
@@ -13,17 +12,23 @@ from urllib.parse import urlencode
 import uuid
 
 import httpx
-from sqlalchemy import select, and_, or_, func
+from sqlalchemy import select, update, and_, or_, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.models.webhooks import (
-    WebhookEndpoint, WebhookDelivery, WebhookEvent, ExternalIntegration,
-    APIRateLimit, WebhookEventType, WebhookStatus, DeliveryStatus
+    WebhookEndpoint, WebhookDelivery, WebhookDeliveryEvent, WebhookEvent, ExternalIntegration,
+    APIRateLimit, WebhookEventType, WebhookStatus, DeliveryStatus, BATCH_EVENT_TYPE
 )
 from app.schemas.webhooks import (
     WebhookEventCreate, WebhookDeliveryCreate, OAuth2TokenResponse
 )
+from app.services.rate_limiter import (
+    RateLimit, RateLimitDecision, RateLimitUsageWriter, create_rate_limiter
+)
+from app.services.webhook_queue import QUEUED_STATUSES, WebhookDeliveryQueue
+from app.services.webhook_subscriptions import CompiledSubscription, SubscriptionIndex, parse_event_types
+from app.services.webhook_transport import WebhookTransport
 
 logger = logging.getLogger(__name__)
 
@@ -32,7 +37,10 @@ class WebhookService:
     """Service for managing webhook endpoints and deliveries."""
     
     def __init__(self):
-        self.http_client = httpx.AsyncClient(timeout=30.0)
+        self.transport = WebhookTransport()
+        self.rate_limiter = create_rate_limiter()
+        self.rate_limit_usage = RateLimitUsageWriter()
+        self.subscriptions = SubscriptionIndex()
     
     async def create_webhook_endpoint(
         self,
@@ -56,6 +64,7 @@ class WebhookService:
         db.add(endpoint)
         await db.commit()
         await db.refresh(endpoint)
+        self.subscriptions.invalidate(organization_id)
         
         logger.info(f"Created webhook endpoint {endpoint.id} for organization {organization_id}")
         return endpoint
@@ -83,6 +92,7 @@ class WebhookService:
         endpoint.updated_at = datetime.utcnow()
         await db.commit()
         await db.refresh(endpoint)
+        self.subscriptions.invalidate(endpoint.organization_id)
         
         return endpoint
     
@@ -102,6 +112,7 @@ class WebhookService:
         
         await db.delete(endpoint)
         await db.commit()
+        self.subscriptions.invalidate(endpoint.organization_id)
         
         logger.info(f"Deleted webhook endpoint {endpoint_id}")
         return True
@@ -119,16 +130,21 @@ class WebhookService:
             WebhookEndpoint.organization_id == organization_id
         )
         
-        if event_type:
-            query = query.where(
-                WebhookEndpoint.event_types.contains([event_type.value])
-            )
-        
         if is_active is not None:
             query = query.where(WebhookEndpoint.is_active == is_active)
         
         result = await db.execute(query)
-        return result.scalars().all()
+        endpoints = result.scalars().all()
+        
+        if event_type:
+            # event_types is a JSON string column; match on the parsed list
+            event_type = getattr(event_type, "value", event_type)
+            endpoints = [
+                endpoint for endpoint in endpoints
+                if event_type in parse_event_types(endpoint.event_types)
+            ]
+        
+        return endpoints
     
     async def create_webhook_event(
         self,
@@ -153,8 +169,8 @@ class WebhookService:
         await db.commit()
         await db.refresh(event)
         
-        # Queue for immediate processing
-        asyncio.create_task(self.process_webhook_event(db, event.id))
+        # Fan out to deliveries now; the HTTP calls run on the delivery queue
+        await self.process_webhook_event(db, event.id)
         
         return event
     
@@ -173,36 +189,44 @@ class WebhookService:
         if not event or event.is_processed:
             return []
         
-        # Get matching webhook endpoints
-        endpoints = await self.get_webhook_endpoints(
-            db,
-            event.organization_id,
-            event.event_type,
-            is_active=True
-        )
+        # Get matching webhook endpoints from the compiled subscription index
+        endpoint_ids = await self.subscriptions.match(db, event)
+        endpoints = []
+        if endpoint_ids:
+            query = select(WebhookEndpoint).where(WebhookEndpoint.id.in_(endpoint_ids))
+            result = await db.execute(query)
+            endpoints = result.scalars().all()
         
         deliveries = []
+        batches = []
+        batch_due = False
         
         for endpoint in endpoints:
-            # Check if endpoint should receive this event
-            if not self._should_deliver_event(endpoint, event):
-                continue
-            
-            # Create delivery
-            delivery = await self._create_webhook_delivery(
-                db, endpoint, event
-            )
-            
-            if delivery:
-                deliveries.append(delivery)
-                # Schedule delivery
-                asyncio.create_task(self._deliver_webhook(db, delivery.id))
+            # Add the event to the endpoint's open batch, or build a delivery
+            if endpoint.batch_enabled:
+                batch, due = await self._add_to_batch(db, endpoint, event)
+                batch_due = batch_due or due
+                if batch:
+                    batches.append(batch)
+            else:
+                deliveries.append(self._build_webhook_delivery(endpoint, event))
         
-        # Mark event as processed
+        # Insert all deliveries, batch appends included, and mark the event
+        # processed in one transaction, so a retry never appends it twice
+        db.add_all(deliveries)
         event.is_processed = True
         event.processed_at = datetime.utcnow()
         await db.commit()
         
+        for batch in batches:
+            if batch.status == DeliveryStatus.BATCHING.value:
+                webhook_delivery_queue.schedule_retry(batch.id, batch.next_retry_at)
+        
+        deliveries.extend(batches)
+        
+        if deliveries or batch_due:
+            webhook_delivery_queue.notify()
+        
         logger.info(f"Processed webhook event {event_id}, created {len(deliveries)} deliveries")
         return deliveries
     
@@ -214,22 +238,192 @@ class WebhookService:
     ) -> Optional[WebhookDelivery]:
         """Create a webhook delivery record."""
         
-        # Prepare payload
-        payload = {
+        delivery = self._build_webhook_delivery(endpoint, event)
+        
+        db.add(delivery)
+        await db.commit()
+        await db.refresh(delivery)
+        
+        return delivery
+    
+    def _build_webhook_delivery(
+        self,
+        endpoint: WebhookEndpoint,
+        event: WebhookEvent
+    ) -> WebhookDelivery:
+        """Build a signed, unsaved delivery of one event."""
+        
+        payload = self._build_event_payload(event)
+        headers, signature = self._build_delivery_headers(
+            endpoint, event.event_type, event.event_uuid, event.created_at, payload
+        )
+        
+        delivery = WebhookDelivery(
+            endpoint_id=endpoint.id,
+            event_type=event.event_type,
+            event_id=event.event_uuid,
+            payload=payload,
+            headers=headers,
+            url=str(endpoint.url),
+            signature=signature,
+            payload_size=len(json.dumps(payload, default=str)),
+            max_attempts=endpoint.max_retries + 1,
+            organization_id=event.organization_id
+        )
+        
+        return delivery
+    
+    async def _add_to_batch(
+        self,
+        db: AsyncSession,
+        endpoint: WebhookEndpoint,
+        event: WebhookEvent
+    ) -> Tuple[Optional[WebhookDelivery], bool]:
+        """Append an event to the endpoint's open batch, without committing.
+        
+        Returns the new batch delivery if one had to be opened, and whether a
+        batch became due to send. Appends only succeed while the batch is
+        open, unclaimed and unchanged since it was read, so an event never
+        joins a batch a worker has picked up.
+        """
+        
+        item = self._build_event_payload(event)
+        item_size = len(json.dumps(item, default=str))
+        open_batch = and_(
+            WebhookDelivery.endpoint_id == endpoint.id,
+            WebhookDelivery.status == DeliveryStatus.BATCHING.value,
+            WebhookDelivery.locked_by.is_(None)
+        )
+        
+        query = select(
+            WebhookDelivery.id,
+            WebhookDelivery.event_count,
+            WebhookDelivery.payload_size
+        ).where(open_batch).order_by(WebhookDelivery.id.desc()).limit(1)
+        result = await db.execute(query)
+        batch = result.first()
+        
+        sealed = False
+        if batch is not None:
+            event_count = batch.event_count + 1
+            payload_size = batch.payload_size + item_size + 1
+            
+            if event_count <= endpoint.batch_max_size and payload_size <= endpoint.batch_max_bytes:
+                values = {
+                    "event_count": event_count,
+                    "payload_size": payload_size
+                }
+                full = event_count >= endpoint.batch_max_size
+                if full:
+                    values.update(status=DeliveryStatus.PENDING.value, next_retry_at=None)
+                
+                appended = await db.execute(
+                    update(WebhookDelivery)
+                    .where(and_(
+                        WebhookDelivery.id == batch.id,
+                        WebhookDelivery.event_count == batch.event_count,
+                        open_batch
+                    ))
+                    .values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+                if appended.rowcount == 1:
+                    db.add(WebhookDeliveryEvent(
+                        delivery_id=batch.id,
+                        event_id=event.event_uuid,
+                        event_type=event.event_type,
+                        position=batch.event_count,
+                        payload=item
+                    ))
+                    return None, full
+            else:
+                # No room left: send the batch now and open a new one
+                await db.execute(
+                    update(WebhookDelivery)
+                    .where(and_(WebhookDelivery.id == batch.id, open_batch))
+                    .values(status=DeliveryStatus.PENDING.value, next_retry_at=None)
+                    .execution_options(synchronize_session=False)
+                )
+                sealed = True
+        
+        payload_size = item_size + 2
+        full = endpoint.batch_max_size <= 1 or payload_size >= endpoint.batch_max_bytes
+        linger_until = datetime.utcnow() + timedelta(milliseconds=endpoint.batch_max_linger_ms)
+        
+        delivery = WebhookDelivery(
+            endpoint_id=endpoint.id,
+            event_type=BATCH_EVENT_TYPE,
+            status=(DeliveryStatus.PENDING if full else DeliveryStatus.BATCHING).value,
+            payload=[],
+            headers={},
+            url=str(endpoint.url),
+            event_count=1,
+            payload_size=payload_size,
+            next_retry_at=None if full else linger_until,
+            max_attempts=endpoint.max_retries + 1,
+            organization_id=event.organization_id
+        )
+        delivery.batch_events.append(WebhookDeliveryEvent(
+            event_id=event.event_uuid,
+            event_type=event.event_type,
+            position=0,
+            payload=item
+        ))
+        
+        db.add(delivery)
+        
+        return delivery, full or sealed
+    
+    async def _seal_batch(self, db: AsyncSession, delivery: WebhookDelivery) -> None:
+        """Build and sign a batch's final payload before its first attempt.
+        
+        Appends only record each event's item in webhook_delivery_events, so
+        the list payload is written once here rather than on every append.
+        """
+        
+        result = await db.execute(
+            select(WebhookDeliveryEvent.payload)
+            .where(WebhookDeliveryEvent.delivery_id == delivery.id)
+            .order_by(WebhookDeliveryEvent.position)
+        )
+        delivery.payload = list(result.scalars())
+        
+        headers, signature = self._build_delivery_headers(
+            delivery.endpoint, BATCH_EVENT_TYPE, delivery.delivery_uuid,
+            datetime.utcnow(), delivery.payload
+        )
+        headers["X-Webhook-Batch-Size"] = str(delivery.event_count)
+        
+        delivery.headers = headers
+        delivery.signature = signature
+        delivery.status = DeliveryStatus.PENDING
+    
+    def _build_event_payload(self, event: WebhookEvent) -> Dict[str, Any]:
+        """Build the payload delivered for one event."""
+        return {
             "event_type": event.event_type,
-            "event_id": str(event.uuid),
+            "event_id": event.event_uuid,
             "timestamp": event.created_at.isoformat(),
             "data": event.payload,
             "context": event.context
         }
-        
-        # Prepare headers
-        headers = endpoint.headers.copy()
+    
+    def _build_delivery_headers(
+        self,
+        endpoint: WebhookEndpoint,
+        event_type: str,
+        webhook_id: str,
+        timestamp: datetime,
+        payload: Any
+    ) -> Tuple[Dict[str, str], str]:
+        """Build signed request headers; returns the headers and the signature."""
+        
+        headers = dict(endpoint.headers) if isinstance(endpoint.headers, dict) else {}
         headers.update({
             "Content-Type": "application/json",
-            "X-Webhook-Event": event.event_type,
-            "X-Webhook-ID": str(event.uuid),
-            "X-Webhook-Timestamp": str(int(event.created_at.timestamp()))
+            "X-Webhook-Event": event_type,
+            "X-Webhook-ID": str(webhook_id),
+            "X-Webhook-Timestamp": str(int(timestamp.timestamp()))
         })
         
         # Generate signature
@@ -244,26 +438,14 @@ class WebhookService:
             auth_headers = self._get_auth_headers(endpoint.auth_type, endpoint.auth_config)
             headers.update(auth_headers)
         
-        delivery = WebhookDelivery(
-            endpoint_id=endpoint.id,
-            event_type=event.event_type,
-            event_id=str(event.uuid),
-            payload=payload,
-            headers=headers,
-            url=str(endpoint.url),
-            signature=signature,
-            max_attempts=endpoint.max_retries + 1,
-            organization_id=event.organization_id
-        )
-        
-        db.add(delivery)
-        await db.commit()
-        await db.refresh(delivery)
-        
-        return delivery
+        return headers, signature
     
     async def _deliver_webhook(self, db: AsyncSession, delivery_id: int) -> bool:
-        """Deliver a webhook to its endpoint."""
+        """Deliver a webhook to its endpoint.
+        
+        Called by the delivery queue with the worker's own session. Failed
+        attempts are rescheduled through ``next_retry_at``.
+        """
         
         # Get delivery
         query = select(WebhookDelivery).options(
@@ -275,10 +457,15 @@ class WebhookService:
         if not delivery or delivery.status == DeliveryStatus.DELIVERED:
             return False
         
+        if delivery.event_type == BATCH_EVENT_TYPE and delivery.signature is None:
+            await self._seal_batch(db, delivery)
+        
         # Check rate limits
-        if not await self._check_rate_limit(db, delivery.endpoint):
-            # Schedule retry
-            delivery.next_retry_at = datetime.utcnow() + timedelta(minutes=5)
+        decision = await self._check_rate_limit(delivery.endpoint)
+        if not decision.allowed:
+            # Retry once the endpoint has capacity again
+            delivery.next_retry_at = datetime.utcnow() + timedelta(seconds=decision.retry_after)
+            self._release_lease(delivery)
             await db.commit()
             return False
         
@@ -290,8 +477,9 @@ class WebhookService:
             # Make HTTP request
             start_time = datetime.utcnow()
             
-            response = await self.http_client.post(
+            response = await self.transport.post(
                 delivery.url,
+                endpoint_id=delivery.endpoint_id,
                 json=delivery.payload,
                 headers=delivery.headers,
                 timeout=delivery.endpoint.timeout_seconds
@@ -318,6 +506,7 @@ class WebhookService:
                 endpoint.last_delivery_at = end_time
                 endpoint.last_success_at = end_time
                 
+                self._release_lease(delivery)
                 await db.commit()
                 logger.info(f"Successfully delivered webhook {delivery_id}")
                 return True
@@ -355,43 +544,74 @@ class WebhookService:
             delivery.next_retry_at = datetime.utcnow() + timedelta(seconds=delay_seconds)
             delivery.status = DeliveryStatus.RETRYING
             delivery.attempt_number += 1
-            
-            # Schedule retry
-            asyncio.create_task(
-                self._schedule_retry(db, delivery_id, delay_seconds)
-            )
         
+        self._release_lease(delivery)
         await db.commit()
         return False
     
-    async def _schedule_retry(self, db: AsyncSession, delivery_id: int, delay_seconds: int):
-        """Schedule a webhook delivery retry."""
-        await asyncio.sleep(delay_seconds)
-        await self._deliver_webhook(db, delivery_id)
+    def _release_lease(self, delivery: WebhookDelivery) -> None:
+        """Hand a delivery back to the queue."""
+        delivery.locked_by = None
+        delivery.locked_until = None
     
     async def retry_failed_deliveries(self, db: AsyncSession) -> int:
-        """Retry failed webhook deliveries that are ready for retry."""
+        """Wake the delivery queue for deliveries whose retry is due."""
         
-        query = select(WebhookDelivery).where(
+        query = select(func.count(WebhookDelivery.id)).where(
             and_(
-                WebhookDelivery.status.in_([DeliveryStatus.FAILED, DeliveryStatus.RETRYING]),
-                WebhookDelivery.attempt_number < WebhookDelivery.max_attempts,
+                WebhookDelivery.status.in_(QUEUED_STATUSES),
                 WebhookDelivery.next_retry_at <= datetime.utcnow()
             )
-        ).limit(100)  # Process in batches
+        )
         
         result = await db.execute(query)
-        deliveries = result.scalars().all()
-        
-        retry_tasks = []
-        for delivery in deliveries:
-            task = asyncio.create_task(self._deliver_webhook(db, delivery.id))
-            retry_tasks.append(task)
+        due = result.scalar() or 0
         
-        if retry_tasks:
-            await asyncio.gather(*retry_tasks, return_exceptions=True)
+        if due:
+            webhook_delivery_queue.notify()
         
-        return len(deliveries)
+        return due
+
+    async def get_event_delivery_status(
+        self, db: AsyncSession, event_id: str, organization_id: int
+    ) -> List[Dict[str, Any]]:
+        """Get the delivery status of one event at each endpoint, batched or not."""
+        
+        columns = (
+            WebhookDelivery.id,
+            WebhookDelivery.endpoint_id,
+            WebhookDelivery.status,
+            WebhookDelivery.attempt_number,
+            WebhookDelivery.completed_at,
+            WebhookDelivery.error_message
+        )
+        direct = select(*columns).where(and_(
+            WebhookDelivery.event_id == event_id,
+            WebhookDelivery.organization_id == organization_id
+        ))
+        batched = select(*columns, WebhookDeliveryEvent.position).join(
+            WebhookDeliveryEvent, WebhookDeliveryEvent.delivery_id == WebhookDelivery.id
+        ).where(and_(
+            WebhookDeliveryEvent.event_id == event_id,
+            WebhookDelivery.organization_id == organization_id
+        ))
+        
+        statuses = []
+        for query, is_batched in ((direct, False), (batched, True)):
+            result = await db.execute(query)
+            for row in result.all():
+                statuses.append({
+                    "delivery_id": row.id,
+                    "endpoint_id": row.endpoint_id,
+                    "status": row.status,
+                    "batched": is_batched,
+                    "batch_position": row.position if is_batched else None,
+                    "attempt_number": row.attempt_number,
+                    "completed_at": row.completed_at,
+                    "error_message": row.error_message
+                })
+        
+        return sorted(statuses, key=lambda status: status["delivery_id"])
     
     def _should_deliver_event(self, endpoint: WebhookEndpoint, event: WebhookEvent) -> bool:
         """Check if an endpoint should receive an event."""
@@ -400,99 +620,28 @@ class WebhookService:
         if not endpoint.is_active or endpoint.status != WebhookStatus.ACTIVE:
             return False
         
-        # Check event type subscription
-        if endpoint.event_types and event.event_type not in endpoint.event_types:
-            return False
-        
-        # Apply filters
-        if endpoint.filters:
-            return self._apply_event_filters(endpoint.filters, event)
-        
-        return True
-    
-    def _apply_event_filters(self, filters: Dict[str, Any], event: WebhookEvent) -> bool:
-        """Apply filters to determine if event should be delivered."""
-        
-        for filter_key, filter_value in filters.items():
-            if filter_key == "source_type":
-                if event.event_source != filter_value:
-                    return False
-            elif filter_key == "user_id":
-                if event.user_id != filter_value:
-                    return False
-            elif filter_key in event.payload:
-                if event.payload[filter_key] != filter_value:
-                    return False
-        
-        return True
-    
-    async def _check_rate_limit(self, db: AsyncSession, endpoint: WebhookEndpoint) -> bool:
-        """Check if webhook endpoint is within rate limits."""
-        
-        # Check per-minute limit
-        minute_limit = await self._get_rate_limit_status(
-            db, "webhook", str(endpoint.id), "minute", endpoint.rate_limit_per_minute
-        )
-        
-        if minute_limit.is_exceeded:
-            return False
-        
-        # Check per-hour limit
-        hour_limit = await self._get_rate_limit_status(
-            db, "webhook", str(endpoint.id), "hour", endpoint.rate_limit_per_hour
-        )
-        
-        return not hour_limit.is_exceeded
+        # Check event type subscription and filters
+        return CompiledSubscription.from_endpoint(endpoint).matches(event)
     
-    async def _get_rate_limit_status(
-        self,
-        db: AsyncSession,
-        subject_type: str,
-        subject_id: str,
-        limit_type: str,
-        max_requests: int
-    ) -> APIRateLimit:
-        """Get or create rate limit status."""
-        
-        window_sizes = {"minute": 60, "hour": 3600, "day": 86400}
-        window_size = window_sizes[limit_type]
-        
-        # Get existing rate limit
-        query = select(APIRateLimit).where(
-            and_(
-                APIRateLimit.subject_type == subject_type,
-                APIRateLimit.subject_id == subject_id,
-                APIRateLimit.limit_type == limit_type
-            )
-        )
-        result = await db.execute(query)
-        rate_limit = result.scalar()
-        
-        now = datetime.utcnow()
-        
-        if not rate_limit:
-            # Create new rate limit
-            rate_limit = APIRateLimit(
-                subject_type=subject_type,
-                subject_id=subject_id,
-                limit_type=limit_type,
-                max_requests=max_requests,
-                window_size_seconds=window_size,
-                organization_id=1  # TODO: Get from context
+    async def _check_rate_limit(self, endpoint: WebhookEndpoint) -> RateLimitDecision:
+        """Check and consume the endpoint's per-minute and per-hour limits."""
+        
+        limits = [
+            RateLimit(limit_type, max_requests)
+            for limit_type, max_requests in (
+                ("minute", endpoint.rate_limit_per_minute),
+                ("hour", endpoint.rate_limit_per_hour)
             )
-            db.add(rate_limit)
+            if max_requests
+        ]
         
-        # Check if we need to reset the window
-        if now >= (rate_limit.window_start + timedelta(seconds=window_size)):
-            rate_limit.current_count = 0
-            rate_limit.window_start = now
-        
-        # Increment counter
-        rate_limit.current_count += 1
-        rate_limit.last_request_at = now
+        decision = await self.rate_limiter.acquire(f"webhook:{endpoint.id}", limits)
+        if decision.allowed:
+            self.rate_limit_usage.record(
+                "webhook", str(endpoint.id), limits, endpoint.organization_id
+            )
         
-        await db.commit()
-        return rate_limit
+        return decision
     
     def _generate_webhook_secret(self) -> str:
         """Generate a webhook secret for signature verification."""
@@ -686,4 +835,5 @@ class OAuth2Service:
 
 # Global service instances
 webhook_service = WebhookService()
+webhook_delivery_queue = WebhookDeliveryQueue(webhook_service)
 oauth2_service = OAuth2Service()
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""
+Event subscription index for webhook fan-out.
+Endpoints are compiled once per organization into per-event-type lists with
+precompiled filter predicates, so routing an event only evaluates the
+endpoints subscribed to its type.
+"""
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, FrozenSet, List, Optional
+
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.webhooks import WebhookEndpoint, WebhookEvent, WebhookStatus
+
+logger = logging.getLogger(__name__)
+
+EventPredicate = Callable[[WebhookEvent], bool]
+
+
+def parse_event_types(value: Any) -> FrozenSet[str]:
+    """Read an endpoint's subscribed event types (stored as a JSON string)."""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value) if value else []
+        except ValueError:
+            logger.error(f"Invalid webhook event_types value: {value!r}")
+            return frozenset()
+    return frozenset(getattr(event_type, "value", event_type) for event_type in value or [])
+
+
+def compile_filters(filters: Any) -> List[EventPredicate]:
+    """Compile endpoint filters into predicates.
+
+    ``source_type`` and ``user_id`` match the event's source and user; any
+    other key must equal the payload value when the payload has that key.
+    """
+    if isinstance(filters, str):
+        filters = json.loads(filters) if filters else {}
+
+    predicates = []
+    for key, expected in (filters or {}).items():
+        if key == "source_type":
+            predicates.append(lambda event, expected=expected: event.event_source == expected)
+        elif key == "user_id":
+            predicates.append(lambda event, expected=expected: event.user_id == expected)
+        else:
+            predicates.append(
+                lambda event, key=key, expected=expected: (
+                    key not in (event.payload or {}) or event.payload[key] == expected
+                )
+            )
+    return predicates
+
+
+@dataclass
+class CompiledSubscription:
+    """An endpoint's event types and filter predicates."""
+    endpoint_id: int
+    event_types: FrozenSet[str]
+    predicates: List[EventPredicate] = field(default_factory=list)
+
+    @classmethod
+    def from_endpoint(cls, endpoint: WebhookEndpoint) -> "CompiledSubscription":
+        return cls(
+            endpoint_id=endpoint.id,
+            event_types=parse_event_types(endpoint.event_types),
+            predicates=compile_filters(endpoint.filters)
+        )
+
+    def subscribes_to(self, event_type: str) -> bool:
+        return not self.event_types or event_type in self.event_types
+
+    def matches(self, event: WebhookEvent) -> bool:
+        return self.subscribes_to(event.event_type) and all(
+            predicate(event) for predicate in self.predicates
+        )
+
+
+@dataclass
+class OrganizationSubscriptions:
+    """Compiled subscriptions of one organization's active endpoints."""
+    by_event_type: Dict[str, List[CompiledSubscription]]
+    all_events: List[CompiledSubscription]  # Endpoints without an event type list
+    expires_at: float
+
+    def match(self, event: WebhookEvent) -> List[int]:
+        candidates = self.by_event_type.get(event.event_type, []) + self.all_events
+        return [
+            subscription.endpoint_id for subscription in candidates
+            if all(predicate(event) for predicate in subscription.predicates)
+        ]
+
+
+class SubscriptionIndex:
+    """Per-organization cache of compiled endpoint subscriptions.
+
+    Entries are dropped by ``invalidate`` whenever an endpoint changes, and
+    expire after ``ttl`` seconds so changes made by other processes are
+    picked up as well.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl if ttl is not None else settings.WEBHOOK_SUBSCRIPTION_CACHE_TTL
+        self.clock = clock
+        self._orgs: Dict[int, OrganizationSubscriptions] = {}
+        # Bumped on invalidation so a build that raced with a change is not cached
+        self._generations: Dict[int, int] = {}
+
+    async def match(self, db: AsyncSession, event: WebhookEvent) -> List[int]:
+        """Return the ids of endpoints that should receive an event."""
+        subscriptions = self._orgs.get(event.organization_id)
+        if subscriptions is None or subscriptions.expires_at <= self.clock():
+            subscriptions = await self._build(db, event.organization_id)
+        return subscriptions.match(event)
+
+    def invalidate(self, organization_id: Optional[int] = None) -> None:
+        """Drop the compiled subscriptions of one organization, or of all."""
+        organization_ids = [organization_id] if organization_id is not None else list(self._orgs)
+        for org_id in organization_ids:
+            self._orgs.pop(org_id, None)
+            self._generations[org_id] = self._generations.get(org_id, 0) + 1
+
+    async def _build(self, db: AsyncSession, organization_id: int) -> OrganizationSubscriptions:
+        generation = self._generations.get(organization_id, 0)
+
+        query = select(WebhookEndpoint).where(and_(
+            WebhookEndpoint.organization_id == organization_id,
+            WebhookEndpoint.is_active.is_(True),
+            WebhookEndpoint.status == WebhookStatus.ACTIVE.value
+        ))
+        result = await db.execute(query)
+
+        by_event_type: Dict[str, List[CompiledSubscription]] = {}
+        all_events = []
+        for endpoint in result.scalars().all():
+            try:
+                subscription = CompiledSubscription.from_endpoint(endpoint)
+            except (ValueError, AttributeError) as e:
+                logger.error(f"Skipping webhook endpoint {endpoint.id} with invalid filters: {e}")
+                continue
+
+            if subscription.event_types:
+                for event_type in subscription.event_types:
+                    by_event_type.setdefault(event_type, []).append(subscription)
+            else:
+                all_events.append(subscription)
+
+        subscriptions = OrganizationSubscriptions(
+            by_event_type=by_event_type,
+            all_events=all_events,
+            expires_at=self.clock() + self.ttl
+        )
+        if self._generations.get(organization_id, 0) == generation:
+            self._orgs[organization_id] = subscriptions
+        return subscriptions
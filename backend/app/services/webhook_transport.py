@@ -0,0 +1,326 @@
+"""
+HTTP transport for webhook delivery.
+Keeps a tuned connection pool per destination host, caches DNS lookups and
+records per-endpoint connection reuse.
+"""
+import asyncio
+import ipaddress
+import logging
+import socket
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import httpcore
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+Resolver = Callable[[str, int], Awaitable[List[str]]]
+
+
+async def _getaddrinfo(host: str, port: int) -> List[str]:
+    infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    # Keep resolver order, drop duplicates
+    return list(dict.fromkeys(info[4][0] for info in infos))
+
+
+class CachingDNSBackend(httpcore.AsyncNetworkBackend):
+    """Network backend that resolves hosts once per ``ttl`` seconds.
+
+    Only the TCP connect goes to the cached address; TLS still verifies and
+    sends SNI for the original host name.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        backend: Optional[httpcore.AsyncNetworkBackend] = None,
+        resolver: Resolver = _getaddrinfo,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self._backend = backend or httpcore.AnyIOBackend()
+        self._resolver = resolver
+        self._clock = clock
+        # {(host, port): (expires_at, addresses)}
+        self._cache: Dict[Tuple[str, int], Tuple[float, List[str]]] = {}
+
+    async def resolve(self, host: str, port: int) -> List[str]:
+        """Return the addresses for a host, from cache while fresh."""
+        try:
+            ipaddress.ip_address(host)
+            return [host]
+        except ValueError:
+            pass
+
+        key = (host, port)
+        cached = self._cache.get(key)
+        if cached and cached[0] > self._clock():
+            return cached[1]
+
+        try:
+            addresses = await self._resolver(host, port)
+        except OSError as e:
+            raise httpcore.ConnectError(f"DNS lookup failed for {host}: {e}") from e
+
+        if addresses:
+            self._cache[key] = (self._clock() + self.ttl, addresses)
+        return addresses
+
+    def invalidate(self, host: str, port: int) -> None:
+        self._cache.pop((host, port), None)
+
+    async def connect_tcp(
+        self,
+        host: str,
+        port: int,
+        timeout: Optional[float] = None,
+        local_address: Optional[str] = None,
+        socket_options: Any = None,
+    ) -> httpcore.AsyncNetworkStream:
+        addresses = await self.resolve(host, port)
+        if not addresses:
+            raise httpcore.ConnectError(f"No addresses found for {host}")
+
+        last_error: Optional[Exception] = None
+        for address in addresses:
+            try:
+                return await self._backend.connect_tcp(
+                    address,
+                    port,
+                    timeout=timeout,
+                    local_address=local_address,
+                    socket_options=socket_options
+                )
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                last_error = e
+
+        # Every cached address failed: resolve again next time
+        self.invalidate(host, port)
+        raise last_error
+
+    async def connect_unix_socket(
+        self, path: str, timeout: Optional[float] = None, socket_options: Any = None
+    ) -> httpcore.AsyncNetworkStream:
+        return await self._backend.connect_unix_socket(
+            path, timeout=timeout, socket_options=socket_options
+        )
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+
+# httpcore errors and their httpx counterparts share names
+HTTPCORE_ERRORS = (
+    httpcore.TimeoutException,
+    httpcore.NetworkError,
+    httpcore.ProtocolError,
+    httpcore.ProxyError,
+    httpcore.UnsupportedProtocol,
+)
+
+
+def _to_httpx_error(error: Exception, request: Optional[httpx.Request] = None) -> httpx.TransportError:
+    error_class = getattr(httpx, type(error).__name__, httpx.TransportError)
+    return error_class(str(error), request=request)
+
+
+class _ResponseStream(httpx.AsyncByteStream):
+    def __init__(self, stream: Any):
+        self._stream = stream
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        try:
+            async for part in self._stream:
+                yield part
+        except HTTPCORE_ERRORS as e:
+            raise _to_httpx_error(e) from e
+
+    async def aclose(self) -> None:
+        if hasattr(self._stream, "aclose"):
+            await self._stream.aclose()
+
+
+class PooledTransport(httpx.AsyncBaseTransport):
+    """httpx transport over an httpcore pool connecting through a given network backend.
+
+    httpx's own transport builds its pool without a network backend, so
+    this one builds the pool itself through httpcore's public constructor.
+    """
+
+    def __init__(
+        self, limits: httpx.Limits, http2: bool, network_backend: httpcore.AsyncNetworkBackend
+    ):
+        self.pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            http2=http2,
+            network_backend=network_backend
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(
+                scheme=request.url.raw_scheme,
+                host=request.url.raw_host,
+                port=request.url.port,
+                target=request.url.raw_path
+            ),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions
+        )
+        try:
+            response = await self.pool.handle_async_request(core_request)
+        except HTTPCORE_ERRORS as e:
+            raise _to_httpx_error(e, request) from e
+
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=_ResponseStream(response.stream),
+            extensions=response.extensions
+        )
+
+    async def aclose(self) -> None:
+        await self.pool.aclose()
+
+
+class WebhookTransport:
+    """Per-host connection pools shared by all webhook deliveries.
+
+    Each destination origin (scheme, host, port) gets its own client, so a
+    slow integration cannot exhaust the connections of the others, and a
+    burst to one host reuses its warm keep-alive or HTTP/2 connections.
+    The least recently used pools are closed beyond ``max_hosts``.
+    """
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        http2: Optional[bool] = None,
+        dns_ttl: Optional[float] = None,
+        max_hosts: Optional[int] = None,
+        network_backend: Optional[httpcore.AsyncNetworkBackend] = None,
+        resolver: Resolver = _getaddrinfo,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections or settings.WEBHOOK_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=(
+                max_keepalive_connections or settings.WEBHOOK_POOL_MAX_KEEPALIVE
+            ),
+            keepalive_expiry=keepalive_expiry or settings.WEBHOOK_POOL_KEEPALIVE_EXPIRY
+        )
+        self.http2 = settings.WEBHOOK_HTTP2 if http2 is None else http2
+        self.max_hosts = max_hosts or settings.WEBHOOK_POOL_MAX_HOSTS
+        self.dns = CachingDNSBackend(
+            dns_ttl or settings.WEBHOOK_DNS_CACHE_TTL,
+            backend=network_backend,
+            resolver=resolver
+        )
+
+        self._clients: "OrderedDict[str, httpx.AsyncClient]" = OrderedDict()
+        self._transports: Dict[str, PooledTransport] = {}
+        # Evicted clients still closing, awaited by close()
+        self._closing: Set[asyncio.Task] = set()
+        # Connections each pool has already served a request on
+        self._seen_streams: Dict[str, "weakref.WeakSet[Any]"] = {}
+        # Per-endpoint counters: {endpoint_id: {"requests", "pool_hits", "pool_misses"}}
+        self.endpoint_stats: Dict[Optional[int], Dict[str, int]] = {}
+
+    async def post(
+        self,
+        url: str,
+        endpoint_id: Optional[int] = None,
+        **kwargs: Any
+    ) -> httpx.Response:
+        """POST through the pool for the URL's origin."""
+        origin = self._origin(url)
+        client = self._get_client(origin)
+        response = await client.post(url, **kwargs)
+        self._record_reuse(origin, endpoint_id, response)
+        return response
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Return open connections per host and reuse counters per endpoint."""
+        hosts = {}
+        for origin, transport in self._transports.items():
+            connections = transport.pool.connections
+            hosts[origin] = {
+                "connections": len(connections),
+                "idle_connections": sum(1 for connection in connections if connection.is_idle())
+            }
+
+        endpoints = {}
+        for endpoint_id, stats in self.endpoint_stats.items():
+            requests = stats["requests"]
+            endpoints[endpoint_id] = {
+                **stats,
+                "hit_rate": round(stats["pool_hits"] / requests * 100, 2) if requests else 0.0
+            }
+
+        return {"hosts": hosts, "endpoints": endpoints}
+
+    async def close(self) -> None:
+        """Close every pool."""
+        clients, self._clients = list(self._clients.values()), OrderedDict()
+        self._transports.clear()
+        self._seen_streams.clear()
+        for client in clients:
+            await client.aclose()
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+
+    def _get_client(self, origin: str) -> httpx.AsyncClient:
+        client = self._clients.get(origin)
+        if client is not None:
+            self._clients.move_to_end(origin)
+            return client
+
+        transport = PooledTransport(self.limits, self.http2, self.dns)
+        client = httpx.AsyncClient(transport=transport, timeout=30.0)
+
+        self._clients[origin] = client
+        self._transports[origin] = transport
+        self._seen_streams[origin] = weakref.WeakSet()
+        while len(self._clients) > self.max_hosts:
+            evicted_origin, evicted = self._clients.popitem(last=False)
+            self._transports.pop(evicted_origin, None)
+            self._seen_streams.pop(evicted_origin, None)
+            task = asyncio.create_task(evicted.aclose())
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+        return client
+
+    def _record_reuse(
+        self, origin: str, endpoint_id: Optional[int], response: httpx.Response
+    ) -> None:
+        stats = self.endpoint_stats.setdefault(
+            endpoint_id, {"requests": 0, "pool_hits": 0, "pool_misses": 0}
+        )
+        stats["requests"] += 1
+
+        stream = response.extensions.get("network_stream")
+        seen = self._seen_streams.get(origin)
+        if stream is None or seen is None:
+            return
+        if stream in seen:
+            stats["pool_hits"] += 1
+        else:
+            seen.add(stream)
+            stats["pool_misses"] += 1
+
+    @staticmethod
+    def _origin(url: str) -> str:
+        parsed = httpx.URL(url)
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        return f"{parsed.scheme}://{parsed.host}:{port}"
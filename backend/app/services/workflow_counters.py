@@ -0,0 +1,284 @@
+"""
+Daily execution quotas and coalesced statistics for workflows.
+Quota checks use counters per workflow and UTC day, kept in memory or in
+Redis and seeded from workflow_executions, instead of counting rows on every
+event. Execution statistics are buffered and written in one transaction.
+"""
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import redis.asyncio as redis
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import get_async_session
+from app.models.workflow import WorkflowDefinition, WorkflowExecution
+
+logger = logging.getLogger(__name__)
+
+
+async def count_executions(db: AsyncSession, workflow_id: int, day: date) -> int:
+    """Count a workflow's executions started on ``day``."""
+    day_start = datetime.combine(day, datetime.min.time())
+    result = await db.execute(
+        select(func.count(WorkflowExecution.id)).where(
+            and_(
+                WorkflowExecution.workflow_id == workflow_id,
+                WorkflowExecution.started_at >= day_start,
+                WorkflowExecution.started_at < day_start + timedelta(days=1)
+            )
+        )
+    )
+    return result.scalar() or 0
+
+
+@dataclass(frozen=True)
+class QuotaReservation:
+    """One execution reserved against a workflow's quota for ``day``.
+
+    ``backend`` names the counter that granted it, so it is released there.
+    """
+    workflow_id: int
+    day: date
+    backend: str
+
+
+class WorkflowQuotaCounter(ABC):
+    """Counts executions per workflow and UTC day against a daily limit.
+
+    ``acquire`` reserves one execution if the limit allows it; ``release``
+    gives a reservation back when the execution was never stored.
+    """
+
+    @abstractmethod
+    async def acquire(
+        self, db: AsyncSession, workflow_id: int, limit: int
+    ) -> Optional[QuotaReservation]:
+        """Reserve one of today's executions for ``workflow_id``, or None if over the limit."""
+
+    @abstractmethod
+    async def release(self, reservation: QuotaReservation) -> None:
+        """Return a reservation."""
+
+    async def close(self) -> None:
+        """Release resources."""
+
+    @staticmethod
+    def today() -> date:
+        return datetime.utcnow().date()
+
+
+class MemoryWorkflowQuotaCounter(WorkflowQuotaCounter):
+    """Per-process counters, reset to the database count every ``reconcile_interval``.
+
+    Executions are stored as soon as they are queued, so the database count
+    includes this process's own executions; between reconciliations other
+    processes' executions are not seen.
+    """
+
+    def __init__(
+        self,
+        reconcile_interval: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.reconcile_interval = (
+            reconcile_interval if reconcile_interval is not None
+            else settings.WORKFLOW_QUOTA_RECONCILE_INTERVAL
+        )
+        self.clock = clock
+        # {workflow_id: [day, count, reconcile_at]}
+        self._counters: Dict[int, List] = {}
+
+    async def acquire(
+        self, db: AsyncSession, workflow_id: int, limit: int
+    ) -> Optional[QuotaReservation]:
+        day = self.today()
+        counter = self._counters.get(workflow_id)
+        if counter is None or counter[0] != day or counter[2] <= self.clock():
+            count = await count_executions(db, workflow_id, day)
+            counter = [day, count, self.clock() + self.reconcile_interval]
+            self._counters[workflow_id] = counter
+
+        if counter[1] >= limit:
+            return None
+        counter[1] += 1
+        return QuotaReservation(workflow_id, day, "memory")
+
+    async def release(self, reservation: QuotaReservation) -> None:
+        counter = self._counters.get(reservation.workflow_id)
+        if counter is not None and counter[0] == reservation.day and counter[1] > 0:
+            counter[1] -= 1
+
+
+class RedisWorkflowQuotaCounter(WorkflowQuotaCounter):
+    """Counters shared by all processes, checked and incremented atomically.
+
+    A missing key (new day, or Redis restarted) is seeded from the database.
+    Falls back to in-memory counters while Redis is unreachable; those
+    reservations are released back to the in-memory counters.
+    """
+
+    # KEYS[1]: counter; ARGV: limit, ttl_seconds, seed (-1 if not known yet)
+    # Returns 1 if acquired, 0 if over the limit, -1 if the counter needs a seed
+    ACQUIRE_SCRIPT = """
+local count = redis.call('GET', KEYS[1])
+if not count or tonumber(count) < 0 then
+    local seed = tonumber(ARGV[3])
+    if seed < 0 then return -1 end
+    count = seed
+    redis.call('SET', KEYS[1], seed, 'EX', tonumber(ARGV[2]))
+end
+if tonumber(count) >= tonumber(ARGV[1]) then return 0 end
+redis.call('INCR', KEYS[1])
+return 1
+"""
+
+    # KEYS[1]: counter. Decrements only an existing, positive counter, so a
+    # release never creates a key (which would lack a TTL and a seed)
+    RELEASE_SCRIPT = """
+local count = redis.call('GET', KEYS[1])
+if count and tonumber(count) > 0 then
+    return redis.call('DECR', KEYS[1])
+end
+return -1
+"""
+
+    # Counters outlive their day so late releases still find them
+    KEY_TTL_SECONDS = 2 * 86400
+
+    def __init__(self, redis_url: str, prefix: str = "teamflow:workflow-quota"):
+        self.redis_url = redis_url
+        self.prefix = prefix
+        self.fallback = MemoryWorkflowQuotaCounter()
+        self._redis: Optional[redis.Redis] = None
+        self._script = None
+        self._release_script = None
+
+    def _key(self, workflow_id: int, day: date) -> str:
+        return f"{self.prefix}:{workflow_id}:{day.isoformat()}"
+
+    def _connect(self) -> None:
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(self.redis_url)
+            self._script = self._redis.register_script(self.ACQUIRE_SCRIPT)
+            self._release_script = self._redis.register_script(self.RELEASE_SCRIPT)
+
+    async def acquire(
+        self, db: AsyncSession, workflow_id: int, limit: int
+    ) -> Optional[QuotaReservation]:
+        try:
+            self._connect()
+            day = self.today()
+            key = self._key(workflow_id, day)
+            acquired = await self._script(keys=[key], args=[limit, self.KEY_TTL_SECONDS, -1])
+            if acquired == -1:
+                seed = await count_executions(db, workflow_id, day)
+                acquired = await self._script(keys=[key], args=[limit, self.KEY_TTL_SECONDS, seed])
+            return QuotaReservation(workflow_id, day, "redis") if acquired == 1 else None
+        except Exception as e:
+            logger.error(f"Redis workflow quota counter unavailable, using local counters: {e}")
+            return await self.fallback.acquire(db, workflow_id, limit)
+
+    async def release(self, reservation: QuotaReservation) -> None:
+        if reservation.backend != "redis":
+            await self.fallback.release(reservation)
+            return
+        try:
+            self._connect()
+            await self._release_script(keys=[self._key(reservation.workflow_id, reservation.day)])
+        except Exception as e:
+            logger.error(f"Failed to release workflow quota for {reservation.workflow_id}: {e}")
+
+    async def close(self) -> None:
+        if self._redis:
+            await self._redis.close()
+            self._redis = None
+
+
+def create_workflow_quota_counter() -> WorkflowQuotaCounter:
+    """Create the counter selected by WORKFLOW_QUOTA_BACKEND."""
+    if settings.WORKFLOW_QUOTA_BACKEND == "redis":
+        return RedisWorkflowQuotaCounter(settings.REDIS_URL)
+    return MemoryWorkflowQuotaCounter()
+
+
+class WorkflowStatsWriter:
+    """Buffers finished executions and adds them to workflow statistics periodically.
+
+    Each flush issues one increment per workflow in a single transaction, so
+    statistics lag by at most ``flush_interval`` seconds.
+    """
+
+    def __init__(self, flush_interval: Optional[float] = None, session_factory=None):
+        self.flush_interval = flush_interval or settings.WORKFLOW_STATS_FLUSH_INTERVAL
+        self.session_factory = session_factory or get_async_session
+        # {workflow_id: [executions, successes, failures, last_executed_at]}
+        self._pending: Dict[int, List] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, workflow_id: int, success: bool, executed_at: Optional[datetime] = None) -> None:
+        """Count one finished execution."""
+        executed_at = executed_at or datetime.utcnow()
+        entry = self._pending.get(workflow_id)
+        if entry is None:
+            entry = self._pending[workflow_id] = [0, 0, 0, executed_at]
+        entry[0] += 1
+        entry[1 if success else 2] += 1
+        entry[3] = max(entry[3], executed_at)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Failed to write workflow statistics: {e}")
+
+    async def flush(self) -> int:
+        """Write buffered statistics in one transaction; returns workflows updated."""
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        try:
+            async with self.session_factory() as session:
+                for workflow_id, (executions, successes, failures, last_executed_at) in pending.items():
+                    await session.execute(
+                        update(WorkflowDefinition)
+                        .where(WorkflowDefinition.id == workflow_id)
+                        .values(
+                            execution_count=func.coalesce(WorkflowDefinition.execution_count, 0) + executions,
+                            success_count=func.coalesce(WorkflowDefinition.success_count, 0) + successes,
+                            failure_count=func.coalesce(WorkflowDefinition.failure_count, 0) + failures,
+                            last_executed_at=last_executed_at
+                        )
+                        .execution_options(synchronize_session=False)
+                    )
+                await session.commit()
+        except Exception:
+            # Keep the counts for the next flush
+            for workflow_id, (executions, successes, failures, last_executed_at) in pending.items():
+                entry = self._pending.setdefault(workflow_id, [0, 0, 0, last_executed_at])
+                entry[0] += executions
+                entry[1] += successes
+                entry[2] += failures
+                entry[3] = max(entry[3], last_executed_at)
+            raise
+
+        return len(pending)
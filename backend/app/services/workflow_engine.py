@@ -2,7 +2,6 @@
 Workflow Engine Service for TeamFlow.
 Handles workflow execution, business rules processing, and automation.
 """
-import asyncio
 import json
 import logging
 from datetime import datetime, timedelta
@@ -26,6 +25,12 @@ from app.schemas.workflow import (
     WorkflowTriggerEvent, WorkflowDefinitionCreate, BusinessRuleCreate,
     AutomationRuleCreate, WorkflowAnalyticsFilter
 )
+from app.services.analytics_rollups import TaskState, analytics_rollups
+from app.services.workflow_counters import (
+    QuotaReservation, WorkflowStatsWriter, create_workflow_quota_counter
+)
+from app.services.workflow_queue import WorkflowExecutionQueue
+from app.services.workflow_rules import CompiledWorkflow, WorkflowIndex
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -38,22 +43,9 @@ class WorkflowEngineService:
     """
     
     def __init__(self):
-        self.condition_evaluators = {
-            ConditionOperator.EQUALS: self._evaluate_equals,
-            ConditionOperator.NOT_EQUALS: self._evaluate_not_equals,
-            ConditionOperator.GREATER_THAN: self._evaluate_greater_than,
-            ConditionOperator.LESS_THAN: self._evaluate_less_than,
-            ConditionOperator.GREATER_EQUAL: self._evaluate_greater_equal,
-            ConditionOperator.LESS_EQUAL: self._evaluate_less_equal,
-            ConditionOperator.CONTAINS: self._evaluate_contains,
-            ConditionOperator.NOT_CONTAINS: self._evaluate_not_contains,
-            ConditionOperator.IN: self._evaluate_in,
-            ConditionOperator.NOT_IN: self._evaluate_not_in,
-            ConditionOperator.IS_NULL: self._evaluate_is_null,
-            ConditionOperator.IS_NOT_NULL: self._evaluate_is_not_null,
-            ConditionOperator.STARTS_WITH: self._evaluate_starts_with,
-            ConditionOperator.ENDS_WITH: self._evaluate_ends_with,
-        }
+        self.workflow_index = WorkflowIndex()
+        self.quotas = create_workflow_quota_counter()
+        self.stats = WorkflowStatsWriter()
         
         self.action_executors = {
             ActionType.ASSIGN_TASK: self._execute_assign_task,
@@ -76,41 +68,52 @@ class WorkflowEngineService:
         trigger_event: WorkflowTriggerEvent
     ) -> List[Dict[str, Any]]:
         """
-        Process a trigger event and execute matching workflows.
+        Process a trigger event and queue matching workflows for execution.
+        
+        Actions run on the workflow execution queue, so the caller never
+        waits for them or for any configured delay.
         
         Args:
             db: Database session
             trigger_event: The trigger event to process
             
         Returns:
-            List of execution results
+            List of queued executions
         """
         try:
             # Find matching workflows
             workflows = await self._find_matching_workflows(db, trigger_event)
             
-            execution_results = []
-            
+            runnable = []
+            reservations = []
             for workflow in workflows:
-                try:
-                    # Check if workflow can execute (rate limiting, etc.)
-                    if not await self._can_workflow_execute(db, workflow):
-                        continue
-                    
-                    # Evaluate conditions
-                    if await self._evaluate_workflow_conditions(workflow, trigger_event):
-                        # Execute workflow
-                        result = await self._execute_workflow(db, workflow, trigger_event)
-                        execution_results.append(result)
-                    
-                except Exception as e:
-                    logger.error(f"Error executing workflow {workflow.id}: {str(e)}")
-                    # Record failed execution
-                    await self._record_execution(
-                        db, workflow, trigger_event, ExecutionStatus.FAILED, error=str(e)
-                    )
+                # Check if workflow can execute (rate limiting, etc.)
+                reservation = await self._can_workflow_execute(db, workflow)
+                if reservation:
+                    runnable.append(workflow)
+                    reservations.append(reservation)
+            
+            if not runnable:
+                return []
             
-            return execution_results
+            try:
+                executions = await self._queue_executions(db, runnable, trigger_event)
+            except Exception:
+                # Nothing was stored, so hand the reserved quota back
+                await db.rollback()
+                for reservation in reservations:
+                    await self.quotas.release(reservation)
+                raise
+            
+            return [
+                {
+                    "workflow_id": execution.workflow_id,
+                    "execution_id": execution.id,
+                    "status": "queued",
+                    "scheduled_at": execution.scheduled_at.isoformat()
+                }
+                for execution in executions
+            ]
             
         except Exception as e:
             logger.error(f"Error processing trigger event: {str(e)}")
@@ -120,10 +123,11 @@ class WorkflowEngineService:
         self,
         db: AsyncSession,
         trigger_event: WorkflowTriggerEvent
-    ) -> List[WorkflowDefinition]:
-        """Find workflows that match the trigger event."""
+    ) -> List[CompiledWorkflow]:
+        """Find workflows whose trigger and conditions match the event."""
         
-        # Get organization ID from the entity
+        # The organization always comes from the entity (cached by the index);
+        # the event context may come from the client and is not trusted
         organization_id = await self._get_organization_id_for_entity(
             db, trigger_event.entity_type, trigger_event.entity_id
         )
@@ -131,76 +135,87 @@ class WorkflowEngineService:
         if not organization_id:
             return []
         
-        query = select(WorkflowDefinition).where(
-            and_(
-                WorkflowDefinition.organization_id == organization_id,
-                WorkflowDefinition.trigger_type == trigger_event.trigger_type,
-                WorkflowDefinition.is_enabled == True,
-                WorkflowDefinition.status == WorkflowStatus.ACTIVE
-            )
-        )
+        # Executions record the organization that was actually matched
+        trigger_event.context = {**trigger_event.context, "organization_id": organization_id}
         
-        result = await db.execute(query)
-        return result.scalars().all()
+        return await self.workflow_index.match(db, organization_id, trigger_event)
+    
+    def invalidate_workflows(self, organization_id: Optional[int] = None) -> None:
+        """Recompile an organization's workflows after a definition changed."""
+        self.workflow_index.invalidate(organization_id)
     
-    async def _evaluate_workflow_conditions(
+    async def _queue_executions(
         self,
-        workflow: WorkflowDefinition,
+        db: AsyncSession,
+        workflows: List[CompiledWorkflow],
         trigger_event: WorkflowTriggerEvent
-    ) -> bool:
-        """Evaluate if workflow conditions are met."""
-        
-        conditions = workflow.conditions
-        if not conditions:
-            return True  # No conditions means always execute
+    ) -> List[WorkflowExecution]:
+        """Store pending executions and hand them to the execution queue."""
+        
+        now = datetime.utcnow()
+        trigger_data = trigger_event.dict()
+        executions = []
+        
+        for workflow in workflows:
+            # The first action's delay is folded into the initial due time
+            first_delay = workflow.actions[0].get('delay_seconds', 0) if workflow.actions else 0
+            executions.append(WorkflowExecution(
+                workflow_id=workflow.id,
+                trigger_data=trigger_data,
+                status=ExecutionStatus.PENDING,
+                started_at=now,
+                planned_actions=workflow.actions,
+                next_action_index=0,
+                scheduled_at=now + timedelta(seconds=workflow.execution_delay_seconds + first_delay),
+                actions_executed=[],
+                execution_results={},
+                triggered_by_user_id=trigger_event.user_id,
+                context_data=trigger_event.context
+            ))
+        
+        db.add_all(executions)
+        await db.commit()
         
-        condition_results = []
+        for execution in executions:
+            if execution.scheduled_at > now:
+                workflow_execution_queue.schedule(execution.id, execution.scheduled_at)
+        workflow_execution_queue.notify()
         
-        for condition in conditions:
-            field_value = self._extract_field_value(trigger_event, condition['field'])
-            operator = ConditionOperator(condition['operator'])
-            expected_value = condition['value']
-            
-            # Evaluate condition
-            evaluator = self.condition_evaluators.get(operator)
-            if evaluator:
-                result = evaluator(field_value, expected_value)
-                condition_results.append(result)
-            else:
-                logger.warning(f"Unknown operator: {operator}")
-                condition_results.append(False)
-        
-        # Apply condition logic (AND/OR)
-        if workflow.condition_logic == "OR":
-            return any(condition_results)
-        else:  # Default to AND
-            return all(condition_results)
+        return executions
     
-    async def _execute_workflow(
-        self,
-        db: AsyncSession,
-        workflow: WorkflowDefinition,
-        trigger_event: WorkflowTriggerEvent
-    ) -> Dict[str, Any]:
-        """Execute a workflow's actions."""
+    async def run_execution(self, db: AsyncSession, execution_id: int) -> Optional[datetime]:
+        """
+        Run a pending execution's actions in order.
+        
+        Stops before the next action that has a delay and records where to
+        resume. Actions after the last recorded point run again if the
+        worker dies, so executors should tolerate being repeated.
+        
+        Returns:
+            When the execution is due again, or None once it has finished
+        """
+        
+        execution = await db.get(WorkflowExecution, execution_id)
+        if execution is None or execution.status != ExecutionStatus.PENDING:
+            return None
+        
+        # Action executors commit, so take everything needed up front
+        workflow_id = execution.workflow_id
+        trigger_event = WorkflowTriggerEvent(**execution.trigger_data)
+        actions = list(execution.planned_actions or [])
+        index = execution.next_action_index or 0
+        execution_results = dict(execution.execution_results or {})
+        actions_executed = list(execution.actions_executed or [])
+        previous_time_ms = execution.execution_time_ms or 0
         
         start_time = datetime.utcnow()
-        execution_results = {}
-        actions_executed = []
+        error = None
         
         try:
-            # Apply execution delay if specified
-            if workflow.execution_delay_seconds > 0:
-                await asyncio.sleep(workflow.execution_delay_seconds)
-            
-            # Execute each action
-            for i, action in enumerate(workflow.actions):
+            while index < len(actions):
+                action = actions[index]
                 action_type = ActionType(action['action_type'])
                 parameters = action.get('parameters', {})
-                delay = action.get('delay_seconds', 0)
-                
-                if delay > 0:
-                    await asyncio.sleep(delay)
                 
                 # Execute action
                 executor = self.action_executors.get(action_type)
@@ -208,7 +223,7 @@ class WorkflowEngineService:
                     action_result = await executor(
                         db, trigger_event, parameters
                     )
-                    execution_results[f"action_{i}"] = action_result
+                    execution_results[f"action_{index}"] = action_result
                     actions_executed.append({
                         "action_type": action_type.value,
                         "parameters": parameters,
@@ -216,111 +231,46 @@ class WorkflowEngineService:
                     })
                 else:
                     logger.warning(f"Unknown action type: {action_type}")
-            
-            # Record successful execution
-            execution_time = (datetime.utcnow() - start_time).total_seconds() * 1000
-            await self._record_execution(
-                db, workflow, trigger_event, ExecutionStatus.SUCCESS,
-                actions_executed=actions_executed,
-                execution_results=execution_results,
-                execution_time_ms=int(execution_time)
-            )
-            
-            # Update workflow statistics
-            await self._update_workflow_stats(db, workflow.id, success=True)
-            
-            return {
-                "workflow_id": workflow.id,
-                "status": "success",
-                "actions_executed": len(actions_executed),
-                "execution_time_ms": int(execution_time),
-                "results": execution_results
-            }
-            
+                
+                index += 1
+                if index < len(actions) and actions[index].get('delay_seconds', 0) > 0:
+                    break
         except Exception as e:
-            # Record failed execution
-            execution_time = (datetime.utcnow() - start_time).total_seconds() * 1000
-            await self._record_execution(
-                db, workflow, trigger_event, ExecutionStatus.FAILED,
-                error=str(e),
-                actions_executed=actions_executed,
-                execution_time_ms=int(execution_time)
-            )
-            
-            # Update workflow statistics
-            await self._update_workflow_stats(db, workflow.id, success=False)
-            
-            raise e
-    
-    # ========================================================================
-    # Condition Evaluators
-    # ========================================================================
-    
-    def _evaluate_equals(self, field_value: Any, expected_value: Any) -> bool:
-        return field_value == expected_value
-    
-    def _evaluate_not_equals(self, field_value: Any, expected_value: Any) -> bool:
-        return field_value != expected_value
-    
-    def _evaluate_greater_than(self, field_value: Any, expected_value: Any) -> bool:
-        try:
-            return float(field_value) > float(expected_value)
-        except (ValueError, TypeError):
-            return False
-    
-    def _evaluate_less_than(self, field_value: Any, expected_value: Any) -> bool:
-        try:
-            return float(field_value) < float(expected_value)
-        except (ValueError, TypeError):
-            return False
-    
-    def _evaluate_greater_equal(self, field_value: Any, expected_value: Any) -> bool:
-        try:
-            return float(field_value) >= float(expected_value)
-        except (ValueError, TypeError):
-            return False
-    
-    def _evaluate_less_equal(self, field_value: Any, expected_value: Any) -> bool:
-        try:
-            return float(field_value) <= float(expected_value)
-        except (ValueError, TypeError):
-            return False
-    
-    def _evaluate_contains(self, field_value: Any, expected_value: Any) -> bool:
-        try:
-            return str(expected_value).lower() in str(field_value).lower()
-        except (AttributeError, TypeError):
-            return False
-    
-    def _evaluate_not_contains(self, field_value: Any, expected_value: Any) -> bool:
-        return not self._evaluate_contains(field_value, expected_value)
-    
-    def _evaluate_in(self, field_value: Any, expected_value: List[Any]) -> bool:
-        try:
-            return field_value in expected_value
-        except TypeError:
-            return False
-    
-    def _evaluate_not_in(self, field_value: Any, expected_value: List[Any]) -> bool:
-        return not self._evaluate_in(field_value, expected_value)
-    
-    def _evaluate_is_null(self, field_value: Any, expected_value: Any) -> bool:
-        return field_value is None
-    
-    def _evaluate_is_not_null(self, field_value: Any, expected_value: Any) -> bool:
-        return field_value is not None
-    
-    def _evaluate_starts_with(self, field_value: Any, expected_value: Any) -> bool:
-        try:
-            return str(field_value).lower().startswith(str(expected_value).lower())
-        except (AttributeError, TypeError):
-            return False
-    
-    def _evaluate_ends_with(self, field_value: Any, expected_value: Any) -> bool:
-        try:
-            return str(field_value).lower().endswith(str(expected_value).lower())
-        except (AttributeError, TypeError):
-            return False
+            logger.error(f"Error executing workflow {workflow_id}: {str(e)}")
+            error = str(e)
+        
+        now = datetime.utcnow()
+        values = {
+            "actions_executed": actions_executed,
+            "execution_results": execution_results,
+            "execution_time_ms": previous_time_ms + int((now - start_time).total_seconds() * 1000),
+            "next_action_index": index,
+            "locked_by": None,
+            "locked_until": None
+        }
+        
+        resume_at = None
+        if error is not None:
+            values.update(status=ExecutionStatus.FAILED, error_message=error, completed_at=now)
+        elif index < len(actions):
+            resume_at = now + timedelta(seconds=actions[index]['delay_seconds'])
+            values.update(scheduled_at=resume_at)
+        else:
+            values.update(status=ExecutionStatus.SUCCESS, completed_at=now)
+        
+        await db.execute(
+            update(WorkflowExecution)
+            .where(WorkflowExecution.id == execution_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        
+        if resume_at is None:
+            # Workflow statistics are written in batches
+            self.stats.record(workflow_id, success=error is None, executed_at=now)
+        
+        return resume_at
     
     # ========================================================================
     # Action Executors
@@ -342,11 +292,7 @@ class WorkflowEngineService:
         
         try:
             # Update task assignment
-            await db.execute(
-                update(Task)
-                .where(Task.id == task_id)
-                .values(assignee_id=assignee_id, updated_at=datetime.utcnow())
-            )
+            await self._update_task(db, task_id, assignee_id=assignee_id)
             await db.commit()
             
             return {"success": True, "task_id": task_id, "assignee_id": assignee_id}
@@ -370,11 +316,7 @@ class WorkflowEngineService:
         
         try:
             if entity_type == "task":
-                await db.execute(
-                    update(Task)
-                    .where(Task.id == entity_id)
-                    .values(status=new_status, updated_at=datetime.utcnow())
-                )
+                await self._update_task(db, entity_id, status=TaskStatus(new_status))
             elif entity_type == "project":
                 await db.execute(
                     update(Project)
@@ -387,6 +329,29 @@ class WorkflowEngineService:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    async def _update_task(self, db: AsyncSession, task_id: int, **values: Any) -> None:
+        """Change task fields and apply the change to the analytics rollups.
+
+        Status and assignee feed the per-status and per-user counters, so
+        the task is loaded and updated through the ORM rather than with a
+        bulk UPDATE, and the rollups are written on the same session.
+        """
+        result = await db.execute(
+            select(Task, Project.organization_id)
+            .join(Project, Project.id == Task.project_id)
+            .where(Task.id == task_id)
+        )
+        row = result.first()
+        if row is None:
+            return
+        
+        task, organization_id = row
+        before = TaskState.from_task(task)
+        for field, value in values.items():
+            setattr(task, field, value)
+        task.updated_at = datetime.utcnow()
+        await analytics_rollups.record_task(db, before, TaskState.from_task(task), organization_id)
+    
     async def _execute_set_priority(
         self,
         db: AsyncSession,
@@ -553,24 +518,6 @@ class WorkflowEngineService:
     # Helper Methods
     # ========================================================================
     
-    def _extract_field_value(self, trigger_event: WorkflowTriggerEvent, field_path: str) -> Any:
-        """Extract field value from trigger event data."""
-        
-        # Simple field extraction logic
-        # In a real implementation, this would support complex field paths like 'task.assignee.name'
-        
-        if field_path.startswith('event.'):
-            # Extract from event data
-            field_name = field_path.replace('event.', '')
-            return trigger_event.event_data.get(field_name)
-        elif field_path.startswith('context.'):
-            # Extract from context
-            field_name = field_path.replace('context.', '')
-            return trigger_event.context.get(field_name)
-        else:
-            # Extract from event data by default
-            return trigger_event.event_data.get(field_path)
-    
     async def _get_organization_id_for_entity(
         self,
         db: AsyncSession,
@@ -580,105 +527,17 @@ class WorkflowEngineService:
         """Get organization ID for an entity."""
         
         try:
-            if entity_type == "task":
-                query = select(Task.project_id).where(Task.id == entity_id)
-                result = await db.execute(query)
-                project_id = result.scalar()
-                if project_id:
-                    query = select(Project.organization_id).where(Project.id == project_id)
-                    result = await db.execute(query)
-                    return result.scalar()
-            elif entity_type == "project":
-                query = select(Project.organization_id).where(Project.id == entity_id)
-                result = await db.execute(query)
-                return result.scalar()
-            elif entity_type == "user":
-                # This would need to determine organization from context
-                pass
-            
-            return None
+            return await self.workflow_index.get_organization_id(db, entity_type, entity_id)
         except Exception:
             return None
     
-    async def _can_workflow_execute(self, db: AsyncSession, workflow: WorkflowDefinition) -> bool:
+    async def _can_workflow_execute(
+        self, db: AsyncSession, workflow: CompiledWorkflow
+    ) -> Optional[QuotaReservation]:
         """Check if workflow can execute (rate limiting, etc.)."""
         
-        # Check daily execution limit
-        today = datetime.utcnow().date()
-        today_start = datetime.combine(today, datetime.min.time())
-        today_end = datetime.combine(today, datetime.max.time())
-        
-        execution_count_query = select(func.count(WorkflowExecution.id)).where(
-            and_(
-                WorkflowExecution.workflow_id == workflow.id,
-                WorkflowExecution.started_at >= today_start,
-                WorkflowExecution.started_at <= today_end
-            )
-        )
-        
-        result = await db.execute(execution_count_query)
-        today_executions = result.scalar() or 0
-        
-        return today_executions < workflow.max_executions_per_day
-    
-    async def _record_execution(
-        self,
-        db: AsyncSession,
-        workflow: WorkflowDefinition,
-        trigger_event: WorkflowTriggerEvent,
-        status: ExecutionStatus,
-        actions_executed: List[Dict[str, Any]] = None,
-        execution_results: Dict[str, Any] = None,
-        execution_time_ms: int = None,
-        error: str = None
-    ) -> WorkflowExecution:
-        """Record workflow execution in database."""
-        
-        execution = WorkflowExecution(
-            workflow_id=workflow.id,
-            trigger_data=trigger_event.dict(),
-            status=status,
-            started_at=datetime.utcnow(),
-            completed_at=datetime.utcnow() if status in [ExecutionStatus.SUCCESS, ExecutionStatus.FAILED] else None,
-            execution_time_ms=execution_time_ms,
-            actions_executed=actions_executed or [],
-            execution_results=execution_results or {},
-            error_message=error,
-            triggered_by_user_id=trigger_event.user_id,
-            context_data=trigger_event.context
-        )
-        
-        db.add(execution)
-        await db.commit()
-        await db.refresh(execution)
-        
-        return execution
-    
-    async def _update_workflow_stats(self, db: AsyncSession, workflow_id: int, success: bool):
-        """Update workflow execution statistics."""
-        
-        if success:
-            await db.execute(
-                update(WorkflowDefinition)
-                .where(WorkflowDefinition.id == workflow_id)
-                .values(
-                    execution_count=WorkflowDefinition.execution_count + 1,
-                    success_count=WorkflowDefinition.success_count + 1,
-                    last_executed_at=datetime.utcnow()
-                )
-            )
-        else:
-            await db.execute(
-                update(WorkflowDefinition)
-                .where(WorkflowDefinition.id == workflow_id)
-                .values(
-                    execution_count=WorkflowDefinition.execution_count + 1,
-                    failure_count=WorkflowDefinition.failure_count + 1,
-                    last_executed_at=datetime.utcnow()
-                )
-            )
-        
-        await db.commit()
+        # Reserve one of today's executions against the daily limit
+        return await self.quotas.acquire(db, workflow.id, workflow.max_executions_per_day)
 
 
 class BusinessRulesService:
@@ -746,4 +605,5 @@ class BusinessRulesService:
 
 
 # Initialize workflow engine instance
-workflow_engine = WorkflowEngineService()
\ No newline at end of file
+workflow_engine = WorkflowEngineService()
+workflow_execution_queue = WorkflowExecutionQueue(workflow_engine)
\ No newline at end of file
@@ -0,0 +1,195 @@
+"""
+Durable workflow execution queue.
+Triggered workflows are stored as pending rows in workflow_executions and run
+by a pool of async workers; delays are persisted due times, not sleeps.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Callable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, exists, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.core.config import settings
+from app.core.database import get_async_session_maker
+from app.core.timing_wheel import HierarchicalTimingWheel
+from app.models.workflow import ExecutionStatus, WorkflowExecution
+
+if TYPE_CHECKING:
+    from app.services.workflow_engine import WorkflowEngineService
+
+logger = logging.getLogger(__name__)
+
+
+class WorkflowExecutionQueue:
+    """Worker pool running queued workflow executions.
+
+    * An execution is ready when it is pending, its ``scheduled_at`` has
+      passed and it holds no live lease. Claiming stamps
+      ``locked_by``/``locked_until``; a dead worker's lease expires and the
+      execution resumes from its last recorded action.
+    * Actions of one execution run in order. When the next action has a
+      delay, the execution records where to resume, sets ``scheduled_at``
+      and gives up its worker, so waiting costs no coroutine or connection.
+    * Executions of different workflows run concurrently; an execution is
+      not claimed while another execution of the same workflow is leased.
+    * Due times are armed on a timing wheel that wakes the workers; an idle
+      poll picks up work queued by other processes or before a restart.
+    """
+
+    def __init__(
+        self,
+        engine: "WorkflowEngineService",
+        worker_count: Optional[int] = None,
+        lease_seconds: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.engine = engine
+        self.worker_count = (
+            worker_count if worker_count is not None else settings.WORKFLOW_WORKERS
+        )
+        self.lease_seconds = lease_seconds or settings.WORKFLOW_LEASE_SECONDS
+        self.poll_interval = poll_interval or settings.WORKFLOW_POLL_INTERVAL
+        self.session_factory = session_factory
+        self.clock = clock
+        self.node_id = uuid.uuid4().hex[:12]
+
+        self.wheel = HierarchicalTimingWheel(tick_seconds=1.0, start_time=clock())
+
+        # Workflows with an execution in flight in this process
+        self._running: Set[int] = set()
+
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        """Start the workers and the schedule timer."""
+        if self._tasks or self.worker_count <= 0:
+            return
+        if self.session_factory is None:
+            self.session_factory = get_async_session_maker()
+
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker(index)) for index in range(self.worker_count)
+        ]
+        self._tasks.append(asyncio.create_task(self._run_timers()))
+        logger.info(f"Started {self.worker_count} workflow execution workers")
+
+    async def stop(self) -> None:
+        """Stop the workers; executions in flight resume once their lease expires."""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def notify(self) -> None:
+        """Wake idle workers after executions were queued."""
+        self._wakeup.set()
+
+    def schedule(self, execution_id: int, run_at: datetime) -> None:
+        """Wake the workers when an execution comes due."""
+        delay = max(0.0, (run_at - datetime.utcnow()).total_seconds())
+        self.wheel.schedule(execution_id, delay, self.clock())
+
+    async def claim(self, session: AsyncSession, worker_id: str) -> Optional[Tuple[int, int]]:
+        """Lease the next ready execution; returns (execution_id, workflow_id)."""
+        now = datetime.utcnow()
+        ready = self._ready_clause(now)
+
+        candidates = select(WorkflowExecution.id, WorkflowExecution.workflow_id).where(ready)
+        if self._running:
+            candidates = candidates.where(WorkflowExecution.workflow_id.notin_(self._running))
+        candidates = candidates.order_by(WorkflowExecution.scheduled_at, WorkflowExecution.id).limit(1)
+        if session.bind.dialect.name != "sqlite":
+            candidates = candidates.with_for_update(skip_locked=True)
+
+        row = (await session.execute(candidates)).first()
+        if row is None:
+            await session.commit()
+            return None
+
+        # Re-check readiness: without row locks another process may have won
+        result = await session.execute(
+            update(WorkflowExecution)
+            .where(and_(WorkflowExecution.id == row.id, ready))
+            .values(
+                locked_by=worker_id,
+                locked_until=now + timedelta(seconds=self.lease_seconds)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+
+        if result.rowcount != 1:
+            return None
+        return row.id, row.workflow_id
+
+    async def _worker(self, index: int) -> None:
+        worker_id = f"{self.node_id}:{index}"
+        async with self.session_factory() as session:
+            while True:
+                try:
+                    claimed = await self.claim(session, worker_id)
+                except Exception as e:
+                    logger.error(f"Workflow worker {worker_id} failed to claim an execution: {e}")
+                    await session.rollback()
+                    claimed = None
+
+                if claimed is None:
+                    await self._wait_for_work()
+                    continue
+
+                execution_id, workflow_id = claimed
+                self._running.add(workflow_id)
+                try:
+                    resume_at = await self.engine.run_execution(session, execution_id)
+                    if resume_at is not None:
+                        self.schedule(execution_id, resume_at)
+                except Exception as e:
+                    # The lease stays in place and the execution resumes after it expires
+                    logger.error(f"Error running workflow execution {execution_id}: {e}")
+                    await session.rollback()
+                finally:
+                    self._running.discard(workflow_id)
+                    session.expunge_all()
+                    # Further executions of this workflow may have been held back
+                    self.notify()
+
+    async def _wait_for_work(self) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _run_timers(self) -> None:
+        while True:
+            await asyncio.sleep(self.wheel.tick_seconds)
+            if self.wheel.advance(self.clock()):
+                self.notify()
+
+    @staticmethod
+    def _ready_clause(now: datetime):
+        leased = aliased(WorkflowExecution)
+        return and_(
+            WorkflowExecution.status == ExecutionStatus.PENDING,
+            or_(WorkflowExecution.scheduled_at.is_(None), WorkflowExecution.scheduled_at <= now),
+            or_(WorkflowExecution.locked_until.is_(None), WorkflowExecution.locked_until < now),
+            ~exists().where(and_(
+                leased.workflow_id == WorkflowExecution.workflow_id,
+                leased.id != WorkflowExecution.id,
+                leased.status == ExecutionStatus.PENDING,
+                leased.locked_until >= now
+            ))
+        )
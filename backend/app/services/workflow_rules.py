@@ -0,0 +1,257 @@
+"""
+Compiled workflow rules and the per-organization trigger index.
+Workflow definitions are compiled once into closures: field lookups and
+operators are resolved and expected values converted at compile time, so
+matching a trigger event runs no queries and no enum or dict lookups.
+"""
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.project import Project
+from app.models.task import Task
+from app.models.workflow import WorkflowDefinition, WorkflowStatus
+from app.schemas.workflow import WorkflowTriggerEvent
+
+logger = logging.getLogger(__name__)
+
+EventPredicate = Callable[[WorkflowTriggerEvent], bool]
+
+
+def _never(event: WorkflowTriggerEvent) -> bool:
+    return False
+
+
+def _always(event: WorkflowTriggerEvent) -> bool:
+    return True
+
+
+def _field_getter(field_path: str) -> Callable[[WorkflowTriggerEvent], Any]:
+    """Resolve a condition field path to a getter on the trigger event."""
+    if field_path.startswith("event."):
+        name = field_path[len("event."):]
+        return lambda event: event.event_data.get(name)
+    if field_path.startswith("context."):
+        name = field_path[len("context."):]
+        return lambda event: event.context.get(name)
+    return lambda event: event.event_data.get(field_path)
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _compare(expected: Any, op: Callable[[float, float], bool]) -> Callable[[Any], bool]:
+    threshold = _number(expected)
+    if threshold is None:
+        return lambda value: False
+
+    def check(value: Any) -> bool:
+        number = _number(value)
+        return number is not None and op(number, threshold)
+    return check
+
+
+def _text(expected: Any, op: Callable[[str, str], bool]) -> Callable[[Any], bool]:
+    needle = str(expected).lower()
+    return lambda value: op(str(value).lower(), needle)
+
+
+def _membership(expected: Any) -> Callable[[Any], bool]:
+    # Only collections become sets; a string keeps its substring match
+    members = None
+    if isinstance(expected, (list, tuple, set, frozenset)):
+        try:
+            members = frozenset(expected)
+        except TypeError:
+            pass
+
+    def check(value: Any) -> bool:
+        try:
+            if members is not None and isinstance(value, Hashable):
+                return value in members
+            return value in expected
+        except TypeError:
+            return False
+    return check
+
+
+# Operator name -> factory turning the expected value into a value check
+OPERATORS: Dict[str, Callable[[Any], Callable[[Any], bool]]] = {
+    "equals": lambda expected: lambda value: value == expected,
+    "not_equals": lambda expected: lambda value: value != expected,
+    "greater_than": lambda expected: _compare(expected, lambda a, b: a > b),
+    "less_than": lambda expected: _compare(expected, lambda a, b: a < b),
+    "greater_equal": lambda expected: _compare(expected, lambda a, b: a >= b),
+    "less_equal": lambda expected: _compare(expected, lambda a, b: a <= b),
+    "contains": lambda expected: _text(expected, lambda value, needle: needle in value),
+    "not_contains": lambda expected: _text(expected, lambda value, needle: needle not in value),
+    "in": _membership,
+    "not_in": lambda expected: (lambda check: lambda value: not check(value))(_membership(expected)),
+    "is_null": lambda expected: lambda value: value is None,
+    "is_not_null": lambda expected: lambda value: value is not None,
+    "starts_with": lambda expected: _text(expected, str.startswith),
+    "ends_with": lambda expected: _text(expected, str.endswith),
+}
+
+
+def compile_condition(condition: Dict[str, Any]) -> EventPredicate:
+    """Compile one ``{"field", "operator", "value"}`` condition."""
+    operator = condition.get("operator")
+    operator = getattr(operator, "value", operator)
+    factory = OPERATORS.get(operator)
+    if factory is None:
+        logger.warning(f"Unknown operator: {operator}")
+        return _never
+
+    get_value = _field_getter(condition["field"])
+    check = factory(condition.get("value"))
+    return lambda event: check(get_value(event))
+
+
+def compile_conditions(conditions: List[Dict[str, Any]], logic: Optional[str]) -> EventPredicate:
+    """Combine compiled conditions with AND (default) or OR logic."""
+    if not conditions:
+        return _always
+
+    predicates = tuple(compile_condition(condition) for condition in conditions)
+    if len(predicates) == 1:
+        return predicates[0]
+    if logic == "OR":
+        return lambda event: any(predicate(event) for predicate in predicates)
+    return lambda event: all(predicate(event) for predicate in predicates)
+
+
+@dataclass
+class CompiledWorkflow:
+    """Snapshot of a workflow definition with its conditions compiled."""
+    id: int
+    name: str
+    organization_id: int
+    trigger_type: str
+    actions: List[Dict[str, Any]]
+    execution_delay_seconds: int
+    max_executions_per_day: int
+    matches: EventPredicate
+
+    @classmethod
+    def from_definition(cls, workflow: WorkflowDefinition) -> "CompiledWorkflow":
+        return cls(
+            id=workflow.id,
+            name=workflow.name,
+            organization_id=workflow.organization_id,
+            trigger_type=getattr(workflow.trigger_type, "value", workflow.trigger_type),
+            actions=list(workflow.actions or []),
+            execution_delay_seconds=workflow.execution_delay_seconds or 0,
+            max_executions_per_day=workflow.max_executions_per_day or 0,
+            matches=compile_conditions(workflow.conditions or [], workflow.condition_logic)
+        )
+
+
+class WorkflowIndex:
+    """Per-organization index of compiled workflows keyed by trigger type.
+
+    Entries are dropped by ``invalidate`` when a definition changes and
+    expire after ``ttl`` seconds to pick up changes from other processes.
+    Entity-to-organization lookups are cached as well (LRU), since tasks
+    and projects do not move between organizations.
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        max_entities: int = 10000,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.ttl = ttl if ttl is not None else settings.WORKFLOW_INDEX_CACHE_TTL
+        self.max_entities = max_entities
+        self.clock = clock
+        # {organization_id: (expires_at, {trigger_type: [CompiledWorkflow]})}
+        self._orgs: Dict[int, Tuple[float, Dict[str, List[CompiledWorkflow]]]] = {}
+        self._generations: Dict[int, int] = {}
+        self._entity_orgs: "OrderedDict[Tuple[str, int], int]" = OrderedDict()
+
+    async def match(
+        self, db: AsyncSession, organization_id: int, trigger_event: WorkflowTriggerEvent
+    ) -> List[CompiledWorkflow]:
+        """Return the organization's workflows whose conditions accept the event."""
+        cached = self._orgs.get(organization_id)
+        if cached is None or cached[0] <= self.clock():
+            by_trigger = await self._build(db, organization_id)
+        else:
+            by_trigger = cached[1]
+
+        trigger_type = getattr(trigger_event.trigger_type, "value", trigger_event.trigger_type)
+        return [
+            workflow for workflow in by_trigger.get(trigger_type, [])
+            if workflow.matches(trigger_event)
+        ]
+
+    def invalidate(self, organization_id: Optional[int] = None) -> None:
+        """Drop the compiled workflows of one organization, or of all."""
+        organization_ids = [organization_id] if organization_id is not None else list(self._orgs)
+        for org_id in organization_ids:
+            self._orgs.pop(org_id, None)
+            self._generations[org_id] = self._generations.get(org_id, 0) + 1
+
+    async def get_organization_id(
+        self, db: AsyncSession, entity_type: str, entity_id: int
+    ) -> Optional[int]:
+        """Get the organization an entity belongs to."""
+        key = (entity_type, entity_id)
+        organization_id = self._entity_orgs.get(key)
+        if organization_id is not None:
+            self._entity_orgs.move_to_end(key)
+            return organization_id
+
+        if entity_type == "task":
+            query = select(Project.organization_id).join(
+                Task, Task.project_id == Project.id
+            ).where(Task.id == entity_id)
+        elif entity_type == "project":
+            query = select(Project.organization_id).where(Project.id == entity_id)
+        else:
+            # Other entities have no organization to match workflows against
+            return None
+
+        result = await db.execute(query)
+        organization_id = result.scalar()
+        if organization_id is not None:
+            self._entity_orgs[key] = organization_id
+            if len(self._entity_orgs) > self.max_entities:
+                self._entity_orgs.popitem(last=False)
+        return organization_id
+
+    async def _build(self, db: AsyncSession, organization_id: int) -> Dict[str, List[CompiledWorkflow]]:
+        generation = self._generations.get(organization_id, 0)
+
+        query = select(WorkflowDefinition).where(
+            and_(
+                WorkflowDefinition.organization_id == organization_id,
+                WorkflowDefinition.is_enabled == True,
+                WorkflowDefinition.status == WorkflowStatus.ACTIVE
+            )
+        ).order_by(WorkflowDefinition.id)
+        result = await db.execute(query)
+
+        by_trigger: Dict[str, List[CompiledWorkflow]] = {}
+        for workflow in result.scalars().all():
+            try:
+                compiled = CompiledWorkflow.from_definition(workflow)
+            except (KeyError, TypeError, AttributeError) as e:
+                logger.error(f"Skipping workflow {workflow.id} with invalid conditions: {e}")
+                continue
+            by_trigger.setdefault(compiled.trigger_type, []).append(compiled)
+
+        if self._generations.get(organization_id, 0) == generation:
+            self._orgs[organization_id] = (self.clock() + self.ttl, by_trigger)
+        return by_trigger
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Rollup rebuild script for TeamFlow
+Recomputes analytics and time log rollups from tasks and time logs
+
+Analytics and timesheets read only the rollup tables, so run this once
+after upgrading past the migrations that add them (7f3a9c2e5b10 for
+analytics rollups, d7e2c9a4f613 for time log rollups), and again whenever
+the counters need recomputing:
+
+    cd backend && python -m scripts.rebuild_rollups [--organization-id ID ...]
+"""
+
+import argparse
+import asyncio
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_async_session
+from app.models.organization import Organization
+from app.services.analytics_rollups import analytics_rollups
+from app.services.time_rollups import time_rollups
+
+
+async def rebuild_rollups(
+    db: AsyncSession, organization_ids: Optional[List[int]] = None
+) -> Dict[int, int]:
+    """Rebuild the analytics rollups of each organization (all by default).
+
+    Returns the rows written per organization.
+    """
+    if organization_ids is None:
+        result = await db.execute(select(Organization.id).order_by(Organization.id))
+        organization_ids = list(result.scalars())
+
+    written = {}
+    for organization_id in organization_ids:
+        written[organization_id] = await analytics_rollups.rebuild(db, organization_id)
+    return written
+
+
+async def _rebuild(organization_ids: Optional[List[int]]) -> None:
+    async with get_async_session() as session:
+        written = await rebuild_rollups(session, organization_ids)
+        time_rows = await time_rollups.rebuild(session) if organization_ids is None else None
+
+    for organization_id, rows in written.items():
+        print(f"🔹 Organization {organization_id}: {rows} analytics rollup rows")
+    print(f"✅ Rebuilt analytics rollups for {len(written)} organizations")
+    if time_rows is not None:
+        print(f"✅ Rebuilt {time_rows} time log rollup rows")
+
+
+def main():
+    """Rebuild rollups from the command line."""
+    parser = argparse.ArgumentParser(description="Rebuild TeamFlow analytics and time log rollups")
+    parser.add_argument(
+        "--organization-id", type=int, action="append", dest="organization_ids",
+        help="Organization whose analytics rollups to rebuild (repeatable, default: all "
+             "organizations plus the time log rollups)"
+    )
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(_rebuild(args.organization_ids))
+        return 0
+    except Exception as e:
+        print(f"❌ Error rebuilding rollups: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -44,6 +44,7 @@ def main():
             port=8000,
             reload=True if settings.ENVIRONMENT == "development" else False,
             reload_dirs=[str(backend_dir)] if settings.ENVIRONMENT == "development" else None,
+            ws_per_message_deflate=settings.WEBSOCKET_PER_MESSAGE_DEFLATE,
         )
     
     except Exception as e:
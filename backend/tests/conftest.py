@@ -86,6 +86,25 @@ async def db_session() -> AsyncGenerator[AsyncSession, None]:
         await conn.run_sync(Base.metadata.drop_all)
 
 
+@pytest_asyncio.fixture
+async def file_db_session(tmp_path) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Create a file-backed database session.
+
+    Background workers need connections of their own; the shared in-memory
+    connection would let one worker's commit or rollback touch another's
+    transaction. Modules that run workers alias ``db_session`` to this.
+    """
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+
+    await engine.dispose()
+
+
 @pytest_asyncio.fixture
 async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
     """
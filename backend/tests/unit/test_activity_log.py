@@ -0,0 +1,163 @@
+"""
+Unit tests for the user activity log.
+
+Tests HyperLogLog estimation and recording activity into daily sketches and
+retention cohorts, and rebuilding them from the event log.
+"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.hyperloglog import HyperLogLog
+from app.models.analytics import ActivityEvent, ActivityMember, ActivitySketch, RetentionCohort
+from app.models.organization import Organization
+from app.models.user import User
+from app.services.activity_log import activity_log
+
+# A Monday, so weeks in these tests start on day 0, 7, 14, ...
+MONDAY = date(2026, 3, 2)
+
+
+def at(days: int, hour: int = 12) -> datetime:
+    return datetime.combine(MONDAY + timedelta(days=days), datetime.min.time()) + timedelta(hours=hour)
+
+
+@pytest_asyncio.fixture
+async def users(db_session: AsyncSession) -> list:
+    users = [
+        User(
+            email=f"user{index}@example.com", hashed_password="x",
+            first_name="User", last_name=str(index), status="active"
+        )
+        for index in range(4)
+    ]
+    db_session.add_all(users)
+    await db_session.commit()
+    return users
+
+
+async def table_rows(db_session: AsyncSession, model, *columns):
+    result = await db_session.execute(select(*columns).order_by(*columns))
+    return result.all()
+
+
+@pytest.mark.unit
+class TestHyperLogLog:
+    """Test distinct count estimation with sparse sketches."""
+
+    def test_estimates_and_merges(self):
+        """Test that estimates of sets and their unions stay within the error bound."""
+        hll = HyperLogLog(precision=11)
+        first, second = {}, {}
+        for value in range(20000):
+            hll.add(first, value)
+        for value in range(10000, 30000):
+            hll.add(second, value)
+
+        small = {}
+        for value in range(100):
+            hll.add(small, value)
+            hll.add(small, value)
+
+        assert abs(hll.estimate(small) - 100) <= 5
+        assert abs(hll.estimate(first) - 20000) < 20000 * 0.05
+        assert abs(hll.estimate(hll.merge([first, second])) - 30000) < 30000 * 0.05
+        assert hll.estimate({}) == 0
+        with pytest.raises(ValueError):
+            HyperLogLog(precision=20)
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestActivityLog:
+    """Test recording activity and reading active users and cohorts."""
+
+    @pytest.mark.asyncio
+    async def test_active_users_and_cohorts(
+        self, db_session: AsyncSession, test_organization: Organization, users: list
+    ):
+        """Test that repeat events count once per day and cohorts count returning users."""
+        org = test_organization.id
+        activity = [
+            (users[0], 0), (users[0], 0), (users[1], 0),  # week 0 cohort
+            (users[0], 1), (users[2], 3),
+            (users[0], 8), (users[2], 9), (users[2], 10),  # week 1
+            (users[3], 9),  # week 1 cohort
+            (users[0], 14),  # week 2
+        ]
+        for user, days in activity:
+            await activity_log.record(db_session, user.id, [org], "task_updated", "task", 1, at(days))
+        await db_session.commit()
+
+        assert await db_session.scalar(select(func.count()).select_from(ActivityEvent)) == len(activity)
+        assert await activity_log.active_user_counts(db_session, MONDAY + timedelta(days=9), org) == {
+            "dau": 2, "wau": 3, "mau": 4
+        }
+        week = await activity_log.active_users(db_session, MONDAY, MONDAY + timedelta(days=6), org)
+        assert week["active_users"] == 3
+        assert [day["active_users"] for day in week["daily_activity"]] == [2, 1, 0, 1, 0, 0, 0]
+
+        weekly = await activity_log.cohorts(db_session, MONDAY, MONDAY + timedelta(days=13), "week", org)
+        assert [(row["users"], row["retained"]) for row in weekly] == [(3, [3, 2, 1]), (1, [1])]
+        assert weekly[0]["retention_rates"][1] == 66.67
+        daily = await activity_log.cohorts(db_session, MONDAY, MONDAY, "day", org)
+        assert daily[0]["retained"] == [2, 1, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 1]
+
+        summary = await activity_log.retention_summary(db_session, MONDAY, MONDAY + timedelta(days=6), org)
+        assert (summary["new_users"], summary["retained_users"]) == (3, 2)
+
+    @pytest.mark.asyncio
+    async def test_rebuild_replays_late_events(
+        self, db_session: AsyncSession, test_organization: Organization, users: list
+    ):
+        """Test that a rebuild counts events recorded out of order, and matches incremental state otherwise."""
+        org = test_organization.id
+        for user, days in [(users[0], 0), (users[1], 2), (users[0], 7), (users[1], 9)]:
+            await activity_log.record(db_session, user.id, [org], "login", occurred_at=at(days))
+        await db_session.commit()
+
+        tables = [
+            (ActivityMember, ActivityMember.user_id, ActivityMember.first_active_on, ActivityMember.last_active_on),
+            (ActivitySketch, ActivitySketch.day, ActivitySketch.register, ActivitySketch.rank),
+            (RetentionCohort, RetentionCohort.granularity, RetentionCohort.cohort_start,
+             RetentionCohort.period, RetentionCohort.users),
+        ]
+        incremental = [await table_rows(db_session, *table) for table in tables]
+
+        assert await activity_log.rebuild(db_session, org) == 4
+        assert [await table_rows(db_session, *table) for table in tables] == incremental
+
+        # Back-dated: the user was already counted later, so only the log sees it
+        await activity_log.record(db_session, users[0].id, [org], "login", occurred_at=at(3))
+        await db_session.commit()
+        before = await activity_log.cohorts(db_session, MONDAY, MONDAY, "day", org)
+        assert before[0]["retained"][3] == 0
+
+        assert await activity_log.rebuild(db_session, org) == 5
+        after = await activity_log.cohorts(db_session, MONDAY, MONDAY, "day", org)
+        assert after[0]["retained"][3] == 1
+
+    @pytest.mark.asyncio
+    async def test_login_survives_activity_failure(
+        self, client: AsyncClient, db_session: AsyncSession, test_organization: Organization,
+        test_user: User, monkeypatch
+    ):
+        """Test that a failing activity write neither blocks the login nor its timestamp."""
+        async def fail(db, user_id, occurred_at=None):
+            db.add(ActivityEvent(organization_id=test_organization.id, user_id=user_id, event_type="login"))
+            raise RuntimeError("activity store unavailable")
+        monkeypatch.setattr(activity_log, "record_login", fail)
+
+        response = await client.post(
+            "/api/v1/auth/login", data={"username": test_user.email, "password": "testpassword123"}
+        )
+
+        assert response.status_code == 200
+        await db_session.refresh(test_user)
+        assert test_user.last_login_at is not None
+        assert await db_session.scalar(select(func.count()).select_from(ActivityEvent)) == 0
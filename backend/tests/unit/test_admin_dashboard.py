@@ -0,0 +1,118 @@
+"""
+Unit tests for the admin dashboard aggregator.
+
+Tests building the dashboard from concurrent, consolidated queries and
+serving it from the cache with background rebuilds.
+"""
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.organization import Organization
+from app.models.project import Project
+from app.models.task import Task
+from app.models.user import User
+from app.services.activity_log import activity_log
+from app.services.admin_dashboard import AdminDashboardAggregator
+
+
+@pytest.fixture
+def db_session(file_db_session: AsyncSession) -> AsyncSession:
+    """Use a file-backed database so sections get their own connections."""
+    return file_db_session
+
+
+@pytest.fixture
+def aggregator(db_session: AsyncSession) -> AdminDashboardAggregator:
+    """Aggregator with a cache namespace of its own."""
+    return AdminDashboardAggregator(
+        ttl=60,
+        refresh_after=30,
+        session_factory=async_sessionmaker(bind=db_session.bind, expire_on_commit=False),
+        namespace=f"admin-test-{uuid.uuid4().hex}"
+    )
+
+
+@pytest_asyncio.fixture
+async def populated(
+    db_session: AsyncSession, test_user: User, test_organization: Organization, test_project: Project
+):
+    """User active a week apart, organization and project with three active tasks, and a dormant organization."""
+    test_user.created_at = datetime.utcnow() - timedelta(days=10)
+    for days_ago in (7, 0):
+        await activity_log.record_login(db_session, test_user.id, datetime.utcnow() - timedelta(days=days_ago))
+    db_session.add_all([
+        Task(title=f"Task {index}", project_id=test_project.id, created_by=test_user.id, is_active=index < 3)
+        for index in range(4)
+    ])
+    db_session.add(Organization(name="Dormant", is_active=False))
+    await db_session.commit()
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestAdminDashboardAggregator:
+    """Test building and caching the admin dashboard."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.filterwarnings("error::sqlalchemy.exc.SAWarning")
+    async def test_build_consolidates_counts(
+        self, db_session: AsyncSession, aggregator: AdminDashboardAggregator, populated
+    ):
+        """Test that the dashboard comes from a handful of statements, one for all counts."""
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(db_session.bind.sync_engine, "before_cursor_execute", count)
+        try:
+            dashboard = await aggregator.build()
+        finally:
+            event.remove(db_session.bind.sync_engine, "before_cursor_execute", count)
+
+        assert len(statements) == 5
+        assert sum("FILTER (WHERE" in statement for statement in statements) == 1
+        assert dashboard["system_statistics"]["total_users"] == 1
+        assert dashboard["system_statistics"]["total_organizations"] == 1
+        assert dashboard["system_statistics"]["total_tasks"] == 3
+        assert dashboard["growth_metrics"]["new_users_30_days"] == 1
+        assert dashboard["user_metrics"]["active_users"] == 1
+        assert dashboard["user_metrics"]["retention_metrics"]["retention_rate"] == 100
+        assert dashboard["organization_metrics"]["average_projects_per_org"] == 1
+        assert dashboard["organization_metrics"]["average_users_per_org"] == 1
+        assert dashboard["organization_metrics"]["top_organizations_by_activity"] == [
+            {"name": "Test Organization", "task_count": 3}
+        ]
+        assert len(dashboard["recent_activities"]) == 3
+        assert dashboard["recent_activities"][0]["user"] == "Test User"
+
+    @pytest.mark.asyncio
+    async def test_cached_and_rebuilt_in_background(self, aggregator: AdminDashboardAggregator, populated):
+        """Test that concurrent reads share one build and stale reads rebuild in the background."""
+        builds = []
+        build = aggregator.build
+
+        async def counting():
+            builds.append(1)
+            await asyncio.sleep(0.05)
+            return await build()
+        aggregator.build = counting
+
+        first, second = await asyncio.gather(aggregator.get(), aggregator.get())
+        assert first is second
+        assert await aggregator.get() is first
+        assert len(builds) == 1
+
+        aggregator.refresh_after = 0
+        assert await aggregator.get() is first
+        rebuilt = await aggregator._rebuild
+        assert len(builds) == 2
+        assert rebuilt is not first
+        aggregator.refresh_after = 30
+        assert await aggregator.get() is rebuilt
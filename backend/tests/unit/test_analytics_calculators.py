@@ -0,0 +1,228 @@
+"""
+Unit tests for analytics metric calculators.
+
+Tests team metrics, batched metrics and reports, and that their query
+count does not grow with the number of users or projects.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.organization import Organization, OrganizationMember
+from app.models.project import Project
+from app.models.task import Task, TaskStatus
+from app.models.time_tracking import TaskTimeLog
+from app.models.user import User, UserStatus
+from app.schemas.analytics import DateRangeRequest, ReportGenerationRequest
+from app.services.analytics import AnalyticsCalculatorService, ReportGenerationService
+from app.services.analytics_batch import MetricRequest, evaluate_metrics
+from app.services.analytics_rollups import AnalyticsRollupStore
+
+TEAM_METRICS = ("workload_distribution", "resource_allocation", "team_velocity")
+
+
+@pytest.fixture
+def query_counter(db_session: AsyncSession):
+    """Count statements executed on the test database."""
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db_session.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", count)
+    yield statements
+    event.remove(engine, "before_cursor_execute", count)
+
+
+@pytest_asyncio.fixture
+async def add_members(
+    db_session: AsyncSession, test_organization: Organization, test_project: Project, test_user: User
+):
+    """Factory adding active members, each with tasks and logged time."""
+    added = []
+
+    async def add(count: int, tasks_each: int = 2):
+        now = datetime.utcnow()
+        for _ in range(count):
+            index = len(added)
+            user = User(
+                email=f"member{index}@example.com",
+                first_name="Team",
+                last_name=f"Member {index}",
+                hashed_password="x",
+                status=UserStatus.ACTIVE
+            )
+            db_session.add(user)
+            await db_session.flush()
+            db_session.add(OrganizationMember(user_id=user.id, organization_id=test_organization.id))
+
+            tasks = [
+                Task(
+                    title=f"Task {index}.{number}",
+                    project_id=test_project.id,
+                    created_by=test_user.id,
+                    assignee_id=user.id,
+                    status=TaskStatus.DONE if number == 0 else TaskStatus.TODO
+                )
+                for number in range(tasks_each + index % 2)
+            ]
+            db_session.add_all(tasks)
+            await db_session.flush()
+            db_session.add(TaskTimeLog(
+                task_id=tasks[0].id,
+                user_id=user.id,
+                start_time=now,
+                end_time=now + timedelta(minutes=30),
+                duration_minutes=30 * (index + 1)
+            ))
+            added.append(user)
+
+        await db_session.commit()
+        await AnalyticsRollupStore().rebuild(db_session, test_organization.id)
+        return added
+    return add
+
+
+async def calculate(db_session: AsyncSession, organization: Organization, metric: str):
+    today = datetime.utcnow().date()
+    return await AnalyticsCalculatorService().calculate_metric(
+        metric, organization.id, today - timedelta(days=6), today, db=db_session
+    )
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestTeamMetrics:
+    """Test workload, resource allocation and velocity metrics."""
+
+    @pytest.mark.asyncio
+    async def test_workload_includes_members_without_tasks(
+        self, db_session: AsyncSession, test_organization: Organization, add_members
+    ):
+        """Test that the balance score counts every active member."""
+        await add_members(2)
+
+        result = await calculate(db_session, test_organization, "workload_distribution")
+
+        # The owner from the fixtures has no tasks; members have 2 and 3
+        assert sorted(result["source_data"]["task_counts"]) == [0, 2, 3]
+        assert result["source_data"]["mean_tasks"] == pytest.approx(5 / 3)
+        assert 0 < result["value"] < 100
+
+    @pytest.mark.asyncio
+    async def test_resource_allocation_and_velocity(
+        self, db_session: AsyncSession, test_organization: Organization, add_members
+    ):
+        """Test per-user hours and completions from the rollups."""
+        await add_members(3)
+
+        allocation = await calculate(db_session, test_organization, "resource_allocation")
+        assert allocation["source_data"]["unique_users"] == 3
+        assert allocation["source_data"]["total_logged_hours"] == pytest.approx(3.0)
+        assert allocation["source_data"]["mean_user_hours"] == pytest.approx(1.0)
+
+        velocity = await calculate(db_session, test_organization, "team_velocity")
+        assert velocity["value"] == pytest.approx(3 / 7)
+        assert velocity["source_data"]["contributors"] == 3
+        assert velocity["source_data"]["user_velocity_std_deviation"] == 0.0
+
+    @pytest.mark.asyncio
+    async def test_query_count_independent_of_team_size(
+        self, db_session: AsyncSession, test_organization: Organization, add_members, query_counter
+    ):
+        """Test that team metrics issue the same number of queries for 3 and 30 members."""
+        counts = []
+        for team_size in (3, 27):
+            await add_members(team_size)
+            query_counter.clear()
+            for metric in TEAM_METRICS:
+                result = await calculate(db_session, test_organization, metric)
+                assert "error" not in result
+            counts.append(len(query_counter))
+
+        assert counts[0] == counts[1]
+        assert counts[0] <= 2 * len(TEAM_METRICS)
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestBatchMetrics:
+    """Test batched metric evaluation and the reports using it."""
+
+    @pytest.mark.asyncio
+    async def test_columnar_result_per_entity(
+        self, db_session: AsyncSession, test_organization: Organization, test_project: Project, add_members
+    ):
+        """Test that a batch returns one row per pair, sliceable by metric."""
+        users = await add_members(2)
+        today = datetime.utcnow().date()
+
+        frame = await AnalyticsCalculatorService().calculate_metrics(
+            [MetricRequest("project_progress", "project", test_project.id)]
+            + [MetricRequest("task_count", "user", user.id) for user in users]
+            + [MetricRequest("hours_logged", "organization", test_organization.id)],
+            test_organization.id, today, today, db_session
+        )
+
+        assert len(frame) == 4
+        assert frame.column("task_count", "user") == {users[0].id: 2, users[1].id: 3}
+        assert frame.get("project_progress", "project", test_project.id) == pytest.approx(40.0)
+        assert frame.get("hours_logged", "organization", test_organization.id) == pytest.approx(1.5)
+
+        with pytest.raises(ValueError):
+            await evaluate_metrics(
+                db_session, test_organization.id, today, today,
+                [MetricRequest("bug_resolution_time", "organization", test_organization.id)]
+            )
+
+    @pytest.mark.asyncio
+    async def test_project_overview_query_count(
+        self, db_session: AsyncSession, test_organization: Organization, add_members, query_counter
+    ):
+        """Test that the project overview issues the same queries for 1 and 10 projects."""
+        await add_members(2)
+        today = datetime.utcnow().date()
+        request = ReportGenerationRequest(
+            template_id=1, date_range=DateRangeRequest(start_date=today, end_date=today)
+        )
+        service = ReportGenerationService()
+
+        counts = []
+        for extra_projects in (0, 9):
+            db_session.add_all([
+                Project(name=f"Extra {index}", organization_id=test_organization.id)
+                for index in range(extra_projects)
+            ])
+            await db_session.commit()
+            query_counter.clear()
+            report = await service._generate_project_overview(None, request, test_organization.id, db_session)
+            counts.append(len(query_counter))
+
+        assert counts[0] == counts[1] == 2
+        assert report["summary"]["total_projects"] == 10
+        [project] = [p for p in report["projects"] if p["task_count"]]
+        assert (project["task_count"], project["completed_tasks"]) == (5, 2)
+
+    @pytest.mark.asyncio
+    async def test_task_analytics_counts_in_sql(
+        self, db_session: AsyncSession, test_organization: Organization, add_members
+    ):
+        """Test that task distributions come from grouped counts."""
+        await add_members(2)
+        today = datetime.utcnow().date()
+        request = ReportGenerationRequest(
+            template_id=1, date_range=DateRangeRequest(start_date=today, end_date=today)
+        )
+
+        report = await ReportGenerationService()._generate_task_analytics(
+            None, request, test_organization.id, db_session
+        )
+
+        assert report["summary"]["total_tasks"] == 5
+        assert report["distributions"]["status"] == {"done": 2, "todo": 3}
+        assert report["summary"]["completion_rate"] == pytest.approx(40.0)
@@ -0,0 +1,126 @@
+"""
+Unit tests for columnar report analytics.
+
+Tests typed column loading, grouping, histograms, percentiles and the time
+tracking report built on them.
+"""
+
+from array import array
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.organization import Organization
+from app.models.project import Project
+from app.models.task import Task
+from app.models.time_tracking import TaskTimeLog
+from app.models.user import User
+from app.schemas.analytics import DateRangeRequest, ReportGenerationRequest
+from app.services.analytics import ReportGenerationService
+from app.services.analytics_columns import (Columns, daily_series, group_sum, histogram,
+                                            percentiles, to_epoch, where)
+
+
+@pytest.mark.unit
+class TestColumnOperations:
+    """Test operations over typed columns."""
+
+    def test_group_and_filter(self):
+        """Test grouped sums and flag filtering."""
+        keys = [1, 2, 1, 3]
+        values = [10, 20, 30, 40]
+
+        assert group_sum(keys, values) == {1: 40, 2: 20, 3: 40}
+        assert list(where(array("q", values), [1, 0, 0, 1])) == [10, 40]
+
+    def test_histogram_and_percentiles(self):
+        """Test bucket counts and interpolated percentiles ignoring NaN."""
+        values = [1, 5, 15, 30, 45, 300]
+
+        assert histogram(values, (10, 30, 60)) == [2, 1, 2, 1]
+        result = percentiles(values + [float("nan")], (0.0, 0.5, 1.0))
+        assert result == {0.0: 1, 0.5: 22.5, 1.0: 300}
+        assert percentiles([]) == {0.5: 0.0, 0.9: 0.0, 0.99: 0.0}
+
+    def test_daily_series_fills_empty_days(self):
+        """Test that every day of the range gets a bucket."""
+        start = date(2026, 3, 1)
+        timestamps = [to_epoch(datetime(2026, 3, 1, 9)), to_epoch(datetime(2026, 3, 3, 18)),
+                      to_epoch(datetime(2026, 3, 9))]
+
+        labels, sums = daily_series(timestamps, [30, 45, 60], start, date(2026, 3, 3))
+
+        assert labels == ["2026-03-01", "2026-03-02", "2026-03-03"]
+        assert sums == [30, 0, 45]
+        assert daily_series(timestamps, None, start, start)[1] == [1]
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestColumnarReports:
+    """Test reports computed from typed columns."""
+
+    @pytest.mark.asyncio
+    async def test_load_streams_typed_columns(
+        self, db_session: AsyncSession, test_project: Project, test_user: User
+    ):
+        """Test that loading converts rows into arrays across batches."""
+        db_session.add_all([
+            Task(title=f"Task {index}", project_id=test_project.id, created_by=test_user.id,
+                 estimated_hours=index or None)
+            for index in range(5)
+        ])
+        await db_session.commit()
+
+        columns = await Columns.load(
+            db_session,
+            select(Task.id, Task.estimated_hours, Task.created_at).order_by(Task.id),
+            {"id": "int", "estimated_hours": "float", "created_at": "datetime"},
+            batch_size=2
+        )
+
+        assert len(columns) == 5
+        assert columns["id"].typecode == "q"
+        assert [value == value for value in columns["estimated_hours"]] == [False, True, True, True, True]
+        assert columns["created_at"][0] > 0
+
+    @pytest.mark.asyncio
+    async def test_time_tracking_report(
+        self, db_session: AsyncSession, test_organization: Organization, test_project: Project, test_user: User
+    ):
+        """Test totals, per-user breakdown and the daily timeline."""
+        task = Task(title="Tracked", project_id=test_project.id, created_by=test_user.id)
+        db_session.add(task)
+        await db_session.flush()
+        today = datetime.utcnow().replace(hour=10, minute=0, second=0, microsecond=0)
+        for days_ago, minutes, billable in ((0, 60, True), (0, 30, False), (2, 90, True), (9, 500, True)):
+            start_time = today - timedelta(days=days_ago)
+            db_session.add(TaskTimeLog(
+                task_id=task.id,
+                user_id=test_user.id,
+                start_time=start_time,
+                end_time=start_time + timedelta(minutes=minutes),
+                duration_minutes=minutes,
+                is_billable=billable
+            ))
+        await db_session.commit()
+
+        request = ReportGenerationRequest(
+            template_id=1,
+            date_range=DateRangeRequest(start_date=today.date() - timedelta(days=6), end_date=today.date())
+        )
+        report = await ReportGenerationService()._generate_time_tracking(
+            None, request, test_organization.id, db_session
+        )
+
+        assert report["summary"]["total_hours"] == pytest.approx(3.0)
+        assert report["summary"]["billable_hours"] == pytest.approx(2.5)
+        assert report["summary"]["median_entry_minutes"] == 60
+        assert report["user_breakdown"] == {test_user.id: {"total": 3.0, "billable": 2.5, "entries": 3}}
+        daily = report["charts"]["daily_hours"]["data"]
+        assert len(daily["labels"]) == 7
+        assert daily["values"][-1] == pytest.approx(1.5)
+        assert daily["values"][-3] == pytest.approx(1.5)
+        assert sum(report["charts"]["entry_duration_distribution"]["data"]["values"]) == 3
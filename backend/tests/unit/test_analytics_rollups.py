@@ -0,0 +1,227 @@
+"""
+Unit tests for analytics rollups.
+
+Tests task and time log deltas, upserted counters, range queries and rebuilds.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.analytics import AnalyticsRollup
+from app.models.organization import Organization
+from app.models.project import Project
+from app.models.task import Task, TaskStatus
+from app.models.time_tracking import TaskTimeLog
+from app.models.user import User
+from app.models.workflow import TriggerType
+from app.schemas.workflow import WorkflowTriggerEvent
+from app.services.analytics import AnalyticsCalculatorService
+from app.services.analytics_rollups import (AnalyticsRollupStore, TaskState,
+                                            period_bounds, task_deltas)
+from app.services.workflow_engine import WorkflowEngineService
+from scripts.rebuild_rollups import rebuild_rollups
+
+ORG = 1
+NOON = datetime(2026, 3, 10, 12, 30)
+
+
+def state(status=TaskStatus.TODO, assignee_id=None, due_date=None, is_active=True) -> TaskState:
+    return TaskState(
+        project_id=7, assignee_id=assignee_id, status=status, is_active=is_active, due_date=due_date
+    )
+
+
+@pytest_asyncio.fixture
+async def make_task(db_session: AsyncSession, test_project: Project, test_user: User):
+    """Factory for stored tasks."""
+    async def make(**values) -> Task:
+        task = Task(title="Rolled up", project_id=test_project.id, created_by=test_user.id, **values)
+        db_session.add(task)
+        await db_session.commit()
+        return task
+    return make
+
+
+@pytest.mark.unit
+class TestTaskDeltas:
+    """Test counter changes derived from task writes."""
+
+    def test_creation_counts_in_every_scope(self):
+        """Test that a new assigned task counts for organization, project and user."""
+        deltas = task_deltas(ORG, None, state(assignee_id=3), NOON)
+
+        assert set(deltas) == {("organization", ORG), ("project", 7), ("user", 3)}
+        for counters in deltas.values():
+            assert counters == {"tasks_created": 1, "tasks_todo": 1}
+
+    def test_completion_against_due_date(self):
+        """Test that completing a task records a completion and whether it was on time."""
+        before = state(TaskStatus.IN_PROGRESS, due_date=NOON + timedelta(days=1))
+
+        on_time = task_deltas(ORG, before, state(TaskStatus.DONE, due_date=before.due_date), NOON)
+        assert on_time[("project", 7)] == {
+            "tasks_in_progress": -1, "tasks_done": 1, "tasks_completed": 1, "completed_on_time": 1
+        }
+
+        late = task_deltas(ORG, before, state(TaskStatus.DONE, due_date=before.due_date), NOON + timedelta(days=2))
+        assert late[("project", 7)]["completed_late"] == 1
+
+    def test_reassignment_moves_status_count(self):
+        """Test that reassigning a task moves its status count between users."""
+        deltas = task_deltas(ORG, state(assignee_id=3), state(assignee_id=4), NOON)
+
+        assert deltas[("user", 3)] == {"tasks_todo": -1}
+        assert deltas[("user", 4)] == {"tasks_todo": 1}
+        assert deltas[("project", 7)] == {"tasks_todo": 0}
+
+    def test_deleting_removes_status_count(self):
+        """Test that a soft-deleted task no longer counts in its status."""
+        deltas = task_deltas(ORG, state(TaskStatus.DONE), state(TaskStatus.DONE, is_active=False), NOON)
+
+        assert deltas[("organization", ORG)] == {"tasks_done": -1}
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestAnalyticsRollupStore:
+    """Test stored rollup counters."""
+
+    @pytest.mark.asyncio
+    async def test_writes_accumulate_into_buckets(
+        self, db_session: AsyncSession, test_organization: Organization, test_project: Project
+    ):
+        """Test that repeated writes add to one hourly and one daily row per scope."""
+        store = AnalyticsRollupStore()
+        for minute in (0, 20, 40):
+            await store.record_task(
+                db_session, None, TaskState(test_project.id, None, TaskStatus.TODO, True, None),
+                test_organization.id, NOON.replace(minute=minute)
+            )
+        await db_session.commit()
+
+        rows = (await db_session.execute(select(func.count(AnalyticsRollup.id)))).scalar()
+        assert rows == 4
+
+        start, end = period_bounds(NOON.date(), NOON.date())
+        totals = await store.totals(db_session, test_organization.id, start, end)
+        assert totals["tasks_created"] == 3
+        assert totals["tasks_todo"] == 3
+
+    @pytest.mark.asyncio
+    async def test_range_uses_hours_at_the_edges(
+        self, db_session: AsyncSession, test_organization: Organization, test_project: Project
+    ):
+        """Test that partial days are summed from hourly rows and whole days from daily rows."""
+        store = AnalyticsRollupStore()
+        created = TaskState(test_project.id, None, TaskStatus.TODO, True, None)
+        for when in (NOON - timedelta(days=1, hours=4), NOON - timedelta(days=1), NOON, NOON + timedelta(hours=3)):
+            await store.record_task(db_session, None, created, test_organization.id, when)
+        await db_session.commit()
+
+        # From 10:00 the day before until 13:00: skips 08:30 before and 15:30 after
+        totals = await store.totals(
+            db_session, test_organization.id,
+            NOON - timedelta(days=1, hours=2, minutes=30), NOON + timedelta(minutes=30)
+        )
+        assert totals["tasks_created"] == 2
+
+        by_project = await store.totals_by_scope(
+            db_session, test_organization.id, "project", None, None, counters=("tasks_created",)
+        )
+        assert by_project == {test_project.id: {"tasks_created": 4}}
+
+    @pytest.mark.asyncio
+    async def test_rebuild_matches_tables(
+        self, db_session: AsyncSession, test_organization: Organization, test_user: User, make_task
+    ):
+        """Test that a rebuild recomputes counters from tasks and time logs."""
+        await make_task(status=TaskStatus.DONE, assignee_id=test_user.id)
+        task = await make_task()
+        db_session.add(TaskTimeLog(
+            task_id=task.id,
+            user_id=test_user.id,
+            start_time=datetime.utcnow() - timedelta(hours=1),
+            end_time=datetime.utcnow(),
+            duration_minutes=60,
+            is_billable=True
+        ))
+        await db_session.commit()
+
+        store = AnalyticsRollupStore()
+        assert await store.rebuild(db_session, test_organization.id) > 0
+        assert await store.rebuild(db_session, test_organization.id) > 0
+
+        totals = await store.totals(db_session, test_organization.id, None, None)
+        assert totals["tasks_created"] == 2
+        assert totals["tasks_completed"] == 1
+        assert totals["minutes_logged"] == 60
+        assert await store.status_counts(db_session, test_organization.id) == {
+            "todo": 1, "in_progress": 0, "in_review": 0, "done": 1, "cancelled": 0
+        }
+        user_totals = await store.totals(db_session, test_organization.id, None, None, "user", test_user.id)
+        assert user_totals["tasks_done"] == 1
+        assert user_totals["billable_minutes"] == 60
+
+    @pytest.mark.asyncio
+    async def test_rebuild_command_backfills_every_organization(
+        self, db_session: AsyncSession, test_organization: Organization, make_task
+    ):
+        """Test that the rebuild command fills rollups for data written before they existed."""
+        await make_task(status=TaskStatus.DONE)
+        await make_task()
+        empty = Organization(name="Empty Organization")
+        db_session.add(empty)
+        await db_session.commit()
+
+        store = AnalyticsRollupStore()
+        assert (await store.totals(db_session, test_organization.id, None, None))["tasks_created"] == 0
+
+        written = await rebuild_rollups(db_session)
+        assert written[empty.id] == 0
+        assert written[test_organization.id] > 0
+        assert (await store.totals(db_session, test_organization.id, None, None))["tasks_created"] == 2
+
+    @pytest.mark.asyncio
+    async def test_workflow_actions_update_rollups(
+        self, db_session: AsyncSession, test_organization: Organization, test_user: User, make_task
+    ):
+        """Test that workflow status and assignment actions keep the counters in step."""
+        task = await make_task()
+        store = AnalyticsRollupStore()
+        await store.rebuild(db_session, test_organization.id)
+
+        engine = WorkflowEngineService()
+        event = WorkflowTriggerEvent(trigger_type=TriggerType.TASK_UPDATED, entity_type="task", entity_id=task.id)
+        assert (await engine._execute_update_status(db_session, event, {"status": "in_progress"}))["success"]
+        assert (await engine._execute_assign_task(db_session, event, {"assignee_id": test_user.id}))["success"]
+        assert not (await engine._execute_update_status(db_session, event, {"status": "bogus"}))["success"]
+
+        status_counts = await store.status_counts(db_session, test_organization.id)
+        assert (status_counts["todo"], status_counts["in_progress"]) == (0, 1)
+        user_totals = await store.totals(db_session, test_organization.id, None, None, "user", test_user.id)
+        assert user_totals["tasks_in_progress"] == 1
+
+    @pytest.mark.asyncio
+    async def test_calculator_reads_rollups(
+        self, db_session: AsyncSession, test_organization: Organization, make_task
+    ):
+        """Test that metrics are computed from the rollups."""
+        await make_task(status=TaskStatus.DONE)
+        await make_task()
+        await AnalyticsRollupStore().rebuild(db_session, test_organization.id)
+
+        today = datetime.utcnow().date()
+        calculator = AnalyticsCalculatorService()
+        completion = await calculator.calculate_metric(
+            "task_completion_rate", test_organization.id, today, today, db=db_session
+        )
+        progress = await calculator.calculate_metric(
+            "project_progress", test_organization.id, today, today, db=db_session
+        )
+
+        assert completion["value"] == 50.0
+        assert progress["value"] == 50.0
@@ -0,0 +1,198 @@
+"""
+Unit tests for dashboard widget queries.
+
+Tests parsing widget query configurations and loading dashboards through
+the batched, cached widget query engine.
+"""
+
+import asyncio
+import uuid
+from datetime import date
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.analytics import ChartType, Dashboard, DashboardWidget
+from app.models.organization import Organization
+from app.models.project import Project
+from app.models.task import Task, TaskStatus
+from app.models.user import User
+from app.services.analytics import DashboardService
+from app.services.analytics_rollups import analytics_rollups
+from app.services.dashboard_queries import WidgetQueryEngine, parse_widget_query
+
+
+@pytest.fixture
+def query_counter(db_session: AsyncSession):
+    """Count statements executed on the test database."""
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db_session.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", count)
+    yield statements
+    event.remove(engine, "before_cursor_execute", count)
+
+
+@pytest.fixture
+def engine() -> WidgetQueryEngine:
+    """Engine with a cache namespace of its own."""
+    return WidgetQueryEngine(namespace=f"widgets-test-{uuid.uuid4().hex}")
+
+
+@pytest_asyncio.fixture
+async def dashboard(
+    db_session: AsyncSession, test_organization: Organization, test_user: User, test_project: Project
+) -> Dashboard:
+    """Dashboard with 20 widgets over a project with five tasks."""
+    db_session.add_all([
+        Task(
+            title=f"Task {index}", project_id=test_project.id, created_by=test_user.id,
+            status=TaskStatus.DONE if index < 2 else TaskStatus.TODO
+        )
+        for index in range(5)
+    ])
+    dashboard = Dashboard(name="Overview", organization_id=test_organization.id, created_by=test_user.id)
+    db_session.add(dashboard)
+    await db_session.flush()
+
+    configs = [
+        {"status_counts": True},
+        {"metrics": ["task_completion_rate", "team_velocity"]},
+        {"metric": "task_count", "entity_type": "project", "entity_id": test_project.id},
+        {"series": ["tasks_created", "tasks_completed"], "days": 7},
+        {"breakdown": "task_count", "group_by": "project"},
+    ]
+    db_session.add_all([
+        DashboardWidget(
+            title=f"Widget {index}",
+            widget_type=ChartType.PIE if index % 2 else ChartType.BAR,
+            query_config=configs[index % len(configs)],
+            dashboard_id=dashboard.id,
+            organization_id=test_organization.id,
+            display_order=index
+        )
+        for index in range(20)
+    ])
+    await db_session.commit()
+    await analytics_rollups.rebuild(db_session, test_organization.id)
+    await db_session.commit()
+    return dashboard
+
+
+async def widgets_of(db_session: AsyncSession, dashboard: Dashboard):
+    result = await db_session.execute(
+        select(DashboardWidget)
+        .where(DashboardWidget.dashboard_id == dashboard.id)
+        .order_by(DashboardWidget.display_order)
+    )
+    return result.scalars().all()
+
+
+@pytest.mark.unit
+class TestWidgetQueryParsing:
+    """Test normalizing widget query configurations."""
+
+    def test_filters_override_query_config(self):
+        """Test that widget filters override the query and equal configs give equal queries."""
+        today = date(2026, 3, 31)
+        query = parse_widget_query(
+            {"metric": "hours_logged", "days": 30},
+            {"entity_type": "user", "entity_id": 7, "days": 7},
+            organization_id=1,
+            today=today
+        )
+
+        assert query.names == ("hours_logged",)
+        assert (query.entity_type, query.entity_id) == ("user", 7)
+        assert query.period_start == date(2026, 3, 25)
+        assert query == parse_widget_query(
+            {"metrics": ["hours_logged"], "entity_type": "user", "entity_id": 7, "days": 7}, {}, 1, today
+        )
+        assert query.cache_key(1) != query.cache_key(2)
+
+    def test_invalid_configs(self):
+        """Test that unusable configurations are rejected."""
+        for config in (
+            {},
+            {"metric": "unknown"},
+            {"series": ["nope"]},
+            {"metric": "task_count", "entity_type": "project"},
+            {"breakdown": "task_count", "group_by": "team"},
+        ):
+            with pytest.raises(ValueError):
+                parse_widget_query(config, None, 1)
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestWidgetQueryEngine:
+    """Test loading dashboards through the widget query engine."""
+
+    @pytest.mark.asyncio
+    async def test_dashboard_load_is_batched_and_read_only(
+        self, db_session: AsyncSession, dashboard: Dashboard, engine: WidgetQueryEngine, query_counter,
+        monkeypatch
+    ):
+        """Test that 20 widgets cost a handful of reads, no writes, and nothing once cached."""
+        monkeypatch.setattr("app.services.analytics.widget_query_engine", engine)
+
+        data = await DashboardService().get_dashboard_data(dashboard, db_session)
+
+        assert len(data) == 20
+        assert len(query_counter) <= 8
+        assert not [s for s in query_counter if s.lstrip().upper().startswith(("INSERT", "UPDATE", "DELETE"))]
+
+        widgets = await widgets_of(db_session, dashboard)
+        status_counts = data[widgets[0].id]
+        assert status_counts["type"] == "bar"
+        assert status_counts["data"]["labels"][:4] == ["todo", "in_progress", "in_review", "done"]
+        assert status_counts["data"]["datasets"][0]["data"][:4] == [3, 0, 0, 2]
+        assert data[widgets[2].id]["data"]["datasets"][0]["data"] == [5]
+        assert len(data[widgets[3].id]["data"]["labels"]) == 7
+        assert data[widgets[4].id]["data"]["labels"] == ["Test Project"]
+        assert data[widgets[5].id]["data"] == status_counts["data"]
+
+        query_counter.clear()
+        assert await DashboardService().get_dashboard_data(dashboard, db_session) == data
+        assert len(query_counter) == 1  # Only the widget list
+
+    @pytest.mark.asyncio
+    async def test_concurrent_loads_share_queries(
+        self, db_session: AsyncSession, dashboard: Dashboard, engine: WidgetQueryEngine
+    ):
+        """Test that concurrent loads of the same queries execute them once."""
+        executed = []
+        execute = engine.execute
+
+        async def counting(db, organization_id, queries):
+            executed.append(len(queries))
+            await asyncio.sleep(0.05)
+            return await execute(db, organization_id, queries)
+        engine.execute = counting
+
+        widgets = await widgets_of(db_session, dashboard)
+        first, second = await asyncio.gather(
+            engine.load(db_session, dashboard.organization_id, widgets),
+            engine.load(db_session, dashboard.organization_id, widgets[:5]),
+        )
+
+        assert executed == [5]
+        assert all(second[widget.id] == first[widget.id] for widget in widgets[:5])
+
+    @pytest.mark.asyncio
+    async def test_invalid_widget_reports_error(
+        self, db_session: AsyncSession, dashboard: Dashboard, engine: WidgetQueryEngine
+    ):
+        """Test that a misconfigured widget gets an error without failing the others."""
+        widgets = await widgets_of(db_session, dashboard)
+        widgets[0].query_config = {"metric": "unknown"}
+
+        data = await engine.load(db_session, dashboard.organization_id, widgets[:2])
+
+        assert "Unknown metrics" in data[widgets[0].id]["error"]
+        assert "data" in data[widgets[1].id]
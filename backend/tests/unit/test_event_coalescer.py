@@ -0,0 +1,137 @@
+"""
+Unit tests for realtime event coalescing and per-connection rate caps.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from app.core.event_coalescer import EventCoalescer
+from app.core.websocket import ConnectionManager, MessageType
+
+
+class FakeWebSocket:
+    """Minimal WebSocket stand-in that records sent frames."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text: str) -> None:
+        self.sent.append(json.loads(text))
+
+
+def make_manager(max_frames_per_second: int = 0) -> ConnectionManager:
+    """Create a manager with one user subscribed to project 10."""
+    manager = ConnectionManager(max_frames_per_second=max_frames_per_second)
+    manager.active_connections = {2: {"conn": FakeWebSocket()}}
+    manager.project_subscriptions = {10: {2: {"conn"}}}
+    return manager
+
+
+@pytest.mark.unit
+class TestEventCoalescer:
+    """Test merging and batching of buffered events."""
+
+    @pytest.mark.asyncio
+    async def test_same_entity_events_merge_into_one_delta(self):
+        """Test that one edit's update, status and assignment events merge."""
+        manager = make_manager()
+        coalescer = EventCoalescer(manager, window_ms=20)
+
+        await coalescer.publish_to_project(
+            10, MessageType.TASK_UPDATED,
+            {"task_id": 1, "changes": {"status": {"old": "todo", "new": "in_progress"}}},
+            entity_key=("task", 1), exclude_user=1,
+        )
+        await coalescer.publish_to_project(
+            10, MessageType.TASK_STATUS_CHANGED,
+            {"task_id": 1, "old_status": "todo", "new_status": "in_progress"},
+            entity_key=("task", 1), exclude_user=1,
+        )
+        await coalescer.publish_to_project(
+            10, MessageType.TASK_UPDATED,
+            {"task_id": 1, "changes": {"status": {"old": "in_progress", "new": "done"}}},
+            entity_key=("task", 1), exclude_user=1,
+        )
+        await asyncio.sleep(0.05)
+
+        frames = manager.active_connections[2]["conn"].sent
+        assert len(frames) == 1
+        assert frames[0]["type"] == "task_updated"
+        data = frames[0]["data"]
+        assert data["changes"]["status"] == {"old": "todo", "new": "done"}
+        assert data["old_status"] == "todo"
+        assert data["coalesced_types"] == ["task_updated", "task_status_changed"]
+
+    @pytest.mark.asyncio
+    async def test_distinct_entities_are_batched(self):
+        """Test that events for different entities share one batch frame."""
+        manager = make_manager()
+        coalescer = EventCoalescer(manager, window_ms=20, max_batch_size=2)
+
+        for task_id in range(3):
+            await coalescer.publish_to_project(
+                10, MessageType.TASK_UPDATED, {"task_id": task_id},
+                entity_key=("task", task_id),
+            )
+        await coalescer.flush_all()
+
+        frames = manager.active_connections[2]["conn"].sent
+        assert [frame["type"] for frame in frames] == ["batch", "task_updated"]
+        assert [event["data"]["task_id"] for event in frames[0]["data"]["events"]] == [0, 1]
+
+    @pytest.mark.asyncio
+    async def test_zero_window_sends_immediately(self):
+        """Test that coalescing can be disabled."""
+        manager = make_manager()
+        coalescer = EventCoalescer(manager, window_ms=0)
+
+        await coalescer.publish_to_project(10, MessageType.TASK_CREATED, {"task_id": 1})
+
+        assert len(manager.active_connections[2]["conn"].sent) == 1
+
+
+@pytest.mark.unit
+class TestConnectionRateCap:
+    """Test the per-connection frame rate cap."""
+
+    @pytest.mark.asyncio
+    async def test_frames_over_cap_are_deferred_into_one_batch(self):
+        """Test that frames over the cap are held back and sent as a batch."""
+        manager = make_manager(max_frames_per_second=20)
+
+        for task_id in range(25):
+            await manager.broadcast_to_project(10, MessageType.TASK_CREATED, {"task_id": task_id})
+
+        frames = manager.active_connections[2]["conn"].sent
+        assert len(frames) == 20
+
+        await asyncio.sleep(0.1)
+        assert len(frames) == 21
+        assert frames[-1]["type"] == "batch"
+        assert len(frames[-1]["data"]["events"]) == 5
+
+    @pytest.mark.asyncio
+    async def test_deferred_flush_tasks_are_tracked(self):
+        """Test that deferred flushes are kept until done and their errors logged."""
+        manager = make_manager(max_frames_per_second=20)
+        for task_id in range(21):
+            await manager.broadcast_to_project(10, MessageType.TASK_CREATED, {"task_id": task_id})
+
+        release = asyncio.Event()
+
+        async def failing(websocket, message_type, data):
+            await release.wait()
+            raise RuntimeError("socket gone")
+        manager.send_message = failing
+
+        await asyncio.sleep(0.1)
+        assert len(manager._flush_tasks) == 1
+        task = next(iter(manager._flush_tasks))
+
+        release.set()
+        await asyncio.wait([task])
+        await asyncio.sleep(0)
+        assert not manager._flush_tasks
+        assert isinstance(task.exception(), RuntimeError)
@@ -0,0 +1,161 @@
+"""
+Unit tests for the timing wheel and the presence service.
+"""
+
+import pytest
+
+from app.core.presence import PresenceService
+from app.core.timing_wheel import HierarchicalTimingWheel
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.unit
+class TestHierarchicalTimingWheel:
+    """Test timer scheduling, cascading and cancellation."""
+
+    def test_timers_fire_in_order_across_levels(self):
+        """Test that short and long timers expire at their deadlines."""
+        wheel = HierarchicalTimingWheel(tick_seconds=1, wheel_size=4, levels=3)
+        wheel.schedule("short", 2, now=0)
+        wheel.schedule("long", 37, now=0)
+
+        assert wheel.advance(1) == []
+        assert [key for key, _ in wheel.advance(2)] == ["short"]
+        assert wheel.advance(36) == []
+        assert [key for key, _ in wheel.advance(37)] == ["long"]
+        assert len(wheel) == 0
+
+    def test_reschedule_replaces_timer(self):
+        """Test that scheduling an existing key moves its deadline."""
+        wheel = HierarchicalTimingWheel(tick_seconds=1, wheel_size=4, levels=3)
+        wheel.schedule("conn", 5, now=0, payload=1)
+        wheel.schedule("conn", 5, now=4, payload=2)
+
+        assert wheel.advance(8) == []
+        assert wheel.advance(9) == [("conn", 2)]
+
+    def test_cancel(self):
+        """Test that cancelled timers never fire."""
+        wheel = HierarchicalTimingWheel(tick_seconds=1, wheel_size=4, levels=3)
+        wheel.schedule("conn", 20, now=0)
+
+        assert wheel.cancel("conn") is True
+        assert wheel.cancel("conn") is False
+        assert wheel.advance(30) == []
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def service(clock: FakeClock) -> PresenceService:
+    """Create a presence service that records diffs and expiries."""
+    service = PresenceService(
+        heartbeat_timeout=30, typing_ttl=5, flush_interval=0.25, tick_seconds=1, clock=clock
+    )
+    service.diffs = []
+    service.expired_typing = []
+    service.timed_out = []
+
+    async def on_diff(diff):
+        service.diffs.append(diff)
+
+    async def on_typing_expired(task_id, user_id):
+        service.expired_typing.append((task_id, user_id))
+
+    async def on_connection_timeout(connection_id, user_id):
+        service.timed_out.append(connection_id)
+        service.remove_connection(connection_id)
+
+    service.on_diff = on_diff
+    service.on_typing_expired = on_typing_expired
+    service.on_connection_timeout = on_connection_timeout
+    return service
+
+
+@pytest.mark.unit
+class TestPresenceService:
+    """Test presence snapshots, diffs and expiry."""
+
+    @pytest.mark.asyncio
+    async def test_snapshot_tracks_users_not_connections(self, service: PresenceService):
+        """Test that a user stays online until their last connection leaves."""
+        service.register_connection("a1", 1)
+        service.register_connection("a2", 1)
+        service.join_project(10, 1, "a1")
+        service.join_project(10, 1, "a2")
+
+        assert service.get_project_presence(10)["total_online"] == 1
+
+        service.remove_connection("a1")
+        assert service.get_project_presence(10)["total_online"] == 1
+
+        service.remove_connection("a2")
+        assert service.get_project_presence(10) == {"online_users": [], "total_online": 0}
+
+    @pytest.mark.asyncio
+    async def test_snapshot_is_reused_between_changes(self, service: PresenceService):
+        """Test that reads without membership changes return the same snapshot."""
+        service.register_connection("a1", 1)
+        service.join_project(10, 1, "a1")
+
+        first = service.get_project_presence(10)
+        service.heartbeat("a1")
+        assert service.get_project_presence(10) is first
+
+    @pytest.mark.asyncio
+    async def test_diffs_are_batched_and_cancel_out(self, service: PresenceService):
+        """Test that joins are batched and join+leave within a window cancel."""
+        for connection_id, user_id in (("a", 1), ("b", 2), ("c", 3)):
+            service.register_connection(connection_id, user_id)
+            service.join_project(10, user_id, connection_id)
+        service.remove_connection("c")
+
+        await service.flush()
+
+        assert len(service.diffs) == 1
+        assert [entry["user_id"] for entry in service.diffs[0]["joined"]] == [1, 2]
+        assert service.diffs[0]["left"] == []
+
+    @pytest.mark.asyncio
+    async def test_typing_indicator_expires(self, service: PresenceService, clock: FakeClock):
+        """Test that an unrenewed typing indicator expires after its TTL."""
+        service.register_connection("a", 1)
+        assert service.start_typing(100, 1, "a") is True
+        clock.now = 3
+        assert service.start_typing(100, 1, "a") is False
+
+        clock.now = 7
+        await service.process_expired()
+        assert service.expired_typing == []
+
+        clock.now = 9
+        await service.process_expired()
+        assert service.expired_typing == [(100, 1)]
+        assert 100 not in service.typing_indicators
+
+    @pytest.mark.asyncio
+    async def test_missing_heartbeats_time_out(self, service: PresenceService, clock: FakeClock):
+        """Test that connections without heartbeats are timed out."""
+        service.register_connection("a", 1)
+        service.register_connection("b", 2)
+        service.join_project(10, 1, "a")
+
+        clock.now = 20
+        service.heartbeat("b")
+        clock.now = 31
+        await service.process_expired()
+
+        assert service.timed_out == ["a"]
+        assert service.get_project_presence(10)["total_online"] == 0
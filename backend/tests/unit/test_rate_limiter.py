@@ -0,0 +1,102 @@
+"""
+Unit tests for the webhook rate limiter.
+
+Tests GCRA token-bucket decisions and write-behind of usage counters.
+"""
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.organization import Organization
+from app.models.webhooks import APIRateLimit
+from app.services.rate_limiter import MemoryRateLimiter, RateLimit, RateLimitUsageWriter
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.unit
+class TestMemoryRateLimiter:
+    """Test in-memory GCRA decisions."""
+
+    @pytest.mark.asyncio
+    async def test_allows_burst_then_spaces_requests(self):
+        """Test that a full window burst is allowed and refills gradually."""
+        clock = FakeClock()
+        limiter = MemoryRateLimiter(clock=clock)
+        limits = [RateLimit("minute", 6)]
+
+        decisions = [await limiter.acquire("webhook:1", limits) for _ in range(7)]
+        assert [decision.allowed for decision in decisions] == [True] * 6 + [False]
+        assert decisions[0].remaining == 5
+        assert decisions[-1].retry_after == pytest.approx(10)
+
+        clock.now += 10
+        assert (await limiter.acquire("webhook:1", limits)).allowed
+        assert not (await limiter.acquire("webhook:1", limits)).allowed
+
+    @pytest.mark.asyncio
+    async def test_all_limits_must_pass(self):
+        """Test that a request rejected by one limit consumes no capacity."""
+        clock = FakeClock()
+        limiter = MemoryRateLimiter(clock=clock)
+        limits = [RateLimit("minute", 10), RateLimit("hour", 2)]
+
+        assert (await limiter.acquire("webhook:1", limits)).allowed
+        assert (await limiter.acquire("webhook:1", limits)).allowed
+        decision = await limiter.acquire("webhook:1", limits)
+        assert not decision.allowed
+        assert decision.retry_after == pytest.approx(1800)
+
+        # The minute bucket was not charged for the rejected request
+        assert (await limiter.acquire("webhook:1", [RateLimit("minute", 10)])).remaining == 7
+
+    @pytest.mark.asyncio
+    async def test_subjects_are_independent(self):
+        """Test that each subject has its own bucket."""
+        limiter = MemoryRateLimiter(clock=FakeClock())
+        limits = [RateLimit("minute", 1)]
+
+        assert (await limiter.acquire("webhook:1", limits)).allowed
+        assert (await limiter.acquire("webhook:2", limits)).allowed
+        assert not (await limiter.acquire("webhook:1", limits)).allowed
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestRateLimitUsageWriter:
+    """Test write-behind of rate limit usage."""
+
+    @pytest.mark.asyncio
+    async def test_flush_upserts_counters(
+        self, db_session: AsyncSession, test_organization: Organization
+    ):
+        """Test that buffered counts are added to APIRateLimit rows."""
+        writer = RateLimitUsageWriter(
+            session_factory=async_sessionmaker(bind=db_session.bind, expire_on_commit=False)
+        )
+        limits = [RateLimit("minute", 60), RateLimit("hour", 1000)]
+
+        for _ in range(3):
+            writer.record("webhook", "7", limits, test_organization.id)
+        assert await writer.flush() == 2
+
+        writer.record("webhook", "7", limits, test_organization.id)
+        assert await writer.flush() == 2
+        assert await writer.flush() == 0
+
+        result = await db_session.execute(
+            select(APIRateLimit).where(APIRateLimit.subject_id == "7")
+        )
+        rows = {row.limit_type: row for row in result.scalars().all()}
+        assert rows["minute"].current_count == 4
+        assert rows["hour"].max_requests == 1000
+        assert rows["hour"].organization_id == test_organization.id
@@ -0,0 +1,245 @@
+"""
+Unit tests for background report jobs.
+
+Tests queued report generation, chunked exports, job claiming and ranged
+downloads.
+"""
+
+import csv
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.routes.reports import parse_range, ranged_file_response
+from app.models.analytics import (
+    Report, ReportExport, ReportFormat, ReportJobStatus, ReportTemplate, ReportType
+)
+from app.models.organization import Organization
+from app.models.project import Project
+from app.models.task import Task
+from app.models.user import User
+from app.schemas.analytics import DateRangeRequest, ReportExportRequest, ReportGenerationRequest
+from app.services.analytics import ReportGenerationService
+from app.services.report_exports import ReportExporter, csv_lines, flatten
+from app.services.report_queue import ReportJobQueue
+
+
+@pytest.fixture
+def db_session(file_db_session: AsyncSession) -> AsyncSession:
+    """Use a file-backed database so workers get their own connections."""
+    return file_db_session
+
+
+@pytest_asyncio.fixture
+async def task_template(
+    db_session: AsyncSession, test_organization: Organization, test_user: User, test_project: Project
+) -> ReportTemplate:
+    """Task analytics template over a project with seven tasks."""
+    db_session.add_all([
+        Task(
+            title=f"Task {index}", project_id=test_project.id, created_by=test_user.id,
+            status="done" if index < 3 else "todo"
+        )
+        for index in range(7)
+    ])
+    template = ReportTemplate(
+        name="Tasks",
+        report_type=ReportType.TASK_ANALYTICS,
+        organization_id=test_organization.id,
+        created_by=test_user.id
+    )
+    db_session.add(template)
+    await db_session.commit()
+    return template
+
+
+def generation_request(template: ReportTemplate) -> ReportGenerationRequest:
+    today = date.today()
+    return ReportGenerationRequest(
+        template_id=template.id,
+        name="Weekly tasks",
+        date_range=DateRangeRequest(start_date=today - timedelta(days=7), end_date=today)
+    )
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestReportGeneration:
+    """Test queueing and running report generation."""
+
+    @pytest.mark.asyncio
+    async def test_generate_queues_then_runs(
+        self, db_session: AsyncSession, task_template: ReportTemplate, test_user: User
+    ):
+        """Test that generation is queued and a run stores the data and progress."""
+        service = ReportGenerationService()
+
+        report = await service.generate_report(
+            task_template, generation_request(task_template), test_user, db_session
+        )
+        assert report.status == ReportJobStatus.QUEUED
+        assert report.progress == 0
+        assert report.data == {}
+
+        await service.run_generation(db_session, report.id)
+
+        await db_session.refresh(report)
+        assert report.status == ReportJobStatus.COMPLETED
+        assert report.progress == 100
+        assert report.data["summary"]["total_tasks"] == 7
+        assert report.file_size_bytes == len(json.dumps(report.data, default=str).encode("utf-8"))
+        assert report.completed_at is not None
+        await db_session.refresh(task_template)
+        assert task_template.usage_count == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_generation_is_recorded(
+        self, db_session: AsyncSession, task_template: ReportTemplate, test_user: User
+    ):
+        """Test that a generator error marks the report failed instead of raising."""
+        service = ReportGenerationService()
+        report = await service.generate_report(
+            task_template, generation_request(task_template), test_user, db_session
+        )
+
+        async def broken(*args):
+            raise RuntimeError("boom")
+        service.report_generators[ReportType.TASK_ANALYTICS] = broken
+        await service.run_generation(db_session, report.id)
+
+        await db_session.refresh(report)
+        assert report.status == ReportJobStatus.FAILED
+        assert "boom" in report.error_message
+
+    @pytest.mark.asyncio
+    async def test_claim_prefers_reports_and_skips_leased_jobs(
+        self, db_session: AsyncSession, task_template: ReportTemplate, test_user: User
+    ):
+        """Test that reports are claimed before exports and leased jobs are skipped."""
+        service = ReportGenerationService()
+        report = await service.generate_report(
+            task_template, generation_request(task_template), test_user, db_session
+        )
+        export = await service.request_export(
+            db_session, report, test_user.id, ReportExportRequest(format=ReportFormat.CSV)
+        )
+        queue = ReportJobQueue(service, worker_count=0)
+
+        assert await queue.claim(db_session, "worker-1") == (Report, report.id)
+        assert await queue.claim(db_session, "worker-2") == (ReportExport, export.id)
+        assert await queue.claim(db_session, "worker-3") is None
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestReportExports:
+    """Test chunked report exports."""
+
+    @pytest_asyncio.fixture
+    async def report(self, db_session: AsyncSession, task_template: ReportTemplate, test_user: User):
+        return await ReportGenerationService().generate_report(
+            task_template, generation_request(task_template), test_user, db_session
+        )
+
+    async def export(self, db_session, report, user, format, tmp_path):
+        """Run an export three rows at a time; returns it with the recorded progress."""
+        service = ReportGenerationService()
+        export = await service.request_export(
+            db_session, report, user.id, ReportExportRequest(format=format)
+        )
+        progress = []
+        exporter = ReportExporter(export_dir=str(tmp_path / "exports"), chunk_size=3)
+        original = exporter._progress
+
+        async def record(db, export_id, written, total, lease_seconds):
+            progress.append(written * 100 // total)
+            await original(db, export_id, written, total, lease_seconds)
+        exporter._progress = record
+
+        await exporter.run(db_session, export.id, lease_seconds=60)
+        await db_session.refresh(export)
+        return export, progress
+
+    @pytest.mark.asyncio
+    async def test_csv_export_in_chunks(self, db_session: AsyncSession, report: Report, test_user: User, tmp_path):
+        """Test that a CSV export is written chunk by chunk with progress."""
+        export, progress = await self.export(db_session, report, test_user, ReportFormat.CSV, tmp_path)
+
+        assert export.status == ReportJobStatus.COMPLETED
+        assert export.progress == 100
+        assert export.row_count == 7
+        assert progress == [42, 85, 100]
+        assert export.filename.endswith(".csv")
+        with open(export.file_path, newline="") as file:
+            rows = list(csv.reader(file))
+        assert rows[0][:3] == ["id", "project_id", "title"]
+        assert [row[2] for row in rows[1:]] == [f"Task {index}" for index in range(7)]
+        assert export.file_size_bytes == sum(len(",".join(row)) + 2 for row in rows)
+
+    @pytest.mark.asyncio
+    async def test_jsonl_export(self, db_session: AsyncSession, report: Report, test_user: User, tmp_path):
+        """Test that a JSONL export writes one object per row."""
+        export, _ = await self.export(db_session, report, test_user, ReportFormat.JSONL, tmp_path)
+
+        with open(export.file_path) as file:
+            rows = [json.loads(line) for line in file]
+        assert len(rows) == 7
+        assert rows[0]["status"] == "done"
+        assert export.content_type == "application/x-ndjson"
+
+    @pytest.mark.asyncio
+    async def test_parquet_export(self, db_session: AsyncSession, report: Report, test_user: User, tmp_path):
+        """Test that a Parquet export keeps typed columns."""
+        parquet = pytest.importorskip("pyarrow.parquet")
+        export, _ = await self.export(db_session, report, test_user, ReportFormat.PARQUET, tmp_path)
+
+        table = parquet.read_table(export.file_path)
+        assert table.num_rows == 7
+        assert str(table.schema.field("id").type) == "int64"
+
+
+@pytest.mark.unit
+class TestReportDownloads:
+    """Test ranged downloads and CSV flattening."""
+
+    def test_parse_range(self):
+        """Test byte range parsing, including suffix and open-ended ranges."""
+        assert parse_range(None, 100) is None
+        assert parse_range("bytes=0-9", 100) == (0, 9)
+        assert parse_range("bytes=90-", 100) == (90, 99)
+        assert parse_range("bytes=-10", 100) == (90, 99)
+        assert parse_range("bytes=50-500", 100) == (50, 99)
+        assert parse_range("items=0-1", 100) is None
+        with pytest.raises(ValueError):
+            parse_range("bytes=100-", 100)
+        for header in ("bytes=-10", "bytes=0-", "bytes=0-0"):
+            with pytest.raises(ValueError):
+                parse_range(header, 0)
+
+    @pytest.mark.asyncio
+    async def test_ranged_response(self, tmp_path):
+        """Test that a range request streams only the requested bytes."""
+        path = tmp_path / "export.csv"
+        path.write_bytes(bytes(range(200)))
+
+        response = ranged_file_response(str(path), "export.csv", "text/csv", "bytes=10-19")
+        body = b"".join([chunk async for chunk in response.body_iterator])
+
+        assert response.status_code == 206
+        assert response.headers["content-range"] == "bytes 10-19/200"
+        assert response.headers["content-length"] == "10"
+        assert body == bytes(range(10, 20))
+
+    def test_flatten_to_csv(self):
+        """Test that nested report data becomes metric/value lines."""
+        data = {"summary": {"users": 3, "at": datetime(2026, 1, 2)}, "top": [{"name": "a"}]}
+
+        assert list(csv_lines([("metric", "value"), *flatten(data)])) == [
+            "metric,value\r\n",
+            "summary.users,3\r\n",
+            "summary.at,2026-01-02T00:00:00\r\n",
+            "top.0.name,a\r\n",
+        ]
@@ -0,0 +1,261 @@
+"""
+Unit tests for the report scheduler.
+
+Tests next run computation, leader election, dispatching due schedules and
+evaluating alerts from rollups.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.analytics import (
+    Report, ReportAlert, ReportExport, ReportFrequency, ReportJobStatus, ReportSchedule,
+    ReportTemplate, ReportType, SchedulerLease
+)
+from app.models.organization import Organization
+from app.models.project import Project
+from app.models.task import Task
+from app.models.user import User
+from app.services.analytics import ReportGenerationService
+from app.services.analytics_rollups import analytics_rollups
+from app.services.report_scheduler import (
+    CronExpression, ReportScheduler, evaluate_alerts, next_run_time
+)
+
+
+@pytest.fixture
+def db_session(file_db_session: AsyncSession) -> AsyncSession:
+    """Use a file-backed database so schedulers get their own connections."""
+    return file_db_session
+
+
+def make_scheduler(db_session: AsyncSession, **kwargs) -> ReportScheduler:
+    return ReportScheduler(
+        ReportGenerationService(),
+        session_factory=async_sessionmaker(bind=db_session.bind, expire_on_commit=False),
+        **kwargs
+    )
+
+
+def schedule_of(frequency=ReportFrequency.DAILY, **values) -> ReportSchedule:
+    values.setdefault("timezone", "UTC")
+    return ReportSchedule(name="Schedule", frequency=frequency, **values)
+
+
+@pytest.mark.unit
+class TestNextRunTime:
+    """Test computing the next run of a schedule."""
+
+    def test_cron_fields(self):
+        """Test steps, ranges and the either-day rule of cron."""
+        every_quarter = CronExpression("*/15 * * * *")
+        assert every_quarter.next_after(datetime(2026, 3, 2, 10, 7)) == datetime(2026, 3, 2, 10, 15)
+
+        weekdays = CronExpression("0 9 * * 1-5")
+        assert weekdays.next_after(datetime(2026, 3, 6, 9, 0)) == datetime(2026, 3, 9, 9, 0)
+
+        # 13th of the month or any Friday
+        either = CronExpression("30 8 13 * 5")
+        assert either.next_after(datetime(2026, 3, 10)) == datetime(2026, 3, 13, 8, 30)
+        assert either.next_after(datetime(2026, 3, 13, 9)) == datetime(2026, 3, 20, 8, 30)
+
+        assert CronExpression("0 0 1 1 *").next_after(datetime(2026, 6, 1)) == datetime(2027, 1, 1)
+        with pytest.raises(ValueError):
+            CronExpression("61 * * * *")
+
+    def test_frequencies(self):
+        """Test daily, weekly and monthly runs, clamping to short months."""
+        after = datetime(2026, 1, 31, 12, 0)  # Saturday
+
+        assert next_run_time(schedule_of(scheduled_time="08:00"), after) == datetime(2026, 2, 1, 8)
+        assert next_run_time(schedule_of(scheduled_time="18:30"), after) == datetime(2026, 1, 31, 18, 30)
+        weekly = schedule_of(ReportFrequency.WEEKLY, scheduled_time="09:00", scheduled_day=0)
+        assert next_run_time(weekly, after) == datetime(2026, 2, 2, 9)
+        monthly = schedule_of(ReportFrequency.MONTHLY, scheduled_time="06:00", scheduled_day=31)
+        assert next_run_time(monthly, after) == datetime(2026, 2, 28, 6)
+        quarterly = schedule_of(ReportFrequency.QUARTERLY, scheduled_day=1)
+        assert next_run_time(quarterly, after) == datetime(2026, 4, 1)
+        assert next_run_time(schedule_of(ReportFrequency.MANUAL), after) is None
+
+    def test_timezone_and_cron_parameter(self):
+        """Test that runs are placed in the schedule's timezone, across DST."""
+        schedule = schedule_of(scheduled_time="09:00", timezone="America/New_York")
+
+        assert next_run_time(schedule, datetime(2026, 3, 1, 15)) == datetime(2026, 3, 2, 14)
+        assert next_run_time(schedule, datetime(2026, 3, 9, 15)) == datetime(2026, 3, 10, 13)
+
+        schedule.parameters = {"cron": "0 7 * * *"}
+        assert next_run_time(schedule, datetime(2026, 3, 9, 15)) == datetime(2026, 3, 10, 11)
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestSchedulerLeadership:
+    """Test electing a single scheduler node."""
+
+    @pytest.mark.asyncio
+    async def test_one_leader_and_takeover(self, db_session: AsyncSession):
+        """Test that one node leads and another takes over once its lease expires."""
+        first, second = make_scheduler(db_session), make_scheduler(db_session)
+
+        assert await first.elect(db_session) is True
+        assert await second.elect(db_session) is False
+        assert await first.elect(db_session) is True
+
+        await db_session.execute(
+            update(SchedulerLease).values(expires_at=datetime.utcnow() - timedelta(seconds=1))
+        )
+        await db_session.commit()
+
+        assert await second.elect(db_session) is True
+        assert await first.elect(db_session) is False
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestScheduleDispatch:
+    """Test dispatching and running due schedules."""
+
+    @pytest_asyncio.fixture
+    async def schedule(self, db_session: AsyncSession, test_organization: Organization, test_user: User):
+        template = ReportTemplate(
+            name="Tasks",
+            report_type=ReportType.TASK_ANALYTICS,
+            organization_id=test_organization.id,
+            created_by=test_user.id
+        )
+        db_session.add(template)
+        await db_session.commit()
+
+        schedule = ReportSchedule(
+            name="Daily tasks",
+            template_id=template.id,
+            frequency=ReportFrequency.DAILY,
+            scheduled_time="06:00",
+            auto_export_formats=["csv"],
+            organization_id=test_organization.id,
+            created_by=test_user.id,
+            next_run_at=datetime.utcnow() - timedelta(minutes=1)
+        )
+        db_session.add(schedule)
+        await db_session.commit()
+        return schedule
+
+    @pytest.mark.asyncio
+    async def test_due_schedule_dispatched_once(self, db_session: AsyncSession, schedule: ReportSchedule):
+        """Test that a due schedule is claimed once and its next run moves forward."""
+        first, second = make_scheduler(db_session), make_scheduler(db_session)
+
+        assert await first.dispatch_due_schedules(db_session) == [schedule.id]
+        assert await second.dispatch_due_schedules(db_session) == []
+        assert first.jobs.get_nowait() == ("schedule", schedule.id)
+
+        await db_session.refresh(schedule)
+        assert schedule.next_run_at > datetime.utcnow()
+        assert schedule.next_run_at.time() == datetime(2026, 1, 1, 6).time()
+
+    @pytest.mark.asyncio
+    async def test_upcoming_schedule_armed_on_wheel(self, db_session: AsyncSession, schedule: ReportSchedule):
+        """Test that a schedule due before the next scan is armed instead of polled for."""
+        schedule.next_run_at = datetime.utcnow() + timedelta(seconds=5)
+        await db_session.commit()
+        scheduler = make_scheduler(db_session, poll_interval=30)
+
+        assert await scheduler.dispatch_due_schedules(db_session) == []
+        assert schedule.id in scheduler.wheel
+
+    @pytest.mark.asyncio
+    async def test_run_queues_report_and_exports(self, db_session: AsyncSession, schedule: ReportSchedule):
+        """Test that a run queues the report and its automatic exports."""
+        scheduler = make_scheduler(db_session)
+
+        await scheduler.run_schedule(db_session, schedule.id)
+
+        report = (await db_session.execute(select(Report))).scalar_one()
+        assert report.status == ReportJobStatus.QUEUED
+        assert report.data_end_date - report.data_start_date == timedelta(days=1)
+        export = (await db_session.execute(select(ReportExport))).scalar_one()
+        assert export.report_id == report.id
+        await db_session.refresh(schedule)
+        assert schedule.run_count == 1
+        assert schedule.failure_count == 0
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestAlertEvaluation:
+    """Test evaluating alerts from rollups."""
+
+    @pytest.mark.asyncio
+    async def test_alert_fires_after_consecutive_breaches(
+        self, db_session: AsyncSession, test_organization: Organization, test_user: User,
+        test_project: Project
+    ):
+        """Test that an alert fires once its threshold is crossed enough times in a row."""
+        db_session.add_all([
+            Task(title=f"Task {index}", project_id=test_project.id, created_by=test_user.id)
+            for index in range(3)
+        ])
+        alert = ReportAlert(
+            name="Too many open tasks",
+            metric_name="task_count",
+            threshold_value=2,
+            threshold_operator=">",
+            consecutive_periods=2,
+            notification_recipients=[test_user.id],
+            organization_id=test_organization.id,
+            created_by=test_user.id
+        )
+        unknown = ReportAlert(
+            name="Unknown",
+            metric_name="bug_resolution_time",
+            threshold_value=1,
+            threshold_operator=">",
+            organization_id=test_organization.id,
+            created_by=test_user.id
+        )
+        db_session.add_all([alert, unknown])
+        await db_session.commit()
+        await analytics_rollups.rebuild(db_session, test_organization.id)
+        await db_session.commit()
+
+        fired = [
+            await evaluate_alerts(db_session, test_organization.id, [alert.id, unknown.id])
+            for _ in range(3)
+        ]
+
+        assert [[a.id for a in batch] for batch in fired] == [[], [alert.id], []]
+        assert alert.last_value == 3
+        assert alert.consecutive_breaches == 3
+        assert alert.trigger_count == 1
+        assert unknown.last_evaluated_at is not None
+
+    @pytest.mark.asyncio
+    async def test_due_alerts_batched_per_organization(
+        self, db_session: AsyncSession, test_organization: Organization, test_user: User
+    ):
+        """Test that due alerts are queued as one batch per organization."""
+        alerts = [
+            ReportAlert(
+                name=f"Alert {index}",
+                metric_name="hours_logged",
+                threshold_value=10,
+                threshold_operator="<",
+                organization_id=test_organization.id,
+                created_by=test_user.id,
+                last_evaluated_at=datetime.utcnow() if index == 2 else None
+            )
+            for index in range(3)
+        ]
+        db_session.add_all(alerts)
+        await db_session.commit()
+        scheduler = make_scheduler(db_session, alert_interval=300)
+
+        batches = await scheduler.dispatch_due_alerts(db_session)
+
+        assert batches == {test_organization.id: [alerts[0].id, alerts[1].id]}
+        assert await scheduler.dispatch_due_alerts(db_session) == {}
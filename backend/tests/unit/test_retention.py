@@ -0,0 +1,145 @@
+"""
+Unit tests for the retention cleanup engine.
+
+Tests chunked deletion, policy conditions and archiving.
+"""
+
+import gzip
+import json
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.organization import Organization
+from app.models.security import AuditLog
+from app.models.user import User
+from app.models.webhooks import DeliveryStatus, WebhookDelivery, WebhookDeliveryEvent, WebhookEndpoint
+from app.services.retention import RetentionEngine
+
+
+@pytest_asyncio.fixture
+async def deliveries(
+    db_session: AsyncSession, test_organization: Organization, test_user: User
+):
+    """Create old finished, old pending and recent deliveries."""
+    endpoint = WebhookEndpoint(
+        name="Retention Endpoint",
+        url="https://example.com/hook",
+        organization_id=test_organization.id,
+        created_by=test_user.id
+    )
+    db_session.add(endpoint)
+    await db_session.commit()
+
+    old = datetime.utcnow() - timedelta(days=60)
+    specs = (
+        [(DeliveryStatus.DELIVERED, old)] * 7
+        + [(DeliveryStatus.PENDING, old)] * 2
+        + [(DeliveryStatus.FAILED, datetime.utcnow())] * 3
+    )
+    for status, completed_at in specs:
+        db_session.add(WebhookDelivery(
+            endpoint_id=endpoint.id,
+            event_type="task.created",
+            payload={"status": status.value},
+            url=endpoint.url,
+            status=status.value,
+            completed_at=completed_at,
+            organization_id=test_organization.id
+        ))
+    await db_session.commit()
+    return endpoint
+
+
+async def count(db_session: AsyncSession, model) -> int:
+    result = await db_session.execute(select(func.count(model.id)))
+    return result.scalar()
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestRetentionEngine:
+    """Test purging expired rows."""
+
+    @pytest.mark.asyncio
+    async def test_purge_deletes_in_chunks(self, db_session: AsyncSession, deliveries):
+        """Test that only finished, expired deliveries are deleted, chunk by chunk."""
+        engine = RetentionEngine(batch_size=3, pause_seconds=0)
+
+        result = await engine.purge(db_session, "webhook_deliveries", days=30)
+
+        assert result.deleted == 7
+        assert result.batches == 3
+        assert result.archive_path is None
+        assert await count(db_session, WebhookDelivery) == 5
+
+    @pytest.mark.asyncio
+    async def test_purge_deletes_batch_events(self, db_session: AsyncSession, deliveries):
+        """Test that purged deliveries take their batch event rows with them."""
+        result = await db_session.execute(select(WebhookDelivery).order_by(WebhookDelivery.id))
+        for delivery in result.scalars():
+            db_session.add(WebhookDeliveryEvent(
+                delivery_id=delivery.id, event_id=f"event-{delivery.id}",
+                event_type="task.created", position=0, payload={}
+            ))
+        await db_session.commit()
+        # As in the application, where SQLite does not enforce ON DELETE CASCADE
+        await db_session.execute(text("PRAGMA foreign_keys=OFF"))
+
+        engine = RetentionEngine(batch_size=3, pause_seconds=0)
+        result = await engine.purge(db_session, "webhook_deliveries", days=30)
+        assert result.deleted == 7
+
+        orphans = await db_session.execute(
+            select(func.count(WebhookDeliveryEvent.id))
+            .outerjoin(WebhookDelivery, WebhookDelivery.id == WebhookDeliveryEvent.delivery_id)
+            .where(WebhookDelivery.id.is_(None))
+        )
+        assert orphans.scalar() == 0
+        assert await count(db_session, WebhookDeliveryEvent) == 5
+
+    @pytest.mark.asyncio
+    async def test_purge_archives_before_deleting(
+        self, db_session: AsyncSession, deliveries, tmp_path
+    ):
+        """Test that archived rows are exactly the deleted rows."""
+        engine = RetentionEngine(batch_size=4, pause_seconds=0, archive_dir=str(tmp_path))
+
+        result = await engine.purge(db_session, "webhook_deliveries", days=30, archive=True)
+
+        assert result.deleted == 7
+        with gzip.open(result.archive_path, "rt", encoding="utf-8") as archive:
+            rows = [json.loads(line) for line in archive]
+        assert len(rows) == 7
+        assert {row["status"] for row in rows} == {DeliveryStatus.DELIVERED.value}
+        assert len({row["id"] for row in rows}) == 7
+
+    @pytest.mark.asyncio
+    async def test_run_covers_every_policy(self, db_session: AsyncSession, test_user: User):
+        """Test that a full run purges each table by its own timestamp."""
+        for days_ago in (400, 10):
+            db_session.add(AuditLog(
+                user_id=test_user.id,
+                action_type="login",
+                resource_type="user",
+                description="Signed in",
+                created_at=datetime.utcnow() - timedelta(days=days_ago)
+            ))
+        await db_session.commit()
+
+        results = await RetentionEngine(pause_seconds=0).run(db_session)
+
+        assert results["audit_logs"].deleted == 1
+        assert await count(db_session, AuditLog) == 1
+        assert set(results) >= {"webhook_events", "workflow_executions", "login_attempts"}
+
+    @pytest.mark.asyncio
+    async def test_archive_requires_directory(self, db_session: AsyncSession):
+        """Test that archiving without a directory is rejected."""
+        engine = RetentionEngine(archive_dir="")
+
+        with pytest.raises(ValueError):
+            await engine.run(db_session, archive=True)
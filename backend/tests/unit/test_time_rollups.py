@@ -0,0 +1,260 @@
+"""
+Unit tests for time tracking rollups.
+
+Tests maintaining per user, task and day totals as time logs are stopped,
+edited and deleted, reading them as team timesheets and project
+breakdowns, and rebuilding them from the logs.
+"""
+
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.routes.advanced_features import get_timesheet
+from app.models.organization import Organization, OrganizationMember, OrganizationMemberRole
+from app.models.project import Project
+from app.models.task import Task
+from app.models.time_tracking import TaskTimeLog, TimeLogRollup
+from app.models.user import User
+from app.services.advanced_features import TimeTrackingService
+from app.services.time_rollups import TimeLogState, time_rollups
+from scripts import rebuild_rollups as rebuild_script
+
+DAY = date(2026, 3, 2)
+
+
+def at(days: int, hour: int = 9) -> datetime:
+    return datetime.combine(DAY + timedelta(days=days), datetime.min.time()) + timedelta(hours=hour)
+
+
+@pytest_asyncio.fixture
+async def teammate(db_session: AsyncSession) -> User:
+    user = User(
+        email="teammate@example.com", hashed_password="x",
+        first_name="Team", last_name="Mate", status="active"
+    )
+    db_session.add(user)
+    await db_session.commit()
+    return user
+
+
+@pytest_asyncio.fixture
+async def tasks(db_session: AsyncSession, test_user: User, test_project: Project) -> list:
+    tasks = [
+        Task(title=f"Task {index}", project_id=test_project.id, created_by=test_user.id)
+        for index in range(2)
+    ]
+    db_session.add_all(tasks)
+    await db_session.commit()
+    return tasks
+
+
+async def log_time(
+    db_session: AsyncSession, user: User, task: Task, start: datetime, minutes: int, is_billable: bool = True
+) -> TaskTimeLog:
+    """Run a timer for ``minutes`` and record it the way the stop endpoint does."""
+    time_log = TaskTimeLog(task_id=task.id, user_id=user.id, start_time=start, is_billable=is_billable)
+    db_session.add(time_log)
+    await db_session.flush()
+    time_log.stop_timer(start + timedelta(minutes=minutes))
+    await time_rollups.record(db_session, None, TimeLogState.from_time_log(time_log))
+    await db_session.commit()
+    return time_log
+
+
+async def stored_rollups(db_session: AsyncSession) -> list:
+    result = await db_session.execute(
+        select(
+            TimeLogRollup.user_id, TimeLogRollup.task_id, TimeLogRollup.day,
+            TimeLogRollup.minutes, TimeLogRollup.billable_minutes, TimeLogRollup.entries
+        ).order_by(TimeLogRollup.user_id, TimeLogRollup.task_id, TimeLogRollup.day)
+    )
+    return result.all()
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestTimeRollupStore:
+    """Test maintaining and reading time log rollups."""
+
+    @pytest.mark.asyncio
+    async def test_stop_edit_and_delete(self, db_session: AsyncSession, test_user: User, tasks: list):
+        """Test that stopping, editing and deleting logs keep the totals and billable split."""
+        first = await log_time(db_session, test_user, tasks[0], at(0), 90)
+        await log_time(db_session, test_user, tasks[0], at(0, 14), 30, is_billable=False)
+
+        running = TaskTimeLog(task_id=tasks[1].id, user_id=test_user.id, start_time=at(0, 16))
+        db_session.add(running)
+        await db_session.flush()
+        assert TimeLogState.from_time_log(running) is None
+
+        assert await stored_rollups(db_session) == [(test_user.id, tasks[0].id, DAY, 120, 90, 2)]
+
+        # Editing moves the log's minutes, billable split and day
+        before = TimeLogState.from_time_log(first)
+        first.is_billable = False
+        first.start_time = at(1)
+        first.stop_timer(at(1) + timedelta(minutes=60))
+        await time_rollups.record(db_session, before, TimeLogState.from_time_log(first))
+        await db_session.commit()
+        assert await stored_rollups(db_session) == [
+            (test_user.id, tasks[0].id, DAY, 30, 0, 1),
+            (test_user.id, tasks[0].id, DAY + timedelta(days=1), 60, 0, 1),
+        ]
+
+        before = TimeLogState.from_time_log(first)
+        first.is_active = False
+        await time_rollups.record(db_session, before, TimeLogState.from_time_log(first))
+        await db_session.commit()
+
+        matrix = await time_rollups.user_day_matrix(db_session, [test_user.id], DAY, DAY + timedelta(days=1))
+        assert matrix == {
+            test_user.id: {DAY: {"total_minutes": 30, "billable_minutes": 0, "entries_count": 1, "tasks_count": 1}}
+        }
+
+    @pytest.mark.asyncio
+    async def test_team_timesheet_in_one_query(
+        self, db_session: AsyncSession, test_user: User, teammate: User, tasks: list
+    ):
+        """Test that a user by day timesheet for a team comes from a single statement."""
+        await log_time(db_session, test_user, tasks[0], at(0), 60)
+        await log_time(db_session, test_user, tasks[1], at(0, 13), 45, is_billable=False)
+        await log_time(db_session, test_user, tasks[0], at(2), 30)
+        await log_time(db_session, teammate, tasks[1], at(1), 120)
+        await log_time(db_session, teammate, tasks[1], at(5), 15)
+
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(db_session.bind.sync_engine, "before_cursor_execute", count)
+        try:
+            timesheet = await TimeTrackingService.get_timesheet(
+                db_session, [test_user.id, teammate.id], DAY, DAY + timedelta(days=2)
+            )
+        finally:
+            event.remove(db_session.bind.sync_engine, "before_cursor_execute", count)
+
+        assert len(statements) == 1
+        assert timesheet["days"] == [DAY, DAY + timedelta(days=1), DAY + timedelta(days=2)]
+        mine, theirs = timesheet["users"]
+        assert [cell["total_minutes"] for cell in mine["days"]] == [105, 0, 30]
+        assert mine["days"][0] == {
+            "day": DAY, "total_minutes": 105, "billable_minutes": 60, "entries_count": 2, "tasks_count": 2
+        }
+        assert (mine["total_minutes"], mine["billable_minutes"]) == (135, 90)
+        assert [cell["total_minutes"] for cell in theirs["days"]] == [0, 120, 0]
+        assert timesheet["daily_totals"] == [105, 120, 30]
+
+    @pytest.mark.asyncio
+    async def test_timesheet_visibility(
+        self, db_session: AsyncSession, test_user: User, teammate: User,
+        test_organization: Organization, test_project: Project
+    ):
+        """Test that timesheets only cover users and projects the caller shares."""
+        end = DAY + timedelta(days=1)
+
+        with pytest.raises(HTTPException) as excinfo:
+            await get_timesheet(DAY, end, [teammate.id], None, db_session, test_user)
+        assert excinfo.value.status_code == 403
+
+        db_session.add(OrganizationMember(
+            organization_id=test_organization.id, user_id=teammate.id, role=OrganizationMemberRole.MEMBER
+        ))
+        other = Organization(name="Other Organization")
+        db_session.add(other)
+        await db_session.flush()
+        foreign = Project(name="Foreign Project", organization_id=other.id)
+        db_session.add(foreign)
+        await db_session.commit()
+
+        timesheet = await get_timesheet(DAY, end, [teammate.id], None, db_session, test_user)
+        assert [row.user_id for row in timesheet.users] == [teammate.id]
+
+        # The owner may expand a project without being on it, a plain member may not
+        timesheet = await get_timesheet(DAY, end, None, test_project.id, db_session, test_user)
+        assert [row.user_id for row in timesheet.users] == [test_user.id]
+        with pytest.raises(HTTPException) as excinfo:
+            await get_timesheet(DAY, end, None, test_project.id, db_session, teammate)
+        assert excinfo.value.status_code == 403
+        with pytest.raises(HTTPException) as excinfo:
+            await get_timesheet(DAY, end, None, foreign.id, db_session, test_user)
+        assert excinfo.value.status_code == 403
+
+    @pytest.mark.asyncio
+    async def test_summaries_and_breakdown(
+        self, db_session: AsyncSession, test_user: User, teammate: User, test_project: Project, tasks: list
+    ):
+        """Test that the daily summary and project breakdown read the rollups."""
+        await log_time(db_session, test_user, tasks[0], at(0), 90)
+        await log_time(db_session, test_user, tasks[1], at(0, 13), 30, is_billable=False)
+        await log_time(db_session, teammate, tasks[1], at(1), 240)
+
+        summary = await TimeTrackingService.get_user_daily_summary(db_session, test_user.id, at(0))
+        assert summary["total_minutes"] == 120
+        assert summary["total_hours"] == 2.0
+        assert summary["billable_hours"] == 1.5
+        assert (summary["entries_count"], summary["tasks_count"]) == (2, 2)
+
+        breakdown = await TimeTrackingService.get_project_time_breakdown(db_session, test_project.id)
+        assert [(row["user_name"], row["total_hours"], row["billable_hours"]) for row in breakdown] == [
+            ("Team Mate", 4.0, 4.0),
+            ("Test User", 2.0, 1.5),
+        ]
+        first_day = await TimeTrackingService.get_project_time_breakdown(
+            db_session, test_project.id, at(0), at(0)
+        )
+        assert [row["user_id"] for row in first_day] == [test_user.id]
+
+    @pytest.mark.asyncio
+    async def test_rebuild_matches_incremental(
+        self, db_session: AsyncSession, test_user: User, teammate: User, tasks: list
+    ):
+        """Test that rebuilding from the logs gives the incrementally maintained rows."""
+        await log_time(db_session, test_user, tasks[0], at(0), 90)
+        await log_time(db_session, test_user, tasks[0], at(0, 14), 30, is_billable=False)
+        await log_time(db_session, teammate, tasks[1], at(3), 45)
+        incremental = await stored_rollups(db_session)
+
+        # A log written before rollups existed
+        db_session.add(TaskTimeLog(
+            task_id=tasks[1].id, user_id=teammate.id, start_time=at(4),
+            end_time=at(4, 10), duration_minutes=60, is_billable=True
+        ))
+        await db_session.commit()
+
+        assert await time_rollups.rebuild(db_session, [test_user.id]) == 1
+        assert await stored_rollups(db_session) == incremental
+
+        assert await time_rollups.rebuild(db_session) == 3
+        assert await stored_rollups(db_session) == incremental + [
+            (teammate.id, tasks[1].id, DAY + timedelta(days=4), 60, 60, 1)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_rebuild_command_backfills_existing_logs(
+        self, db_session: AsyncSession, test_user: User, tasks: list, monkeypatch
+    ):
+        """Test that the rebuild command makes logs written before the rollups visible."""
+        db_session.add(TaskTimeLog(
+            task_id=tasks[0].id, user_id=test_user.id, start_time=at(0),
+            end_time=at(0, 11), duration_minutes=120, is_billable=True
+        ))
+        await db_session.commit()
+
+        summary = await TimeTrackingService.get_user_daily_summary(db_session, test_user.id, at(0))
+        assert summary["total_minutes"] == 0
+
+        @asynccontextmanager
+        async def session():
+            yield db_session
+        monkeypatch.setattr(rebuild_script, "get_async_session", session)
+        await rebuild_script._rebuild(None)
+
+        summary = await TimeTrackingService.get_user_daily_summary(db_session, test_user.id, at(0))
+        assert summary["total_minutes"] == 120
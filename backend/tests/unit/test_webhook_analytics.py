@@ -0,0 +1,133 @@
+"""
+Unit tests for webhook delivery analytics.
+
+Tests the grouped aggregates and histogram percentiles.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.organization import Organization
+from app.models.user import User
+from app.models.webhooks import DeliveryStatus, WebhookDelivery, WebhookEndpoint
+from app.schemas.webhooks import WebhookAnalyticsFilter
+from app.services.webhook_analytics import (
+    PERCENTILES, RESPONSE_TIME_BUCKETS, WebhookAnalyticsService, _bucket_percentiles
+)
+
+
+@pytest_asyncio.fixture
+async def deliveries(
+    db_session: AsyncSession, test_organization: Organization, test_user: User
+):
+    """Create 100 deliveries over two days; every tenth one fails."""
+    endpoint = WebhookEndpoint(
+        name="Analytics Endpoint",
+        url="https://example.com/hook",
+        organization_id=test_organization.id,
+        created_by=test_user.id
+    )
+    db_session.add(endpoint)
+    await db_session.commit()
+
+    day = datetime(2026, 3, 1, 12, 0)
+    for n in range(100):
+        failed = n % 10 == 0
+        db_session.add(WebhookDelivery(
+            endpoint_id=endpoint.id,
+            event_type="task.created" if n % 2 else "task.updated",
+            payload={},
+            url=endpoint.url,
+            status=(DeliveryStatus.FAILED if failed else DeliveryStatus.DELIVERED).value,
+            response_status_code=500 if failed else 200,
+            response_time_ms=(n + 1) * 10,
+            scheduled_at=day + timedelta(days=n // 50),
+            organization_id=test_organization.id
+        ))
+    await db_session.commit()
+    return endpoint
+
+
+@pytest.mark.unit
+class TestBucketPercentiles:
+    """Test percentile interpolation from histogram buckets."""
+
+    def test_percentiles_fall_in_the_right_bucket(self):
+        """Test that each percentile lands within its bucket's bounds."""
+        values = list(range(1, 1001))
+        counts = {}
+        for value in values:
+            bucket = next(
+                (index for index, bound in enumerate(RESPONSE_TIME_BUCKETS) if value <= bound),
+                len(RESPONSE_TIME_BUCKETS)
+            )
+            counts[bucket] = counts.get(bucket, 0) + 1
+
+        results = _bucket_percentiles(sorted(counts.items()), 1, 1000)
+        for q in PERCENTILES:
+            exact = values[int(q * (len(values) - 1))]
+            assert abs(results[q] - exact) <= exact * 0.25
+
+    def test_histogram_smaller_than_count(self):
+        """Test that a histogram read after deliveries were removed still interpolates."""
+        assert _bucket_percentiles([], 1, 1000) == {q: 0 for q in PERCENTILES}
+
+        results = _bucket_percentiles([(3, 2)], 8, 9)
+        assert all(8 <= results[q] <= 9 for q in PERCENTILES)
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestWebhookAnalyticsService:
+    """Test SQL-computed webhook analytics."""
+
+    @pytest.mark.asyncio
+    async def test_overall_stats(self, db_session: AsyncSession, deliveries):
+        """Test totals, success rate and response times."""
+        analytics = await WebhookAnalyticsService().get_analytics(
+            db_session, deliveries.organization_id, WebhookAnalyticsFilter()
+        )
+
+        stats = analytics["overall_stats"]
+        assert stats["total_deliveries"] == 100
+        assert stats["successful_deliveries"] == 90
+        assert stats["failed_deliveries"] == 10
+        assert stats["success_rate"] == 90.0
+        assert stats["average_response_time_ms"] == 505.0
+        assert stats["max_response_time_ms"] == 1000
+        assert 400 <= stats["median_response_time_ms"] <= 620
+        assert 760 <= stats["p95_response_time_ms"] <= 1000
+
+    @pytest.mark.asyncio
+    async def test_breakdowns(self, db_session: AsyncSession, deliveries):
+        """Test the per-day, per-event-type and failing endpoint breakdowns."""
+        analytics = await WebhookAnalyticsService().get_analytics(
+            db_session, deliveries.organization_id, WebhookAnalyticsFilter()
+        )
+
+        assert [row["date"] for row in analytics["deliveries_by_day"]] == ["2026-03-01", "2026-03-02"]
+        assert [row["total_deliveries"] for row in analytics["deliveries_by_day"]] == [50, 50]
+        by_type = {row["event_type"]: row for row in analytics["deliveries_by_event_type"]}
+        assert by_type["task.updated"]["failed_deliveries"] == 10
+        assert by_type["task.created"]["failed_deliveries"] == 0
+
+        [failing] = analytics["top_failing_endpoints"]
+        assert failing["endpoint_id"] == deliveries.id
+        assert failing["failure_rate"] == 10.0
+        assert len(analytics["response_time_trends"]) == 2
+
+    @pytest.mark.asyncio
+    async def test_filters_apply_to_every_figure(self, db_session: AsyncSession, deliveries):
+        """Test that status filters narrow the aggregates."""
+        analytics = await WebhookAnalyticsService().get_analytics(
+            db_session,
+            deliveries.organization_id,
+            WebhookAnalyticsFilter(status_filter=[DeliveryStatus.FAILED])
+        )
+
+        assert analytics["overall_stats"]["total_deliveries"] == 10
+        assert analytics["overall_stats"]["successful_deliveries"] == 0
+        assert sum(row["total_deliveries"] for row in analytics["deliveries_by_day"]) == 10
@@ -0,0 +1,259 @@
+"""
+Unit tests for batched webhook delivery.
+
+Tests appending events to open batches, sealing and per-event status.
+"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.organization import Organization
+from app.models.user import User
+from app.models.webhooks import (
+    BATCH_EVENT_TYPE, DeliveryStatus, WebhookDelivery, WebhookEndpoint, WebhookEvent
+)
+from app.services.webhook_queue import WebhookDeliveryQueue
+from app.services.webhook_service import WebhookService
+
+
+@pytest_asyncio.fixture
+async def endpoint(
+    db_session: AsyncSession, test_organization: Organization, test_user: User
+) -> WebhookEndpoint:
+    """Create a batching webhook endpoint."""
+    endpoint = WebhookEndpoint(
+        name="Batch Endpoint",
+        url="https://example.com/hook",
+        secret="batch-secret",
+        batch_enabled=True,
+        batch_max_size=3,
+        batch_max_linger_ms=60000,
+        batch_max_bytes=64 * 1024,
+        organization_id=test_organization.id,
+        created_by=test_user.id
+    )
+    db_session.add(endpoint)
+    await db_session.commit()
+    return endpoint
+
+
+async def create_event(db_session: AsyncSession, endpoint: WebhookEndpoint, n: int) -> WebhookEvent:
+    event = WebhookEvent(
+        event_type="task.created",
+        event_source="task",
+        source_id=n,
+        payload={"task_id": n},
+        context={},
+        organization_id=endpoint.organization_id
+    )
+    db_session.add(event)
+    await db_session.commit()
+    return event
+
+
+async def add_to_batch(
+    db_session: AsyncSession, service: WebhookService, endpoint: WebhookEndpoint, event: WebhookEvent
+):
+    """Append the way event processing does, committing afterwards."""
+    result = await service._add_to_batch(db_session, endpoint, event)
+    await db_session.commit()
+    return result
+
+
+async def get_batches(db_session: AsyncSession, endpoint: WebhookEndpoint):
+    result = await db_session.execute(
+        select(WebhookDelivery)
+        .where(WebhookDelivery.endpoint_id == endpoint.id)
+        .order_by(WebhookDelivery.id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().all()
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestWebhookBatching:
+    """Test collecting events into batch deliveries."""
+
+    @pytest.mark.asyncio
+    async def test_events_append_to_open_batch(
+        self, db_session: AsyncSession, endpoint: WebhookEndpoint
+    ):
+        """Test that events share one lingering batch until it is due."""
+        service = WebhookService()
+        for n in range(2):
+            event = await create_event(db_session, endpoint, n)
+            await add_to_batch(db_session, service, endpoint, event)
+
+        [batch] = await get_batches(db_session, endpoint)
+        assert batch.event_type == BATCH_EVENT_TYPE
+        assert batch.status == DeliveryStatus.BATCHING.value
+        assert batch.event_count == 2
+        assert batch.payload == []
+        assert batch.next_retry_at > datetime.utcnow()
+
+        # Not claimable until the linger expires
+        queue = WebhookDeliveryQueue(
+            service,
+            session_factory=async_sessionmaker(bind=db_session.bind, expire_on_commit=False)
+        )
+        assert await queue.claim(db_session, "worker-1") is None
+
+        batch.next_retry_at = datetime.utcnow() - timedelta(seconds=1)
+        await db_session.commit()
+        assert await queue.claim(db_session, "worker-1") == (batch.id, endpoint.id)
+
+    @pytest.mark.asyncio
+    async def test_full_batch_is_queued_immediately(
+        self, db_session: AsyncSession, endpoint: WebhookEndpoint
+    ):
+        """Test that reaching batch_max_size queues the batch and opens a new one."""
+        service = WebhookService()
+        for n in range(4):
+            event = await create_event(db_session, endpoint, n)
+            await add_to_batch(db_session, service, endpoint, event)
+
+        full, opened = await get_batches(db_session, endpoint)
+        assert full.status == DeliveryStatus.PENDING.value
+        assert full.next_retry_at is None
+        assert full.event_count == 3
+        assert opened.status == DeliveryStatus.BATCHING.value
+        assert opened.event_count == 1
+
+    @pytest.mark.asyncio
+    async def test_claimed_batch_rejects_appends(
+        self, db_session: AsyncSession, endpoint: WebhookEndpoint
+    ):
+        """Test that events never join a batch a worker has leased."""
+        service = WebhookService()
+        event = await create_event(db_session, endpoint, 0)
+        await add_to_batch(db_session, service, endpoint, event)
+
+        [batch] = await get_batches(db_session, endpoint)
+        batch.locked_by = "worker-1"
+        batch.locked_until = datetime.utcnow() + timedelta(minutes=5)
+        await db_session.commit()
+
+        event = await create_event(db_session, endpoint, 1)
+        await add_to_batch(db_session, service, endpoint, event)
+
+        claimed, opened = await get_batches(db_session, endpoint)
+        assert claimed.event_count == 1
+        assert opened.event_count == 1
+
+    @pytest.mark.asyncio
+    async def test_seal_signs_batch_payload(
+        self, db_session: AsyncSession, endpoint: WebhookEndpoint
+    ):
+        """Test that sealing builds the list payload from the batch's events and signs it."""
+        service = WebhookService()
+        for n in range(2):
+            event = await create_event(db_session, endpoint, n)
+            await add_to_batch(db_session, service, endpoint, event)
+
+        [batch] = await get_batches(db_session, endpoint)
+        batch.endpoint = endpoint
+        await service._seal_batch(db_session, batch)
+
+        assert [item["data"] for item in batch.payload] == [{"task_id": 0}, {"task_id": 1}]
+        assert batch.status == DeliveryStatus.PENDING
+        assert batch.headers["X-Webhook-Event"] == BATCH_EVENT_TYPE
+        assert batch.headers["X-Webhook-Batch-Size"] == "2"
+        assert batch.signature == service._generate_webhook_signature(
+            json.dumps(batch.payload, sort_keys=True), endpoint.secret
+        )
+
+    @pytest.mark.asyncio
+    async def test_event_delivery_status_includes_batches(
+        self, db_session: AsyncSession, endpoint: WebhookEndpoint
+    ):
+        """Test per-event status lookup through the batch."""
+        service = WebhookService()
+        events = []
+        for n in range(2):
+            event = await create_event(db_session, endpoint, n)
+            await add_to_batch(db_session, service, endpoint, event)
+            events.append(event)
+
+        [status] = await service.get_event_delivery_status(
+            db_session, events[1].event_uuid, endpoint.organization_id
+        )
+        assert status["batched"] is True
+        assert status["batch_position"] == 1
+        assert status["status"] == DeliveryStatus.BATCHING.value
+
+    @pytest.mark.asyncio
+    async def test_event_delivery_status_is_scoped_to_members(
+        self, db_session: AsyncSession, endpoint: WebhookEndpoint, authenticated_client: AsyncClient
+    ):
+        """Test that the status endpoint only serves events of the user's organizations."""
+        service = WebhookService()
+        event = await create_event(db_session, endpoint, 0)
+        await add_to_batch(db_session, service, endpoint, event)
+
+        other = Organization(name="Other Organization")
+        db_session.add(other)
+        await db_session.commit()
+        foreign = WebhookEvent(
+            event_type="task.created", event_source="task", source_id=1,
+            payload={}, context={}, organization_id=other.id
+        )
+        db_session.add(foreign)
+        await db_session.commit()
+
+        response = await authenticated_client.get(f"/api/v1/webhooks/events/{event.event_uuid}/deliveries")
+        assert response.status_code == 200
+        assert [status["batched"] for status in response.json()] == [True]
+
+        response = await authenticated_client.get(f"/api/v1/webhooks/events/{foreign.event_uuid}/deliveries")
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_fan_out_is_one_transaction(
+        self, db_session: AsyncSession, endpoint: WebhookEndpoint, monkeypatch
+    ):
+        """Test that a failed fan-out leaves no batch appends and a retry appends once."""
+        service = WebhookService()
+        direct = WebhookEndpoint(
+            name="Direct Endpoint",
+            url="https://example.com/direct",
+            secret="direct-secret",
+            organization_id=endpoint.organization_id,
+            created_by=endpoint.created_by
+        )
+        db_session.add(direct)
+        await db_session.commit()
+        await add_to_batch(db_session, service, endpoint, await create_event(db_session, endpoint, 0))
+        event = await create_event(db_session, endpoint, 1)
+
+        def failing(*args):
+            raise RuntimeError("signing failed")
+        monkeypatch.setattr(service, "_build_webhook_delivery", failing)
+        with pytest.raises(RuntimeError):
+            await service.process_webhook_event(db_session, event.id)
+        await db_session.rollback()
+        await db_session.refresh(endpoint)
+
+        [batch] = await get_batches(db_session, endpoint)
+        assert batch.event_count == 1
+        await db_session.refresh(event)
+        assert not event.is_processed
+
+        monkeypatch.undo()
+        await service.process_webhook_event(db_session, event.id)
+        await service.process_webhook_event(db_session, event.id)
+
+        [batch] = await get_batches(db_session, endpoint)
+        assert batch.event_count == 2
+        statuses = await service.get_event_delivery_status(
+            db_session, event.event_uuid, endpoint.organization_id
+        )
+        assert sorted((status["endpoint_id"], status["batch_position"]) for status in statuses) == [
+            (endpoint.id, 1), (direct.id, None)
+        ]
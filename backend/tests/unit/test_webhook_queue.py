@@ -0,0 +1,165 @@
+"""
+Unit tests for the durable webhook delivery queue.
+
+Tests lease-based claiming, per-endpoint concurrency and timer-armed retries.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.organization import Organization
+from app.models.user import User
+from app.models.webhooks import DeliveryStatus, WebhookDelivery, WebhookEndpoint
+from app.services.webhook_queue import WebhookDeliveryQueue
+
+
+class FakeWebhookService:
+    """Delivery stand-in that tracks concurrency and can fail the first attempt."""
+
+    def __init__(self, fail_first: bool = False):
+        self.fail_first = fail_first
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.delivered = []
+
+    async def _deliver_webhook(self, db: AsyncSession, delivery_id: int) -> bool:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+
+        delivery = await db.get(WebhookDelivery, delivery_id)
+        delivery.locked_by = None
+        delivery.locked_until = None
+        if self.fail_first and delivery.attempt_number == 1:
+            delivery.status = DeliveryStatus.RETRYING.value
+            delivery.attempt_number += 1
+            delivery.next_retry_at = datetime.utcnow() + timedelta(seconds=30)
+        else:
+            delivery.status = DeliveryStatus.DELIVERED.value
+            self.delivered.append(delivery_id)
+        await db.commit()
+        return True
+
+
+@pytest.fixture
+def db_session(file_db_session: AsyncSession) -> AsyncSession:
+    """Use a file-backed database so workers get their own connections."""
+    return file_db_session
+
+
+@pytest_asyncio.fixture
+async def endpoint(
+    db_session: AsyncSession, test_organization: Organization, test_user: User
+) -> WebhookEndpoint:
+    """Create a webhook endpoint."""
+    endpoint = WebhookEndpoint(
+        name="Test Endpoint",
+        url="https://example.com/hook",
+        organization_id=test_organization.id,
+        created_by=test_user.id
+    )
+    db_session.add(endpoint)
+    await db_session.commit()
+    return endpoint
+
+
+async def queue_deliveries(db_session: AsyncSession, endpoint: WebhookEndpoint, count: int):
+    deliveries = [
+        WebhookDelivery(
+            endpoint_id=endpoint.id,
+            event_type="task.created",
+            payload={"n": n},
+            url=endpoint.url,
+            organization_id=endpoint.organization_id
+        )
+        for n in range(count)
+    ]
+    db_session.add_all(deliveries)
+    await db_session.commit()
+    return [delivery.id for delivery in deliveries]
+
+
+def make_queue(db_session: AsyncSession, service, **kwargs) -> WebhookDeliveryQueue:
+    return WebhookDeliveryQueue(
+        service,
+        poll_interval=0.05,
+        session_factory=async_sessionmaker(bind=db_session.bind, expire_on_commit=False),
+        **kwargs
+    )
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestWebhookDeliveryQueue:
+    """Test claiming and draining queued deliveries."""
+
+    @pytest.mark.asyncio
+    async def test_claim_leases_delivery(self, db_session: AsyncSession, endpoint: WebhookEndpoint):
+        """Test that a leased delivery is not claimed twice until the lease expires."""
+        [delivery_id] = await queue_deliveries(db_session, endpoint, 1)
+        queue = make_queue(db_session, FakeWebhookService())
+
+        assert await queue.claim(db_session, "worker-1") == (delivery_id, endpoint.id)
+        assert await queue.claim(db_session, "worker-2") is None
+
+        delivery = await db_session.get(WebhookDelivery, delivery_id)
+        await db_session.refresh(delivery)
+        assert delivery.locked_by == "worker-1"
+
+        delivery.locked_until = datetime.utcnow() - timedelta(seconds=1)
+        await db_session.commit()
+        assert await queue.claim(db_session, "worker-2") == (delivery_id, endpoint.id)
+
+    @pytest.mark.asyncio
+    async def test_workers_drain_queue_with_endpoint_limit(
+        self, db_session: AsyncSession, endpoint: WebhookEndpoint
+    ):
+        """Test that workers deliver everything without exceeding the endpoint limit."""
+        delivery_ids = await queue_deliveries(db_session, endpoint, 6)
+        service = FakeWebhookService()
+        queue = make_queue(db_session, service, worker_count=4, endpoint_concurrency=2)
+
+        queue.start()
+        try:
+            for _ in range(500):
+                if len(service.delivered) == len(delivery_ids):
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await queue.stop()
+
+        assert sorted(service.delivered) == delivery_ids
+        assert service.max_in_flight <= 2
+
+    @pytest.mark.asyncio
+    async def test_failed_delivery_arms_retry_timer(
+        self, db_session: AsyncSession, endpoint: WebhookEndpoint
+    ):
+        """Test that a retrying delivery is parked until its timer fires."""
+        [delivery_id] = await queue_deliveries(db_session, endpoint, 1)
+        service = FakeWebhookService(fail_first=True)
+        queue = make_queue(db_session, service, worker_count=1)
+
+        queue.start()
+        try:
+            for _ in range(500):
+                if delivery_id in queue.wheel:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await queue.stop()
+
+        assert delivery_id in queue.wheel
+        assert service.delivered == []
+        assert await queue.claim(db_session, "worker-2") is None
+
+        result = await db_session.execute(
+            select(WebhookDelivery.status).where(WebhookDelivery.id == delivery_id)
+        )
+        assert result.scalar() == DeliveryStatus.RETRYING.value
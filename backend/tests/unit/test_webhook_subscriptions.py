@@ -0,0 +1,163 @@
+"""
+Unit tests for the webhook subscription index.
+
+Tests compiled filters, per-event-type matching, invalidation and bulk fan-out.
+"""
+
+import json
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.organization import Organization
+from app.models.user import User
+from app.models.webhooks import WebhookDelivery, WebhookEndpoint, WebhookEvent, WebhookStatus
+from app.services.webhook_service import WebhookService
+from app.services.webhook_subscriptions import (
+    CompiledSubscription, SubscriptionIndex, compile_filters, parse_event_types
+)
+
+
+def make_event(**kwargs) -> WebhookEvent:
+    values = {
+        "event_type": "task.created",
+        "event_source": "task",
+        "source_id": 1,
+        "payload": {"project_id": 7},
+        "context": {},
+        "organization_id": 1,
+        "user_id": 3,
+    }
+    values.update(kwargs)
+    return WebhookEvent(**values)
+
+
+@pytest_asyncio.fixture
+async def endpoints(
+    db_session: AsyncSession, test_organization: Organization, test_user: User
+):
+    """Create endpoints with different subscriptions."""
+    specs = [
+        ("Tasks", ["task.created", "task.updated"], {}),
+        ("Project 7 tasks", ["task.created"], {"project_id": 7}),
+        ("Everything", [], {}),
+        ("Projects", ["project.created"], {}),
+    ]
+    endpoints = []
+    for name, event_types, filters in specs:
+        endpoint = WebhookEndpoint(
+            name=name,
+            url=f"https://example.com/{len(endpoints)}",
+            secret="subscription-secret",
+            event_types=json.dumps(event_types),
+            filters=filters,
+            organization_id=test_organization.id,
+            created_by=test_user.id
+        )
+        db_session.add(endpoint)
+        endpoints.append(endpoint)
+    await db_session.commit()
+    return endpoints
+
+
+@pytest.mark.unit
+class TestCompiledSubscription:
+    """Test compiling endpoint subscriptions."""
+
+    def test_parse_event_types(self):
+        """Test reading event types from the JSON string column."""
+        assert parse_event_types('["task.created"]') == frozenset({"task.created"})
+        assert parse_event_types("[]") == frozenset()
+        assert parse_event_types(["task.created"]) == frozenset({"task.created"})
+
+    def test_filters_match_source_user_and_payload(self):
+        """Test that compiled filters keep the documented semantics."""
+        predicates = compile_filters({"source_type": "task", "user_id": 3, "project_id": 7})
+        assert all(predicate(make_event()) for predicate in predicates)
+        assert not all(predicate(make_event(user_id=4)) for predicate in predicates)
+        assert not all(predicate(make_event(payload={"project_id": 8})) for predicate in predicates)
+        # Payload keys only filter events that carry them
+        assert all(predicate(make_event(payload={})) for predicate in predicates)
+
+    def test_empty_event_types_subscribe_to_everything(self):
+        """Test that an endpoint without event types receives every event."""
+        subscription = CompiledSubscription(endpoint_id=1, event_types=frozenset())
+        assert subscription.matches(make_event(event_type="project.deleted"))
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestSubscriptionIndex:
+    """Test matching events against the compiled index."""
+
+    @pytest.mark.asyncio
+    async def test_match_uses_event_type_and_filters(self, db_session: AsyncSession, endpoints):
+        """Test that only subscribed endpoints with passing filters match."""
+        index = SubscriptionIndex(ttl=60)
+        organization_id = endpoints[0].organization_id
+        tasks, project_tasks, everything, projects = [endpoint.id for endpoint in endpoints]
+
+        event = make_event(organization_id=organization_id)
+        assert sorted(await index.match(db_session, event)) == [tasks, project_tasks, everything]
+
+        event = make_event(organization_id=organization_id, payload={"project_id": 8})
+        assert sorted(await index.match(db_session, event)) == [tasks, everything]
+
+        event = make_event(organization_id=organization_id, event_type="project.created")
+        assert sorted(await index.match(db_session, event)) == [everything, projects]
+
+    @pytest.mark.asyncio
+    async def test_index_is_cached_until_invalidated(self, db_session: AsyncSession, endpoints):
+        """Test that endpoint changes only show up after invalidation."""
+        index = SubscriptionIndex(ttl=60)
+        organization_id = endpoints[0].organization_id
+        event = make_event(organization_id=organization_id, event_type="project.created")
+        assert len(await index.match(db_session, event)) == 2
+
+        endpoints[3].status = WebhookStatus.SUSPENDED.value
+        await db_session.commit()
+        assert len(await index.match(db_session, event)) == 2
+
+        index.invalidate(organization_id)
+        assert await index.match(db_session, event) == [endpoints[2].id]
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestWebhookFanOut:
+    """Test creating deliveries for an event."""
+
+    @pytest.mark.asyncio
+    async def test_process_event_creates_deliveries_in_bulk(
+        self, db_session: AsyncSession, endpoints
+    ):
+        """Test that each matching endpoint gets one signed delivery."""
+        service = WebhookService()
+        event = make_event(organization_id=endpoints[0].organization_id)
+        db_session.add(event)
+        await db_session.commit()
+
+        deliveries = await service.process_webhook_event(db_session, event.id)
+
+        assert len(deliveries) == 3
+        result = await db_session.execute(
+            select(WebhookDelivery).where(WebhookDelivery.event_id == event.event_uuid)
+        )
+        stored = result.scalars().all()
+        assert sorted(delivery.endpoint_id for delivery in stored) == [
+            endpoints[0].id, endpoints[1].id, endpoints[2].id
+        ]
+        assert all(delivery.signature for delivery in stored)
+        assert event.is_processed
+
+    @pytest.mark.asyncio
+    async def test_endpoint_update_invalidates_index(self, db_session: AsyncSession, endpoints):
+        """Test that updating an endpoint through the service refreshes routing."""
+        service = WebhookService()
+        event = make_event(organization_id=endpoints[0].organization_id, event_type="project.created")
+        assert len(await service.subscriptions.match(db_session, event)) == 2
+
+        await service.update_webhook_endpoint(db_session, endpoints[3].id, {"is_active": False})
+        assert await service.subscriptions.match(db_session, event) == [endpoints[2].id]
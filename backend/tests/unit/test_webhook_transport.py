@@ -0,0 +1,131 @@
+"""
+Unit tests for the webhook delivery transport.
+
+Tests per-host pooling, connection reuse metrics and DNS caching using
+httpcore's mock network backend.
+"""
+
+import httpcore
+import httpx
+import pytest
+
+from app.services.webhook_transport import WebhookTransport
+
+OK_RESPONSE = b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok"
+CLOSE_RESPONSE = b"HTTP/1.1 200 OK\r\nConnection: close\r\nContent-Length: 2\r\n\r\nok"
+
+
+class CountingResolver:
+    """Resolver stand-in that counts lookups."""
+
+    def __init__(self):
+        self.lookups = []
+
+    async def __call__(self, host: str, port: int):
+        self.lookups.append(host)
+        return ["127.0.0.1"]
+
+
+def make_transport(resolver: CountingResolver, responses=None, **kwargs) -> WebhookTransport:
+    return WebhookTransport(
+        http2=False,
+        **kwargs,
+        network_backend=httpcore.AsyncMockBackend(responses or [OK_RESPONSE] * 3),
+        resolver=resolver
+    )
+
+
+@pytest.mark.unit
+class TestWebhookTransport:
+    """Test pooled webhook delivery."""
+
+    @pytest.mark.asyncio
+    async def test_reuses_connections_per_host(self):
+        """Test that sequential deliveries to one host reuse one connection."""
+        resolver = CountingResolver()
+        transport = make_transport(resolver)
+        try:
+            for _ in range(3):
+                response = await transport.post("http://hooks.example.com/a", endpoint_id=1, json={})
+                assert response.status_code == 200
+
+            stats = transport.get_pool_stats()
+            assert stats["endpoints"][1]["requests"] == 3
+            assert stats["endpoints"][1]["pool_misses"] == 1
+            assert stats["endpoints"][1]["pool_hits"] == 2
+            assert stats["hosts"]["http://hooks.example.com:80"]["connections"] == 1
+        finally:
+            await transport.close()
+
+    @pytest.mark.asyncio
+    async def test_separate_pool_per_host(self):
+        """Test that each destination host gets its own pool."""
+        transport = make_transport(CountingResolver())
+        try:
+            await transport.post("http://a.example.com/hook", endpoint_id=1, json={})
+            await transport.post("http://b.example.com/hook", endpoint_id=2, json={})
+
+            stats = transport.get_pool_stats()
+            assert set(stats["hosts"]) == {"http://a.example.com:80", "http://b.example.com:80"}
+            assert stats["endpoints"][2]["pool_misses"] == 1
+        finally:
+            await transport.close()
+
+    @pytest.mark.asyncio
+    async def test_dns_lookups_are_cached(self):
+        """Test that new connections to a host reuse the cached lookup."""
+        resolver = CountingResolver()
+        # The server closes every connection, forcing a new connect per request
+        transport = make_transport(resolver, responses=[CLOSE_RESPONSE])
+        try:
+            await transport.post("http://hooks.example.com/a", endpoint_id=1, json={})
+            await transport.post("http://hooks.example.com/b", endpoint_id=1, json={})
+
+            assert transport.get_pool_stats()["endpoints"][1]["pool_misses"] == 2
+
+            assert resolver.lookups == ["hooks.example.com"]
+        finally:
+            await transport.close()
+
+    @pytest.mark.asyncio
+    async def test_ip_literals_skip_resolution(self):
+        """Test that IP addresses are connected to directly."""
+        resolver = CountingResolver()
+        transport = make_transport(resolver)
+        try:
+            await transport.post("http://10.0.0.5:8080/hook", json={})
+            assert resolver.lookups == []
+        finally:
+            await transport.close()
+
+    @pytest.mark.asyncio
+    async def test_connect_errors_are_httpx_errors(self):
+        """Test that failed connects surface as httpx errors and drop the cached lookup."""
+        class FailingBackend(httpcore.AsyncMockBackend):
+            async def connect_tcp(self, host, port, **kwargs):
+                raise httpcore.ConnectError(f"refused by {host}")
+
+        resolver = CountingResolver()
+        transport = WebhookTransport(http2=False, network_backend=FailingBackend([]), resolver=resolver)
+        try:
+            with pytest.raises(httpx.ConnectError):
+                await transport.post("http://hooks.example.com/a", json={})
+            with pytest.raises(httpx.ConnectError):
+                await transport.post("http://hooks.example.com/a", json={})
+            assert resolver.lookups == ["hooks.example.com", "hooks.example.com"]
+        finally:
+            await transport.close()
+
+    @pytest.mark.asyncio
+    async def test_evicted_pools_are_closed(self):
+        """Test that pools evicted beyond max_hosts are closed and awaited on close."""
+        transport = make_transport(CountingResolver(), max_hosts=1)
+        await transport.post("http://a.example.com/hook", json={})
+        transport._get_client("http://b.example.com:80")
+
+        assert set(transport.get_pool_stats()["hosts"]) == {"http://b.example.com:80"}
+        closing = set(transport._closing)
+        assert len(closing) == 1
+        await transport.close()
+        assert all(task.done() for task in closing)
+        assert not transport._closing
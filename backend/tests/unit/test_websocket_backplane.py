@@ -0,0 +1,120 @@
+"""
+Unit tests for multi-node WebSocket fan-out.
+
+Uses the in-process backplane to connect two ConnectionManager instances
+as if they were running on separate workers.
+"""
+
+import json
+
+import pytest
+import pytest_asyncio
+
+from app.core.backplane import InProcessBackplane
+from app.core.websocket import ConnectionManager, MessageType
+
+
+class FakeWebSocket:
+    """Minimal WebSocket stand-in that records sent frames."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text: str) -> None:
+        self.sent.append(json.loads(text))
+
+
+@pytest_asyncio.fixture
+async def nodes():
+    """Create two managers sharing one in-process backplane."""
+    backplane = InProcessBackplane()
+    node_a = ConnectionManager()
+    node_b = ConnectionManager()
+    await node_a.attach_backplane(backplane)
+    await node_b.attach_backplane(backplane)
+
+    node_a.active_connections = {1: {"conn-a": FakeWebSocket()}}
+    node_b.active_connections = {2: {"conn-b": FakeWebSocket()}}
+    return node_a, node_b
+
+
+@pytest.mark.unit
+class TestBackplaneFanOut:
+    """Test that broadcasts reach connections held by other nodes."""
+
+    @pytest.mark.asyncio
+    async def test_project_broadcast_reaches_other_node(self, nodes):
+        """Test that a project broadcast on node A reaches node B."""
+        node_a, node_b = nodes
+        await node_b.subscribe_to_project(2, 10, "conn-b")
+
+        await node_a.broadcast_to_project(
+            10, MessageType.TASK_UPDATED, {"task_id": 5}, exclude_user=1
+        )
+
+        frames = node_b.active_connections[2]["conn-b"].sent
+        assert frames[-1]["type"] == "task_updated"
+        assert frames[-1]["data"] == {"task_id": 5}
+
+    @pytest.mark.asyncio
+    async def test_exclude_user_applies_on_every_node(self, nodes):
+        """Test that the excluded user is skipped on remote nodes too."""
+        node_a, node_b = nodes
+        await node_b.subscribe_to_task(2, 100, "conn-b")
+
+        await node_a.broadcast_to_task(
+            100, MessageType.COMMENT_ADDED, {"comment_id": 1}, exclude_user=2
+        )
+
+        assert node_b.active_connections[2]["conn-b"].sent == []
+
+    @pytest.mark.asyncio
+    async def test_send_to_user_is_delivered_once(self, nodes):
+        """Test that a direct message is delivered once and not echoed back."""
+        node_a, node_b = nodes
+
+        await node_b.send_to_user(1, MessageType.NOTIFICATION, {"message": "hi"})
+        await node_a.send_to_user(1, MessageType.NOTIFICATION, {"message": "again"})
+
+        frames = node_a.active_connections[1]["conn-a"].sent
+        assert [frame["data"]["message"] for frame in frames] == ["hi", "again"]
+
+    @pytest.mark.asyncio
+    async def test_presence_is_shared(self, nodes):
+        """Test that presence reflects users connected to any node."""
+        node_a, node_b = nodes
+        node_a.presence.register_connection("conn-a", 1)
+        node_b.presence.register_connection("conn-b", 2)
+        await node_a.subscribe_to_project(1, 10, "conn-a")
+        await node_b.subscribe_to_project(2, 10, "conn-b")
+        await node_a.presence.flush()
+        await node_b.presence.flush()
+
+        presence = await node_a.get_project_presence(10)
+        assert presence["total_online"] == 2
+
+        await node_b.disconnect("conn-b", 2)
+        await node_b.presence.flush()
+        presence = await node_a.get_project_presence(10)
+        assert [user["user_id"] for user in presence["online_users"]] == [1]
+
+    @pytest.mark.asyncio
+    async def test_failed_start_is_not_attached(self):
+        """Test that a backplane whose start fails is stopped and not used."""
+
+        class BrokenBackplane(InProcessBackplane):
+            stopped = False
+
+            async def start(self, handler) -> None:
+                raise ConnectionError("subscribe failed")
+
+            async def stop(self) -> None:
+                self.stopped = True
+
+        backplane = BrokenBackplane()
+        node = ConnectionManager()
+        with pytest.raises(ConnectionError):
+            await node.attach_backplane(backplane)
+
+        assert node.backplane is None
+        assert backplane.stopped
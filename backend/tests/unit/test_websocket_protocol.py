@@ -0,0 +1,77 @@
+"""
+Unit tests for WebSocket wire protocol negotiation and encoding.
+"""
+
+import json
+
+import msgpack
+import pytest
+
+from app.core.websocket import MessageType
+from app.core.websocket_protocol import (MESSAGE_TYPE_CODES, JSONProtocol,
+                                         MsgpackProtocol, negotiate_protocol)
+
+
+@pytest.mark.unit
+class TestProtocolNegotiation:
+    """Test selection of the wire protocol for a connection."""
+
+    def test_json_is_default(self):
+        """Test that clients without a preference get JSON."""
+        protocol, subprotocol = negotiate_protocol(None, [])
+        assert isinstance(protocol, JSONProtocol)
+        assert subprotocol is None
+
+    def test_subprotocol_selects_msgpack(self):
+        """Test that an offered subprotocol is accepted and echoed back."""
+        protocol, subprotocol = negotiate_protocol("json", ["teamflow.msgpack.v1"])
+        assert isinstance(protocol, MsgpackProtocol)
+        assert subprotocol == "teamflow.msgpack.v1"
+
+    def test_msgpack_connections_do_not_share_state(self):
+        """Test that each msgpack connection gets its own delta state."""
+        first, _ = negotiate_protocol("msgpack", [])
+        second, _ = negotiate_protocol("msgpack", [])
+        assert first is not second
+
+
+@pytest.mark.unit
+class TestFrameEncoding:
+    """Test the JSON and msgpack frame formats."""
+
+    def test_json_frame_format_unchanged(self):
+        """Test that JSON frames keep the type/data/timestamp shape."""
+        frame = json.loads(JSONProtocol().encode(MessageType.ERROR.value, {"error": "x"}))
+        assert frame["type"] == "error"
+        assert frame["data"] == {"error": "x"}
+        assert "timestamp" in frame
+
+    def test_every_message_type_has_a_code(self):
+        """Test that all message types can be sent over msgpack."""
+        assert {message_type.value for message_type in MessageType} == set(MESSAGE_TYPE_CODES)
+        assert len(set(MESSAGE_TYPE_CODES.values())) == len(MESSAGE_TYPE_CODES)
+
+    def test_repeated_task_snapshots_are_delta_encoded(self):
+        """Test that later snapshots of a task only carry changed fields."""
+        protocol = MsgpackProtocol()
+        snapshot = {"task_id": 7, "task_title": "Write docs", "status": "todo", "priority": "high"}
+
+        full = msgpack.unpackb(protocol.encode("task_updated", snapshot))
+        delta = msgpack.unpackb(
+            protocol.encode("task_updated", {"task_id": 7, "task_title": "Write docs", "status": "done"})
+        )
+
+        assert full[0] == MESSAGE_TYPE_CODES["task_updated"]
+        assert full[2] == snapshot
+        assert len(delta) == 4
+        assert delta[2] == {"task_id": 7, "status": "done"}
+        assert delta[3] == ["priority"]
+
+    def test_snapshot_cache_is_bounded(self):
+        """Test that the per-connection snapshot cache evicts old tasks."""
+        protocol = MsgpackProtocol(max_snapshots=2)
+        for task_id in range(3):
+            protocol.encode("task_updated", {"task_id": task_id})
+
+        frame = msgpack.unpackb(protocol.encode("task_updated", {"task_id": 0}))
+        assert len(frame) == 3
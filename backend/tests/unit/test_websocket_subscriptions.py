@@ -0,0 +1,87 @@
+"""
+Unit tests for the WebSocket subscription registry.
+
+Tests that the ConnectionManager keeps its connection -> topic reverse index
+in sync with the project/task registries and cleans up empty entries.
+"""
+
+import pytest
+
+from app.core.websocket import ConnectionManager
+
+
+class FakeWebSocket:
+    """Minimal WebSocket stand-in that records sent frames."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text: str) -> None:
+        self.sent.append(text)
+
+
+@pytest.fixture
+def manager() -> ConnectionManager:
+    """Create a connection manager with two connected users."""
+    manager = ConnectionManager()
+    manager.active_connections = {
+        1: {"conn-a": FakeWebSocket(), "conn-b": FakeWebSocket()},
+        2: {"conn-c": FakeWebSocket()},
+    }
+    return manager
+
+
+@pytest.mark.unit
+class TestSubscriptionRegistry:
+    """Test subscribe, unsubscribe and disconnect bookkeeping."""
+
+    @pytest.mark.asyncio
+    async def test_subscribe_records_reverse_index(self, manager: ConnectionManager):
+        """Test that subscriptions are indexed by connection."""
+        await manager.subscribe_to_project(1, 10, "conn-a")
+        await manager.subscribe_to_task(1, 100, "conn-a")
+
+        assert manager.project_subscriptions == {10: {1: {"conn-a"}}}
+        assert manager.task_subscriptions == {100: {1: {"conn-a"}}}
+        assert manager.connection_subscriptions["conn-a"] == {
+            ("project", 10),
+            ("task", 100),
+        }
+
+    @pytest.mark.asyncio
+    async def test_unsubscribe_removes_empty_topics(self, manager: ConnectionManager):
+        """Test that unsubscribing the last connection drops the topic."""
+        await manager.subscribe_to_task(1, 100, "conn-a")
+        await manager.unsubscribe_from_task(1, 100, "conn-a")
+
+        assert 100 not in manager.task_subscriptions
+        assert "conn-a" not in manager.connection_subscriptions
+
+    @pytest.mark.asyncio
+    async def test_disconnect_only_touches_own_topics(self, manager: ConnectionManager):
+        """Test that disconnect leaves other connections subscribed."""
+        await manager.subscribe_to_project(1, 10, "conn-a")
+        await manager.subscribe_to_project(1, 10, "conn-b")
+        await manager.subscribe_to_task(1, 100, "conn-a")
+        await manager.subscribe_to_task(2, 100, "conn-c")
+
+        await manager.disconnect("conn-a", 1)
+
+        assert manager.project_subscriptions == {10: {1: {"conn-b"}}}
+        assert manager.task_subscriptions == {100: {2: {"conn-c"}}}
+        assert "conn-a" not in manager.connection_subscriptions
+        assert "conn-a" not in manager.active_connections[1]
+
+    @pytest.mark.asyncio
+    async def test_disconnect_clears_typing_indicators(self, manager: ConnectionManager):
+        """Test that typing indicators of a dropped connection are cleared."""
+        await manager.subscribe_to_task(2, 100, "conn-c")
+        await manager.handle_typing_indicator(1, 100, "conn-a", True)
+
+        await manager.disconnect("conn-a", 1)
+
+        assert 100 not in manager.presence.typing_indicators
+        assert any(
+            "user_stopped_typing" in frame
+            for frame in manager.active_connections[2]["conn-c"].sent
+        )
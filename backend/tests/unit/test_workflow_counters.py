@@ -0,0 +1,206 @@
+"""
+Unit tests for workflow quota counters and statistics.
+
+Tests daily quota counting, reconciliation and coalesced statistics writes.
+"""
+
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.organization import Organization
+from app.models.user import User
+from app.models.workflow import ExecutionStatus, TriggerType, WorkflowDefinition, WorkflowExecution
+from app.services.workflow_counters import (
+    MemoryWorkflowQuotaCounter, RedisWorkflowQuotaCounter, WorkflowStatsWriter
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeRedis:
+    """Redis stand-in running the counter's scripts against a dict."""
+
+    def __init__(self):
+        self.values = {}
+        self.down = False
+
+    def register_script(self, source: str):
+        async def run(keys, args=()):
+            if self.down:
+                raise ConnectionError("Redis is down")
+            key = keys[0]
+            count = self.values.get(key)
+            if source == RedisWorkflowQuotaCounter.RELEASE_SCRIPT:
+                if count is not None and count > 0:
+                    self.values[key] = count - 1
+                    return count - 1
+                return -1
+            limit, _, seed = args
+            if count is None or count < 0:
+                if seed < 0:
+                    return -1
+                count = self.values[key] = seed
+            if count >= limit:
+                return 0
+            self.values[key] = count + 1
+            return 1
+        return run
+
+
+def redis_counter() -> RedisWorkflowQuotaCounter:
+    counter = RedisWorkflowQuotaCounter("redis://unused")
+    counter._redis = FakeRedis()
+    counter._script = counter._redis.register_script(counter.ACQUIRE_SCRIPT)
+    counter._release_script = counter._redis.register_script(counter.RELEASE_SCRIPT)
+    return counter
+
+
+@pytest_asyncio.fixture
+async def workflow(db_session: AsyncSession, test_organization: Organization, test_user: User):
+    """Create a workflow."""
+    workflow = WorkflowDefinition(
+        name="Counted",
+        trigger_type=TriggerType.TASK_CREATED,
+        conditions=[],
+        actions=[],
+        organization_id=test_organization.id,
+        created_by=test_user.id
+    )
+    db_session.add(workflow)
+    await db_session.commit()
+    return workflow
+
+
+async def add_executions(db_session: AsyncSession, workflow: WorkflowDefinition, count: int):
+    db_session.add_all([
+        WorkflowExecution(
+            workflow_id=workflow.id,
+            trigger_data={},
+            status=ExecutionStatus.SUCCESS,
+            started_at=datetime.utcnow()
+        )
+        for _ in range(count)
+    ])
+    await db_session.commit()
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestMemoryWorkflowQuotaCounter:
+    """Test in-memory daily quota counters."""
+
+    @pytest.mark.asyncio
+    async def test_seeds_from_database_and_enforces_limit(
+        self, db_session: AsyncSession, workflow: WorkflowDefinition
+    ):
+        """Test that today's stored executions count against the limit."""
+        await add_executions(db_session, workflow, 2)
+        counter = MemoryWorkflowQuotaCounter(reconcile_interval=60, clock=FakeClock())
+
+        reservation = await counter.acquire(db_session, workflow.id, 3)
+        assert reservation
+        assert not await counter.acquire(db_session, workflow.id, 3)
+
+        await counter.release(reservation)
+        assert await counter.acquire(db_session, workflow.id, 3)
+
+    @pytest.mark.asyncio
+    async def test_reconciles_after_interval(
+        self, db_session: AsyncSession, workflow: WorkflowDefinition
+    ):
+        """Test that counters only re-read the database once the interval has passed."""
+        clock = FakeClock()
+        counter = MemoryWorkflowQuotaCounter(reconcile_interval=60, clock=clock)
+        assert await counter.acquire(db_session, workflow.id, 5)
+
+        # Executions stored by another process
+        await add_executions(db_session, workflow, 5)
+        assert await counter.acquire(db_session, workflow.id, 5)
+
+        clock.now = 61
+        assert not await counter.acquire(db_session, workflow.id, 5)
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestRedisWorkflowQuotaCounter:
+    """Test shared quota counters and their in-memory fallback."""
+
+    @pytest.mark.asyncio
+    async def test_release_goes_to_the_granting_backend(
+        self, db_session: AsyncSession, workflow: WorkflowDefinition
+    ):
+        """Test that reservations made while Redis was down are released locally."""
+        counter = redis_counter()
+        fake = counter._redis
+        key = counter._key(workflow.id, counter.today())
+
+        from_redis = await counter.acquire(db_session, workflow.id, 2)
+        assert from_redis.backend == "redis"
+
+        fake.down = True
+        from_memory = await counter.acquire(db_session, workflow.id, 2)
+        assert from_memory.backend == "memory"
+        assert counter.fallback._counters[workflow.id][1] == 1
+
+        fake.down = False
+        await counter.release(from_memory)
+        assert counter.fallback._counters[workflow.id][1] == 0
+        assert fake.values[key] == 1
+
+        await counter.release(from_redis)
+        assert fake.values[key] == 0
+
+    @pytest.mark.asyncio
+    async def test_release_never_creates_a_counter(
+        self, db_session: AsyncSession, workflow: WorkflowDefinition
+    ):
+        """Test that releasing after Redis lost the key leaves it to be seeded from the database."""
+        await add_executions(db_session, workflow, 1)
+        counter = redis_counter()
+        fake = counter._redis
+
+        reservation = await counter.acquire(db_session, workflow.id, 2)
+        fake.values.clear()
+        await counter.release(reservation)
+        assert fake.values == {}
+
+        assert await counter.acquire(db_session, workflow.id, 2)
+        assert not await counter.acquire(db_session, workflow.id, 2)
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestWorkflowStatsWriter:
+    """Test coalesced workflow statistics."""
+
+    @pytest.mark.asyncio
+    async def test_flush_adds_buffered_counts(
+        self, db_session: AsyncSession, workflow: WorkflowDefinition
+    ):
+        """Test that buffered executions are added to the workflow's statistics."""
+        writer = WorkflowStatsWriter(
+            session_factory=async_sessionmaker(bind=db_session.bind, expire_on_commit=False)
+        )
+        for success in (True, True, False):
+            writer.record(workflow.id, success=success)
+        assert await writer.flush() == 1
+
+        writer.record(workflow.id, success=True)
+        assert await writer.flush() == 1
+        assert await writer.flush() == 0
+
+        await db_session.refresh(workflow)
+        assert workflow.execution_count == 4
+        assert workflow.success_count == 3
+        assert workflow.failure_count == 1
+        assert workflow.last_executed_at is not None
@@ -0,0 +1,215 @@
+"""
+Unit tests for the workflow execution queue.
+
+Tests queued triggering, delayed actions and per-workflow claiming.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.organization import Organization
+from app.models.project import Project
+from app.models.task import Task
+from app.models.user import User
+from app.models.workflow import ExecutionStatus, TriggerType, WorkflowDefinition, WorkflowExecution
+from app.schemas.workflow import WorkflowTriggerEvent
+from app.services.workflow_engine import WorkflowEngineService, workflow_execution_queue
+from app.services.workflow_queue import WorkflowExecutionQueue
+
+
+@pytest.fixture
+def db_session(file_db_session: AsyncSession) -> AsyncSession:
+    """Use a file-backed database so workers get their own connections."""
+    return file_db_session
+
+
+@pytest_asyncio.fixture
+async def make_workflow(db_session: AsyncSession, test_organization: Organization, test_user: User):
+    """Factory for enabled workflows notifying on task creation."""
+    async def make(actions, execution_delay_seconds: int = 0) -> WorkflowDefinition:
+        workflow = WorkflowDefinition(
+            name="Notify",
+            trigger_type=TriggerType.TASK_CREATED,
+            conditions=[],
+            actions=actions,
+            execution_delay_seconds=execution_delay_seconds,
+            organization_id=test_organization.id,
+            created_by=test_user.id
+        )
+        db_session.add(workflow)
+        await db_session.commit()
+        return workflow
+    return make
+
+
+def notify(delay_seconds: int = 0):
+    return {
+        "action_type": "send_notification",
+        "parameters": {"message": "hi", "recipient_ids": [1]},
+        "delay_seconds": delay_seconds
+    }
+
+
+def make_queue(db_session: AsyncSession, engine, **kwargs) -> WorkflowExecutionQueue:
+    return WorkflowExecutionQueue(
+        engine,
+        poll_interval=0.05,
+        session_factory=async_sessionmaker(bind=db_session.bind, expire_on_commit=False),
+        **kwargs
+    )
+
+
+async def queue_execution(db_session: AsyncSession, workflow: WorkflowDefinition, **values) -> int:
+    execution = WorkflowExecution(
+        workflow_id=workflow.id,
+        trigger_data={"trigger_type": "task_created", "entity_type": "task", "entity_id": 1},
+        status=ExecutionStatus.PENDING,
+        planned_actions=workflow.actions,
+        next_action_index=0,
+        scheduled_at=datetime.utcnow(),
+        **values
+    )
+    db_session.add(execution)
+    await db_session.commit()
+    return execution.id
+
+
+async def wait_for(condition, attempts: int = 500):
+    for _ in range(attempts):
+        if await condition():
+            return
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestWorkflowExecutionQueue:
+    """Test queueing and running workflow executions."""
+
+    @pytest.mark.asyncio
+    async def test_trigger_queues_without_waiting(
+        self, db_session: AsyncSession, make_workflow, test_project: Project, test_user: User
+    ):
+        """Test that a delayed workflow is queued and the caller returns at once."""
+        workflow = await make_workflow([notify()], execution_delay_seconds=3600)
+        task = Task(title="Queued", project_id=test_project.id, created_by=test_user.id)
+        db_session.add(task)
+        await db_session.commit()
+        event = WorkflowTriggerEvent(
+            trigger_type=TriggerType.TASK_CREATED,
+            entity_type="task",
+            entity_id=task.id
+        )
+
+        [result] = await asyncio.wait_for(
+            WorkflowEngineService().process_trigger_event(db_session, event), timeout=5
+        )
+        assert result["status"] == "queued"
+
+        execution = await db_session.get(WorkflowExecution, result["execution_id"])
+        assert execution.status == ExecutionStatus.PENDING
+        assert execution.scheduled_at > datetime.utcnow() + timedelta(minutes=59)
+        assert execution.id in workflow_execution_queue.wheel
+        assert await make_queue(db_session, WorkflowEngineService()).claim(db_session, "w") is None
+        workflow_execution_queue.wheel.cancel(execution.id)
+
+    @pytest.mark.asyncio
+    async def test_trigger_ignores_organization_in_context(
+        self, db_session: AsyncSession, make_workflow, test_user: User
+    ):
+        """Test that a caller cannot run another organization's workflows through the context."""
+        await make_workflow([notify()])
+        other = Organization(name="Other Organization")
+        db_session.add(other)
+        await db_session.commit()
+        project = Project(name="Other Project", organization_id=other.id)
+        db_session.add(project)
+        await db_session.commit()
+        task = Task(title="Elsewhere", project_id=project.id, created_by=test_user.id)
+        db_session.add(task)
+        await db_session.commit()
+
+        engine = WorkflowEngineService()
+        event = WorkflowTriggerEvent(
+            trigger_type=TriggerType.TASK_CREATED,
+            entity_type="task",
+            entity_id=task.id,
+            context={"organization_id": (await make_workflow([])).organization_id}
+        )
+        assert await engine.process_trigger_event(db_session, event) == []
+        assert event.context["organization_id"] == other.id
+
+    @pytest.mark.asyncio
+    async def test_delayed_action_parks_execution(self, db_session: AsyncSession, make_workflow):
+        """Test that a worker stops before a delayed action and resumes when it is due."""
+        workflow = await make_workflow([notify(), notify(delay_seconds=3600)])
+        execution_id = await queue_execution(db_session, workflow)
+        queue = make_queue(db_session, WorkflowEngineService(), worker_count=1)
+
+        queue.start()
+        try:
+            async def parked():
+                return execution_id in queue.wheel
+            await wait_for(parked)
+        finally:
+            await queue.stop()
+
+        execution = await db_session.get(WorkflowExecution, execution_id)
+        await db_session.refresh(execution)
+        assert execution.status == ExecutionStatus.PENDING
+        assert execution.next_action_index == 1
+        assert len(execution.actions_executed) == 1
+        assert execution.locked_by is None
+
+        execution.scheduled_at = datetime.utcnow()
+        await db_session.commit()
+        engine = WorkflowEngineService()
+        engine.stats.session_factory = async_sessionmaker(bind=db_session.bind, expire_on_commit=False)
+        assert await engine.run_execution(db_session, execution_id) is None
+        assert await engine.stats.flush() == 1
+
+        await db_session.refresh(execution)
+        assert execution.status == ExecutionStatus.SUCCESS
+        assert len(execution.actions_executed) == 2
+        workflow = await db_session.get(WorkflowDefinition, workflow.id)
+        await db_session.refresh(workflow)
+        assert workflow.success_count == 1
+
+    @pytest.mark.asyncio
+    async def test_one_leased_execution_per_workflow(self, db_session: AsyncSession, make_workflow):
+        """Test that executions of one workflow wait while another workflow's run."""
+        first = await make_workflow([notify()])
+        second = await make_workflow([notify()])
+        first_ids = [await queue_execution(db_session, first) for _ in range(2)]
+        second_id = await queue_execution(db_session, second)
+        queue = make_queue(db_session, WorkflowEngineService())
+
+        assert await queue.claim(db_session, "worker-1") == (first_ids[0], first.id)
+        assert await queue.claim(db_session, "worker-2") == (second_id, second.id)
+        assert await queue.claim(db_session, "worker-3") is None
+
+    @pytest.mark.asyncio
+    async def test_workers_drain_queue(self, db_session: AsyncSession, make_workflow):
+        """Test that workers complete every queued execution."""
+        workflows = [await make_workflow([notify(), notify()]) for _ in range(3)]
+        execution_ids = [
+            await queue_execution(db_session, workflow) for workflow in workflows for _ in range(2)
+        ]
+        queue = make_queue(db_session, WorkflowEngineService(), worker_count=3)
+
+        async def drained():
+            async with queue.session_factory() as session:
+                executions = [await session.get(WorkflowExecution, id) for id in execution_ids]
+                return all(execution.status == ExecutionStatus.SUCCESS for execution in executions)
+
+        queue.start()
+        try:
+            await wait_for(drained)
+        finally:
+            await queue.stop()
+
+        assert await drained()
@@ -0,0 +1,145 @@
+"""
+Unit tests for compiled workflow rules.
+
+Tests condition compilation and the per-organization trigger index.
+"""
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.organization import Organization
+from app.models.project import Project
+from app.models.user import User
+from app.models.workflow import TriggerType, WorkflowDefinition
+from app.schemas.workflow import WorkflowTriggerEvent
+from app.services.workflow_rules import WorkflowIndex, compile_condition, compile_conditions
+
+
+def make_event(trigger_type: TriggerType = TriggerType.TASK_CREATED, **event_data) -> WorkflowTriggerEvent:
+    return WorkflowTriggerEvent(
+        trigger_type=trigger_type,
+        entity_type="task",
+        entity_id=1,
+        event_data=event_data,
+        context={"source": "api"}
+    )
+
+
+@pytest_asyncio.fixture
+async def workflows(db_session: AsyncSession, test_organization: Organization, test_user: User):
+    """Create workflows with different triggers and conditions."""
+    specs = [
+        ("Urgent tasks", TriggerType.TASK_CREATED,
+         [{"field": "priority", "operator": "equals", "value": "urgent"}]),
+        ("All new tasks", TriggerType.TASK_CREATED, []),
+        ("Completed tasks", TriggerType.TASK_COMPLETED, []),
+    ]
+    workflows = []
+    for name, trigger_type, conditions in specs:
+        workflow = WorkflowDefinition(
+            name=name,
+            trigger_type=trigger_type,
+            conditions=conditions,
+            actions=[],
+            organization_id=test_organization.id,
+            created_by=test_user.id
+        )
+        db_session.add(workflow)
+        workflows.append(workflow)
+    await db_session.commit()
+    return workflows
+
+
+@pytest.mark.unit
+class TestCompiledConditions:
+    """Test compiling workflow conditions into predicates."""
+
+    @pytest.mark.parametrize("operator,expected,value,result", [
+        ("equals", "urgent", "urgent", True),
+        ("not_equals", "urgent", "low", True),
+        ("greater_than", 2, "3", True),
+        ("greater_than", 2, "n/a", False),
+        ("less_equal", "5", 5, True),
+        ("contains", "BUG", "Fix bug in login", True),
+        ("not_contains", "bug", "Add feature", True),
+        ("in", ["a", "b"], "a", True),
+        ("in", ["a", "b"], {"unhashable": True}, False),
+        ("not_in", ["a", "b"], "c", True),
+        ("in", "urgent,high", "high", True),
+        ("not_in", "urgent,high", "high", False),
+        ("in", "urgent,high", 1, False),
+        ("is_null", None, None, True),
+        ("is_not_null", None, 0, True),
+        ("starts_with", "fix", "Fix login", True),
+        ("ends_with", "LOGIN", "Fix login", True),
+        ("ends_with", "login", "Fix logout", False),
+    ])
+    def test_operators(self, operator, expected, value, result):
+        """Test each operator against the event data."""
+        predicate = compile_condition({"field": "event.value", "operator": operator, "value": expected})
+        assert predicate(make_event(value=value)) is result
+
+    def test_context_fields_and_unknown_operators(self):
+        """Test context lookups and that unknown operators never match."""
+        event = make_event()
+        assert compile_condition({"field": "context.source", "operator": "equals", "value": "api"})(event)
+        assert not compile_condition({"field": "source", "operator": "matches", "value": "api"})(event)
+
+    def test_condition_logic(self):
+        """Test AND (default) and OR combination."""
+        conditions = [
+            {"field": "priority", "operator": "equals", "value": "urgent"},
+            {"field": "points", "operator": "greater_than", "value": 5},
+        ]
+        event = make_event(priority="urgent", points=1)
+        assert not compile_conditions(conditions, "AND")(event)
+        assert compile_conditions(conditions, "OR")(event)
+        assert compile_conditions([], "AND")(event)
+
+
+@pytest.mark.unit
+@pytest.mark.database
+class TestWorkflowIndex:
+    """Test matching trigger events against the compiled index."""
+
+    @pytest.mark.asyncio
+    async def test_match_by_trigger_and_conditions(self, db_session: AsyncSession, workflows):
+        """Test that only workflows for the trigger whose conditions pass match."""
+        index = WorkflowIndex(ttl=60)
+        organization_id = workflows[0].organization_id
+
+        matched = await index.match(db_session, organization_id, make_event(priority="urgent"))
+        assert [workflow.name for workflow in matched] == ["Urgent tasks", "All new tasks"]
+
+        matched = await index.match(db_session, organization_id, make_event(priority="low"))
+        assert [workflow.name for workflow in matched] == ["All new tasks"]
+
+    @pytest.mark.asyncio
+    async def test_index_is_cached_until_invalidated(self, db_session: AsyncSession, workflows):
+        """Test that definition changes show up after invalidation."""
+        index = WorkflowIndex(ttl=60)
+        organization_id = workflows[0].organization_id
+        event = make_event(TriggerType.TASK_COMPLETED)
+        assert len(await index.match(db_session, organization_id, event)) == 1
+
+        workflows[2].is_enabled = False
+        await db_session.commit()
+        assert len(await index.match(db_session, organization_id, event)) == 1
+
+        index.invalidate(organization_id)
+        assert await index.match(db_session, organization_id, event) == []
+
+    @pytest.mark.asyncio
+    async def test_entity_organization_is_cached(
+        self, db_session: AsyncSession, test_organization: Organization
+    ):
+        """Test resolving and caching a project's organization."""
+        project = Project(name="Cached", organization_id=test_organization.id)
+        db_session.add(project)
+        await db_session.commit()
+
+        index = WorkflowIndex()
+        assert await index.get_organization_id(db_session, "project", project.id) == test_organization.id
+        assert index._entity_orgs[("project", project.id)] == test_organization.id
+        assert await index.get_organization_id(db_session, "user", 1) is None